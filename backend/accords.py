@@ -0,0 +1,185 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+METRICS = ("cosine", "overlap")
+
+
+class AccordIndex:
+    """
+    Dense perfumes × accords matrix for "smells like" search.
+
+    Each row holds one perfume's accord strengths (0–1, from the scraped
+    percentages) over the shared accord vocabulary. Queries score every
+    perfume in one vectorized pass and pick the top k with argpartition.
+
+    Two metrics are available:
+
+    - "cosine": cosine similarity of the accord vectors; row norms are
+      precomputed, so this is a single matrix-vector product.
+    - "overlap": weighted Jaccard, sum(min) / sum(max). It also penalises
+      accords the candidate has but the query lacks.
+    """
+
+    def __init__(self, urls: Sequence[str], names: Sequence[str], brands: Sequence[str], accords: Sequence[str], matrix: np.ndarray):
+        """
+        Args:
+            urls: Perfume URL per row.
+            names: Perfume name per row.
+            brands: Brand per row.
+            accords: Accord name per column (lower-case).
+            matrix: float32 array of shape (len(urls), len(accords)).
+        """
+        self.urls = list(urls)
+        self.names = list(names)
+        self.brands = list(brands)
+        self.accords = list(accords)
+        self.matrix = matrix
+        self.row_of = {url: row for row, url in enumerate(self.urls)}
+        self.column_of = {accord: column for column, accord in enumerate(self.accords)}
+
+        brand_keys = [(brand or "").lower() for brand in self.brands]
+        self.brand_codes: Dict[str, int] = {brand: code for code, brand in enumerate(dict.fromkeys(brand_keys))}
+        self.brand_of_row = np.array([self.brand_codes[brand] for brand in brand_keys], dtype=np.int32)
+
+        # Only the norms are kept, not a normalized copy, so a memory-mapped
+        # matrix stays shared between processes
+        norms = np.linalg.norm(matrix, axis=1).astype(np.float32)
+        self.norms = np.where(norms == 0, 1, norms)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "AccordIndex":
+        """
+        Build from scraped perfume dicts (accords as [{"woody": 82.3}, ...]).
+
+        Records without accords are left out; a repeated URL keeps its last record.
+        """
+        profiles: Dict[str, dict] = {}
+        for record in records:
+            accords = cls._profile(record.get("accords"))
+            if record.get("url") and accords:
+                profiles[record["url"]] = {"name": record.get("name"), "brand": record.get("brand"), "accords": accords}
+
+        vocabulary = sorted({accord for profile in profiles.values() for accord in profile["accords"]})
+        column_of = {accord: column for column, accord in enumerate(vocabulary)}
+        matrix = np.zeros((len(profiles), len(vocabulary)), dtype=np.float32)
+        for row, profile in enumerate(profiles.values()):
+            for accord, strength in profile["accords"].items():
+                matrix[row, column_of[accord]] = strength
+        return cls(
+            list(profiles), [p["name"] for p in profiles.values()], [p["brand"] for p in profiles.values()], vocabulary, matrix
+        )
+
+    @classmethod
+    def from_db(cls, db) -> "AccordIndex":
+        """Build from a db.PerfumeDB using its perfume_accords table."""
+        rows = db.conn.execute(
+            "SELECT p.url, p.name, b.name AS brand, a.name AS accord, pa.strength FROM perfume_accords pa "
+            "JOIN perfumes p ON p.id = pa.perfume_id JOIN accords a ON a.id = pa.accord_id "
+            "LEFT JOIN brands b ON b.id = p.brand_id ORDER BY p.id, pa.position"
+        )
+        records: Dict[str, dict] = {}
+        for url, name, brand, accord, strength in rows:
+            record = records.setdefault(url, {"url": url, "name": name, "brand": brand, "accords": []})
+            record["accords"].append({accord: strength})
+        return cls.from_records(records.values())
+
+    @staticmethod
+    def _profile(accords) -> Dict[str, float]:
+        """Flatten [{"woody": 82.3}, ...] or {"woody": 82.3} into {accord: strength in 0..1}."""
+        if isinstance(accords, dict):
+            accords = [accords]
+        profile: Dict[str, float] = {}
+        for accord in accords or []:
+            for name, strength in accord.items():
+                profile[name.strip().lower()] = max(0.0, float(strength)) / 100.0
+        return profile
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def vector(self, accords) -> np.ndarray:
+        """
+        Encode an accord profile over this index's vocabulary.
+
+        Args:
+            accords: {"oud": 80, "rose": 40} or the scraped list-of-dicts layout,
+                with strengths in percent. Unknown accords are ignored.
+        """
+        vector = np.zeros(len(self.accords), dtype=np.float32)
+        for accord, strength in self._profile(accords).items():
+            column = self.column_of.get(accord)
+            if column is not None:
+                vector[column] = strength
+        return vector
+
+    def _scores(self, query: np.ndarray, metric: str) -> np.ndarray:
+        if metric == "cosine":
+            norm = np.linalg.norm(query)
+            return (self.matrix @ (query / norm)) / self.norms if norm else np.zeros(len(self), dtype=np.float32)
+        if metric == "overlap":
+            union = np.maximum(self.matrix, query).sum(axis=1)
+            return np.minimum(self.matrix, query).sum(axis=1) / np.where(union == 0, 1, union)
+        raise ValueError(f"Unknown metric {metric!r}; expected one of {METRICS}")
+
+    def _top_k(self, scores: np.ndarray, k: int, brands: Optional[Iterable[str]], exclude: Optional[int]) -> List[Dict]:
+        mask = np.ones(len(scores), dtype=bool)
+        if brands is not None:
+            codes = [self.brand_codes[b.lower()] for b in brands if b.lower() in self.brand_codes]
+            mask &= np.isin(self.brand_of_row, codes)
+        if exclude is not None:
+            mask[exclude] = False
+        candidates = np.flatnonzero(mask)
+        if not len(candidates) or k <= 0:
+            return []
+
+        candidate_scores = scores[candidates]
+        if k < len(candidates):
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-candidate_scores[top], kind="stable")]
+        return [
+            {"url": self.urls[row], "name": self.names[row], "brand": self.brands[row], "score": float(scores[row])}
+            for row in candidates[top].tolist()
+        ]
+
+    def similar_to(self, url: str, k: int = 10, brands: Optional[Iterable[str]] = None, metric: str = "cosine") -> List[Dict]:
+        """
+        Perfumes whose accords are closest to the perfume at `url`.
+
+        Args:
+            url (str): Reference perfume.
+            k (int): Number of results.
+            brands: Only return perfumes from these brands (e.g. ["Lattafa", "Armaf"]).
+            metric (str): "cosine" or "overlap".
+
+        Returns:
+            list: Dicts with url, name, brand and score, best first.
+        """
+        row = self.row_of.get(url)
+        if row is None:
+            raise KeyError(f"No accords indexed for {url}")
+        return self._top_k(self._scores(self.matrix[row], metric), k, brands, exclude=row)
+
+    def search(self, accords, k: int = 10, brands: Optional[Iterable[str]] = None, metric: str = "cosine") -> List[Dict]:
+        """
+        Perfumes closest to a user-supplied accord profile, e.g. {"oud": 80, "rose": 50}.
+        """
+        return self._top_k(self._scores(self.vector(accords), metric), k, brands, exclude=None)
+
+    def save(self, directory: str):
+        """Write the matrix as .npy (memory-mappable) plus a JSON sidecar of labels."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "accords.npy"), self.matrix)
+        with open(os.path.join(directory, "accords.json"), "w", encoding="utf-8") as f:
+            json.dump({"urls": self.urls, "names": self.names, "brands": self.brands, "accords": self.accords}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "AccordIndex":
+        with open(os.path.join(directory, "accords.json"), encoding="utf-8") as f:
+            labels = json.load(f)
+        matrix = np.load(os.path.join(directory, "accords.npy"), mmap_mode="r" if mmap else None)
+        return cls(labels["urls"], labels["names"], labels["brands"], labels["accords"], matrix)
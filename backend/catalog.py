@@ -0,0 +1,306 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from backend.db import DATA_DIR, PERFUMES_PATH, iter_json_records
+from backend.versioning import current_version_dir, publish_version
+
+CATALOG_DIR = os.path.join(DATA_DIR, "catalog")
+FORMAT_VERSION = 1
+
+SCALAR_FIELDS = ("url", "name", "brand", "photo_url")
+LIST_FIELDS = ("notes", "smells_like", "pros", "cons", "reviews")
+# Bit per optional list column in `present.npy`, so None and [] round-trip
+PRESENT_BITS = {field: 1 << i for i, field in enumerate(LIST_FIELDS + ("accords",))}
+
+PERFUME_ID_RE = re.compile(r"-(\d+)\.html$")
+
+
+def perfume_id(url: str) -> Optional[int]:
+    """Numeric id at the end of a perfume URL (".../Aventus-9828.html" → 9828)."""
+    match = PERFUME_ID_RE.search(url or "")
+    return int(match.group(1)) if match else None
+
+
+def url_hash(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CatalogWriter:
+    """
+    Streams perfume records into the columnar catalog format.
+
+    Every string (names, brands, notes, accord names, reviews…) is interned
+    into one UTF-8 blob and referenced by an int32 id, so a note shared by
+    thousands of perfumes is stored once. List fields become an int64
+    offsets array plus a flat int32 values array; accord strengths are a
+    float32 array beside the accord name ids. `close` writes every array as
+    .npy so the reader can memory-map it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.count = 0
+        self._string_ids: Dict[str, int] = {}
+        self._blob = bytearray()
+        self._string_offsets = array("q", [0])
+        self._scalars = {field: array("i") for field in SCALAR_FIELDS}
+        self._lists = {field: (array("q", [0]), array("i")) for field in LIST_FIELDS}
+        self._accords = (array("q", [0]), array("i"), array("f"))
+        self._present = array("B")
+        self._ids = array("q")
+        self._url_hashes = array("Q")
+
+    def _intern(self, text: Optional[str]) -> int:
+        if text is None:
+            return -1
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self._string_offsets) - 1
+            self._blob += text.encode("utf-8")
+            self._string_offsets.append(len(self._blob))
+        return string_id
+
+    def add(self, record: dict):
+        for field in SCALAR_FIELDS:
+            self._scalars[field].append(self._intern(record.get(field)))
+        present = 0
+        for field in LIST_FIELDS:
+            offsets, values = self._lists[field]
+            items = record.get(field)
+            if items is not None:
+                present |= PRESENT_BITS[field]
+                values.extend(self._intern(str(item)) for item in items)
+            offsets.append(len(values))
+        offsets, names, weights = self._accords
+        if record.get("accords") is not None:
+            present |= PRESENT_BITS["accords"]
+            for accord in record["accords"]:
+                for name, weight in accord.items():
+                    names.append(self._intern(name))
+                    weights.append(float(weight))
+        offsets.append(len(names))
+        self._present.append(present)
+        pid = perfume_id(record.get("url"))
+        self._ids.append(-1 if pid is None else pid)
+        self._url_hashes.append(url_hash(record.get("url") or ""))
+        self.count += 1
+
+    def _save(self, name: str, values, dtype):
+        np.save(os.path.join(self.directory, name + ".npy"), np.frombuffer(values, dtype=dtype) if len(values) else np.empty(0, dtype))
+
+    def close(self) -> int:
+        """Write all columns, then meta.json last; returns the number of perfumes."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._save("strings", self._blob, np.uint8)
+        self._save("string_offsets", self._string_offsets, np.int64)
+        for field, ids in self._scalars.items():
+            self._save(field, ids, np.int32)
+        for field, (offsets, values) in self._lists.items():
+            self._save(f"{field}.offsets", offsets, np.int64)
+            self._save(f"{field}.values", values, np.int32)
+        offsets, names, weights = self._accords
+        self._save("accords.offsets", offsets, np.int64)
+        self._save("accords.names", names, np.int32)
+        self._save("accords.weights", weights, np.float32)
+        self._save("present", self._present, np.uint8)
+
+        # Sorted lookup tables: URL hash -> row and perfume id -> row, searched with searchsorted
+        hashes = np.frombuffer(self._url_hashes, dtype=np.uint64) if self.count else np.empty(0, np.uint64)
+        order = np.argsort(hashes, kind="stable").astype(np.int32)
+        np.save(os.path.join(self.directory, "url_hashes.npy"), hashes[order])
+        np.save(os.path.join(self.directory, "url_rows.npy"), order)
+        ids = np.frombuffer(self._ids, dtype=np.int64) if self.count else np.empty(0, np.int64)
+        order = np.argsort(ids, kind="stable").astype(np.int32)
+        np.save(os.path.join(self.directory, "ids.npy"), ids[order])
+        np.save(os.path.join(self.directory, "id_rows.npy"), order)
+
+        with open(os.path.join(self.directory, "meta.json"), "w") as f:
+            json.dump({"format": FORMAT_VERSION, "count": self.count, "strings": len(self._string_offsets) - 1}, f)
+        return self.count
+
+
+def write_catalog(records: Iterable[dict], directory: str) -> int:
+    """Compile perfume records into a catalog directory; returns the number written."""
+    writer = CatalogWriter(directory)
+    for record in records:
+        writer.add(record)
+    return writer.close()
+
+
+class PerfumeView:
+    """
+    One catalog row; fields are decoded from the mapped arrays on access.
+
+    Attribute names match the scraper's Perfume model (`view.name`,
+    `view.notes`, `view.accords`…). `as_dict` and `to_model` materialize the
+    whole record.
+    """
+
+    __slots__ = ("catalog", "row")
+
+    def __init__(self, catalog: "Catalog", row: int):
+        self.catalog = catalog
+        self.row = row
+
+    def __getattr__(self, field):
+        if field in SCALAR_FIELDS:
+            return self.catalog._string(int(self.catalog._columns[field][self.row]))
+        if field in PRESENT_BITS:
+            return self.catalog._list(field, self.row)
+        raise AttributeError(field)
+
+    def __eq__(self, other):
+        return isinstance(other, PerfumeView) and other.catalog is self.catalog and other.row == self.row
+
+    def __repr__(self):
+        return f"PerfumeView({self.url!r})"
+
+    @property
+    def id(self) -> Optional[int]:
+        return perfume_id(self.url)
+
+    def as_dict(self, fields: Sequence[str] = SCALAR_FIELDS + ("accords",) + LIST_FIELDS) -> Dict:
+        return {field: getattr(self, field) for field in fields}
+
+    def to_model(self):
+        """The row as a scraper `Perfume` model."""
+        from backend.scrape.models import Perfume
+
+        return Perfume(**self.as_dict())
+
+
+class Catalog:
+    """
+    Read-only, memory-mapped columnar perfume catalog written by CatalogWriter.
+
+    Opening maps the .npy files without reading them, so it takes
+    milliseconds whatever the catalog size, and API workers serving the
+    same catalog share its pages through the OS page cache. Rows are
+    exposed as lazy PerfumeView objects; lookups by URL or perfume id are
+    binary searches over sorted arrays, with no per-perfume Python objects.
+    """
+
+    def __init__(self, directory: str = CATALOG_DIR, mmap: bool = True):
+        directory = current_version_dir(directory)
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["format"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog format {self.meta['format']} in {directory}")
+        mode = "r" if mmap else None
+
+        def load(name):
+            return np.load(os.path.join(directory, name + ".npy"), mmap_mode=mode)
+
+        self.directory = directory
+        self._blob = load("strings")
+        self._string_offsets = load("string_offsets")
+        self._columns = {field: load(field) for field in SCALAR_FIELDS}
+        self._lists = {field: (load(f"{field}.offsets"), load(f"{field}.values")) for field in LIST_FIELDS}
+        self._accords = load("accords.offsets"), load("accords.names"), load("accords.weights")
+        self._present = load("present")
+        self._url_hashes, self._url_rows = load("url_hashes"), load("url_rows")
+        self._ids, self._id_rows = load("ids"), load("id_rows")
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def __getitem__(self, row: int) -> PerfumeView:
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        return PerfumeView(self, row % len(self))
+
+    def __iter__(self) -> Iterator[PerfumeView]:
+        return (PerfumeView(self, row) for row in range(len(self)))
+
+    def __contains__(self, url: str) -> bool:
+        return self.row_of(url) is not None
+
+    def _string(self, string_id: int) -> Optional[str]:
+        if string_id < 0:
+            return None
+        start, stop = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+        return self._blob[start:stop].tobytes().decode("utf-8")
+
+    def _list(self, field: str, row: int):
+        if not self._present[row] & PRESENT_BITS[field]:
+            return None
+        if field == "accords":
+            offsets, names, weights = self._accords
+            start, stop = offsets[row], offsets[row + 1]
+            # Strengths are stored as float32; rounding hides the float32 -> float64 noise (82.3, not 82.30000305)
+            return [
+                {self._string(int(name)): round(float(weight), 4)} for name, weight in zip(names[start:stop], weights[start:stop])
+            ]
+        offsets, values = self._lists[field]
+        return [self._string(int(value)) for value in values[offsets[row]:offsets[row + 1]]]
+
+    def row_of(self, url: str) -> Optional[int]:
+        """Row of the perfume with this URL, or None."""
+        key = np.uint64(url_hash(url))
+        start = int(np.searchsorted(self._url_hashes, key, side="left"))
+        stop = int(np.searchsorted(self._url_hashes, key, side="right"))
+        for row in self._url_rows[start:stop]:  # More than one only on a hash collision
+            if self._string(int(self._columns["url"][row])) == url:
+                return int(row)
+        return None
+
+    def get(self, url: str) -> Optional[PerfumeView]:
+        row = self.row_of(url)
+        return None if row is None else PerfumeView(self, row)
+
+    def by_id(self, pid: int) -> Optional[PerfumeView]:
+        """Perfume whose URL ends in `-{pid}.html`, or None."""
+        position = int(np.searchsorted(self._ids, pid))
+        if position < len(self._ids) and self._ids[position] == pid:
+            return PerfumeView(self, int(self._id_rows[position]))
+        return None
+
+    def records(self, fields: Sequence[str] = ("url", "name", "brand")) -> Iterator[Dict]:
+        """Stream rows as plain dicts holding only `fields`."""
+        for view in self:
+            yield view.as_dict(fields)
+
+
+def build_catalog(perfumes_path: str = PERFUMES_PATH, directory: str = CATALOG_DIR) -> int:
+    """
+    Compile scraped perfumes into `directory`, replacing any previous catalog atomically.
+
+    The catalog is written to a staging directory that becomes a new version
+    of `directory` before its CURRENT pointer is switched (see
+    versioning.publish_version), so an opening Catalog sees the old or the new one.
+
+    Args:
+        perfumes_path (str): Scraped perfumes (.json array or .jsonl checkpoint).
+        directory (str): Catalog directory to write.
+
+    Returns:
+        int: Number of perfumes compiled.
+    """
+    os.makedirs(directory, exist_ok=True)
+    staging = os.path.join(directory, f".staging-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)  # Left behind by an interrupted build
+    count = write_catalog(iter_json_records(perfumes_path), staging)
+    publish_version(directory, staging)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile scraped perfumes into the memory-mapped columnar catalog.")
+    parser.add_argument("--perfumes", default=PERFUMES_PATH, help="Scraped perfumes JSON / JSONL")
+    parser.add_argument("--out", default=CATALOG_DIR, help="Catalog directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = build_catalog(args.perfumes, args.out)
+    written = current_version_dir(args.out)
+    size = sum(os.path.getsize(os.path.join(written, name)) for name in os.listdir(written))
+    print(f"✅ Compiled {count} perfumes ({size / 2 ** 20:.1f} MiB) in {time.perf_counter() - started:.2f}s")
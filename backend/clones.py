@@ -0,0 +1,240 @@
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.linking import PerfumeLinker
+
+# "X is a clone of Y", "X is basically a dupe for Y", "X = a cheap copy of Y"
+CLAIM_RE = re.compile(
+    r"(?:\b(?:is|are|was)|=)\s+(?:\w+\s+){0,3}?(?:clone|dupe|copy|knock\s?off|twin)s?\s+(?:of|for|to)\b", re.IGNORECASE
+)
+SENTENCE_RE = re.compile(r"[^.!?\n]+")
+
+SMELLS_LIKE_WEIGHT = 1.0
+# A brand-only entry resolved to the brand's closest-accord perfume is a guess
+INFERRED_SMELLS_LIKE_WEIGHT = 0.25
+CLAIM_WEIGHT = 0.5  # Per Reddit claim; repeated claims add up
+
+# Cap on the precomputed two-hop neighbourhood of one perfume, so hubs stay bounded
+MAX_NEIGHBOURHOOD = 100
+
+PAGERANK_DAMPING = 0.85
+
+
+def clone_claims(posts: Iterable[dict], linker: PerfumeLinker) -> Iterator[Tuple[str, str]]:
+    """
+    (clone url, original url) pairs claimed in Reddit posts and comments.
+
+    A sentence claims a clone when it reads "X is a clone/dupe/copy of Y":
+    perfumes linked before the phrase are clones of those linked after it.
+    """
+    for post in posts:
+        texts = [post.get("title"), post.get("selftext")] + [c.get("body") for c in post.get("comments") or []]
+        for text in texts:
+            for sentence in SENTENCE_RE.findall(text or ""):
+                claim = CLAIM_RE.search(sentence)
+                if not claim:
+                    continue
+                originals = linker.link(sentence[claim.end():])
+                for clone in linker.link(sentence[:claim.start()]):
+                    for original in originals:
+                        if clone != original:
+                            yield clone, original
+
+
+def resolve_smells_like(text: str, url: str, linker: PerfumeLinker, accords=None) -> Optional[Tuple[str, float]]:
+    """
+    Catalog URL a "reminds me of" entry of the perfume at `url` refers to, with its edge weight.
+
+    Entries naming a perfume are linked with `linker` and weigh
+    SMELLS_LIKE_WEIGHT. The carousel often only yields a brand ("Armaf");
+    given an AccordIndex, such an entry resolves to that brand's perfume
+    with the closest accords, at the lower INFERRED_SMELLS_LIKE_WEIGHT.
+    """
+    linked = [other for other in linker.link(text) if other != url]
+    if linked:
+        return linked[0], SMELLS_LIKE_WEIGHT
+    if accords is not None and url in accords.row_of:
+        closest = accords.similar_to(url, 1, brands=[text])
+        if closest:
+            return closest[0]["url"], INFERRED_SMELLS_LIKE_WEIGHT
+    return None
+
+
+class CloneGraph:
+    """
+    Undirected "smells like / clone of" graph over the catalog, in CSR form.
+
+    Node i is catalog row i. Edges come from resolved `smells_like` entries
+    and Reddit clone claims; parallel edges are merged by summing their
+    weights. The direct neighbours of row i are
+    `indices[indptr[i]:indptr[i + 1]]`, and its neighbourhood up to two hops
+    is precomputed the same way in `hop_indptr` / `hop_indices` / `hops`.
+    Each list is already ranked (direct neighbours by edge weight, then
+    everything by PageRank `centrality`), so a lookup is one array slice.
+    """
+
+    ARRAYS = ("indptr", "indices", "weights", "hop_indptr", "hop_indices", "hops", "centrality")
+    META_FILE = "clones.json"
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def edges(self) -> int:
+        """Number of undirected edges."""
+        return len(self.indices) // 2
+
+    @classmethod
+    def from_edges(cls, count: int, edges: Iterable[Tuple[int, int, float]]) -> "CloneGraph":
+        """
+        Build from (row, row, weight) edges over `count` nodes; self-loops are dropped.
+        """
+        src, dst, weight = [], [], []
+        for a, b, w in edges:
+            if a != b:
+                src += [a, b]
+                dst += [b, a]
+                weight += [w, w]
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        pairs, inverse = np.unique(src * count + dst, return_inverse=True)
+        weights = np.bincount(inverse, weights=np.asarray(weight, dtype=np.float64), minlength=len(pairs))
+        src, dst = pairs // count, pairs % count
+
+        centrality = cls._pagerank(count, src, dst, weights)
+        order = np.lexsort((-centrality[dst], -weights, src))
+        src, dst, weights = src[order], dst[order], weights[order]
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=count), out=indptr[1:])
+        indices = dst.astype(np.int32)
+
+        hop_indptr, hop_indices, hops = cls._two_hop(count, indptr, dst, centrality)
+        return cls({
+            "indptr": indptr, "indices": indices, "weights": weights.astype(np.float32),
+            "hop_indptr": hop_indptr, "hop_indices": hop_indices, "hops": hops, "centrality": centrality.astype(np.float32),
+        })
+
+    @staticmethod
+    def _two_hop(count: int, indptr: np.ndarray, indices: np.ndarray, centrality: np.ndarray):
+        """
+        Ranked neighbourhoods up to two hops, as CSR arrays.
+
+        Each perfume's ranked direct neighbours are first cut to
+        MAX_NEIGHBOURHOOD, so a hub costs at most MAX_NEIGHBOURHOOD² pairs.
+        Every remaining edge u-v is then expanded into u-w for each kept
+        neighbour w of v in one vectorized gather; pairs are deduplicated
+        keeping the shorter hop, ranked (direct neighbours in edge order, then
+        two-hop ones by centrality) and capped at MAX_NEIGHBOURHOOD per perfume.
+        """
+        src = np.repeat(np.arange(count), np.diff(indptr))
+        kept = np.arange(len(indices)) - indptr[src] < MAX_NEIGHBOURHOOD
+        src, indices = src[kept], indices[kept]
+        degree = np.bincount(src, minlength=count)
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(degree, out=indptr[1:])
+        lengths = degree[indices]
+        total = int(lengths.sum())
+        gather = np.repeat(indptr[indices] - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        rows = np.concatenate([src, np.repeat(src, lengths)])
+        others = np.concatenate([indices, indices[gather]])
+        hop = np.concatenate([np.ones(len(src), np.uint8), np.full(total, 2, np.uint8)])
+        rank = np.concatenate([np.arange(len(src), dtype=np.float64), -centrality[indices[gather]]])
+
+        keep = rows != others
+        rows, others, hop, rank = rows[keep], others[keep], hop[keep], rank[keep]
+        # One entry per (row, other) pair, the direct one if there is one
+        order = np.lexsort((hop, others, rows))
+        pairs = rows[order] * count + others[order]
+        first = order[np.concatenate([[True], pairs[1:] != pairs[:-1]])] if len(pairs) else order
+        rows, others, hop, rank = rows[first], others[first], hop[first], rank[first]
+
+        order = np.lexsort((rank, hop, rows))
+        rows, others, hop = rows[order], others[order], hop[order]
+        starts = np.searchsorted(rows, np.arange(count))
+        keep = np.arange(len(rows)) - starts[rows] < MAX_NEIGHBOURHOOD
+        rows, others, hop = rows[keep], others[keep], hop[keep]
+        hop_indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=count), out=hop_indptr[1:])
+        return hop_indptr, others.astype(np.int32), hop.astype(np.uint8)
+
+    @staticmethod
+    def _pagerank(count: int, src: np.ndarray, dst: np.ndarray, weights: np.ndarray, iterations: int = 50) -> np.ndarray:
+        """Weighted PageRank by power iteration; isolated perfumes share the teleport mass evenly."""
+        if not count:
+            return np.empty(0)
+        strength = np.bincount(src, weights=weights, minlength=count)
+        share = weights / strength[src]
+        rank = np.full(count, 1.0 / count)
+        for _ in range(iterations):
+            dangling = rank[strength == 0].sum()
+            updated = (1 - PAGERANK_DAMPING + PAGERANK_DAMPING * dangling) / count
+            updated = updated + PAGERANK_DAMPING * np.bincount(dst, weights=rank[src] * share, minlength=count)
+            if np.abs(updated - rank).sum() < 1e-10:
+                return updated
+            rank = updated
+        return rank
+
+    @classmethod
+    def build(
+        cls, records: Iterable[dict], linker: PerfumeLinker, accords=None, claims: Iterable[Tuple[str, str]] = ()
+    ) -> "CloneGraph":
+        """
+        Resolve perfumes' `smells_like` entries and Reddit clone claims into a graph.
+
+        Args:
+            records: Perfume dicts with url and smells_like, in catalog row order.
+            linker (PerfumeLinker): Links perfume names to catalog URLs.
+            accords (AccordIndex): Resolves brand-only entries; optional.
+            claims: (clone url, original url) pairs, e.g. from `clone_claims`.
+        """
+        urls: List[str] = []
+        similar: List[Tuple[int, Sequence[str]]] = []
+        for row, record in enumerate(records):
+            urls.append(record["url"])
+            if record.get("smells_like"):
+                similar.append((row, record["smells_like"]))
+        row_of = {url: row for row, url in enumerate(urls)}
+
+        edges: List[Tuple[int, int, float]] = []
+        for row, entries in similar:
+            for text in entries:
+                resolved = resolve_smells_like(text, urls[row], linker, accords)
+                if resolved and resolved[0] in row_of:
+                    edges.append((row, row_of[resolved[0]], resolved[1]))
+        for clone, original in claims:
+            if clone in row_of and original in row_of:
+                edges.append((row_of[clone], row_of[original], CLAIM_WEIGHT))
+        return cls.from_edges(len(urls), edges)
+
+    def neighbours(self, row: int, hops: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ranked (rows, hop distances) within `hops` (1 or 2) of `row`.
+
+        Returns views into the graph arrays; nothing is computed per query.
+        """
+        if hops == 1:
+            rows = self.indices[self.indptr[row]:self.indptr[row + 1]][:MAX_NEIGHBOURHOOD]
+            return rows, np.ones(len(rows), dtype=np.uint8)
+        start, stop = self.hop_indptr[row], self.hop_indptr[row + 1]
+        return self.hop_indices[start:stop], self.hops[start:stop]
+
+    def save(self, directory: str):
+        """Write every array as .npy (memory-mappable) plus a small JSON sidecar."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, self.META_FILE), "w") as f:
+            json.dump({"perfumes": len(self), "edges": self.edges}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "CloneGraph":
+        mode = "r" if mmap else None
+        return cls({name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in cls.ARRAYS})
@@ -0,0 +1,494 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import orjson
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+DB_PATH = os.path.join(DATA_DIR, "scentoracle.sqlite3")
+PERFUMES_PATH = os.path.join(DATA_DIR, "website_all_perfumes.json")
+REDDIT_PATH = os.path.join(DATA_DIR, "reddit_perfume_discussions.ndjson")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS brands (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE
+);
+
+CREATE TABLE IF NOT EXISTS perfumes (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    brand_id INTEGER REFERENCES brands(id),
+    photo_url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_perfumes_brand ON perfumes(brand_id);
+CREATE INDEX IF NOT EXISTS idx_perfumes_name ON perfumes(name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE
+);
+
+CREATE TABLE IF NOT EXISTS perfume_notes (
+    perfume_id INTEGER NOT NULL REFERENCES perfumes(id),
+    note_id INTEGER NOT NULL REFERENCES notes(id),
+    position INTEGER NOT NULL,
+    PRIMARY KEY (perfume_id, note_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_perfume_notes_note ON perfume_notes(note_id, perfume_id);
+
+CREATE TABLE IF NOT EXISTS accords (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE
+);
+
+CREATE TABLE IF NOT EXISTS perfume_accords (
+    perfume_id INTEGER NOT NULL REFERENCES perfumes(id),
+    accord_id INTEGER NOT NULL REFERENCES accords(id),
+    strength REAL NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (perfume_id, accord_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_perfume_accords_strength ON perfume_accords(accord_id, strength, perfume_id);
+
+CREATE TABLE IF NOT EXISTS smells_like (
+    perfume_id INTEGER NOT NULL REFERENCES perfumes(id),
+    position INTEGER NOT NULL,
+    similar_name TEXT NOT NULL,
+    similar_id INTEGER REFERENCES perfumes(id),
+    PRIMARY KEY (perfume_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_smells_like_similar ON smells_like(similar_id);
+CREATE INDEX IF NOT EXISTS idx_smells_like_name ON smells_like(similar_name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    perfume_id INTEGER NOT NULL REFERENCES perfumes(id),
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_perfume ON reviews(perfume_id);
+
+CREATE TABLE IF NOT EXISTS pros_cons (
+    perfume_id INTEGER NOT NULL REFERENCES perfumes(id),
+    kind TEXT NOT NULL CHECK (kind IN ('pro', 'con')),
+    position INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (perfume_id, kind, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS reddit_posts (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    selftext TEXT,
+    score INTEGER,
+    num_comments INTEGER,
+    subreddit TEXT NOT NULL,
+    created_utc INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_reddit_posts_subreddit ON reddit_posts(subreddit COLLATE NOCASE, created_utc);
+
+CREATE TABLE IF NOT EXISTS reddit_comments (
+    id INTEGER PRIMARY KEY,
+    post_id TEXT NOT NULL REFERENCES reddit_posts(id),
+    author TEXT,
+    body TEXT,
+    score INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_reddit_comments_post ON reddit_comments(post_id);
+"""
+
+# Child tables rewritten whenever their parent perfume is reloaded
+PERFUME_CHILD_TABLES = ("perfume_notes", "perfume_accords", "smells_like", "reviews", "pros_cons")
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _Vocabulary:
+    """In-memory name -> id map for a lookup table, filled during a bulk load."""
+
+    def __init__(self, conn: sqlite3.Connection, table: str):
+        self.table = table
+        self.ids: Dict[str, int] = {name.lower(): row_id for row_id, name in conn.execute(f"SELECT id, name FROM {table}")}
+        self.next_id = max(self.ids.values(), default=0) + 1
+        self.new_rows: List[tuple] = []
+
+    def id_for(self, name: str) -> int:
+        key = name.lower()
+        row_id = self.ids.get(key)
+        if row_id is None:
+            row_id = self.ids[key] = self.next_id
+            self.next_id += 1
+            self.new_rows.append((row_id, name))
+        return row_id
+
+    def flush(self, conn: sqlite3.Connection):
+        if self.new_rows:
+            conn.executemany(f"INSERT INTO {self.table} (id, name) VALUES (?, ?)", self.new_rows)
+            self.new_rows = []
+
+
+class PerfumeDB:
+    """
+    Normalized SQLite store for scraped perfumes and Reddit discussions.
+
+    Brands, notes and accords are lookup tables; perfumes link to them
+    through junction tables indexed in both directions, so lookups by brand,
+    note or accord strength are index scans. Bulk loads run in a single
+    transaction using executemany, with the database in WAL mode so readers
+    are never blocked by a load.
+    """
+
+    def __init__(self, path: str = DB_PATH, check_same_thread: bool = True):
+        """
+        Args:
+            path (str): SQLite database file; ":memory:" for a throwaway store.
+            check_same_thread (bool): Passed to sqlite3; disable to share the
+                connection across threads that serialize their own access.
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # Bulk loading
+
+    def load_perfumes(self, records: Iterable[dict], batch_size: int = 2000) -> int:
+        """
+        Insert or replace perfumes and everything hanging off them.
+
+        Records use the scraper's Perfume layout (accords as a list of
+        {name: percentage} dicts). A perfume already stored under the same
+        URL keeps its id and has its notes, accords, reviews etc. replaced.
+
+        Args:
+            records: Iterable of perfume dicts; streamed in batches.
+            batch_size (int): Records per executemany batch.
+
+        Returns:
+            int: Number of perfumes loaded.
+        """
+        count = 0
+        with self.conn:
+            url_ids = dict(self.conn.execute("SELECT url, id FROM perfumes").fetchall())
+            next_id = max(url_ids.values(), default=0) + 1
+            brands = _Vocabulary(self.conn, "brands")
+            notes = _Vocabulary(self.conn, "notes")
+            accords = _Vocabulary(self.conn, "accords")
+
+            for batch in _batched(records, batch_size):
+                # A checkpoint can hold a URL more than once; the last record wins
+                batch = list({record.get("url"): record for record in batch}.values())
+                perfume_rows, note_rows, accord_rows = [], [], []
+                similar_rows, review_rows, pro_con_rows, replaced = [], [], [], []
+
+                for record in batch:
+                    url = record.get("url")
+                    if not url:
+                        continue
+                    perfume_id = url_ids.get(url)
+                    if perfume_id is None:
+                        perfume_id = url_ids[url] = next_id
+                        next_id += 1
+                    else:
+                        replaced.append((perfume_id,))
+
+                    brand = record.get("brand")
+                    brand_id = brands.id_for(brand) if brand else None
+                    perfume_rows.append((perfume_id, url, record.get("name") or "Unknown", brand_id, record.get("photo_url")))
+
+                    seen_notes = set()
+                    for position, note in enumerate(record.get("notes") or []):
+                        note_id = notes.id_for(note)
+                        if note_id not in seen_notes:
+                            seen_notes.add(note_id)
+                            note_rows.append((perfume_id, note_id, position))
+
+                    seen_accords = set()
+                    for position, accord in enumerate(record.get("accords") or []):
+                        for name, strength in accord.items():
+                            accord_id = accords.id_for(name)
+                            if accord_id not in seen_accords:
+                                seen_accords.add(accord_id)
+                                accord_rows.append((perfume_id, accord_id, float(strength), position))
+
+                    similar_rows.extend(
+                        (perfume_id, position, name) for position, name in enumerate(record.get("smells_like") or [])
+                    )
+                    review_rows.extend((perfume_id, str(body)) for body in record.get("reviews") or [])
+                    pro_con_rows.extend((perfume_id, "pro", i, body) for i, body in enumerate(record.get("pros") or []))
+                    pro_con_rows.extend((perfume_id, "con", i, body) for i, body in enumerate(record.get("cons") or []))
+                    count += 1
+
+                for vocabulary in (brands, notes, accords):
+                    vocabulary.flush(self.conn)
+                for table in PERFUME_CHILD_TABLES:
+                    self.conn.executemany(f"DELETE FROM {table} WHERE perfume_id = ?", replaced)
+                self.conn.executemany(
+                    "INSERT INTO perfumes (id, url, name, brand_id, photo_url) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET name = excluded.name, brand_id = excluded.brand_id, "
+                    "photo_url = excluded.photo_url",
+                    perfume_rows,
+                )
+                self.conn.executemany("INSERT INTO perfume_notes VALUES (?, ?, ?)", note_rows)
+                self.conn.executemany("INSERT INTO perfume_accords VALUES (?, ?, ?, ?)", accord_rows)
+                self.conn.executemany(
+                    "INSERT INTO smells_like (perfume_id, position, similar_name) VALUES (?, ?, ?)", similar_rows
+                )
+                self.conn.executemany("INSERT INTO reviews (perfume_id, body) VALUES (?, ?)", review_rows)
+                self.conn.executemany("INSERT INTO pros_cons VALUES (?, ?, ?, ?)", pro_con_rows)
+
+            self._link_smells_like()
+        return count
+
+    def _link_smells_like(self):
+        """
+        Point "smells like" entries at the stored perfumes they name.
+
+        Entries are matched with linking.PerfumeLinker, as the clone graph
+        resolves them. The carousel mostly yields bare brands ("Armaf"),
+        which name no single perfume, so those keep a NULL similar_id.
+        """
+        from backend.linking import PerfumeLinker  # linking imports this module
+
+        perfumes = self._rows(
+            "SELECT p.id, p.url, p.name, b.name AS brand FROM perfumes p LEFT JOIN brands b ON b.id = p.brand_id", ()
+        )
+        linker = PerfumeLinker(perfumes)
+        id_of = {perfume["url"]: perfume["id"] for perfume in perfumes}
+        links = []
+        for perfume_id, position, text, url in self.conn.execute(
+            "SELECT s.perfume_id, s.position, s.similar_name, p.url FROM smells_like s JOIN perfumes p ON p.id = s.perfume_id"
+        ):
+            linked = [other for other in linker.link(text) if other != url]
+            links.append((id_of[linked[0]] if linked else None, perfume_id, position))
+        self.conn.executemany("UPDATE smells_like SET similar_id = ? WHERE perfume_id = ? AND position = ?", links)
+
+    def load_reddit_posts(self, posts: Iterable[dict], batch_size: int = 2000) -> int:
+        """
+        Insert or replace Reddit posts and their comments.
+
+        Args:
+            posts: Iterable of RedditPost dicts; streamed in batches.
+            batch_size (int): Posts per executemany batch.
+
+        Returns:
+            int: Number of posts loaded.
+        """
+        count = 0
+        with self.conn:
+            for batch in _batched(posts, batch_size):
+                batch = list({post["id"]: post for post in batch}.values())
+                post_rows, comment_rows = [], []
+                for post in batch:
+                    post_rows.append((
+                        post["id"], post.get("title") or "", post.get("url") or "", post.get("selftext"),
+                        post.get("score"), post.get("num_comments"), post.get("subreddit") or "",
+                        post.get("created_utc"),
+                    ))
+                    comment_rows.extend(
+                        (post["id"], comment.get("author"), comment.get("body"), comment.get("score"))
+                        for comment in post.get("comments") or []
+                    )
+                    count += 1
+
+                self.conn.executemany(
+                    "DELETE FROM reddit_comments WHERE post_id = ?", [(row[0],) for row in post_rows]
+                )
+                self.conn.executemany("INSERT OR REPLACE INTO reddit_posts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", post_rows)
+                self.conn.executemany(
+                    "INSERT INTO reddit_comments (post_id, author, body, score) VALUES (?, ?, ?, ?)", comment_rows
+                )
+        return count
+
+    # Queries
+
+    def _rows(self, sql: str, params: tuple) -> List[Dict]:
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def get_perfume(self, url: str) -> Optional[Dict]:
+        """
+        Reassemble one perfume in the scraper's record layout.
+
+        Args:
+            url (str): Perfume URL.
+
+        Returns:
+            dict or None: The perfume, or None if it is not stored.
+        """
+        row = self.conn.execute(
+            "SELECT p.id, p.url, p.name, b.name AS brand, p.photo_url "
+            "FROM perfumes p LEFT JOIN brands b ON b.id = p.brand_id WHERE p.url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        perfume_id = row["id"]
+
+        def column(sql):
+            return [r[0] for r in self.conn.execute(sql, (perfume_id,))]
+
+        return {
+            "url": row["url"],
+            "name": row["name"],
+            "brand": row["brand"],
+            "photo_url": row["photo_url"],
+            "accords": [
+                {r["name"]: r["strength"]}
+                for r in self.conn.execute(
+                    "SELECT a.name, pa.strength FROM perfume_accords pa JOIN accords a ON a.id = pa.accord_id "
+                    "WHERE pa.perfume_id = ? ORDER BY pa.position",
+                    (perfume_id,),
+                )
+            ],
+            "notes": column(
+                "SELECT n.name FROM perfume_notes pn JOIN notes n ON n.id = pn.note_id "
+                "WHERE pn.perfume_id = ? ORDER BY pn.position"
+            ),
+            "smells_like": column("SELECT similar_name FROM smells_like WHERE perfume_id = ? ORDER BY position"),
+            "pros": column("SELECT body FROM pros_cons WHERE perfume_id = ? AND kind = 'pro' ORDER BY position"),
+            "cons": column("SELECT body FROM pros_cons WHERE perfume_id = ? AND kind = 'con' ORDER BY position"),
+            "reviews": column("SELECT body FROM reviews WHERE perfume_id = ? ORDER BY id"),
+        }
+
+    def perfumes_by_brand(self, brand: str) -> List[Dict]:
+        """All perfumes of a brand (case-insensitive)."""
+        return self._rows(
+            "SELECT p.id, p.url, p.name, b.name AS brand FROM brands b "
+            "JOIN perfumes p ON p.brand_id = b.id WHERE b.name = ? ORDER BY p.name",
+            (brand,),
+        )
+
+    def perfumes_with_note(self, note: str) -> List[Dict]:
+        """All perfumes listing `note` anywhere in their pyramid."""
+        return self._rows(
+            "SELECT p.id, p.url, p.name, b.name AS brand FROM notes n "
+            "JOIN perfume_notes pn ON pn.note_id = n.id "
+            "JOIN perfumes p ON p.id = pn.perfume_id "
+            "LEFT JOIN brands b ON b.id = p.brand_id WHERE n.name = ? ORDER BY p.name",
+            (note,),
+        )
+
+    def perfumes_with_accord(self, accord: str, min_strength: float = 0.0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Perfumes whose `accord` is at least `min_strength` percent, strongest first.
+
+        Example: perfumes_with_accord("oud", 40) for "perfumes with oud > 40%".
+        """
+        return self._rows(
+            "SELECT p.id, p.url, p.name, b.name AS brand, pa.strength FROM accords a "
+            "JOIN perfume_accords pa ON pa.accord_id = a.id AND pa.strength >= ? "
+            "JOIN perfumes p ON p.id = pa.perfume_id "
+            "LEFT JOIN brands b ON b.id = p.brand_id WHERE a.name = ? "
+            "ORDER BY pa.strength DESC LIMIT ?",
+            (min_strength, accord, -1 if limit is None else limit),
+        )
+
+    def smells_like(self, url: str) -> List[Dict]:
+        """The "smells like" entries of a perfume, linked to stored perfumes where possible."""
+        return self._rows(
+            "SELECT s.similar_name, s.similar_id, t.url AS similar_url FROM perfumes p "
+            "JOIN smells_like s ON s.perfume_id = p.id "
+            "LEFT JOIN perfumes t ON t.id = s.similar_id WHERE p.url = ? ORDER BY s.position",
+            (url,),
+        )
+
+    def reddit_posts(self, subreddit: str, since: Optional[int] = None, limit: int = 50) -> List[Dict]:
+        """Newest posts of a subreddit, optionally only those created after `since`."""
+        return self._rows(
+            "SELECT id, title, url, score, num_comments, subreddit, created_utc FROM reddit_posts "
+            "WHERE subreddit = ? COLLATE NOCASE AND created_utc > ? ORDER BY created_utc DESC LIMIT ?",
+            (subreddit, -1 if since is None else since, limit),
+        )
+
+    def reddit_comments(self, post_id: str) -> List[Dict]:
+        """Comments stored for a Reddit post."""
+        return self._rows(
+            "SELECT author, body, score FROM reddit_comments WHERE post_id = ? ORDER BY id", (post_id,)
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """Row counts per table."""
+        tables = ("brands", "perfumes", "notes", "accords", "reviews", "reddit_posts", "reddit_comments")
+        return {table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+
+
+def iter_json_records(path: str) -> Iterator[dict]:
+    """
+    Stream records from a scraped data file.
+
+    NDJSON / JSONL files are read line by line; a legacy JSON array is
+    loaded in one go.
+
+    Args:
+        path (str): Path to a .json, .jsonl or .ndjson file.
+    """
+    if not os.path.exists(path):
+        return
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        continue  # Torn final line from an interrupted write
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        yield from json.load(f)
+
+
+def build_database(db_path: str = DB_PATH, perfumes_path: str = PERFUMES_PATH, reddit_path: str = REDDIT_PATH) -> Dict[str, int]:
+    """
+    Load the scraped perfume and Reddit files into the SQLite store.
+
+    Args:
+        db_path (str): SQLite database to create or update.
+        perfumes_path (str): Scraped perfumes (.json array or .jsonl checkpoint).
+        reddit_path (str): Reddit posts (.ndjson log or legacy .json array).
+
+    Returns:
+        dict: Row counts per table after the load.
+    """
+    with PerfumeDB(db_path) as db:
+        db.load_perfumes(iter_json_records(perfumes_path))
+        db.load_reddit_posts(iter_json_records(reddit_path))
+        return db.counts()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the ScentOracle SQLite store from scraped data.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database path")
+    parser.add_argument("--perfumes", default=PERFUMES_PATH, help="Scraped perfumes JSON / JSONL")
+    parser.add_argument("--reddit", default=REDDIT_PATH, help="Reddit posts NDJSON / JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = build_database(args.db, args.perfumes, args.reddit)
+    print(f"✅ Loaded {counts} in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,317 @@
+import hashlib
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+CACHE_PATH = os.path.join(DATA_DIR, "embedding_cache.sqlite3")
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class Chunk:
+    doc_id: str
+    chunk_id: str
+    text: str
+
+
+def chunk_text(text: str, max_words: int = 200, overlap: int = 20) -> List[str]:
+    """
+    Split text into windows of at most `max_words` words.
+
+    Consecutive windows share `overlap` words so a sentence cut at a window
+    boundary still appears whole in one of them.
+
+    Args:
+        text (str): Text to split.
+        max_words (int): Words per chunk.
+        overlap (int): Words repeated between consecutive chunks.
+
+    Returns:
+        list: Chunk texts; empty for blank input.
+    """
+    words = text.split()
+    if len(words) <= max_words:
+        return [" ".join(words)] if words else []
+    step = max(1, max_words - overlap)
+    return [" ".join(words[start:start + max_words]) for start in range(0, len(words) - overlap, step)]
+
+
+def chunk_documents(documents: Iterable[Tuple[str, str]], max_words: int = 200, overlap: int = 20) -> Iterator[Chunk]:
+    """Chunk (doc_id, text) pairs; chunk ids are `<doc_id>:<n>`."""
+    for doc_id, text in documents:
+        for n, piece in enumerate(chunk_text(text or "", max_words, overlap)):
+            yield Chunk(doc_id, f"{doc_id}:{n}", piece)
+
+
+def perfume_documents(perfume: dict) -> Iterator[Tuple[str, str]]:
+    """
+    The embeddable texts of one scraped perfume.
+
+    Each review is its own document; notes and pros/cons are rendered as
+    short descriptive texts prefixed with the perfume's name.
+    """
+    url = perfume["url"]
+    title = f"{perfume.get('name', '')} by {perfume.get('brand', '')}".strip()
+    if perfume.get("notes"):
+        yield f"{url}#notes", f"{title}. Notes: {', '.join(perfume['notes'])}"
+    if perfume.get("pros"):
+        yield f"{url}#pros", f"{title}. Pros: {'; '.join(perfume['pros'])}"
+    if perfume.get("cons"):
+        yield f"{url}#cons", f"{title}. Cons: {'; '.join(perfume['cons'])}"
+    for i, review in enumerate(perfume.get("reviews") or []):
+        yield f"{url}#review-{i}", str(review)
+
+
+def reddit_documents(post: dict) -> Iterator[Tuple[str, str]]:
+    """The embeddable texts of one Reddit post: the post itself and each comment."""
+    text = "\n\n".join(part for part in (post.get("title"), post.get("selftext")) if part)
+    if text:
+        yield f"reddit:{post['id']}", text
+    for i, comment in enumerate(post.get("comments") or []):
+        if comment.get("body"):
+            yield f"reddit:{post['id']}#comment-{i}", comment["body"]
+
+
+class Embedder(ABC):
+    """
+    Turns a batch of texts into a (len(texts), dim) float32 array.
+
+    `name` identifies the model in the embedding cache, so two embedders
+    must only share a name if they produce identical vectors.
+    """
+    name: str = None
+    dim: int = None
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts`; row i is the vector of texts[i]."""
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic, dependency-free embedder based on feature hashing.
+
+    Word unigrams and bigrams are hashed (blake2b, so results are stable
+    across processes) into `dim` signed buckets and L2-normalized. It has no
+    semantic knowledge, but texts sharing vocabulary land close together,
+    which is enough to exercise the pipeline and run retrieval offline.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = TOKEN_RE.findall(text.lower())
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                bucket, sign = self._bucket(feature)
+                vectors[row, bucket] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings from the OpenAI API; needs the `openai` package and OPENAI_API_KEY."""
+
+    DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+    def __init__(self, model: str = "text-embedding-3-small", client=None):
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI()
+        self.client = client
+        self.name = f"openai:{model}"
+        self.model = model
+        self.dim = self.DIMENSIONS.get(model)
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(model=self.model, input=list(texts))
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+
+def embedder_from_name(name: str) -> Embedder:
+    """Recreate an embedder from its `name`, e.g. "hashing-384" or "openai:text-embedding-3-small"."""
+    if name.startswith("hashing-"):
+        return HashingEmbedder(int(name.split("-", 1)[1]))
+    if name.startswith("openai:"):
+        return OpenAIEmbedder(name.split(":", 1)[1])
+    raise ValueError(f"Unknown embedder {name!r}")
+
+
+class EmbeddingCache:
+    """
+    On-disk vector cache keyed by SHA-256 of (model name, text).
+
+    A re-run of the pipeline only has to embed texts whose hash is not in
+    the cache; unchanged reviews and comments are read back as stored.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS vectors (
+            key BLOB PRIMARY KEY,
+            model TEXT NOT NULL,
+            vector BLOB NOT NULL
+        ) WITHOUT ROWID
+    """
+
+    LOOKUP_BATCH = 500  # Stay under SQLite's bound-parameter limit
+
+    def __init__(self, path: str = CACHE_PATH):
+        """
+        Args:
+            path (str): SQLite file holding the vectors; ":memory:" for a throwaway cache.
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(self.SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return cached vectors for whichever of `keys` are present."""
+        found = {}
+        for start in range(0, len(keys), self.LOOKUP_BATCH):
+            batch = keys[start:start + self.LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for key, blob in self._db.execute(f"SELECT key, vector FROM vectors WHERE key IN ({placeholders})", batch):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, items: Iterable[Tuple[bytes, np.ndarray]]):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vectors (key, model, vector) VALUES (?, ?, ?)",
+                ((key, model, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items),
+            )
+
+
+@dataclass
+class EmbeddingStats:
+    requested: int = 0  # Texts asked for, duplicates included
+    unique: int = 0
+    cached: int = 0
+    embedded: int = 0
+    batches: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "requested": self.requested, "unique": self.unique, "cached": self.cached,
+            "embedded": self.embedded, "batches": self.batches,
+        }
+
+
+@dataclass
+class EmbeddingPipeline:
+    """
+    Chunk → dedupe → cache lookup → batched embedding.
+
+    Identical texts are embedded once per call, texts already in the cache
+    are not embedded at all, and the remainder is sent to the embedder in
+    batches of `batch_size`.
+    """
+    embedder: Embedder
+    cache: Optional[EmbeddingCache] = None
+    batch_size: int = 64
+    max_words: int = 200
+    overlap: int = 20
+    stats: EmbeddingStats = field(default_factory=EmbeddingStats)
+
+    def embed_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed `texts`, returning one row per input text (duplicates included).
+        """
+        model = self.embedder.name
+        keys = [EmbeddingCache.key(model, text) for text in texts]
+        first_text: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            first_text.setdefault(key, text)
+        self.stats.requested += len(texts)
+        self.stats.unique += len(first_text)
+
+        vectors = self.cache.get_many(list(first_text)) if self.cache is not None else {}
+        self.stats.cached += len(vectors)
+
+        missing = [key for key in first_text if key not in vectors]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            embedded = np.asarray(self.embedder.embed([first_text[key] for key in batch]), dtype=np.float32)
+            self.stats.batches += 1
+            self.stats.embedded += len(batch)
+            vectors.update(zip(batch, embedded))
+            if self.cache is not None:
+                self.cache.put_many(model, zip(batch, embedded))
+
+        if not keys:
+            return np.empty((0, self.embedder.dim or 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def embed_documents(self, documents: Iterable[Tuple[str, str]]) -> Tuple[List[Chunk], np.ndarray]:
+        """
+        Chunk and embed (doc_id, text) pairs.
+
+        Returns:
+            Tuple of (chunks, vectors) with one vector row per chunk.
+        """
+        chunks = list(chunk_documents(documents, self.max_words, self.overlap))
+        return chunks, self.embed_texts([chunk.text for chunk in chunks])
+
+    def index_documents(self, index, documents: Iterable[Tuple[str, str]], chunk_size: int = 10_000, keyword_index=None) -> int:
+        """
+        Embed documents and add their chunks to a retrieval.VectorIndex.
+
+        Documents are processed `chunk_size` chunks at a time so memory stays
+        bounded on large corpora.
+
+        Args:
+            index: retrieval.VectorIndex receiving the chunk vectors.
+            documents: (doc_id, text) pairs.
+            chunk_size (int): Chunks embedded per round.
+            keyword_index: Optional retrieval.BM25Index that receives the same
+                chunks, so hybrid search can fuse both result lists by id.
+
+        Returns:
+            int: Number of chunks added.
+        """
+        added = 0
+        pending: List[Chunk] = []
+
+        def flush(chunks: List[Chunk]) -> int:
+            ids, texts = [c.chunk_id for c in chunks], [c.text for c in chunks]
+            if keyword_index is not None:
+                keyword_index.add(ids, texts)
+            return index.add(ids, self.embed_texts(texts))
+
+        for chunk in chunk_documents(documents, self.max_words, self.overlap):
+            pending.append(chunk)
+            if len(pending) >= chunk_size:
+                added += flush(pending)
+                pending = []
+        if pending:
+            added += flush(pending)
+        return added
@@ -0,0 +1,339 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from backend.db import DATA_DIR, PERFUMES_PATH, REDDIT_PATH, iter_json_records
+from backend.embeddings import reddit_documents
+
+MENTIONS_PATH = os.path.join(DATA_DIR, "reddit_mentions.sqlite3")
+
+GENDER_SUFFIX_RE = re.compile(r"\s+for\s+(women and men|men and women|women|men)\s*$", re.IGNORECASE)
+
+# Community shorthand for brands, keyed by the normalized brand name
+BRAND_ALIASES = {
+    "maison francis kurkdjian": ["mfk"],
+    "parfums de marly": ["pdm"],
+    "yves saint laurent": ["ysl"],
+    "jean paul gaultier": ["jpg"],
+    "giorgio armani": ["armani"],
+    "dolce gabbana": ["d g", "dg"],
+    "le labo": ["lelabo"],
+}
+
+# Brand-less names shorter than this are too ambiguous to link ("Oud", "Man")
+MIN_SHORT_NAME_LENGTH = 4
+
+# Brand-less names of this many words are distinctive enough to link alone ("club de nuit intense man")
+MIN_STANDALONE_WORDS = 3
+
+
+def normalize(text: str) -> str:
+    """Lower-case, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text.replace("'", "")))
+
+
+def perfume_aliases(name: str, brand: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Normalized aliases for a scraped perfume.
+
+    Fragrantica names look like "Aventus Creed for men". The full name and
+    the name without its gender suffix identify the perfume on their own;
+    the name with the brand also removed ("aventus") only counts when the
+    brand is mentioned nearby.
+
+    Returns:
+        Tuple of (full aliases, short aliases).
+    """
+    bare = GENDER_SUFFIX_RE.sub("", name or "")
+    full = {normalize(name), normalize(bare)}
+    brand_norm = normalize(brand)
+    short = set()
+    stripped = normalize(bare)
+    if brand_norm and stripped.endswith(" " + brand_norm):
+        stripped = stripped[: -len(brand_norm) - 1]
+    if brand_norm and stripped.startswith(brand_norm + " "):
+        stripped = stripped[len(brand_norm) + 1:]
+    if stripped and stripped != brand_norm:
+        if len(stripped) >= MIN_SHORT_NAME_LENGTH:
+            short.add(stripped)
+        if brand_norm:
+            full.add(f"{brand_norm} {stripped}")
+            full.add(f"{stripped} {brand_norm}")
+    return {alias for alias in full if alias}, short - full
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher over word tokens.
+
+    Patterns and text are sequences of normalized tokens, so every match is
+    aligned to word boundaries ("oud" never matches inside "loud"). A single
+    left-to-right pass reports every pattern occurrence, however many
+    patterns are loaded.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._terminal: Dict[int, int] = {}  # node → pattern id
+        self._fail: List[int] = []
+        self._out: List[List[int]] = []
+        self.patterns: List[str] = []
+        self._sizes: List[int] = []  # Tokens per pattern
+
+    def add(self, pattern: str) -> int:
+        """Add a normalized pattern; returns its id (the same id if added twice)."""
+        node = 0
+        for token in pattern.split():
+            nxt = self._goto[node].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][token] = nxt
+                self._goto.append({})
+            node = nxt
+        if node not in self._terminal:
+            self._terminal[node] = len(self.patterns)
+            self.patterns.append(pattern)
+            self._sizes.append(len(pattern.split()))
+            self._out = []  # Needs a rebuild
+        return self._terminal[node]
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them."""
+        self._fail = [0] * len(self._goto)
+        self._out = [[self._terminal[node]] if node in self._terminal else [] for node in range(len(self._goto))]
+        queue = list(self._goto[0].values())
+        for node in queue:  # The list grows while iterating: BFS order
+            for token, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+
+    def find(self, tokens: Sequence[str]) -> List[Tuple[int, int, int]]:
+        """
+        All pattern occurrences in `tokens`.
+
+        Returns:
+            list: (start, stop, pattern id) token spans, in order of `stop`.
+        """
+        if len(self._out) != len(self._goto):
+            self.build()
+        found = []
+        node = 0
+        for stop, token in enumerate(tokens, start=1):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for pattern_id in self._out[node]:
+                found.append((stop - self._sizes[pattern_id], stop, pattern_id))
+        return found
+
+
+class PerfumeLinker:
+    """
+    Finds which perfumes a piece of text talks about.
+
+    A text links to a perfume when it contains one of the perfume's full
+    aliases ("creed aventus", "aventus creed for men"), or its short name
+    ("aventus") together with the brand or a brand alias. Short names of
+    MIN_STANDALONE_WORDS words or more link without the brand. A match
+    lying inside a longer linked alias is ignored, so "Aventus for Her"
+    does not also count as a mention of Aventus.
+    """
+
+    def __init__(self, perfumes: Iterable[dict], aliases: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            perfumes: Scraped perfume dicts with url, name and brand.
+            aliases: Extra full aliases per perfume URL (e.g. {url: ["cdnim"]}).
+        """
+        self.matcher = AhoCorasick()
+        self._full: Dict[int, Set[str]] = defaultdict(set)  # pattern id → perfume urls
+        self._short: Dict[int, Set[Tuple[str, str]]] = defaultdict(set)  # pattern id → (url, brand)
+        self._brand: Dict[int, Set[str]] = defaultdict(set)  # pattern id → brands
+        extra = aliases or {}
+
+        for perfume in perfumes:
+            url, brand = perfume["url"], normalize(perfume.get("brand"))
+            full, short = perfume_aliases(perfume.get("name"), perfume.get("brand"))
+            for alias in full | {normalize(a) for a in extra.get(url, ())}:
+                if alias:
+                    self._full[self.matcher.add(alias)].add(url)
+            for alias in short:
+                self._short[self.matcher.add(alias)].add((url, brand))
+            if brand:
+                for alias in [brand] + BRAND_ALIASES.get(brand, []):
+                    self._brand[self.matcher.add(alias)].add(brand)
+        self.matcher.build()
+
+        fingerprint = hashlib.sha256()
+        for pattern_id, pattern in enumerate(self.matcher.patterns):
+            targets = sorted(self._full.get(pattern_id, ())) + sorted(map("|".join, self._short.get(pattern_id, ())))
+            fingerprint.update(f"{pattern}\t{','.join(targets)}\n".encode("utf-8"))
+        self.fingerprint = fingerprint.hexdigest()
+
+    def link(self, text: str) -> Dict[str, str]:
+        """
+        Perfumes mentioned in `text`.
+
+        Returns:
+            dict: {perfume url: alias that matched}.
+        """
+        found = self.matcher.find(normalize(text).split())
+        brands = set().union(*(self._brand[p] for _, _, p in found if p in self._brand))
+        links: Dict[str, str] = {}
+        covered: Set[int] = set()  # Tokens inside an already linked, longer alias
+        for start, stop, pattern_id in sorted(found, key=lambda m: m[0] - m[1]):
+            span = set(range(start, stop))
+            if span <= covered:
+                continue  # "aventus" inside "aventus for her"
+            alias = self.matcher.patterns[pattern_id]
+            standalone = stop - start >= MIN_STANDALONE_WORDS
+            linked = list(self._full.get(pattern_id, ()))
+            linked += [url for url, brand in self._short.get(pattern_id, ()) if standalone or brand in brands]
+            for url in linked:
+                links.setdefault(url, alias)
+            if linked:
+                covered |= span
+        return links
+
+
+class MentionIndex:
+    """
+    Persisted perfume → Reddit mention map.
+
+    Mentions are keyed by the same document ids as the embedding pipeline
+    ("reddit:<post id>" and "reddit:<post id>#comment-<n>"). Each post is
+    linked once; on later runs only new posts, or posts whose comment count
+    changed, are relinked. If the perfume catalog changes, the linker's
+    fingerprint changes and every post is relinked on the next update.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS mentions (
+            perfume_url TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            post_id TEXT NOT NULL,
+            alias TEXT NOT NULL,
+            PRIMARY KEY (perfume_url, doc_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_mentions_post ON mentions(post_id);
+        CREATE TABLE IF NOT EXISTS linked_posts (
+            post_id TEXT PRIMARY KEY,
+            num_comments INTEGER
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str = MENTIONS_PATH, check_same_thread: bool = True, read_only: bool = False):
+        """
+        Args:
+            path (str): SQLite file; ":memory:" for a throwaway index.
+            check_same_thread (bool): Passed to sqlite3.connect.
+            read_only (bool): Open an existing index for lookups only.
+        """
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=check_same_thread)
+            return
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _check_fingerprint(self, linker: PerfumeLinker):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None or row[0] != linker.fingerprint:
+            self.conn.execute("DELETE FROM mentions")
+            self.conn.execute("DELETE FROM linked_posts")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (linker.fingerprint,))
+
+    def update(self, linker: PerfumeLinker, posts: Iterable[dict]) -> Dict[str, int]:
+        """
+        Link new and changed posts.
+
+        Args:
+            linker (PerfumeLinker): Matcher built from the current catalog.
+            posts: Reddit post dicts (the scraper's NDJSON records).
+
+        Returns:
+            dict: Counts of posts linked, posts skipped and mentions written.
+        """
+        counts = {"linked": 0, "skipped": 0, "mentions": 0}
+        with self.conn:
+            self._check_fingerprint(linker)
+            for post in posts:
+                post_id = post["id"]
+                seen = self.conn.execute("SELECT num_comments FROM linked_posts WHERE post_id = ?", (post_id,)).fetchone()
+                if seen is not None and seen[0] == post.get("num_comments"):
+                    counts["skipped"] += 1
+                    continue
+                rows = [
+                    (url, doc_id, post_id, alias)
+                    for doc_id, text in reddit_documents(post)
+                    for url, alias in linker.link(text).items()
+                ]
+                self.conn.execute("DELETE FROM mentions WHERE post_id = ?", (post_id,))
+                self.conn.executemany("INSERT OR REPLACE INTO mentions VALUES (?, ?, ?, ?)", rows)
+                self.conn.execute("INSERT OR REPLACE INTO linked_posts VALUES (?, ?)", (post_id, post.get("num_comments")))
+                counts["linked"] += 1
+                counts["mentions"] += len(rows)
+        return counts
+
+    def mentions(self, perfume_url: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Documents mentioning a perfume, as dicts with doc_id, post_id and alias."""
+        rows = self.conn.execute(
+            "SELECT doc_id, post_id, alias FROM mentions WHERE perfume_url = ? ORDER BY doc_id LIMIT ?",
+            (perfume_url, -1 if limit is None else limit),
+        )
+        return [{"doc_id": doc_id, "post_id": post_id, "alias": alias} for doc_id, post_id, alias in rows]
+
+    def mention_counts(self, perfume_urls: Sequence[str]) -> Dict[str, int]:
+        """Number of mentioning documents per perfume."""
+        counts = dict.fromkeys(perfume_urls, 0)
+        for start in range(0, len(perfume_urls), 500):
+            batch = list(perfume_urls[start:start + 500])
+            placeholders = ",".join("?" * len(batch))
+            counts.update(self.conn.execute(
+                f"SELECT perfume_url, COUNT(*) FROM mentions WHERE perfume_url IN ({placeholders}) GROUP BY perfume_url", batch
+            ))
+        return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Link Reddit posts and comments to the perfumes they mention.")
+    parser.add_argument("--db", default=MENTIONS_PATH, help="Mention index SQLite path")
+    parser.add_argument("--perfumes", default=PERFUMES_PATH, help="Scraped perfumes JSON / JSONL")
+    parser.add_argument("--reddit", default=REDDIT_PATH, help="Reddit posts NDJSON / JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    linker = PerfumeLinker(iter_json_records(args.perfumes))
+    print(f"🔎 Built matcher with {len(linker.matcher.patterns)} aliases in {time.perf_counter() - started:.2f}s")
+    with MentionIndex(args.db) as index:
+        counts = index.update(linker, iter_json_records(args.reddit))
+    print(f"✅ Linked {counts['linked']} posts ({counts['skipped']} unchanged), "
+          f"{counts['mentions']} mentions in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from backend.accords import METRICS
+from backend.embeddings import embedder_from_name
+from backend.model import AnswerCache, LatencyStats, RAGModel
+from backend.rerank import RERANK_BUDGET, CrossEncoder, Reranker
+from backend.snapshot import RETRIEVAL_BUDGET, SNAPSHOT_ROOT, SnapshotManager, gather_context
+
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "5"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2048"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+# Semantic tier embedder (an embedder name) and threshold; by default the served snapshot's embedder
+# at the threshold tuned for it in model.SEMANTIC_THRESHOLDS
+ANSWER_CACHE_EMBEDDER = os.getenv("ANSWER_CACHE_EMBEDDER")
+ANSWER_CACHE_THRESHOLD = float(os.environ["ANSWER_CACHE_THRESHOLD"]) if os.getenv("ANSWER_CACHE_THRESHOLD") else None
+RETRIEVAL_BUDGET_SECONDS = float(os.getenv("RETRIEVAL_BUDGET_SECONDS", str(RETRIEVAL_BUDGET)))
+# ONNX cross-encoder (with tokenizer.json beside it) used to rerank /ask passages; unset disables reranking
+RERANK_MODEL = os.getenv("RERANK_MODEL")
+RERANK_BUDGET_SECONDS = float(os.getenv("RERANK_BUDGET_SECONDS", str(RERANK_BUDGET)))
+
+
+class AskRequest(BaseModel):
+    question: str = Field(min_length=1, max_length=2000)
+    k: int = Field(default=8, ge=1, le=50)
+    stream: bool = False
+
+
+class AskResponse(BaseModel):
+    answer: str
+    sources: List[Dict]
+    snapshot: str
+    cached: bool = False
+    retrieval: Optional[Dict] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the current snapshot once per worker and keep watching for new ones."""
+    manager = SnapshotManager(os.getenv("SNAPSHOT_ROOT", SNAPSHOT_ROOT), SNAPSHOT_POLL_SECONDS)
+    await asyncio.to_thread(manager.reload)
+    model = getattr(app.state, "model", None)
+    if model is None:
+        embedder = embedder_from_name(ANSWER_CACHE_EMBEDDER) if ANSWER_CACHE_EMBEDDER else (
+            manager.current.embedder if manager.current is not None else None
+        )
+        model = RAGModel(cache=AnswerCache.for_embedder(embedder, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_THRESHOLD))
+    if model.cache is not None:
+        manager.on_swap.append(model.cache.revalidate)
+    reranker = getattr(app.state, "reranker", None)
+    if reranker is None and RERANK_MODEL:
+        reranker = Reranker(CrossEncoder(RERANK_MODEL), budget=RERANK_BUDGET_SECONDS)
+    watcher = asyncio.create_task(manager.watch())
+    app.state.snapshots = manager
+    app.state.model = model
+    app.state.reranker = reranker
+    app.state.ttft = LatencyStats()
+    app.state.unstreamed_latency = LatencyStats()
+    app.state.ask_latency = LatencyStats()
+    try:
+        yield
+    finally:
+        watcher.cancel()
+        manager.close()
+        if reranker is not None:
+            reranker.close()
+
+
+app = FastAPI(title="ScentOracle", lifespan=lifespan)
+
+
+@contextmanager
+def _snapshot(request: Request):
+    """Pin the served snapshot for one request; 503 until one is published."""
+    manager = request.app.state.snapshots
+    if manager.current is None:
+        raise HTTPException(status_code=503, detail="No retrieval snapshot has been published yet")
+    with manager.acquire() as snapshot:
+        yield snapshot
+
+
+@app.get("/health")
+async def health(request: Request):
+    current = request.app.state.snapshots.current
+    return {"status": "ok" if current else "no_snapshot", "snapshot": current.version if current else None}
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    cache = request.app.state.model.cache
+    return {
+        "snapshot_swaps": request.app.state.snapshots.swaps,
+        "answer_cache": dict(cache.stats.as_dict(), entries=len(cache)) if cache is not None else None,
+        "ask_ttft": request.app.state.ttft.as_dict(),  # Streamed requests only
+        "ask_unstreamed_latency": request.app.state.unstreamed_latency.as_dict(),
+        "ask_latency": request.app.state.ask_latency.as_dict(),
+        "rerank": request.app.state.reranker.stats.as_dict() if request.app.state.reranker is not None else None,
+    }
+
+
+@app.get("/search")
+async def search(
+    request: Request,
+    q: str = Query(min_length=1),
+    k: int = Query(10, ge=1, le=100),
+    profile: Optional[str] = Query(None, description='Note/accord pre-filter, e.g. "vanilla AND tonka, NOT oud, amber >= 30%"'),
+):
+    with _snapshot(request) as snapshot:
+        try:
+            hits = await asyncio.to_thread(snapshot.search, q, k, profile)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return {"snapshot": snapshot.version, "results": hits}
+
+
+@app.get("/profile")
+async def profile(request: Request, q: str = Query(min_length=1), limit: int = Query(20, ge=1, le=200)):
+    """Perfumes matching a boolean scent profile such as "has vanilla AND tonka, NOT oud, accord amber >= 30%"."""
+    with _snapshot(request) as snapshot:
+        try:
+            matches = await asyncio.to_thread(snapshot.profile_search, q, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return dict(matches, snapshot=snapshot.version)
+
+
+@app.get("/perfume/{perfume_id}/similar")
+async def similar(
+    request: Request,
+    perfume_id: int,
+    k: int = Query(10, ge=1, le=100),
+    brands: Optional[List[str]] = Query(None),
+    metric: str = Query("cosine"),
+):
+    if metric not in METRICS:
+        raise HTTPException(status_code=422, detail=f"metric must be one of {METRICS}")
+    with _snapshot(request) as snapshot:
+        perfume = snapshot.perfume(perfume_id)
+        if perfume is None:
+            raise HTTPException(status_code=404, detail=f"Unknown perfume {perfume_id}")
+        try:
+            results = await asyncio.to_thread(snapshot.similar, perfume_id, k, brands, metric)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"No accords known for perfume {perfume_id}")
+        return {"snapshot": snapshot.version, "perfume": perfume, "results": results}
+
+
+@app.get("/perfume/{perfume_id}/clones")
+async def clones(request: Request, perfume_id: int, k: int = Query(10, ge=1, le=100), hops: int = Query(2, ge=1, le=2)):
+    """Clones of a perfume and, with hops=2, clones of its clones, from the snapshot's clone graph."""
+    with _snapshot(request) as snapshot:
+        perfume = snapshot.perfume(perfume_id)
+        if perfume is None:
+            raise HTTPException(status_code=404, detail=f"Unknown perfume {perfume_id}")
+        results = await asyncio.to_thread(snapshot.clone_family, perfume_id, k, hops)
+        return {"snapshot": snapshot.version, "perfume": perfume, "results": results}
+
+
+async def _iterate_in_thread(iterator: Iterator[str]) -> AsyncIterator[str]:
+    """Drain a blocking iterator (an LLM token stream) without blocking the event loop."""
+    done = object()
+    while (item := await asyncio.to_thread(next, iterator, done)) is not done:
+        yield item
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _ask_events(request: Request, body: AskRequest, started: float) -> AsyncIterator[str]:
+    """
+    Server-sent events for a streamed /ask.
+
+    Emits `sources` once retrieval is done, then one `token` event per
+    generated piece and a final `done` event with timings. The first token
+    is requested before the sources event is written, so generation
+    overlaps with sending the sources.
+    """
+    app = request.app
+    model = app.state.model
+    with app.state.snapshots.acquire() as snapshot:
+        hit = await asyncio.to_thread(model.lookup, body.question)
+        if hit is not None:
+            sources, retrieval, tokens = hit.sources, None, _single(hit.answer)
+        else:
+            sources, retrieval = await gather_context(
+                snapshot, body.question, body.k, RETRIEVAL_BUDGET_SECONDS,
+                reranker=app.state.reranker, manager=app.state.snapshots,
+            )
+            tokens = _iterate_in_thread(model.stream_answer(body.question, sources))
+
+        upcoming = asyncio.ensure_future(anext(tokens, None))
+        yield _sse("sources", {"snapshot": snapshot.version, "cached": hit is not None, "sources": sources, "retrieval": retrieval})
+        parts, ttft = [], None
+        try:
+            while (token := await upcoming) is not None:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    app.state.ttft.record(ttft)
+                upcoming = asyncio.ensure_future(anext(tokens, None))
+                parts.append(token)
+                yield _sse("token", {"text": token})
+        finally:
+            upcoming.cancel()
+        if hit is None:
+            await asyncio.to_thread(model.remember, body.question, "".join(parts), sources)
+        total = time.perf_counter() - started
+        app.state.ask_latency.record(total)
+        yield _sse("done", {"ttft_ms": round((ttft or total) * 1000, 3), "total_ms": round(total * 1000, 3)})
+
+
+@app.post("/ask", response_model=AskResponse)
+async def ask(request: Request, body: AskRequest):
+    """
+    Answer a question from retrieved passages.
+
+    With `"stream": true` the answer is sent as server-sent events (see
+    `_ask_events`); otherwise as one JSON response.
+    """
+    started = time.perf_counter()
+    if body.stream:
+        if request.app.state.snapshots.current is None:
+            raise HTTPException(status_code=503, detail="No retrieval snapshot has been published yet")
+        return StreamingResponse(
+            _ask_events(request, body, started), media_type="text/event-stream", headers={"Cache-Control": "no-cache"},
+        )
+
+    model = request.app.state.model
+    with _snapshot(request) as snapshot:
+        hit = await asyncio.to_thread(model.lookup, body.question)
+        if hit is not None:
+            response = AskResponse(answer=hit.answer, sources=hit.sources, snapshot=snapshot.version, cached=True)
+        else:
+            sources, retrieval = await gather_context(
+                snapshot, body.question, body.k, RETRIEVAL_BUDGET_SECONDS,
+                reranker=request.app.state.reranker, manager=request.app.state.snapshots,
+            )
+            answer = await asyncio.to_thread(model.answer, body.question, sources)
+            await asyncio.to_thread(model.remember, body.question, answer, sources)
+            response = AskResponse(answer=answer, sources=sources, snapshot=snapshot.version, retrieval=retrieval)
+    elapsed = time.perf_counter() - started
+    request.app.state.unstreamed_latency.record(elapsed)
+    request.app.state.ask_latency.record(elapsed)
+    return response
@@ -0,0 +1,382 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SYSTEM_PROMPT = (
+    "You are ScentOracle, a fragrance expert. Answer the question using only the "
+    "context passages, which come from perfume pages and Reddit discussions. "
+    "Name specific perfumes and brands, and say so when the context does not cover the question."
+)
+
+# Characters of context sent to the LLM; keeps prompts (and cost) bounded
+MAX_CONTEXT_CHARS = 6000
+
+# Cosine similarity at which a cached question counts as a paraphrase, per embedder family.
+# Hashing vectors only measure shared words: "sauvage alternative" vs "alternative to sauvage"
+# scores 0.52 but "best vanilla for winter" vs "... for summer" 0.71, so no threshold works for them.
+SEMANTIC_THRESHOLDS = {"openai": 0.9}
+
+
+class LLM(ABC):
+    """Completes a chat prompt; `name` identifies the model in logs and caches."""
+    name: str = None
+
+    @abstractmethod
+    def complete(self, system: str, prompt: str) -> str:
+        """The full completion of `prompt` under the `system` instructions."""
+
+    def stream(self, system: str, prompt: str) -> Iterator[str]:
+        """Yield the completion in pieces as they are generated; by default all at once."""
+        yield self.complete(system, prompt)
+
+
+class OpenAIChatLLM(LLM):
+    """Chat completions from the OpenAI API; needs the `openai` package and OPENAI_API_KEY."""
+
+    def __init__(self, model: str = "gpt-4o-mini", client=None, temperature: float = 0.2):
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI()
+        self.client = client
+        self.model = model
+        self.name = f"openai:{model}"
+        self.temperature = temperature
+
+    def _create(self, system, prompt, **kwargs):
+        return self.client.chat.completions.create(
+            model=self.model,
+            temperature=self.temperature,
+            messages=[{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+            **kwargs,
+        )
+
+    def complete(self, system, prompt):
+        return self._create(system, prompt).choices[0].message.content
+
+    def stream(self, system, prompt):
+        for chunk in self._create(system, prompt, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class StubLLM(LLM):
+    """
+    Offline stand-in for a real LLM.
+
+    Answers with the first context passage (or a fixed reply), and counts
+    calls so tests can check when the LLM was actually reached. `stream`
+    yields the answer word by word, sleeping `delay` seconds before each
+    word to imitate generation latency.
+    """
+
+    name = "stub"
+
+    def __init__(self, reply: Optional[str] = None, delay: float = 0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+
+    def complete(self, system, prompt):
+        self.calls += 1
+        if self.reply is not None:
+            return self.reply
+        context = prompt.split("Context:\n", 1)[-1].split("\n\nQuestion:", 1)[0]
+        first = context.split("\n\n", 1)[0]
+        return first.split("] ", 1)[-1] if first.strip() else "I couldn't find anything about that."
+
+    def stream(self, system, prompt):
+        for word in re.findall(r"\S+\s*", self.complete(system, prompt)):
+            if self.delay:
+                time.sleep(self.delay)
+            yield word
+
+
+def get_llm() -> LLM:
+    """The configured LLM: OpenAI when OPENAI_API_KEY is set, otherwise the offline stub."""
+    if os.getenv("OPENAI_API_KEY"):
+        return OpenAIChatLLM(os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini"))
+    return StubLLM()
+
+
+def build_prompt(question: str, passages: Sequence[Dict], max_chars: int = MAX_CONTEXT_CHARS) -> str:
+    """
+    Render retrieved passages and the question into a prompt.
+
+    Passages are numbered in rank order and cut off once `max_chars` of
+    context is reached.
+
+    Args:
+        question (str): User question.
+        passages: Dicts with doc_id and text, best first.
+        max_chars (int): Context budget in characters.
+    """
+    blocks: List[str] = []
+    used = 0
+    for n, passage in enumerate(passages, start=1):
+        block = f"[{n}] {passage['text']}"
+        if blocks and used + len(block) > max_chars:
+            break
+        blocks.append(block)
+        used += len(block)
+    return "Context:\n" + "\n\n".join(blocks) + f"\n\nQuestion: {question}"
+
+
+def normalize_query(question: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a question, used as the exact cache key."""
+    return " ".join(re.findall(r"\w+", question.lower()))
+
+
+def sources_digest(passages: Iterable[Dict]) -> str:
+    """Fingerprint of the passages an answer was generated from."""
+    digest = hashlib.sha256()
+    for passage in passages:
+        digest.update(f"{passage['doc_id']}\0{passage['text']}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    sources: List[Dict]
+    digest: str
+    vector: Optional[np.ndarray]
+    created: float
+
+
+@dataclass
+class CacheStats:
+    lookups: int = 0
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def misses(self) -> int:
+        return self.lookups - self.exact_hits - self.semantic_hits
+
+    def as_dict(self) -> Dict[str, float]:
+        lookups = self.lookups or 1
+        return {
+            "lookups": self.lookups, "exact_hits": self.exact_hits, "semantic_hits": self.semantic_hits,
+            "misses": self.misses, "evictions": self.evictions, "expirations": self.expirations,
+            "invalidations": self.invalidations, "hit_ratio": (self.exact_hits + self.semantic_hits) / lookups,
+            "exact_hit_ratio": self.exact_hits / lookups, "semantic_hit_ratio": self.semantic_hits / lookups,
+        }
+
+
+class AnswerCache:
+    """
+    Two-tier answer cache in front of the LLM.
+
+    The exact tier is an LRU map keyed by the normalized question. On an
+    exact miss, the semantic tier embeds the question and reuses the answer
+    of the most similar cached question if their cosine similarity reaches
+    `threshold` ("sauvage alternative" vs "alternative to sauvage").
+
+    Entries expire after `ttl` seconds, the least recently used entry is
+    evicted beyond `max_entries`, and `revalidate` drops answers whose
+    source passages changed in a newly published snapshot.
+    """
+
+    def __init__(
+        self,
+        embedder=None,
+        max_entries: int = 1024,
+        ttl: float = 24 * 3600,
+        threshold: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            embedder: embeddings.Embedder for the semantic tier; None disables it.
+            max_entries (int): Entries kept before LRU eviction.
+            ttl (float): Seconds an answer stays valid.
+            threshold (float): Minimum cosine similarity for a semantic hit.
+            clock: Time source, injectable for tests.
+        """
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.clock = clock
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._matrix: Optional[Tuple[List[str], np.ndarray]] = None  # Stacked vectors for the semantic tier
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_embedder(cls, embedder, max_entries: int = 1024, ttl: float = 24 * 3600, threshold: Optional[float] = None, **kwargs) -> "AnswerCache":
+        """
+        Cache whose semantic tier uses `embedder` at the threshold tuned for it.
+
+        Args:
+            embedder: embeddings.Embedder, normally the served snapshot's.
+            threshold (float): Overrides SEMANTIC_THRESHOLDS. Without either,
+                the semantic tier is disabled rather than guessed.
+        """
+        if threshold is None and embedder is not None:
+            threshold = SEMANTIC_THRESHOLDS.get(re.split(r"[:-]", embedder.name, maxsplit=1)[0])
+        if threshold is None:
+            return cls(None, max_entries, ttl, **kwargs)
+        return cls(embedder, max_entries, ttl, threshold, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: str):
+        del self._entries[key]
+        self._matrix = None
+
+    def _expire(self, now: float):
+        for key in [key for key, entry in self._entries.items() if now - entry.created > self.ttl]:
+            self._drop(key)
+            self.stats.expirations += 1
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        if self.embedder is None:
+            return None
+        return np.asarray(self.embedder.embed([question])[0], dtype=np.float32)
+
+    def _nearest(self, vector: np.ndarray) -> Optional[str]:
+        if self._matrix is None:
+            keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+            vectors = np.stack([self._entries[key].vector for key in keys]) if keys else np.empty((0, len(vector)), dtype=np.float32)
+            self._matrix = keys, vectors
+        keys, vectors = self._matrix
+        if not keys:
+            return None
+        scores = vectors @ vector
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.threshold else None
+
+    def get(self, question: str) -> Optional[CachedAnswer]:
+        """Cached answer for `question` from either tier, or None."""
+        key = normalize_query(question)
+        vector = self._embed(question) if key not in self._entries else None
+        with self._lock:
+            self.stats.lookups += 1
+            self._expire(self.clock())
+            if key in self._entries:
+                self.stats.exact_hits += 1
+            elif vector is not None and (key := self._nearest(vector)) is not None:
+                self.stats.semantic_hits += 1
+            else:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, question: str, answer: str, sources: Sequence[Dict]):
+        entry = CachedAnswer(question, answer, list(sources), sources_digest(sources), self._embed(question), self.clock())
+        with self._lock:
+            key = normalize_query(question)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, predicate: Callable[[CachedAnswer], bool]) -> int:
+        """Drop every entry for which `predicate` is true; returns the number dropped."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if predicate(entry)]
+            for key in stale:
+                self._drop(key)
+            self.stats.invalidations += len(stale)
+        return len(stale)
+
+    def revalidate(self, snapshot) -> int:
+        """
+        Drop answers whose sources differ in `snapshot`.
+
+        Meant as a SnapshotManager swap hook: an answer survives only if every
+        passage it was generated from still exists with the same text.
+        """
+        def changed(entry: CachedAnswer) -> bool:
+            ids = [passage["doc_id"] for passage in entry.sources]
+            texts = snapshot.passage_texts(ids) if ids else {}
+            current = [{"doc_id": doc_id, "text": texts.get(doc_id)} for doc_id in ids]
+            return any(p["text"] is None for p in current) or sources_digest(current) != entry.digest
+
+        return self.invalidate(changed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+
+class LatencyStats:
+    """Percentiles over the most recent `window` latency samples."""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            samples = np.array(self._samples)
+        if not len(samples):
+            return {"count": self.count, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+        p50, p95, p99 = (np.percentile(samples, [50, 95, 99]) * 1000).round(3).tolist()
+        return {"count": self.count, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+class RAGModel:
+    """Answers questions from retrieved passages with an LLM, behind an optional AnswerCache."""
+
+    def __init__(self, llm: Optional[LLM] = None, cache: Optional[AnswerCache] = None):
+        """
+        Args:
+            llm (LLM): Model used for generation; defaults to get_llm().
+            cache (AnswerCache): Answer cache consulted before retrieval and generation.
+        """
+        self.llm = llm or get_llm()
+        self.cache = cache
+
+    def answer(self, question: str, passages: Sequence[Dict]) -> str:
+        return self.llm.complete(SYSTEM_PROMPT, build_prompt(question, passages))
+
+    def stream_answer(self, question: str, passages: Sequence[Dict]) -> Iterator[str]:
+        return self.llm.stream(SYSTEM_PROMPT, build_prompt(question, passages))
+
+    def lookup(self, question: str) -> Optional[CachedAnswer]:
+        return self.cache.get(question) if self.cache is not None else None
+
+    def remember(self, question: str, answer: str, passages: Sequence[Dict]):
+        if self.cache is not None:
+            self.cache.put(question, answer, passages)
+
+    def ask(self, question: str, retrieve: Callable[[str], List[Dict]]) -> Tuple[str, List[Dict], bool]:
+        """
+        Answer `question`, retrieving passages with `retrieve` only on a cache miss.
+
+        Returns:
+            Tuple of (answer, source passages, whether it came from the cache).
+        """
+        hit = self.lookup(question)
+        if hit is not None:
+            return hit.answer, hit.sources, True
+        passages = retrieve(question)
+        answer = self.answer(question, passages)
+        self.remember(question, answer, passages)
+        return answer, passages, False
@@ -0,0 +1,250 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.linking import normalize
+
+# Spellings that name the same note
+NOTE_SYNONYMS = {
+    "agarwood": "oud", "oudh": "oud", "aoud": "oud", "oud wood": "oud", "oudwood": "oud",
+    "tonka bean": "tonka", "tonka beans": "tonka", "vanille": "vanilla", "vanilla bean": "vanilla",
+    "vanilla absolute": "vanilla", "cedarwood": "cedar", "sandal": "sandalwood", "patchouly": "patchouli",
+    "musks": "musk", "white musks": "white musk", "labdanum": "amber", "olibanum": "incense",
+    "frankincense": "incense", "neroli": "orange blossom", "lemon zest": "lemon", "pink peppercorn": "pink pepper",
+}
+
+# Families a specific note rolls up into when its last word names one ("Bourbon Vanilla" -> vanilla)
+NOTE_FAMILIES = frozenset({
+    "vanilla", "tonka", "oud", "amber", "musk", "rose", "jasmine", "sandalwood", "patchouli", "vetiver", "cedar",
+    "leather", "iris", "lavender", "pepper", "tobacco", "incense", "coffee", "cacao", "honey", "lemon", "orange",
+    "mandarin", "bergamot", "grapefruit", "apple", "pear", "pineapple", "cherry", "plum", "raspberry", "mint",
+    "cardamom", "cinnamon", "saffron", "ginger", "violet", "peony", "magnolia", "lily", "moss", "birch", "pine",
+})
+
+ACCORD_RE = re.compile(r"^(?:accord\s+)?(.+?)\s*(>=|≥|>|<=|≤|<)\s*(\d+(?:\.\d+)?)\s*%?$")
+ACCORD_OPS = {">=": np.greater_equal, "≥": np.greater_equal, ">": np.greater, "<=": np.less_equal, "≤": np.less_equal, "<": np.less}
+
+# Set bits per byte value, for counting matches (np.bitwise_count needs NumPy 2)
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def canonical_note(note: str) -> str:
+    """Normalized spelling of a note: case, accents and known synonyms folded ("Tonka Bean" -> "tonka")."""
+    text = normalize(note)
+    return NOTE_SYNONYMS.get(text, text)
+
+
+@lru_cache(maxsize=65536)
+def note_terms(note: str) -> Tuple[str, ...]:
+    """
+    Terms a scraped note is indexed under: its canonical form plus its family.
+
+    "Bourbon Vanilla" -> ("bourbon vanilla", "vanilla"), so a query for
+    vanilla matches every vanilla, and one for bourbon vanilla only that.
+    """
+    canonical = canonical_note(note)
+    if not canonical:
+        return ()
+    words = canonical.split()
+    family = None
+    for size in (2, 1):
+        tail = " ".join(words[-size:])
+        tail = NOTE_SYNONYMS.get(tail, tail)
+        if tail in NOTE_FAMILIES:
+            family = tail
+            break
+    return (canonical,) if family in (None, canonical) else (canonical, family)
+
+
+@dataclass
+class ProfileQuery:
+    """
+    A boolean scent-profile filter.
+
+    Every note in `all_of` must be present, at least one note of each
+    `any_of` group must be, none of `none_of` may be, and every accord
+    condition (accord, operator, percent) must hold.
+    """
+
+    all_of: List[str] = field(default_factory=list)
+    any_of: List[List[str]] = field(default_factory=list)
+    none_of: List[str] = field(default_factory=list)
+    accords: List[Tuple[str, str, float]] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, text: str) -> "ProfileQuery":
+        """
+        Parse a query such as "has vanilla AND tonka, NOT oud, accord amber >= 30%".
+
+        Clauses are separated by commas or AND; "NOT x" excludes a note,
+        "x OR y" requires either, and "[accord] name >= N[%]" (also >, <=, <,
+        ≥, ≤) constrains an accord's strength.
+
+        Raises:
+            ValueError: If the query has no clauses.
+        """
+        query = cls()
+        for clause in re.split(r",|\band\b", text, flags=re.IGNORECASE):
+            clause = re.sub(r"^\s*(?:has|with|note)\s+", "", clause.strip(), flags=re.IGNORECASE).strip()
+            if not clause:
+                continue
+            accord = ACCORD_RE.match(clause)
+            if accord:
+                query.accords.append((normalize(accord.group(1)), accord.group(2), float(accord.group(3))))
+            elif re.match(r"^not\s+", clause, flags=re.IGNORECASE):
+                query.none_of.append(re.sub(r"^not\s+", "", clause, flags=re.IGNORECASE))
+            elif re.search(r"\bor\b", clause, flags=re.IGNORECASE):
+                query.any_of.append([part.strip() for part in re.split(r"\bor\b", clause, flags=re.IGNORECASE) if part.strip()])
+            else:
+                query.all_of.append(clause)
+        if not (query.all_of or query.any_of or query.none_of or query.accords):
+            raise ValueError(f"Empty profile query: {text!r}")
+        return query
+
+
+class ProfileIndex:
+    """
+    Packed bitsets over the catalog for boolean note and accord filters.
+
+    Notes are folded into a vocabulary (see `note_terms`) and each term gets
+    one bitset with a bit per perfume, packed into uint64 words. Accord
+    strengths are kept column-wise as uint16 hundredths of a percent. A
+    query ANDs, ORs and inverts whole bitsets and thresholds accord columns,
+    all as vectorized NumPy operations, so filtering the full catalog costs
+    a few word-wise passes instead of a loop over perfumes.
+
+    Rows are aligned with the records the index was built from (the
+    snapshot catalog's row order).
+    """
+
+    BITS_FILE = "notes.npy"
+    STRENGTHS_FILE = "accords.npy"
+    META_FILE = "profiles.json"
+
+    def __init__(self, count: int, notes: List[str], bits: np.ndarray, accords: List[str], strengths: np.ndarray):
+        """
+        Args:
+            count (int): Number of perfumes (rows).
+            notes: Note vocabulary; term i owns bits[i].
+            bits: uint64 array (len(notes), words) of packed row bitsets.
+            accords: Accord vocabulary; accord j owns strengths[j].
+            strengths: uint16 array (len(accords), count), hundredths of a percent.
+        """
+        self.size = count
+        self.notes = notes
+        self.note_of = {note: i for i, note in enumerate(notes)}
+        self.bits = bits
+        self.accords = accords
+        self.accord_of = {accord: j for j, accord in enumerate(accords)}
+        self.strengths = strengths
+        self.words = (count + 63) // 64
+
+    def __len__(self) -> int:
+        return self.size
+
+    @staticmethod
+    def _pack(flags: np.ndarray, words: int) -> np.ndarray:
+        packed = np.packbits(flags, bitorder="little")
+        return np.pad(packed, (0, words * 8 - len(packed))).view(np.uint64)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "ProfileIndex":
+        """Build from dicts with `notes` (list of str) and `accords` (list of {name: percent})."""
+        note_rows: Dict[str, List[int]] = {}
+        accord_cells: Dict[str, Tuple[List[int], List[float]]] = {}
+        accord_names: Dict[str, str] = {}
+        count = 0
+        for row, record in enumerate(records):
+            count += 1
+            for note in record.get("notes") or []:
+                for term in note_terms(note):
+                    rows = note_rows.setdefault(term, [])
+                    if not rows or rows[-1] != row:
+                        rows.append(row)
+            for accord in record.get("accords") or []:
+                for name, strength in accord.items():
+                    if name not in accord_names:
+                        accord_names[name] = normalize(name)
+                    rows, values = accord_cells.setdefault(accord_names[name], ([], []))
+                    rows.append(row)
+                    values.append(strength)
+
+        words = (count + 63) // 64
+        notes = sorted(note_rows)
+        bits = np.zeros((len(notes), words), dtype=np.uint64)
+        for i, note in enumerate(notes):
+            flags = np.zeros(words * 64, dtype=bool)
+            flags[note_rows[note]] = True
+            bits[i] = cls._pack(flags, words)
+        accords = sorted(accord_cells)
+        strengths = np.zeros((len(accords), count), dtype=np.uint16)
+        for j, accord in enumerate(accords):
+            rows, values = accord_cells[accord]
+            strengths[j, rows] = np.clip(np.round(np.asarray(values, dtype=np.float64) * 100), 0, 65535)
+        return cls(count, notes, bits, accords, strengths)
+
+    def _note_bits(self, note: str) -> Optional[np.ndarray]:
+        i = self.note_of.get(canonical_note(note))
+        return None if i is None else self.bits[i]
+
+    def mask(self, query: ProfileQuery) -> np.ndarray:
+        """Packed uint64 bitset of the perfumes matching `query`."""
+        flags = np.zeros(self.words * 64, dtype=bool)
+        flags[:self.size] = True
+        mask = self._pack(flags, self.words)
+        empty = np.zeros_like(mask)
+        for note in query.all_of:
+            bits = self._note_bits(note)
+            mask &= empty if bits is None else bits
+        for group in query.any_of:
+            either = empty.copy()
+            for note in group:
+                bits = self._note_bits(note)
+                if bits is not None:
+                    either |= bits
+            mask &= either
+        for note in query.none_of:
+            bits = self._note_bits(note)
+            if bits is not None:
+                mask &= ~bits
+        for accord, op, percent in query.accords:
+            j = self.accord_of.get(accord)
+            column = self.strengths[j] if j is not None else np.zeros(self.size, dtype=np.uint16)
+            mask &= self._pack(ACCORD_OPS[op](column, round(percent * 100)), self.words)
+        return mask
+
+    def rows(self, mask: np.ndarray) -> np.ndarray:
+        """Row numbers set in a mask, ascending."""
+        return np.flatnonzero(np.unpackbits(mask.view(np.uint8), bitorder="little")[:self.size])
+
+    @staticmethod
+    def count(mask: np.ndarray) -> int:
+        """Number of perfumes set in a mask."""
+        return int(POPCOUNT[mask.view(np.uint8)].sum(dtype=np.int64))
+
+    def match(self, query: ProfileQuery) -> np.ndarray:
+        """Rows of the perfumes matching `query`."""
+        return self.rows(self.mask(query))
+
+    def save(self, directory: str):
+        """Write the bitsets and accord columns as .npy (memory-mappable) plus a JSON vocabulary."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, self.BITS_FILE), self.bits)
+        np.save(os.path.join(directory, self.STRENGTHS_FILE), self.strengths)
+        with open(os.path.join(directory, self.META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"count": self.size, "notes": self.notes, "accords": self.accords}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "ProfileIndex":
+        with open(os.path.join(directory, cls.META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        bits = np.load(os.path.join(directory, cls.BITS_FILE), mmap_mode=mode)
+        strengths = np.load(os.path.join(directory, cls.STRENGTHS_FILE), mmap_mode=mode)
+        return cls(meta["count"], meta["notes"], bits, meta["accords"], strengths)
+
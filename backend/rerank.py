@@ -0,0 +1,213 @@
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Pairs scored per ONNX run
+RERANK_BATCH = 32
+# How long the batcher waits for more concurrent requests before running a batch
+RERANK_WAIT = 0.005
+# Seconds a request waits for reranked scores before keeping the first-stage order
+RERANK_BUDGET = 0.15
+
+Tokenizer = Callable[[Sequence[Tuple[str, str]]], Dict[str, np.ndarray]]
+
+
+class PairTokenizer:
+    """Encodes (query, passage) pairs with a Hugging Face tokenizer.json, as cross-encoders expect."""
+
+    def __init__(self, path: str, max_length: int = 256):
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+
+    def __call__(self, pairs: Sequence[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        encodings = self.tokenizer.encode_batch(list(pairs))
+        return {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+
+
+class CrossEncoder:
+    """
+    ONNX cross-encoder scoring (query, passage) pairs on CPU.
+
+    The model takes the tokenizer's arrays as inputs (whichever of
+    input_ids, attention_mask and token_type_ids it declares) and returns
+    one logit per pair, or per class with the relevant class last.
+    """
+
+    def __init__(self, model_path: str, tokenizer: Optional[Tokenizer] = None, threads: Optional[int] = None):
+        """
+        Args:
+            model_path (str): ONNX model file.
+            tokenizer: Pair tokenizer; defaults to tokenizer.json next to the model.
+            threads (int): onnxruntime intra-op threads; defaults to its own choice.
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.inputs = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = tokenizer or PairTokenizer(os.path.join(os.path.dirname(model_path), "tokenizer.json"))
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        """Relevance logits, one per pair."""
+        if not pairs:
+            return np.empty(0, dtype=np.float32)
+        features = self.tokenizer(pairs)
+        logits = self.session.run(None, {name: features[name] for name in self.inputs})[0]
+        return np.asarray(logits, dtype=np.float32).reshape(len(pairs), -1)[:, -1]
+
+
+@dataclass
+class RerankStats:
+    requests: int = 0
+    batches: int = 0
+    pairs: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    pair_seconds: float = 0.0  # Moving average of model time per pair
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests, "batches": self.batches, "pairs": self.pairs, "timeouts": self.timeouts,
+            "errors": self.errors, "pair_ms": round(self.pair_seconds * 1000, 4),
+        }
+
+
+class Reranker:
+    """
+    Cross-encoder rerank stage with dynamic batching across requests.
+
+    Concurrent `rerank` calls queue their pairs; one worker task waits
+    `max_wait` for requests to arrive, takes up to `max_batch` pairs of them
+    and scores them off the event loop, so concurrent requests share model
+    runs instead of each paying for its own.
+
+    Each request is capped by a latency budget: it only sends as many
+    candidates as the measured per-pair cost allows, and if scores are
+    still not back when the budget runs out, or the model fails, it keeps
+    the first-stage order.
+    """
+
+    def __init__(self, encoder, max_batch: int = RERANK_BATCH, max_wait: float = RERANK_WAIT, budget: float = RERANK_BUDGET):
+        """
+        Args:
+            encoder: Object with `score(pairs) -> np.ndarray`, e.g. CrossEncoder.
+            max_batch (int): Pairs per model run.
+            max_wait (float): Seconds to wait for more requests before running a batch.
+            budget (float): Default per-request latency budget in seconds.
+        """
+        self.encoder = encoder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.budget = budget
+        self.stats = RerankStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()  # Serializes model runs and stats updates
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            jobs = [await self._queue.get()]
+            size = len(jobs[0][0])
+            if size < self.max_batch:
+                await asyncio.sleep(self.max_wait)  # Let concurrent requests join this batch
+            while size < self.max_batch and not self._queue.empty():
+                jobs.append(self._queue.get_nowait())
+                size += len(jobs[-1][0])
+            jobs = [job for job in jobs if not job[1].done()]  # Requests that already gave up
+            if not jobs:
+                continue
+            pairs = [pair for job_pairs, _ in jobs for pair in job_pairs]
+            try:
+                scores = await asyncio.to_thread(self._score, pairs)
+            except Exception as e:
+                for _, future in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            offset = 0
+            for job_pairs, future in jobs:
+                if not future.done():  # Cancelled once its request ran out of budget
+                    future.set_result(scores[offset:offset + len(job_pairs)])
+                offset += len(job_pairs)
+
+    def _score(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        with self._lock:
+            started = time.perf_counter()
+            scores = np.concatenate(
+                [self.encoder.score(pairs[i:i + self.max_batch]) for i in range(0, len(pairs), self.max_batch)]
+            )
+            per_pair = (time.perf_counter() - started) / len(pairs)
+            self.stats.pair_seconds = per_pair if not self.stats.batches else 0.8 * self.stats.pair_seconds + 0.2 * per_pair
+            self.stats.batches += 1
+            self.stats.pairs += len(pairs)
+        return scores
+
+    async def score(self, query: str, passages: Sequence[str]) -> np.ndarray:
+        """Cross-encoder scores of `passages` for `query`, batched with concurrent calls."""
+        if not passages:
+            return np.empty(0, dtype=np.float32)
+        self._start()
+        future = self._loop.create_future()
+        self._queue.put_nowait(([(query, passage) for passage in passages], future))
+        return await future
+
+    async def rerank(self, query: str, passages: Sequence[Dict], k: int, budget: Optional[float] = None) -> Tuple[List[Dict], Dict]:
+        """
+        The `k` passages the cross-encoder ranks highest for `query`.
+
+        Args:
+            query (str): User question.
+            passages: First-stage passages (dicts with text), best first.
+            k (int): Passages to keep.
+            budget (float): Seconds to wait for scores; defaults to the reranker's.
+
+        Returns:
+            Tuple of (passages, info). Reranked passages carry `rerank_score`;
+            on timeout or a model error the first `k` first-stage passages
+            are returned.
+            info has `reranked`, the number of `candidates` sent and `ms`.
+        """
+        budget = self.budget if budget is None else budget
+        started = time.perf_counter()
+        self.stats.requests += 1
+        # Send no more candidates than the budget has time for at the measured per-pair cost
+        cap = max(k, int(budget / self.stats.pair_seconds)) if self.stats.pair_seconds else len(passages)
+        candidates = list(passages[:cap])
+        try:
+            scores = await asyncio.wait_for(self.score(query, [p["text"] for p in candidates]), budget)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats.timeouts += 1
+            else:
+                self.stats.errors += 1
+            info = {"reranked": False, "candidates": len(candidates), "ms": round((time.perf_counter() - started) * 1000, 3)}
+            return list(passages[:k]), info
+        order = np.argsort(-scores, kind="stable")[:k]
+        reranked = [dict(candidates[i], rerank_score=float(scores[i])) for i in order.tolist()]
+        return reranked, {"reranked": True, "candidates": len(candidates), "ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
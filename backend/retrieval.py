@@ -0,0 +1,809 @@
+import json
+import math
+import os
+import re
+import shutil
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import faiss
+import numpy as np
+
+from backend.versioning import current_version_dir, publish_version
+
+INDEX_KINDS = ("flat", "ivf", "hnsw")
+
+# k-means wants roughly this many training points per IVF list
+IVF_POINTS_PER_LIST = 39
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Conventional RRF damping constant (Cormack et al.)
+RRF_K = 60
+
+
+class VectorIndex:
+    """
+    FAISS index over document embeddings, keyed by string document ids.
+
+    Three index kinds are supported:
+
+    - "flat": exact inner-product search.
+    - "ivf": IndexIVFFlat; trained on the first batch added and retrained on
+      every vector once the index grows `retrain_ratio` times past its
+      training set, so centroids (and the number of lists) keep up with the
+      corpus. `nprobe` lists are visited per query.
+    - "hnsw": IndexHNSWFlat graph; `ef_search` controls the search beam.
+
+    Vectors are L2-normalized by default, so scores are cosine similarities.
+    Documents can be added, replaced and removed incrementally. Flat and IVF
+    indexes delete from FAISS directly; HNSW graphs cannot, so removed
+    documents are tombstoned and filtered from results until the graph is
+    rebuilt, which happens automatically once tombstones pass
+    `rebuild_ratio` of the index.
+
+    `save` writes raw float32 vectors, int64 labels and the FAISS index to a
+    new version directory and then points CURRENT at it; `load` memory-maps
+    them, so API workers start without re-reading or re-embedding the
+    scraped JSON, and workers serving the same files share one copy in the
+    page cache.
+    """
+
+    META_FILE = "meta.json"
+    INDEX_FILE = "index.faiss"
+    VECTORS_FILE = "vectors.f32"
+    LABELS_FILE = "labels.i64"
+    DOC_IDS_FILE = "doc_ids.txt"
+    TOMBSTONES_FILE = "tombstones.i64"
+
+    def __init__(
+        self,
+        dim: int,
+        kind: str = "flat",
+        nlist: int = 256,
+        nprobe: int = 16,
+        hnsw_m: int = 32,
+        ef_search: int = 64,
+        normalize: bool = True,
+        rebuild_ratio: float = 0.25,
+        retrain_ratio: float = 2.0,
+    ):
+        """
+        Args:
+            dim (int): Embedding dimension.
+            kind (str): One of INDEX_KINDS.
+            nlist (int): Maximum number of IVF lists; reduced for small corpora.
+            nprobe (int): IVF lists searched per query.
+            hnsw_m (int): HNSW neighbours per node.
+            ef_search (int): HNSW search beam width.
+            normalize (bool): L2-normalize vectors so scores are cosine similarities.
+            rebuild_ratio (float): Fraction of tombstoned HNSW entries that triggers a rebuild.
+            retrain_ratio (float): Growth over the IVF training set that triggers a retrain.
+        """
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind {kind!r}; expected one of {INDEX_KINDS}")
+        self.dim = dim
+        self.kind = kind
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.normalize = normalize
+        self.rebuild_ratio = rebuild_ratio
+        self.retrain_ratio = retrain_ratio
+
+        self._vector_chunks: List[np.ndarray] = []
+        self._label_chunks: List[np.ndarray] = []
+        self._label_of: Dict[str, int] = {}
+        self._doc_of: Dict[int, str] = {}
+        self._tombstones: Set[int] = set()
+        self._next_label = 0
+        self._trained_on = 0  # Vectors the IVF centroids were fitted to
+        self._mmapped = False
+        self.index = None
+
+    # FAISS plumbing
+
+    def _new_index(self, training: Optional[np.ndarray] = None):
+        if self.kind == "flat":
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+        if self.kind == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efSearch = self.ef_search
+            return faiss.IndexIDMap2(hnsw)
+
+        points = 0 if training is None else len(training)
+        nlist = max(1, min(self.nlist, points // IVF_POINTS_PER_LIST))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(self.dim), self.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        if points:
+            index.train(training)
+        index.nprobe = self.nprobe
+        return index
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors = np.array(vectors, dtype=np.float32, ndmin=2, copy=True)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+        if self.normalize:
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _writable(self):
+        """Copy memory-mapped data into memory before the first mutation after `load`."""
+        if not self._mmapped:
+            return
+        self._mmapped = False
+        self._vector_chunks = [np.array(chunk) for chunk in self._vector_chunks]
+        self._label_chunks = [np.array(chunk) for chunk in self._label_chunks]
+        if self.index is None:
+            return
+        # Mapped vectors and inverted lists are read-only views, so the FAISS
+        # index is rebuilt in memory; IVF keeps its trained centroids
+        labels, vectors = self._stored()
+        if self.kind == "ivf":
+            mapped = self.index
+            self.index = faiss.IndexIVFFlat(faiss.clone_index(mapped.quantizer), self.dim, mapped.nlist, faiss.METRIC_INNER_PRODUCT)
+            self.index.nprobe = self.nprobe
+        else:
+            self.index = self._new_index()
+            self._tombstones = set()
+        self.index.add_with_ids(vectors, labels)
+
+    def _stored(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All live (labels, vectors), in insertion order."""
+        if not self._label_chunks:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float32)
+        labels = np.concatenate(self._label_chunks)
+        vectors = np.concatenate(self._vector_chunks)
+        alive = np.fromiter((label in self._doc_of for label in labels.tolist()), dtype=bool, count=len(labels))
+        return labels[alive], vectors[alive]
+
+    # Public API
+
+    def __len__(self) -> int:
+        return len(self._label_of)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._label_of
+
+    def add(self, doc_ids: Sequence[str], vectors) -> int:
+        """
+        Add documents, replacing any already indexed under the same id.
+
+        Args:
+            doc_ids: One id per vector.
+            vectors: Array of shape (len(doc_ids), dim).
+
+        Returns:
+            int: Number of vectors added.
+        """
+        vectors = self._prepare(vectors)
+        if len(doc_ids) != len(vectors):
+            raise ValueError(f"Got {len(doc_ids)} ids for {len(vectors)} vectors")
+        if not len(doc_ids):
+            return 0
+        if any("\n" in doc_id for doc_id in doc_ids):
+            raise ValueError("Document ids cannot contain newlines")
+        self._writable()
+
+        # Within one batch the last vector for an id wins
+        last = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+        if len(last) != len(doc_ids):
+            rows = sorted(last.values())
+            doc_ids, vectors = [doc_ids[row] for row in rows], vectors[rows]
+        self.remove([doc_id for doc_id in doc_ids if doc_id in self._label_of])
+
+        labels = np.arange(self._next_label, self._next_label + len(doc_ids), dtype=np.int64)
+        self._next_label += len(doc_ids)
+        for label, doc_id in zip(labels.tolist(), doc_ids):
+            self._label_of[doc_id] = label
+            self._doc_of[label] = doc_id
+        self._vector_chunks.append(vectors)
+        self._label_chunks.append(labels)
+
+        if self.index is None:
+            self.index = self._new_index(vectors if self.kind == "ivf" else None)
+            self._trained_on = len(vectors) if self.kind == "ivf" else 0
+        self.index.add_with_ids(vectors, labels)
+        if self.kind == "ivf" and len(self) > self.retrain_ratio * self._trained_on:
+            self.rebuild()
+        return len(labels)
+
+    def remove(self, doc_ids: Sequence[str]) -> int:
+        """
+        Remove documents by id; unknown ids are ignored.
+
+        Returns:
+            int: Number of documents removed.
+        """
+        labels = [self._label_of.pop(doc_id) for doc_id in doc_ids if doc_id in self._label_of]
+        if not labels:
+            return 0
+        self._writable()
+        for label in labels:
+            del self._doc_of[label]
+
+        if self.kind == "hnsw":
+            self._tombstones.update(labels)
+            if len(self._tombstones) > self.rebuild_ratio * self.index.ntotal:
+                self.rebuild()
+        else:
+            self.index.remove_ids(np.array(labels, dtype=np.int64))
+        return len(labels)
+
+    def rebuild(self):
+        """Rebuild the FAISS index from the live vectors, dropping tombstones and retraining IVF."""
+        self._writable()
+        labels, vectors = self._stored()
+        self._vector_chunks, self._label_chunks = [vectors], [labels]
+        self._tombstones = set()
+        self.index = self._new_index(vectors if self.kind == "ivf" else None) if len(labels) else None
+        self._trained_on = len(labels) if self.kind == "ivf" else 0
+        if self.index is not None:
+            self.index.add_with_ids(vectors, labels)
+
+    def search(self, queries, k: int = 10) -> List[List[Tuple[str, float]]]:
+        """
+        Find the `k` nearest documents for each query vector.
+
+        Args:
+            queries: Array of shape (dim,) or (n, dim).
+            k (int): Results per query.
+
+        Returns:
+            One list of (doc_id, score) per query, best first.
+        """
+        queries = self._prepare(queries)
+        if self.index is None or not len(self):
+            return [[] for _ in range(len(queries))]
+
+        # Over-fetch so tombstoned HNSW entries don't leave a query short
+        fetch = min(self.index.ntotal, k + len(self._tombstones))
+        scores, labels = self.index.search(queries, fetch)
+        results = []
+        for row_scores, row_labels in zip(scores.tolist(), labels.tolist()):
+            hits = []
+            for score, label in zip(row_scores, row_labels):
+                doc_id = self._doc_of.get(label)
+                if doc_id is not None:
+                    hits.append((doc_id, score))
+                    if len(hits) == k:
+                        break
+            results.append(hits)
+        return results
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Trade recall for latency at query time."""
+        if nprobe is not None:
+            self.nprobe = nprobe
+            if self.kind == "ivf" and self.index is not None:
+                self.index.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+            if self.kind == "hnsw" and self.index is not None:
+                faiss.downcast_index(self.index.index).hnsw.efSearch = ef_search
+
+    # Persistence
+
+    def save(self, directory: str):
+        """
+        Persist the index as memory-mappable files.
+
+        Files are written to a staging directory, which is renamed whole into
+        a new version directory before CURRENT is switched to it (see
+        versioning.publish_version), so `load` sees either the previous set or this one.
+
+        Args:
+            directory (str): Destination directory; created if needed.
+        """
+        os.makedirs(directory, exist_ok=True)
+        staging = os.path.join(directory, f".staging-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)  # Left behind by an interrupted save
+        os.makedirs(staging)
+
+        labels, vectors = self._stored()
+        np.ascontiguousarray(vectors, dtype=np.float32).tofile(os.path.join(staging, self.VECTORS_FILE))
+        np.ascontiguousarray(labels, dtype=np.int64).tofile(os.path.join(staging, self.LABELS_FILE))
+        np.array(sorted(self._tombstones), dtype=np.int64).tofile(os.path.join(staging, self.TOMBSTONES_FILE))
+        with open(os.path.join(staging, self.DOC_IDS_FILE), "w", encoding="utf-8") as f:
+            f.write("\n".join(self._doc_of[label] for label in labels.tolist()))
+        if self.index is not None:
+            faiss.write_index(self.index, os.path.join(staging, self.INDEX_FILE))
+        meta = {
+            "dim": self.dim,
+            "kind": self.kind,
+            "count": len(labels),
+            "next_label": self._next_label,
+            "has_index": self.index is not None,
+            "trained_on": self._trained_on,
+            "params": {
+                "nlist": self.nlist, "nprobe": self.nprobe, "hnsw_m": self.hnsw_m, "ef_search": self.ef_search,
+                "normalize": self.normalize, "rebuild_ratio": self.rebuild_ratio, "retrain_ratio": self.retrain_ratio,
+            },
+        }
+        with open(os.path.join(staging, self.META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+        publish_version(directory, staging)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "VectorIndex":
+        """
+        Open an index written by `save`.
+
+        Args:
+            directory (str): Directory passed to `save`.
+            mmap (bool): Memory-map vectors and the FAISS index instead of
+                reading them into memory; the first add/remove copies them in.
+
+        Returns:
+            VectorIndex: The loaded index.
+        """
+        directory = current_version_dir(directory)
+        with open(os.path.join(directory, cls.META_FILE)) as f:
+            meta = json.load(f)
+        self = cls(meta["dim"], meta["kind"], **meta["params"])
+        count = meta["count"]
+
+        def read(name, dtype, shape):
+            path = os.path.join(directory, name)
+            if not count:
+                return np.empty(shape, dtype=dtype)
+            if mmap:
+                return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+            return np.fromfile(path, dtype=dtype).reshape(shape)
+
+        labels = read(cls.LABELS_FILE, np.int64, (count,))
+        vectors = read(cls.VECTORS_FILE, np.float32, (count, self.dim))
+        with open(os.path.join(directory, cls.DOC_IDS_FILE), encoding="utf-8") as f:
+            doc_ids = f.read().split("\n") if count else []
+
+        self._label_chunks, self._vector_chunks = [labels], [vectors]
+        self._doc_of = dict(zip(labels.tolist(), doc_ids))
+        self._label_of = {doc_id: label for label, doc_id in self._doc_of.items()}
+        self._tombstones = set(np.fromfile(os.path.join(directory, cls.TOMBSTONES_FILE), dtype=np.int64).tolist())
+        self._next_label = meta["next_label"]
+        self._trained_on = meta.get("trained_on", count)
+
+        if meta["has_index"]:
+            # IVF maps its inverted lists; flat and HNSW map their vector storage
+            flags = (faiss.IO_FLAG_MMAP if self.kind == "ivf" else faiss.IO_FLAG_MMAP_IFC) if mmap else 0
+            self.index = faiss.read_index(os.path.join(directory, cls.INDEX_FILE), flags)
+            self.set_search_params(self.nprobe, self.ef_search)
+        self._mmapped = mmap
+        return self
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens, as used by the keyword index."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class _StringTable:
+    """
+    Strings packed into one UTF-8 buffer with an offsets array, so a saved
+    table is memory-mapped instead of parsed. `order` lists the string
+    numbers sorted by their UTF-8 bytes (None when the table itself is
+    sorted) and `find` binary-searches it.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, order: Optional[np.ndarray] = None):
+        self.data = data
+        self.offsets = offsets
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _bytes(self, n: int) -> bytes:
+        return self.data[int(self.offsets[n]):int(self.offsets[n + 1])].tobytes()
+
+    def __getitem__(self, n: int) -> str:
+        return self._bytes(n).decode("utf-8")
+
+    def find(self, key: str) -> Optional[int]:
+        """Number of the string equal to `key`, or None."""
+        key = key.encode("utf-8")
+        size = len(self) if self.order is None else len(self.order)
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(mid if self.order is None else int(self.order[mid])) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == size:
+            return None
+        n = lo if self.order is None else int(self.order[lo])
+        return n if self._bytes(n) == key else None
+
+    @staticmethod
+    def write(data_path: str, offsets_path: str, strings: Sequence[str]):
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        with open(data_path, "wb") as f:
+            f.write(b"".join(encoded))
+        offsets.tofile(offsets_path)
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring.
+
+    Embeddings blur exact names ("Aventus", "CDNIM", "Lattafa"); this index
+    matches them literally. Postings are held in CSR layout: for term number
+    t, `docs[offsets[t]:offsets[t + 1]]` are the documents containing it and
+    `tfs[...]` the term frequencies. Scoring a query touches only the
+    postings of its terms.
+
+    Documents added since the last search are buffered and merged into the
+    CSR arrays on the next search or save. Removed documents are dropped
+    from the postings on the same merge. `save` writes the arrays, the
+    sorted term table and the document ids as raw files which `load`
+    memory-maps: a few million comments load without parsing, query terms
+    and ids are binary-searched on disk, and only the pages a query touches
+    are read. The first add or remove after a load builds the in-memory
+    lookups again.
+    """
+
+    META_FILE = "meta.json"
+    TERMS_FILE = "terms.utf8"  # Sorted by UTF-8 bytes; term number = rank
+    TERM_OFFSETS_FILE = "term_offsets.i64"
+    OFFSETS_FILE = "offsets.i64"
+    DOCS_FILE = "docs.i32"
+    TFS_FILE = "tfs.u16"
+    LENGTHS_FILE = "lengths.i32"
+    DOC_IDS_FILE = "doc_ids.utf8"  # Removed documents are empty strings
+    DOC_ID_OFFSETS_FILE = "doc_id_offsets.i64"
+    DOC_ORDER_FILE = "doc_order.i32"  # Live doc numbers sorted by id
+
+    MAX_TF = np.iinfo(np.uint16).max
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            k1 (float): Term-frequency saturation.
+            b (float): Document-length normalization strength.
+        """
+        self.k1 = k1
+        self.b = b
+
+        self._term_of: Dict[str, int] = {}
+        self._doc_ids: List[Optional[str]] = []  # Doc number → id; None once removed
+        self._doc_of: Dict[str, int] = {}
+        self._total_length = 0
+        # Set by `load` until the first add/remove
+        self._terms: Optional[_StringTable] = None
+        self._ids: Optional[_StringTable] = None
+        self._live = 0
+
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._docs = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.uint16)
+        self._lengths = np.empty(0, dtype=np.int32)
+
+        self._pending_terms: List[int] = []
+        self._pending_docs: List[int] = []
+        self._pending_tfs: List[int] = []
+        self._pending_lengths: List[int] = []
+        self._removed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return self._live if self._ids is not None else len(self._doc_of)
+
+    def __contains__(self, doc_id: str) -> bool:
+        if self._ids is not None:
+            return bool(doc_id) and self._ids.find(doc_id) is not None
+        return doc_id in self._doc_of
+
+    def _thaw(self):
+        """Replace the on-disk tables of a loaded index by in-memory lookups."""
+        if self._ids is None:
+            return
+        self._term_of = {self._terms[n]: n for n in range(len(self._terms))}
+        self._doc_ids = [self._ids[n] or None for n in range(len(self._ids))]
+        self._doc_of = {doc_id: doc for doc, doc_id in enumerate(self._doc_ids) if doc_id is not None}
+        self._terms = self._ids = None
+
+    def add(self, doc_ids: Sequence[str], texts: Sequence[str]) -> int:
+        """
+        Index documents, replacing any already indexed under the same id.
+
+        Returns:
+            int: Number of documents added.
+        """
+        if len(doc_ids) != len(texts):
+            raise ValueError(f"Got {len(doc_ids)} ids for {len(texts)} texts")
+        if any("\n" in doc_id for doc_id in doc_ids):
+            raise ValueError("Document ids cannot contain newlines")
+        self._thaw()
+        for doc_id, text in zip(doc_ids, texts):
+            if doc_id in self._doc_of:  # Already indexed, or repeated within this batch: last one wins
+                self.remove([doc_id])
+            doc = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._doc_of[doc_id] = doc
+            tokens = tokenize(text or "")
+            self._pending_lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            for term, tf in Counter(tokens).items():
+                self._pending_terms.append(self._term_of.setdefault(term, len(self._term_of)))
+                self._pending_docs.append(doc)
+                self._pending_tfs.append(min(tf, self.MAX_TF))
+        return len(doc_ids)
+
+    def remove(self, doc_ids: Iterable[str]) -> int:
+        """
+        Remove documents by id; unknown ids are ignored.
+
+        Returns:
+            int: Number of documents removed.
+        """
+        self._thaw()
+        removed = 0
+        for doc_id in doc_ids:
+            doc = self._doc_of.pop(doc_id, None)
+            if doc is None:
+                continue
+            self._doc_ids[doc] = None
+            self._total_length -= self._length(doc)
+            self._removed.add(doc)
+            removed += 1
+        return removed
+
+    def _length(self, doc: int) -> int:
+        frozen = len(self._lengths)
+        return int(self._lengths[doc]) if doc < frozen else self._pending_lengths[doc - frozen]
+
+    def _merge(self):
+        """Fold buffered additions and removals into the CSR postings."""
+        if not self._pending_lengths and not self._removed:
+            return
+        counts = np.diff(self._offsets)
+        terms = np.concatenate([np.repeat(np.arange(len(counts), dtype=np.int64), counts), np.array(self._pending_terms, dtype=np.int64)])
+        docs = np.concatenate([self._docs, np.array(self._pending_docs, dtype=np.int32)])
+        tfs = np.concatenate([self._tfs, np.array(self._pending_tfs, dtype=np.uint16)])
+        lengths = np.concatenate([self._lengths, np.array(self._pending_lengths, dtype=np.int32)])
+
+        if self._removed:
+            removed = np.fromiter(self._removed, dtype=np.int64, count=len(self._removed))
+            keep = ~np.isin(docs, removed)
+            terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+            lengths[removed] = 0
+
+        order = np.lexsort((docs, terms))
+        self._docs, self._tfs, self._lengths = docs[order], tfs[order], lengths
+        self._offsets = np.zeros(len(self._term_of) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self._term_of)), out=self._offsets[1:])
+        self._pending_terms, self._pending_docs, self._pending_tfs, self._pending_lengths = [], [], [], []
+        self._removed = set()
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank documents against `query` with BM25.
+
+        Args:
+            query (str): Free text; tokenized like the documents.
+            k (int): Number of results.
+
+        Returns:
+            list: (doc_id, score) pairs, best first.
+        """
+        self._merge()
+        if self._terms is not None:
+            terms = {self._terms.find(token) for token in tokenize(query)} - {None}
+        else:
+            terms = {self._term_of[token] for token in tokenize(query) if token in self._term_of}
+        if not terms or not len(self) or k <= 0:
+            return []
+
+        total = len(self)
+        average_length = max(self._total_length / total, 1e-9)
+        hit_docs, hit_scores = [], []
+        for term in terms:
+            start, end = int(self._offsets[term]), int(self._offsets[term + 1])
+            if start == end:
+                continue
+            docs = np.asarray(self._docs[start:end])
+            tfs = np.asarray(self._tfs[start:end], dtype=np.float32)
+            norm = self.k1 * (1 - self.b + self.b * np.asarray(self._lengths[docs], dtype=np.float32) / average_length)
+            idf = math.log(1 + (total - (end - start) + 0.5) / ((end - start) + 0.5))
+            hit_docs.append(docs)
+            hit_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not hit_docs:
+            return []
+
+        docs, inverse = np.unique(np.concatenate(hit_docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(hit_scores))
+        if k < len(docs):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(docs))
+        top = top[np.lexsort((docs[top], -scores[top]))]
+        doc_id = self._ids.__getitem__ if self._ids is not None else self._doc_ids.__getitem__
+        return [(doc_id(doc), float(score)) for doc, score in zip(docs[top].tolist(), scores[top].tolist())]
+
+    # Persistence
+
+    def save(self, directory: str):
+        """
+        Persist the postings and lookup tables as memory-mappable files.
+
+        Terms are renumbered in sorted order on the way out, so the term
+        table is binary-searched directly and needs no permutation of its own.
+        The files are published as a new version of `directory` (see
+        versioning.publish_version), so `load` never mixes two saves.
+
+        Args:
+            directory (str): Destination directory; created if needed.
+        """
+        self._thaw()
+        self._merge()
+        os.makedirs(directory, exist_ok=True)
+        staging = os.path.join(directory, f".staging-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)  # Left behind by an interrupted save
+        os.makedirs(staging)
+
+        terms = sorted(self._term_of, key=lambda term: term.encode("utf-8"))
+        old = np.array([self._term_of[term] for term in terms], dtype=np.int64)
+        counts = np.diff(self._offsets)[old]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        # Posting i of the n-th sorted term sits at its old offset + (i - new offset)
+        postings = np.repeat(self._offsets[old] - offsets[:-1], counts) + np.arange(offsets[-1], dtype=np.int64)
+        live = sorted(self._doc_of.values(), key=lambda doc: self._doc_ids[doc].encode("utf-8"))
+
+        offsets.tofile(os.path.join(staging, self.OFFSETS_FILE))
+        np.asarray(self._docs[postings], dtype=np.int32).tofile(os.path.join(staging, self.DOCS_FILE))
+        np.asarray(self._tfs[postings], dtype=np.uint16).tofile(os.path.join(staging, self.TFS_FILE))
+        self._lengths.astype(np.int32).tofile(os.path.join(staging, self.LENGTHS_FILE))
+        _StringTable.write(os.path.join(staging, self.TERMS_FILE), os.path.join(staging, self.TERM_OFFSETS_FILE), terms)
+        _StringTable.write(
+            os.path.join(staging, self.DOC_IDS_FILE), os.path.join(staging, self.DOC_ID_OFFSETS_FILE),
+            [doc_id or "" for doc_id in self._doc_ids],
+        )
+        np.array(live, dtype=np.int32).tofile(os.path.join(staging, self.DOC_ORDER_FILE))
+        meta = {
+            "k1": self.k1, "b": self.b, "terms": len(terms), "docs": len(self._doc_ids), "live": len(live),
+            "postings": len(self._docs), "total_length": self._total_length,
+            "term_bytes": os.path.getsize(os.path.join(staging, self.TERMS_FILE)),
+            "doc_id_bytes": os.path.getsize(os.path.join(staging, self.DOC_IDS_FILE)),
+        }
+        with open(os.path.join(staging, self.META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+        publish_version(directory, staging)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "BM25Index":
+        """
+        Open an index written by `save`.
+
+        Nothing is parsed: terms and document ids are looked up by binary
+        search over the saved tables until the first add or remove.
+
+        Args:
+            directory (str): Directory passed to `save`.
+            mmap (bool): Memory-map the files instead of reading them in;
+                the first merge after an add/remove copies the postings into memory.
+
+        Returns:
+            BM25Index: The loaded index.
+        """
+        directory = current_version_dir(directory)
+        with open(os.path.join(directory, cls.META_FILE)) as f:
+            meta = json.load(f)
+        self = cls(meta["k1"], meta["b"])
+
+        def read(name, dtype, count):
+            path = os.path.join(directory, name)
+            if not count:
+                return np.empty(0, dtype=dtype)
+            if mmap:
+                return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+            return np.fromfile(path, dtype=dtype)
+
+        self._offsets = read(cls.OFFSETS_FILE, np.int64, meta["terms"] + 1)
+        self._docs = read(cls.DOCS_FILE, np.int32, meta["postings"])
+        self._tfs = read(cls.TFS_FILE, np.uint16, meta["postings"])
+        self._lengths = read(cls.LENGTHS_FILE, np.int32, meta["docs"])
+        self._terms = _StringTable(
+            read(cls.TERMS_FILE, np.uint8, meta["term_bytes"]), read(cls.TERM_OFFSETS_FILE, np.int64, meta["terms"] + 1),
+        )
+        self._ids = _StringTable(
+            read(cls.DOC_IDS_FILE, np.uint8, meta["doc_id_bytes"]), read(cls.DOC_ID_OFFSETS_FILE, np.int64, meta["docs"] + 1),
+            read(cls.DOC_ORDER_FILE, np.int32, meta["live"]),
+        )
+        self._live = meta["live"]
+        self._total_length = meta["total_length"]
+        return self
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Tuple[str, float]]], k: int = RRF_K, limit: Optional[int] = None,
+    weights: Optional[Sequence[float]] = None,
+) -> List[Tuple[str, float]]:
+    """
+    Merge ranked result lists with Reciprocal Rank Fusion.
+
+    Each document scores sum(weight / (k + rank)) over the lists it appears
+    in (rank starting at 1). Only ranks are used, so BM25 scores and cosine
+    similarities need no calibration against each other.
+
+    Args:
+        rankings: Result lists of (doc_id, score), best first.
+        k (int): Damping constant; larger values flatten the rank curve.
+        limit (int): Truncate the fused list to this many results.
+        weights: Optional per-list weights (default 1.0 each).
+
+    Returns:
+        list: (doc_id, fused score) pairs, best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+class HybridSearcher:
+    """
+    Keyword + vector retrieval fused with RRF.
+
+    Both indexes must be keyed by the same ids (EmbeddingPipeline.index_documents
+    fills both from the same chunks when given a `keyword_index`).
+    """
+
+    # Growth factor of each index's search depth while pre-filtered results are short
+    FILTER_OVERFETCH = 10
+
+    def __init__(self, vector_index: VectorIndex, keyword_index: BM25Index, embedder, fetch: int = 50, rrf_k: int = RRF_K):
+        """
+        Args:
+            vector_index (VectorIndex): Dense index over the chunks.
+            keyword_index (BM25Index): Keyword index over the same chunks.
+            embedder: embeddings.Embedder used to embed queries.
+            fetch (int): Candidates taken from each index before fusion.
+            rrf_k (int): RRF damping constant.
+        """
+        self.vector_index = vector_index
+        self.keyword_index = keyword_index
+        self.embedder = embedder
+        self.fetch = fetch
+        self.rrf_k = rrf_k
+
+    def _filtered(self, search: Callable[[int], List[Tuple[str, float]]], size: int, want: int, allow: Callable[[str], bool]):
+        """
+        Allowed hits of `search`, searching FILTER_OVERFETCH times deeper
+        each round until `want` pass the filter or all `size` ids were searched.
+        """
+        depth = want
+        while True:
+            depth = min(depth * self.FILTER_OVERFETCH, size)
+            hits = search(depth)
+            allowed = [hit for hit in hits if allow(hit[0])]
+            if len(allowed) >= want or depth >= size or len(hits) < depth:
+                return allowed
+
+    def search(self, query: str, k: int = 10, allow: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Fused top-k chunk ids with RRF scores.
+
+        Args:
+            query (str): Search text.
+            k (int): Results to return.
+            allow: Optional pre-filter on chunk ids. Rejected ids are dropped
+                before fusion, and each index is searched deeper until it has
+                `fetch` allowed candidates or has been searched exhaustively,
+                so a selective filter widens the search instead of coming up
+                short: `k` results come back whenever `k` allowed chunks match.
+        """
+        fetch = max(k, self.fetch)
+        vector = self.embedder.embed([query])
+        if not allow:
+            dense = self.vector_index.search(vector, fetch)[0]
+            sparse = self.keyword_index.search(query, fetch)
+        else:
+            dense = self._filtered(lambda depth: self.vector_index.search(vector, depth)[0], len(self.vector_index), fetch, allow)
+            sparse = self._filtered(lambda depth: self.keyword_index.search(query, depth), len(self.keyword_index), fetch, allow)
+        return reciprocal_rank_fusion([dense, sparse], k=self.rrf_k, limit=k)
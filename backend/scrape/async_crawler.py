@@ -0,0 +1,280 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from scraper_utils import FetchMetrics, backoff_delay, parse_retry_after
+from scrape_log import get_log
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, holding at most `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and consume it."""
+        # The lock queues waiters so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """One token bucket per host, created lazily on first use."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, url: str):
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()
+
+
+class GlobalBackoff:
+    """
+    Crawl-wide pause shared by every worker.
+
+    A 429 on any request pushes back the resume time for all workers, using
+    Retry-After when the server sends it and exponential backoff otherwise.
+    A successful response resets the backoff exponent.
+    """
+
+    def __init__(self, base_wait: float = 20, max_wait: float = 120):
+        self.base_wait = base_wait
+        self.max_wait = max_wait
+        self.strikes = 0
+        self.resume_at = 0.0
+
+    def trigger(self, retry_after: Optional[float] = None) -> float:
+        delay = backoff_delay(self.strikes, self.base_wait, self.max_wait, retry_after)
+        self.strikes += 1
+        self.resume_at = max(self.resume_at, time.monotonic() + delay)
+        return delay
+
+    def reset(self):
+        self.strikes = 0
+
+    async def wait(self):
+        while True:
+            remaining = self.resume_at - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+
+@dataclass
+class CrawlStats:
+    fetched: int = 0
+    parsed: int = 0
+    failed: int = 0
+    rate_limited: int = 0
+    cached: int = 0
+    revalidated: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.fetched / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class AsyncCrawler:
+    """
+    Bounded-concurrency aiohttp crawler for perfume detail pages.
+
+    `concurrency` workers pull URLs from a shared queue. Every request first
+    waits out the global 429 backoff and then takes a token from its host's
+    bucket, so the crawl as a whole never exceeds `rate_per_host` requests per
+    second per host. Fetched pages are handed to `parse`, and whatever it
+    returns (if truthy) is handed to `sink` — typically the scraper's
+    existing save_progress.
+
+    With an HtmlCache, cached pages are served without a request unless
+    `refresh` is set, in which case they are revalidated with a conditional
+    GET and a 304 reuses the cached body.
+
+    Nothing blocking runs on the event loop: `parse` runs in a worker
+    thread, and cache reads/writes and `sink` run one at a time on a single
+    I/O thread (neither the cache nor a checkpointing sink is safe to call
+    concurrently).
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[str, bytes], object],
+        sink: Callable[[object], None],
+        concurrency: int = 8,
+        rate_per_host: float = 2.0,
+        burst: float = 1.0,
+        max_retries: int = 10,
+        timeout: float = 15,
+        headers: Optional[Callable[[], Dict[str, str]]] = None,
+        backoff_base: float = 20,
+        backoff_max: float = 120,
+        cache=None,
+        refresh: bool = False,
+        metrics: Optional[FetchMetrics] = None,
+    ):
+        self.parse = parse
+        self.sink = sink
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = headers or (lambda: {})
+        self.limiter = HostRateLimiter(rate_per_host, burst)
+        self.backoff = GlobalBackoff(backoff_base, backoff_max)
+        self.cache = cache
+        self.refresh = refresh
+        self.metrics = metrics or FetchMetrics()
+        self.stats = CrawlStats()
+        self._io: Optional[ThreadPoolExecutor] = None
+
+    async def _in_io_thread(self, fn: Callable, *args):
+        """Run blocking cache or sink work on the crawler's I/O thread."""
+        if self._io is None:
+            self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawler-io")
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    def _cached(self, url: str):
+        """(cached body or None, conditional request headers) for `url`."""
+        entry = self.cache.get(url)
+        cached = self.cache.read(entry) if entry is not None else None
+        # Validators only when the cached body can stand in for a 304; a lost body needs a plain GET
+        return cached, self.cache.conditional_headers(url) if cached is not None else {}
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[bytes]:
+        """
+        Fetch a page, honouring the shared rate limit and 429 backoff.
+
+        Returns:
+            bytes or None: Raw page body, or None if the URL failed permanently.
+        """
+        cached, conditional = await self._in_io_thread(self._cached, url) if self.cache is not None else (None, {})
+        if cached is not None and not self.refresh:
+            self.stats.cached += 1
+            return cached
+
+        for _ in range(self.max_retries):
+            await self.backoff.wait()
+            await self.limiter.acquire(url)
+            started = time.perf_counter()
+            try:
+                async with session.get(url, headers={**self.headers(), **conditional}) as response:
+                    self.metrics.record(url, time.perf_counter() - started, response.status)
+                    if response.status == 200:
+                        body = await response.read()
+                        self.backoff.reset()
+                        self.stats.fetched += 1
+                        self.stats.bytes += len(body)
+                        if self.cache is not None:
+                            await self._in_io_thread(self.cache.put, url, body, response.headers)
+                        return body
+
+                    if response.status == 304 and cached is not None:
+                        self.backoff.reset()
+                        self.stats.revalidated += 1
+                        await self._in_io_thread(self.cache.touch, url, response.headers)
+                        return cached
+
+                    if response.status == 429:
+                        self.stats.rate_limited += 1
+                        wait_time = self.backoff.trigger(parse_retry_after(response.headers.get("Retry-After")))
+                        get_log().warning("rate_limited", url, f"Rate limited! Pausing all workers for {wait_time:.1f} seconds...")
+                        continue
+
+                    get_log().error(f"http_{response.status}", url, f"Error {response.status} for {url}. Skipping.")
+                    return None
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.metrics.record(url, time.perf_counter() - started)
+                get_log().warning("network_error", url, f"Network error: {str(e) or type(e).__name__} for {url}. Retrying...")
+                await asyncio.sleep(self.backoff.base_wait * random.random())
+
+        get_log().error("max_retries", url, f"Max retries reached for {url}, skipping.")
+        return None
+
+    async def handle(self, url: str, html: bytes):
+        """Parse a fetched page and pass the result to the sink."""
+        result = await asyncio.to_thread(self.parse, url, html)
+        if result:
+            await self._in_io_thread(self.sink, result)
+            self.stats.parsed += 1
+
+    async def _worker(self, session: aiohttp.ClientSession, queue: asyncio.Queue):
+        while True:
+            url = await queue.get()
+            try:
+                html = await self.fetch(session, url)
+                if html is None:
+                    self.stats.failed += 1
+                else:
+                    await self.handle(url, html)
+            except Exception as e:
+                self.stats.failed += 1
+                get_log().error("process_error", url, f"Error processing {url}: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def crawl(self, urls: Iterable[str]) -> CrawlStats:
+        """
+        Crawl all `urls` and return the crawl statistics.
+
+        Args:
+            urls: URLs to fetch; duplicates are fetched once.
+        """
+        self.stats = CrawlStats()
+        queue: asyncio.Queue = asyncio.Queue()
+        for url in dict.fromkeys(urls):
+            queue.put_nowait(url)
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout) as session:
+            workers = [asyncio.create_task(self._worker(session, queue)) for _ in range(self.concurrency)]
+            try:
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if self._io is not None:
+                    self._io.shutdown()
+                    self._io = None
+
+        self.stats.finished = time.monotonic()
+        return self.stats
+
+    def run(self, urls: Iterable[str]) -> CrawlStats:
+        """Synchronous entry point for scripts."""
+        return asyncio.run(self.crawl(urls))
@@ -0,0 +1,189 @@
+import json
+import os
+from typing import Dict, Iterator, Optional, Set
+
+
+class CheckpointStore:
+    """
+    Append-only JSONL checkpoint for scraped perfumes.
+
+    Every scraped perfume is appended as a single line, so saving progress
+    costs O(record) instead of rewriting the whole dataset. Writes are flushed
+    immediately and fsynced in batches; a torn final line left behind by a
+    crash is dropped on the next open. `compact` turns the log into the final
+    JSON array consumed by the rest of the pipeline.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 50):
+        """
+        Args:
+            path (str): Location of the JSONL checkpoint file.
+            fsync_every (int): Number of appended records between fsync calls.
+        """
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self._file = None
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _repair_tail(self):
+        """Truncate a partially written last line left by an interrupted write."""
+        try:
+            with open(self.path, "rb+") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size == 0:
+                    return
+                f.seek(size - 1)
+                if f.read(1) == b"\n":
+                    return
+
+                # Walk back to the last complete line and cut everything after it
+                chunk_size = 4096
+                end = size
+                while end > 0:
+                    start = max(0, end - chunk_size)
+                    f.seek(start)
+                    chunk = f.read(end - start)
+                    newline = chunk.rfind(b"\n")
+                    if newline != -1:
+                        f.truncate(start + newline + 1)
+                        return
+                    end = start
+                f.truncate(0)
+        except FileNotFoundError:
+            return
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._repair_tail()
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def append(self, record: Dict):
+        """
+        Append one record to the checkpoint.
+
+        Args:
+            record (dict): JSON-serializable perfume record.
+        """
+        f = self._open()
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """Force buffered records to disk."""
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def close(self):
+        """Sync outstanding records and release the file handle."""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def iter_records(self) -> Iterator[Dict]:
+        """
+        Stream records back from the checkpoint, one line at a time.
+
+        Lines that cannot be decoded (e.g. a torn write) are skipped.
+        """
+        if self._file is not None:
+            self._file.flush()
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # Torn final line from an interrupted write
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def urls(self) -> Set[str]:
+        """Return the set of perfume URLs already stored in the checkpoint."""
+        return {record["url"] for record in self.iter_records() if "url" in record}
+
+    def compact(self, output_path: str, indent: Optional[int] = 2) -> int:
+        """
+        Write the checkpoint out as a single JSON array.
+
+        Records are streamed in two passes so memory stays proportional to the
+        number of URLs, not the size of the data. When a URL appears more than
+        once, the last record wins. The output is written to a temporary file
+        and atomically moved into place.
+
+        Args:
+            output_path (str): Destination of the compacted JSON file.
+            indent (int): Indentation for the output; None for compact output.
+
+        Returns:
+            int: Number of records written.
+        """
+        last_seen = {}
+        for position, record in enumerate(self.iter_records()):
+            last_seen[record.get("url", position)] = position
+        keep = set(last_seen.values())
+
+        tmp_path = output_path + ".tmp"
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            out.write("[")
+            for position, record in enumerate(self.iter_records()):
+                if position not in keep:
+                    continue
+                out.write(",\n" if count else "\n")
+                body = json.dumps(record, indent=indent, ensure_ascii=False)
+                if indent:
+                    body = "\n".join(" " * indent + line for line in body.splitlines())
+                out.write(body)
+                count += 1
+            out.write("\n]\n" if count else "]\n")
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, output_path)
+        return count
+
+    def import_json(self, json_path: str) -> int:
+        """
+        Seed an empty checkpoint from a legacy JSON array file.
+
+        Args:
+            json_path (str): Path to a previously compacted JSON file.
+
+        Returns:
+            int: Number of records imported.
+        """
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+
+        count = 0
+        for record in records:
+            if isinstance(record, dict):
+                self.append(record)
+                count += 1
+        self.sync()
+        return count
@@ -0,0 +1,295 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple, Union
+
+from bs4 import BeautifulSoup, NavigableString, UnicodeDammit
+from lxml import etree, html as lxml_html
+
+from models import Perfume
+
+
+def remove_leading_digits(text: str) -> str:
+    """
+    Removes any leading digits (and optional whitespace) from the start of `text`.
+    Example: '201Good for everyday wear' -> 'Good for everyday wear'
+    """
+    return re.sub(r'^[0-9]+\s*', '', text).strip()
+
+
+class PerfumeExtractor(ABC):
+    """
+    Turns a perfume detail page into a Perfume plus the list of missing fields.
+
+    Backends must produce identical output for the same page; SoupExtractor
+    is the reference implementation the others are tested against.
+    """
+    name = None
+
+    @abstractmethod
+    def extract(self, url: str, html: Union[str, bytes]) -> Tuple[Perfume, List[str]]:
+        """
+        Parse one detail page.
+
+        Args:
+            url (str): URL the page was fetched from.
+            html (str | bytes): Raw page.
+
+        Returns:
+            Tuple of (Perfume, names of the fields that were not found)
+        """
+
+
+class SoupExtractor(PerfumeExtractor):
+    """Reference extractor using BeautifulSoup CSS selectors."""
+    name = "soup"
+
+    def extract(self, url, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        missing_fields = []
+
+        name_tag = soup.select_one("h1[itemprop='name']")
+        name = name_tag.text.strip() if name_tag else "Unknown"
+        if not name_tag:
+            missing_fields.append("name")
+
+        brand_tag = soup.select_one("p[itemprop='brand'] a span[itemprop='name']")
+        brand = brand_tag.text.strip() if brand_tag else "Unknown"
+        if not brand_tag:
+            missing_fields.append("brand")
+
+        image_tag = soup.select_one("img[itemprop='image']")
+        photo_url = image_tag["src"] if image_tag else None
+        if not image_tag:
+            missing_fields.append("photo_url")
+
+        # Extract Accords
+        accords = []
+        for accord_tag in soup.select(".accord-box .accord-bar"):
+            try:
+                accord_name = accord_tag.text.strip()
+                accord_width = accord_tag["style"].split("width:")[-1].split("%")[0]
+                accords.append({accord_name: float(accord_width)})
+            except:
+                missing_fields.append(f"accords: {accord_name}")
+
+        # Extract Notes
+        all_notes = {}
+
+        # 1) Find all <pyramid-level> nodes that have a [notes] attribute, e.g. notes="ingredients" or notes="top"
+        pyramid_levels = soup.select('pyramid-level[notes]')
+
+        for level in pyramid_levels:
+            # 2) For each anchor (<a>) inside, get the text from next_sibling
+            # (because the note text typically appears after the <a>).
+            for anchor in level.select('a'):
+                note_text = anchor.next_sibling
+                if isinstance(note_text, NavigableString):
+                    note_text = note_text.strip()
+                    if note_text:
+                        all_notes[note_text] = None
+
+        notes_list = list(all_notes)
+
+        smells_like = [perfume.text.strip() for perfume in soup.select("similar-perfumes .carousel-cell a span.brand")]
+
+        reviews = []
+        for review_box in soup.select(".fragrance-review-box"):
+            body_el = review_box.select_one('[itemprop="reviewBody"]')
+            if body_el:
+                reviews.append(body_el.text.strip())
+
+        pros_container = None
+        cons_container = None
+
+        for column in soup.select('.grid-x .cell.small-6'):
+            header_el = column.select_one('h4.header')
+            if header_el and 'Pros' in header_el.get_text():
+                pros_container = column
+            elif header_el and 'Cons' in header_el.get_text():
+                cons_container = column
+        pros = []
+        cons = []
+
+        if pros_container:
+            for pro_div in pros_container.select('.cell.small-12'):
+                line = pro_div.get_text(strip=True)
+                # Clean up leading digits
+                line = remove_leading_digits(line)
+                if line:
+                    pros.append(line)
+
+        if cons_container:
+            for con_div in cons_container.select('.cell.small-12'):
+                line = con_div.get_text(strip=True)
+                # Clean up leading digits
+                line = remove_leading_digits(line)
+                if line:
+                    cons.append(line)
+
+        # Construct Perfume object
+        perfume_data = Perfume(
+            url=url, name=name, brand=brand, photo_url=photo_url, accords=accords,
+            notes=notes_list, smells_like=smells_like,
+            reviews=reviews, pros=pros, cons=cons
+        )
+
+        return perfume_data, missing_fields
+
+
+def _has_class(*classes: str) -> str:
+    """XPath predicate equivalent to the CSS selector `.a.b`."""
+    return "".join(
+        f"[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]" for cls in classes
+    )
+
+
+class LxmlExtractor(PerfumeExtractor):
+    """
+    Fast extractor running precompiled XPath queries over an lxml tree.
+
+    Each query is the XPath translation of the matching CSS selector in
+    SoupExtractor and is compiled once at import time.
+    """
+    name = "lxml"
+
+    NAME = etree.XPath("(//h1[@itemprop='name'])[1]")
+    BRAND = etree.XPath("(//p[@itemprop='brand']//a//span[@itemprop='name'])[1]")
+    IMAGE = etree.XPath("(//img[@itemprop='image'])[1]")
+    ACCORDS = etree.XPath(f"//*{_has_class('accord-box')}//*{_has_class('accord-bar')}")
+    NOTE_ANCHORS = etree.XPath("//pyramid-level[@notes]//a")
+    SMELLS_LIKE = etree.XPath(f"//similar-perfumes//*{_has_class('carousel-cell')}//a//span{_has_class('brand')}")
+    REVIEW_BOXES = etree.XPath(f"//*{_has_class('fragrance-review-box')}")
+    REVIEW_BODY = etree.XPath("(.//*[@itemprop='reviewBody'])[1]")
+    COLUMNS = etree.XPath(f"//*{_has_class('grid-x')}//*{_has_class('cell', 'small-6')}")
+    COLUMN_HEADER = etree.XPath(f"(.//h4{_has_class('header')})[1]")
+    COLUMN_LINES = etree.XPath(f".//*{_has_class('cell', 'small-12')}")
+    UTF8_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+
+    @staticmethod
+    def _first(query, node):
+        found = query(node)
+        return found[0] if found else None
+
+    @staticmethod
+    def _text(el) -> str:
+        """
+        Equivalent of BeautifulSoup's `.text` / `get_text()`.
+
+        BeautifulSoup collapses whitespace-only strings to a single newline
+        (or space), so the same is done here to keep output identical.
+        """
+        return "".join(
+            part if part.strip() else ("\n" if "\n" in part else " ")
+            for part in el.itertext()
+        )
+
+    @staticmethod
+    def _stripped_text(el) -> str:
+        """Equivalent of BeautifulSoup's `get_text(strip=True)`."""
+        return "".join(part.strip() for part in el.itertext())
+
+    def parse(self, html):
+        parser = None
+        if isinstance(html, bytes):
+            # lxml assumes Latin-1 for bytes without a <meta charset>; detect it the way BeautifulSoup does
+            html = (UnicodeDammit(html, is_html=True).unicode_markup or "").encode("utf-8")
+            parser = self.UTF8_PARSER
+        try:
+            return lxml_html.document_fromstring(html, parser=parser)
+        except etree.ParserError:
+            return lxml_html.document_fromstring("<html></html>")
+
+    def extract(self, url, html):
+        root = self.parse(html)
+        missing_fields = []
+
+        name_tag = self._first(self.NAME, root)
+        name = self._text(name_tag).strip() if name_tag is not None else "Unknown"
+        if name_tag is None:
+            missing_fields.append("name")
+
+        brand_tag = self._first(self.BRAND, root)
+        brand = self._text(brand_tag).strip() if brand_tag is not None else "Unknown"
+        if brand_tag is None:
+            missing_fields.append("brand")
+
+        image_tag = self._first(self.IMAGE, root)
+        photo_url = image_tag.attrib["src"] if image_tag is not None else None
+        if image_tag is None:
+            missing_fields.append("photo_url")
+
+        accords = []
+        for accord_tag in self.ACCORDS(root):
+            accord_name = self._text(accord_tag).strip()
+            try:
+                accord_width = accord_tag.attrib["style"].split("width:")[-1].split("%")[0]
+                accords.append({accord_name: float(accord_width)})
+            except (KeyError, ValueError):
+                missing_fields.append(f"accords: {accord_name}")
+
+        # The note text is the tail of each anchor inside a pyramid level
+        all_notes: Dict[str, None] = {}
+        for anchor in self.NOTE_ANCHORS(root):
+            note_text = (anchor.tail or "").strip()
+            if note_text:
+                all_notes[note_text] = None
+
+        smells_like = [self._text(el).strip() for el in self.SMELLS_LIKE(root)]
+
+        reviews = []
+        for review_box in self.REVIEW_BOXES(root):
+            body_el = self._first(self.REVIEW_BODY, review_box)
+            if body_el is not None:
+                reviews.append(self._text(body_el).strip())
+
+        pros_container = None
+        cons_container = None
+        for column in self.COLUMNS(root):
+            header_el = self._first(self.COLUMN_HEADER, column)
+            if header_el is not None and 'Pros' in self._text(header_el):
+                pros_container = column
+            elif header_el is not None and 'Cons' in self._text(header_el):
+                cons_container = column
+
+        pros = []
+        cons = []
+        for container, lines in ((pros_container, pros), (cons_container, cons)):
+            if container is None:
+                continue
+            for line_el in self.COLUMN_LINES(container):
+                line = remove_leading_digits(self._stripped_text(line_el))
+                if line:
+                    lines.append(line)
+
+        perfume_data = Perfume(
+            url=url, name=name, brand=brand, photo_url=photo_url, accords=accords,
+            notes=list(all_notes), smells_like=smells_like,
+            reviews=reviews, pros=pros, cons=cons
+        )
+
+        return perfume_data, missing_fields
+
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+_instances: Dict[str, PerfumeExtractor] = {}
+
+
+def get_extractor(name: str = "soup") -> PerfumeExtractor:
+    """
+    Return the shared extractor instance for a backend name.
+
+    Args:
+        name (str): One of the keys of EXTRACTORS.
+
+    Returns:
+        PerfumeExtractor: Cached extractor for that backend.
+    """
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor backend {name!r}; expected one of {sorted(EXTRACTORS)}")
+    if name not in _instances:
+        _instances[name] = EXTRACTORS[name]()
+    return _instances[name]
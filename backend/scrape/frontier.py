@@ -0,0 +1,213 @@
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit, urlunsplit
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+STATES = (PENDING, IN_FLIGHT, DONE, FAILED)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def absolute_url(url: str, base: Optional[str] = None) -> str:
+    """
+    The URL to request for a link: resolved against `base`, fragment dropped.
+
+    Example: '/search/?q=x#top' on https://example.com/ -> 'https://example.com/search/?q=x'
+    """
+    return urldefrag(urljoin(base, url.strip()) if base else url.strip())[0]
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> str:
+    """
+    Canonical form of a crawl URL, so one page is only ever queued once.
+
+    Only used to compute dedup keys; pages are requested at their
+    `absolute_url`, since the server may need the query or trailing slash.
+
+    Relative links are resolved against `base`; the scheme and host are
+    lowercased, default ports, query strings and fragments are dropped, and
+    a trailing slash is removed from any path but the root.
+
+    Example: '/designers/Creed.html?page=2#top' on https://Example.com/ ->
+    'https://example.com/designers/Creed.html'
+    """
+    url = urljoin(base, url.strip()) if base else url.strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, "", ""))
+
+
+def url_key(url: str) -> int:
+    """Dedup key of a URL: the 64-bit hash of its normalized form."""
+    return int.from_bytes(hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class CrawlFrontier:
+    """
+    Disk-backed crawl queue with dedup and per-URL state.
+
+    Every URL is keyed by a 64-bit hash of its normalized form, so checking
+    whether a page was already discovered is a single index lookup rather
+    than a scan of everything seen so far; the URL itself is stored as
+    discovered (made absolute) and is what gets fetched. URLs move from
+    pending to in-flight when claimed and to done or failed when finished;
+    a failed URL goes back to pending until it has used up `max_attempts`,
+    behind every URL with fewer attempts.
+
+    State lives in SQLite (WAL), one row per URL, so progress is saved by
+    updating that row. Reopening the frontier resumes where the last run
+    stopped: URLs left in flight by a crash are simply pending again.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS urls (
+            id INTEGER PRIMARY KEY,
+            key INTEGER NOT NULL UNIQUE,
+            url TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            parent TEXT,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            updated REAL NOT NULL
+        );
+        DROP INDEX IF EXISTS urls_queue;
+        CREATE INDEX IF NOT EXISTS urls_claim ON urls (state, kind, attempts, id);
+    """
+
+    def __init__(self, path: str = "../../data/crawl_frontier.sqlite3", max_attempts: int = 3):
+        """
+        Args:
+            path (str): SQLite database holding the frontier.
+            max_attempts (int): Failures after which a URL stays failed.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self.SCHEMA)
+        # Anything in flight when the last run died is retried
+        self._db.execute("UPDATE urls SET state = ? WHERE state = ?", (PENDING, IN_FLIGHT))
+        self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def __contains__(self, url: str) -> bool:
+        return self._db.execute("SELECT 1 FROM urls WHERE key = ?", (url_key(url),)).fetchone() is not None
+
+    def add(self, urls: Iterable[str], kind: str, parent: Optional[str] = None, base: Optional[str] = None) -> List[str]:
+        """
+        Queue newly discovered URLs; ones seen before (in any state) are ignored.
+
+        Args:
+            urls: Absolute or, with `base`, relative links.
+            kind (str): What the page is, e.g. "designer" or "perfume".
+            parent (str): Label carried along, e.g. the designer a perfume belongs to.
+            base (str): URL relative links are resolved against.
+
+        Returns:
+            list: The absolute URLs that were actually added, in order.
+        """
+        added = []
+        now = time.time()
+        with self._db:
+            for url in urls:
+                url = absolute_url(url, base)
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO urls (key, url, kind, parent, state, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (url_key(url), url, kind, parent, PENDING, now),
+                )
+                if cursor.rowcount:
+                    added.append(url)
+        return added
+
+    def claim(self, kind: Optional[str] = None, limit: int = 1) -> List[Tuple[str, str, Optional[str]]]:
+        """
+        Take up to `limit` pending URLs and mark them in flight.
+
+        Untried URLs come first, in discovery order, so a failing URL is
+        retried only after everything queued behind it had its turn.
+
+        Returns:
+            list: (url, kind, parent) tuples.
+        """
+        with self._db:
+            if kind is None:
+                rows = self._db.execute(
+                    "SELECT id, url, kind, parent FROM urls WHERE state = ? ORDER BY attempts, id LIMIT ?", (PENDING, limit)
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT id, url, kind, parent FROM urls WHERE state = ? AND kind = ? ORDER BY attempts, id LIMIT ?",
+                    (PENDING, kind, limit),
+                ).fetchall()
+            self._db.executemany(
+                "UPDATE urls SET state = ?, updated = ? WHERE id = ?", [(IN_FLIGHT, time.time(), row[0]) for row in rows]
+            )
+        return [(url, kind, parent) for _, url, kind, parent in rows]
+
+    def done(self, url: str):
+        with self._db:
+            self._db.execute(
+                "UPDATE urls SET state = ?, error = NULL, updated = ? WHERE key = ?", (DONE, time.time(), url_key(url))
+            )
+
+    def fail(self, url: str, error: str) -> bool:
+        """
+        Record a failed attempt at `url`.
+
+        Returns:
+            bool: True if the URL will be retried, False if it is now failed for good.
+        """
+        with self._db:
+            row = self._db.execute("SELECT attempts FROM urls WHERE key = ?", (url_key(url),)).fetchone()
+            if row is None:
+                return False
+            attempts = row[0] + 1
+            state = PENDING if attempts < self.max_attempts else FAILED
+            self._db.execute(
+                "UPDATE urls SET state = ?, attempts = ?, error = ?, updated = ? WHERE key = ?",
+                (state, attempts, error, time.time(), url_key(url)),
+            )
+        return state == PENDING
+
+    def counts(self, kind: Optional[str] = None) -> Dict[str, int]:
+        """Number of URLs in each state, optionally for one kind."""
+        if kind is None:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state")
+        else:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM urls WHERE kind = ? GROUP BY state", (kind,))
+        return dict({state: 0 for state in STATES}, **dict(rows.fetchall()))
+
+    def iter_urls(self, kind: str, state: Optional[str] = None) -> Iterator[Tuple[str, Optional[str]]]:
+        """Stream (url, parent) pairs of one kind in discovery order, optionally in one state."""
+        if state is None:
+            rows = self._db.execute("SELECT url, parent FROM urls WHERE kind = ? ORDER BY id", (kind,))
+        else:
+            rows = self._db.execute("SELECT url, parent FROM urls WHERE kind = ? AND state = ? ORDER BY id", (kind, state))
+        yield from rows
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+import zstandard
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    digest: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+    size: int = 0
+
+
+class HtmlCache:
+    """
+    Content-addressed, zstd-compressed cache of fetched pages.
+
+    Bodies are stored once per SHA-256 of their content under
+    `objects/<2 hex>/<digest>.zst`, so identical pages (and unchanged
+    re-downloads) cost no extra space. A small SQLite index maps each URL to
+    its current body plus the ETag / Last-Modified validators needed for
+    conditional GETs.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            url TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL,
+            size INTEGER NOT NULL
+        )
+    """
+
+    def __init__(self, root: str = "../../data/html_cache", level: int = 10):
+        """
+        Args:
+            root (str): Directory holding the index and compressed objects.
+            level (int): zstd compression level.
+        """
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(self.SCHEMA)
+        self._db.commit()
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __contains__(self, url: str) -> bool:
+        return self._db.execute("SELECT 1 FROM entries WHERE url = ?", (url,)).fetchone() is not None
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + ".zst")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Return the index entry for `url`, or None if it was never cached."""
+        row = self._db.execute(
+            "SELECT url, digest, etag, last_modified, fetched_at, size FROM entries WHERE url = ?", (url,)
+        ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def read(self, entry: CacheEntry) -> Optional[bytes]:
+        """Load and decompress the body for an entry; None if the object is gone."""
+        try:
+            with open(self._object_path(entry.digest), "rb") as f:
+                return self._decompressor.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+    def get_body(self, url: str) -> Optional[bytes]:
+        entry = self.get(url)
+        return self.read(entry) if entry else None
+
+    def put(self, url: str, body: bytes, headers: Optional[Mapping[str, str]] = None) -> CacheEntry:
+        """
+        Store a freshly downloaded body and its validators.
+
+        Args:
+            url (str): Requested URL.
+            body (bytes): Raw response body.
+            headers (Mapping): Response headers; ETag and Last-Modified are kept.
+
+        Returns:
+            CacheEntry: The stored index entry.
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self._compressor.compress(body))
+            os.replace(tmp_path, path)
+
+        headers = headers or {}
+        entry = CacheEntry(
+            url=url,
+            digest=digest,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            fetched_at=time.time(),
+            size=len(body),
+        )
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.url, entry.digest, entry.etag, entry.last_modified, entry.fetched_at, entry.size),
+            )
+        return entry
+
+    def touch(self, url: str, headers: Optional[Mapping[str, str]] = None):
+        """Record a 304 revalidation, refreshing validators the server re-sent."""
+        headers = headers or {}
+        with self._db:
+            self._db.execute(
+                "UPDATE entries SET fetched_at = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), headers.get("ETag"), headers.get("Last-Modified"), url),
+            )
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Request headers that turn a refresh into a conditional GET."""
+        entry = self.get(url)
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def iter_pages(self) -> Iterator[Tuple[str, bytes]]:
+        """Stream every cached (url, body) pair; no network involved."""
+        rows = self._db.execute("SELECT url, digest, etag, last_modified, fetched_at, size FROM entries ORDER BY url")
+        for row in rows.fetchall():
+            entry = CacheEntry(*row)
+            body = self.read(entry)
+            if body is not None:
+                yield entry.url, body
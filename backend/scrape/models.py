@@ -2,6 +2,12 @@ from typing import List, Dict, Optional
 from pydantic import BaseModel
 
 
+class PerfumeNotes(BaseModel):
+    top: List[str] = []
+    middle: List[str] = []
+    base: List[str] = []
+
+
 class Perfume(BaseModel):
     url: str
     name: str 
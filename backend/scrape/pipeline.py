@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from async_crawler import AsyncCrawler
+from scrape_log import get_log
+
+_DONE = object()
+
+
+def _timed_parse(parse: Callable, url: str, body: bytes) -> Tuple[object, float]:
+    """Run `parse` in a worker process and report how long it took there."""
+    started = time.perf_counter()
+    result = parse(url, body)
+    return result, time.perf_counter() - started
+
+
+@dataclass
+class StageStats:
+    """Item count, payload size and timing for one pipeline stage."""
+    items: int = 0
+    failed: int = 0
+    bytes: int = 0
+    busy: float = 0.0  # Seconds spent doing the stage's work, summed over workers
+    first: Optional[float] = None
+    last: Optional[float] = None
+
+    def record(self, size: int = 0, busy: float = 0.0):
+        now = time.monotonic()
+        if self.first is None:
+            self.first = now - busy
+        self.last = now
+        self.items += 1
+        self.bytes += size
+        self.busy += busy
+
+    @property
+    def wall(self) -> float:
+        if self.first is None or self.last is None:
+            return 0.0
+        return self.last - self.first
+
+    @property
+    def per_second(self) -> float:
+        """Items per second of wall-clock time while the stage was active."""
+        return self.items / self.wall if self.wall > 0 else 0.0
+
+    @property
+    def per_second_busy(self) -> float:
+        """Items per second of worker time, i.e. single-worker throughput."""
+        return self.items / self.busy if self.busy > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "items": self.items,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "wall_seconds": round(self.wall, 4),
+            "busy_seconds": round(self.busy, 4),
+            "items_per_second": round(self.per_second, 2),
+            "items_per_busy_second": round(self.per_second_busy, 2),
+        }
+
+
+@dataclass
+class PipelineStats:
+    fetch: StageStats = field(default_factory=StageStats)
+    parse: StageStats = field(default_factory=StageStats)
+    write: StageStats = field(default_factory=StageStats)
+    elapsed: float = 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "elapsed_seconds": round(self.elapsed, 4),
+            "fetch": self.fetch.as_dict(),
+            "parse": self.parse.as_dict(),
+            "write": self.write.as_dict(),
+        }
+
+    def report(self) -> str:
+        lines = [f"Pipeline finished in {self.elapsed:.2f}s"]
+        for name in ("fetch", "parse", "write"):
+            stage = getattr(self, name)
+            lines.append(
+                f"  {name:<5} {stage.items:>7} items  {stage.per_second:>8.2f}/s"
+                f"  ({stage.failed} failed, {stage.busy:.2f}s busy)"
+            )
+        return "\n".join(lines)
+
+
+class _FetchStage(AsyncCrawler):
+    """AsyncCrawler that queues raw pages for the parse stage instead of parsing inline."""
+
+    def __init__(self, queue: asyncio.Queue, stats: StageStats, **kwargs):
+        super().__init__(parse=None, sink=None, **kwargs)
+        self.queue = queue
+        self.stage_stats = stats
+
+    async def handle(self, url: str, html: bytes):
+        self.stage_stats.record(len(html))
+        await self.queue.put((url, html))  # Blocks when parsers fall behind
+
+
+class ParsePipeline:
+    """
+    Fetch → parse → write pipeline with parsing in a process pool.
+
+    The fetch stage is the async crawler; fetched page bytes go into a bounded
+    queue so fetching back-pressures when parsing falls behind. Parser tasks
+    hand each page to a ProcessPoolExecutor, so CPU-bound parsing runs on
+    all cores while the event loop keeps fetching. Parsed results pass
+    through a second bounded queue to a single writer that calls `sink` in
+    the main process.
+
+    `parse` must be a picklable top-level function taking (url, html_bytes);
+    a falsy return value is counted as a parse failure.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[str, bytes], object],
+        sink: Callable[[object], None],
+        parse_workers: Optional[int] = None,
+        queue_size: int = 64,
+        executor: Optional[Executor] = None,
+        **crawler_options,
+    ):
+        self.parse = parse
+        self.sink = sink
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.executor = executor
+        self.crawler_options = crawler_options
+        self.stats = PipelineStats()
+
+    async def _parse_worker(self, executor: Executor, pages: asyncio.Queue, results: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await pages.get()
+            if item is _DONE:
+                return
+            url, body = item
+            try:
+                result, busy = await loop.run_in_executor(executor, _timed_parse, self.parse, url, body)
+            except Exception as e:
+                self.stats.parse.failed += 1
+                get_log().error("parse_error", url, f"Error parsing {url}: {str(e)}")
+                continue
+            if not result:
+                self.stats.parse.failed += 1
+                continue
+            self.stats.parse.record(len(body), busy)
+            await results.put(result)
+
+    async def _writer(self, results: asyncio.Queue):
+        while True:
+            result = await results.get()
+            if result is _DONE:
+                return
+            started = time.perf_counter()
+            try:
+                # Off the loop, so a slow or fsyncing sink does not stall fetching
+                await asyncio.to_thread(self.sink, result)
+            except Exception as e:
+                self.stats.write.failed += 1
+                get_log().error("save_error", None, f"Error saving result: {str(e)}")
+                continue
+            self.stats.write.record(busy=time.perf_counter() - started)
+
+    async def run(self, urls: Iterable[str]) -> PipelineStats:
+        """
+        Run all three stages over `urls` and return per-stage statistics.
+        """
+        self.stats = PipelineStats()
+        started = time.monotonic()
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.parse_workers)
+        parsers = [
+            asyncio.create_task(self._parse_worker(executor, pages, results))
+            for _ in range(self.parse_workers)
+        ]
+        writer = asyncio.create_task(self._writer(results))
+        try:
+            fetcher = _FetchStage(pages, self.stats.fetch, **self.crawler_options)
+            crawl_stats = await fetcher.crawl(urls)
+            self.stats.fetch.failed = crawl_stats.failed
+
+            for _ in parsers:
+                await pages.put(_DONE)
+            await asyncio.gather(*parsers)
+            await results.put(_DONE)
+            await writer
+        finally:
+            for task in parsers + [writer]:
+                task.cancel()
+            await asyncio.gather(*parsers, writer, return_exceptions=True)
+            if self.executor is None:
+                executor.shutdown()
+
+        self.stats.elapsed = time.monotonic() - started
+        return self.stats
+
+    def run_sync(self, urls: Iterable[str]) -> PipelineStats:
+        """Synchronous entry point for scripts."""
+        return asyncio.run(self.run(urls))
@@ -0,0 +1,236 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional
+
+import orjson
+
+
+def iter_ndjson(path: str) -> Iterator[dict]:
+    """
+    Stream records from an NDJSON file, one line at a time.
+
+    Lines that cannot be decoded, including a torn final line left by an
+    interrupted write, are skipped.
+
+    Args:
+        path (str): NDJSON file to read.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Torn final line from an interrupted write
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+
+
+def _ends_mid_line(f) -> bool:
+    f.seek(0, os.SEEK_END)
+    if f.tell() == 0:
+        return False
+    f.seek(-1, os.SEEK_END)
+    return f.read(1) != b"\n"
+
+
+def append_ndjson(path: str, records: Iterable[dict]) -> int:
+    """
+    Append records to an NDJSON file; cost is proportional to the new records only.
+
+    Args:
+        path (str): NDJSON file to append to; created if missing.
+        records: Records to write.
+
+    Returns:
+        int: Number of records written.
+    """
+    count = 0
+    with open(path, "ab+") as f:
+        if _ends_mid_line(f):
+            f.write(b"\n")  # Fence off a torn line so it can't swallow the next record
+        for record in records:
+            f.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+            count += 1
+        f.flush()
+        os.fsync(f.fileno())
+    return count
+
+
+def write_ndjson(path: str, records: Iterable[dict]) -> int:
+    """
+    Replace an NDJSON file with `records`, streaming through a temporary file.
+
+    Args:
+        path (str): Destination NDJSON file.
+        records: Records to write; may be a generator reading the old file.
+
+    Returns:
+        int: Number of records written.
+    """
+    tmp_path = path + ".tmp"
+    count = 0
+    with open(tmp_path, "wb") as f:
+        for record in records:
+            f.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+            count += 1
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+class RedditStore:
+    """
+    Persistent store of scraped Reddit posts plus per-search watermarks.
+
+    Posts live in an append-only NDJSON log: storing a post appends one line,
+    and a re-scraped post is appended again, with the last line per Reddit id
+    winning. Only a small id -> num_comments index is held in memory, and
+    reading posts back streams the log, so memory stays flat however large
+    the corpus grows. The log is compacted once superseded lines outnumber
+    live ones.
+
+    For every (subreddit, search term) pair the store keeps the newest
+    `created_utc` seen, which lets an incremental run stop as soon as a
+    search reaches content it has already ingested.
+    """
+
+    def __init__(
+        self,
+        path: str = "../../data/reddit_perfume_discussions.ndjson",
+        state_path: str = "../../data/reddit_watermarks.json",
+        legacy_path: Optional[str] = "../../data/reddit_perfume_discussions.json",
+    ):
+        """
+        Args:
+            path (str): NDJSON log holding the posts.
+            state_path (str): JSON file holding the search watermarks.
+            legacy_path (str): JSON array written by older versions, imported
+                once if the log does not exist yet.
+        """
+        self.path = path
+        self.state_path = state_path
+        if legacy_path and not os.path.exists(path) and os.path.exists(legacy_path):
+            self.import_json(legacy_path)
+
+        self.index: Dict[str, Optional[int]] = {}
+        self.lines = 0
+        for post in iter_ndjson(path):
+            self.index[post["id"]] = post.get("num_comments")
+            self.lines += 1
+
+        self.watermarks: Dict[str, float] = {}
+        if os.path.exists(state_path):
+            with open(state_path, "rb") as f:
+                self.watermarks = orjson.loads(f.read())
+
+    def import_json(self, json_path: str) -> int:
+        """
+        Convert a legacy JSON array of posts into the NDJSON log.
+
+        Args:
+            json_path (str): Path to the old reddit_perfume_discussions.json.
+
+        Returns:
+            int: Number of posts imported.
+        """
+        with open(json_path, "r") as f:
+            posts = json.load(f)
+        return write_ndjson(self.path, (post for post in posts if isinstance(post, dict) and "id" in post))
+
+    @staticmethod
+    def watermark_key(subreddit: str, term: str) -> str:
+        return f"{subreddit.lower()}|{term.lower()}"
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, post_id: str) -> bool:
+        return post_id in self.index
+
+    def __iter__(self) -> Iterator[dict]:
+        return self.iter_posts()
+
+    def get_watermark(self, subreddit: str, term: str) -> Optional[float]:
+        """Newest `created_utc` ingested for this search, or None if it never ran."""
+        return self.watermarks.get(self.watermark_key(subreddit, term))
+
+    def advance_watermark(self, subreddit: str, term: str, created_utc: Optional[float]):
+        """Move the watermark forward; it never moves backwards."""
+        if created_utc is None:
+            return
+        key = self.watermark_key(subreddit, term)
+        self.watermarks[key] = max(self.watermarks.get(key, created_utc), created_utc)
+
+    def needs_update(self, post_id: str, num_comments: Optional[int]) -> bool:
+        """True if the post is new or its comment count changed since it was stored."""
+        return post_id not in self.index or self.index[post_id] != num_comments
+
+    def upsert(self, post: dict) -> bool:
+        """
+        Insert or replace a post by appending it to the log.
+
+        Returns:
+            bool: True if the post was not stored before.
+        """
+        return self.upsert_many([post]) == 1
+
+    def upsert_many(self, posts: Iterable[dict]) -> int:
+        """
+        Append a batch of posts to the log in one write.
+
+        Returns:
+            int: Number of posts that were not stored before.
+        """
+        added = 0
+
+        def indexed():
+            nonlocal added
+            for post in posts:
+                if post["id"] not in self.index:
+                    added += 1
+                self.index[post["id"]] = post.get("num_comments")
+                yield post
+
+        self.lines += append_ndjson(self.path, indexed())
+        return added
+
+    def iter_posts(self) -> Iterator[dict]:
+        """
+        Stream the current version of every stored post.
+
+        Two passes over the log: the first finds each id's last line, the
+        second yields only those lines, so no post bodies are held in memory.
+        """
+        last_seen = {}
+        for position, post in enumerate(iter_ndjson(self.path)):
+            last_seen[post["id"]] = position
+        keep = set(last_seen.values())
+        for position, post in enumerate(iter_ndjson(self.path)):
+            if position in keep:
+                yield post
+
+    def compact(self) -> int:
+        """
+        Rewrite the log without superseded lines.
+
+        Returns:
+            int: Number of posts kept.
+        """
+        self.lines = write_ndjson(self.path, self.iter_posts())
+        return self.lines
+
+    def save(self):
+        """Persist the watermarks and compact the log if it has grown stale."""
+        if self.lines > 2 * len(self.index):
+            self.compact()
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(self.watermarks, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,235 @@
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import orjson
+
+_STOP = object()
+
+
+class ScrapeLog:
+    """
+    Structured, queue-backed log for the scrape package.
+
+    Callers only put events on a queue; a background thread batches them into
+    `scrape_events.jsonl` (one JSON object per event, each with a machine
+    readable `code` such as `http_404` or `max_retries`) and keeps the file
+    open for the whole run. Missing extractor fields are not written per page:
+    the writer aggregates them into per-field counters and periodically
+    rewrites `missing_fields_summary.json`, which ranks the selectors that
+    fail most. Console echoes of events are rate limited so a burst of
+    failures can't flood the terminal.
+    """
+
+    EVENTS_FILE = "scrape_events.jsonl"
+    SUMMARY_FILE = "missing_fields_summary.json"
+
+    def __init__(
+        self,
+        directory: str = ".",
+        summary_interval: float = 30.0,
+        echo_per_second: float = 5.0,
+        examples: int = 5,
+    ):
+        """
+        Args:
+            directory (str): Where the events and summary files are written.
+            summary_interval (float): Seconds between summary rewrites.
+            echo_per_second (float): Console lines allowed per second; 0 disables echoing.
+            examples (int): Example URLs kept per missing field.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.events_path = os.path.join(directory, self.EVENTS_FILE)
+        self.summary_path = os.path.join(directory, self.SUMMARY_FILE)
+        self.summary_interval = summary_interval
+        self.echo_per_second = echo_per_second
+        self.examples = examples
+
+        self.pages = 0
+        self.pages_with_missing = 0
+        self.missing: Counter = Counter()
+        self.missing_examples: Dict[str, List[str]] = defaultdict(list)
+        self.codes: Counter = Counter()
+        self._dirty = False
+        self._echo_window = 0
+        self._echoed = 0
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="scrape-log", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Producer side: cheap, non-blocking, safe from any thread or event loop
+
+    def error(self, code: str, url: Optional[str], message: str, **fields):
+        """Record a failure for `url` under a stable error `code`."""
+        self._queue.put(("error", code, url, message, fields, time.time()))
+
+    def warning(self, code: str, url: Optional[str], message: str, **fields):
+        """Record a recoverable problem (e.g. a retry) for `url`."""
+        self._queue.put(("warning", code, url, message, fields, time.time()))
+
+    def missing_fields(self, url: str, fields: List[str]):
+        """Count one parsed page and the extractor fields missing from it."""
+        self._queue.put(("missing", url, list(fields)))
+
+    def flush(self):
+        """Block until every queued event has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Drain the queue, write the final summary and stop the writer."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    # Writer side: runs on the background thread only
+
+    def _run(self):
+        next_summary = time.monotonic() + self.summary_interval
+        with open(self.events_path, "ab") as events:
+            while True:
+                timeout = max(0.0, next_summary - time.monotonic())
+                try:
+                    batch = [self._queue.get(timeout=timeout)]
+                except queue.Empty:
+                    batch = []
+                while len(batch) < 1000:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = any(item is _STOP for item in batch)
+                # task_done must run for every item, or flush() and close() wait forever
+                try:
+                    lines = []
+                    for item in batch:
+                        if item is _STOP:
+                            continue
+                        try:
+                            if item[0] == "missing":
+                                self._count_missing(item[1], item[2])
+                            else:
+                                lines.append(self._event(*item))
+                        except Exception as e:
+                            self._writer_error(e)
+                    if lines:
+                        events.write(b"".join(lines))
+                        events.flush()
+
+                    if stop or time.monotonic() >= next_summary:
+                        next_summary = time.monotonic() + self.summary_interval
+                        self._write_summary()
+                except Exception as e:
+                    self._writer_error(e)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+
+    def _writer_error(self, error: Exception):
+        """Count and report a failure of the writer itself; the writer keeps running."""
+        with self._lock:
+            self.codes["log_writer_error"] += 1
+            self._dirty = True
+        print(f"❌ Scrape log writer failed: {error!r}", file=sys.stderr)
+
+    def _event(self, level, code, url, message, fields, ts) -> bytes:
+        with self._lock:
+            self.codes[code] += 1
+            self._dirty = True
+        self._echo(f"{'❌' if level == 'error' else '⚠️'} {message}")
+        record = {"ts": round(ts, 3), "level": level, "code": code, "url": url, "message": message, **fields}
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+
+    def _count_missing(self, url: str, fields: List[str]):
+        with self._lock:
+            self.pages += 1
+            self._dirty = True
+            if not fields:
+                return
+            self.pages_with_missing += 1
+            # "accords: Woody" -> "accords", so one broken selector is one row
+            for field in {field.split(":", 1)[0].strip() for field in fields}:
+                self.missing[field] += 1
+                if len(self.missing_examples[field]) < self.examples:
+                    self.missing_examples[field].append(url)
+
+    def _echo(self, line: str):
+        if self.echo_per_second <= 0:
+            return
+        window = int(time.monotonic())
+        if window != self._echo_window:
+            if self._suppressed:
+                print(f"… {self._suppressed} more scrape events suppressed (see {self.events_path})", file=sys.stderr)
+            self._echo_window, self._echoed, self._suppressed = window, 0, 0
+        if self._echoed < self.echo_per_second:
+            self._echoed += 1
+            print(line, file=sys.stderr)
+        else:
+            self._suppressed += 1
+
+    def summary(self) -> Dict[str, object]:
+        """Missing-field and error-code counts, most frequent first."""
+        with self._lock:
+            pages = self.pages
+            return {
+                "updated_at": round(time.time(), 3),
+                "pages": pages,
+                "pages_with_missing": self.pages_with_missing,
+                "fields": [
+                    {
+                        "field": field,
+                        "count": count,
+                        "rate": round(count / pages, 4) if pages else 0.0,
+                        "examples": list(self.missing_examples[field]),
+                    }
+                    for field, count in self.missing.most_common()
+                ],
+                "errors": dict(self.codes.most_common()),
+            }
+
+    def _write_summary(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        tmp_path = self.summary_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(self.summary(), option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, self.summary_path)
+
+
+_default_log: Optional[ScrapeLog] = None
+_default_lock = threading.Lock()
+
+
+def get_log() -> ScrapeLog:
+    """Return the process-wide ScrapeLog, writing to the current directory."""
+    global _default_log
+    with _default_lock:
+        if _default_log is None:
+            _default_log = ScrapeLog()
+            atexit.register(_default_log.close)
+        return _default_log
+
+
+def set_log(log: Optional[ScrapeLog]) -> Optional[ScrapeLog]:
+    """Install `log` as the process-wide ScrapeLog and return the previous one."""
+    global _default_log
+    with _default_lock:
+        previous, _default_log = _default_log, log
+        return previous
@@ -1,15 +1,42 @@
-import requests
-from bs4 import BeautifulSoup
-import time
+import argparse
 import json
 import random
 from models import Perfume
+from checkpoint import CheckpointStore
+from async_crawler import AsyncCrawler
+from pipeline import ParsePipeline
+from extractors import get_extractor, remove_leading_digits
+from html_cache import HtmlCache
+from scraper_utils import get_fetcher
+from scrape_log import get_log
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from functools import partial
 from dotenv import load_dotenv
 import os
-import re
+from typing import List, Tuple
 
 load_dotenv()
 
+
+def parse_perfume_html(url: str, html, backend: str = "soup") -> Tuple[Perfume, List[str]]:
+    """
+    Extract a Perfume from a fetched perfume page.
+
+    Kept at module level (no scraper state) so it can be shared by the
+    synchronous and async crawl paths and pickled into parser processes.
+
+    Args:
+        url (str): URL the page was fetched from.
+        html (str or bytes): Raw page HTML.
+        backend (str): Extractor backend, "soup" (reference) or "lxml".
+
+    Returns:
+        tuple: (Perfume, list of missing field names)
+    """
+    return get_extractor(backend).extract(url, html)
+
+
 class PerfumeDataScraper:
     # Rotating User-Agent Pool to Avoid Detection
     USER_AGENTS = [
@@ -23,8 +50,25 @@ class PerfumeDataScraper:
     ]
 
 
-    def __init__(self):
+    CHECKPOINT_PATH = "../../data/website_all_perfumes.jsonl"
+    OUTPUT_PATH = "../../data/website_all_perfumes.json"
+    CACHE_DIR = "../../data/html_cache"
+
+    def __init__(self, extractor="soup", use_cache=True, refresh=False, fetcher=None):
+        """
+        Args:
+            extractor (str): HTML extraction backend, "soup" or "lxml".
+            use_cache (bool): Keep downloaded pages in the raw HTML cache.
+            refresh (bool): Revalidate cached pages with conditional GETs
+                instead of serving them straight from the cache.
+            fetcher (HttpFetcher): HTTP layer; defaults to the shared pooled fetcher.
+        """
         self.base_url = os.getenv("BASE_URL")
+        self.fetcher = fetcher or get_fetcher()
+        self.extractor = extractor
+        self.refresh = refresh
+        self.cache = HtmlCache(self.CACHE_DIR) if use_cache else None
+        self.checkpoint = CheckpointStore(self.CHECKPOINT_PATH)
 
         # Load all perfume URLs from the file
         with open("../../data/website_perfumes_by_designer.json", "r") as f:
@@ -44,214 +88,279 @@ class PerfumeDataScraper:
         return {"User-Agent": random.choice(self.USER_AGENTS)}
 
     def load_scraped_perfumes(self):
-        """Load previously scraped perfume data to avoid duplicate scraping."""
-        try:
-            with open("../../data/website_all_perfumes.json", "r") as f:
-                return {p['url'] for p in json.load(f)}
-        except (FileNotFoundError, json.JSONDecodeError):
-            return set()  # Return an empty set if file doesn't exist or is empty
+        """
+        Load previously scraped perfume URLs to avoid duplicate scraping.
+
+        Streams the JSONL checkpoint line by line. On the first run after
+        switching to the checkpoint, the legacy JSON output is imported into it.
+        """
+        scraped = self.checkpoint.urls()
+        if not scraped and self.checkpoint.import_json(self.OUTPUT_PATH):
+            scraped = self.checkpoint.urls()
+        return scraped
 
     def remove_leading_digits(self, text: str) -> str:
         """
         Removes any leading digits (and optional whitespace) from the start of `text`.
         Example: '201Good for everyday wear' -> 'Good for everyday wear'
         """
-        return re.sub(r'^[0-9]+\s*', '', text).strip()
-
-    def save_progress(self, all_perfumes_data):
-        """Save progress after scraping each perfume, converting non-serializable objects."""
-        
-        # Convert all Perfume objects to dictionaries before saving
-        perfumes_dict = []
-        for perfume in all_perfumes_data:
-            # Handle both Perfume objects and dictionaries/strings
-            if hasattr(perfume, '__dict__'):
-                # It's a Perfume object
-                perfume_dict = {
-                    **perfume.__dict__,
-                    "notes": perfume.notes
-                }
-            elif isinstance(perfume, dict):
-                # It's already a dictionary
-                perfume_dict = perfume
-            else:
-                # Skip if it's a string or other non-compatible type
-                continue
-                
-            perfumes_dict.append(perfume_dict)
-
-        with open("../../data/website_all_perfumes.json", "w") as f:
-            json.dump(perfumes_dict, f, indent=2)
-        
-        print(f"✅ Progress saved! {len(perfumes_dict)} perfumes stored.")
-
-    def request_with_retry(self, url, max_retries=10):
-        """Handles rate limits (429 errors), retries intelligently, and logs failures."""
-        attempt = 0
-        base_wait_time = 20
-        max_wait_time = 120
-
-        while attempt < max_retries:
-            try:
-                response = requests.get(url, headers=self.get_headers(), timeout=15)
-
-                if response.status_code == 200:
-                    return response
-
-                elif response.status_code == 429:  # Rate limit handling
-                    wait_time = min(base_wait_time * (2 ** attempt), max_wait_time)
-                    print(f"⚠️ Rate limited! Waiting {wait_time} seconds before retrying...")
-                    time.sleep(wait_time)
-                    attempt += 1
-
-                else:
-                    with open("error.log", "a") as log_file:
-                        log_file.write(f"❌ Failed to fetch {url} - Status {response.status_code}\n")
-                    print(f"❌ Error {response.status_code} for {url}. Logging and skipping.")
-                    return None  # Move to next URL
-
-            except requests.exceptions.RequestException as e:
-                with open("error.log", "a") as log_file:
-                    log_file.write(f"❌ Network error: {str(e)} for {url}. Retrying...\n")
-                print(f"⚠️ Network error: {str(e)}. Retrying after 60 seconds...")
-                time.sleep(60)  # Avoid infinite failure loops
-
-        # If we reach max_retries, log and move on
-        with open("failed_urls.log", "a") as log_file:
-            log_file.write(f"❌ Max retries reached for {url}. Skipping.\n")
-        print(f"🚨 Max retries reached for {url}, skipping.")
-        return None
+        return remove_leading_digits(text)
+
+    def save_progress(self, perfume):
+        """Append a single scraped perfume to the checkpoint."""
+        if isinstance(perfume, Perfume):
+            perfume = perfume.model_dump()
+        elif not isinstance(perfume, dict):
+            return  # Skip strings or other non-compatible types
+
+        self.checkpoint.append(perfume)
+        self.scraped_perfumes.add(perfume["url"])
+
+    def compact_progress(self):
+        """Write the checkpoint out as the final website_all_perfumes.json."""
+        self.checkpoint.close()
+        count = self.checkpoint.compact(self.OUTPUT_PATH)
+        print(f"✅ Progress saved! {count} perfumes stored.")
+        return count
+
+    def request_with_retry(self, url, max_retries=None, headers=None):
+        """Fetch through the shared pooled session; rate limits and retries are handled there."""
+        return self.fetcher.get(url, headers={**self.get_headers(), **(headers or {})}, max_retries=max_retries)
 
     def scrape_perfume_data(self, url: str) -> Perfume:
         """Scrapes perfume data, handling errors and missing fields."""
         if url in self.scraped_perfumes:
-            print(f"✅ Skipping already scraped perfume: {url}")
             return None  # Skip if already scraped
 
-        response = self.request_with_retry(url)
-        if not response:
+        html = self.fetch_page(url)
+        if html is None:
             return None
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        missing_fields = []
+        return self.parse_perfume_page(url, html)
 
-        try:
-            brand = url.split("/")[-2].replace("-", " ").title()
-
-            name_tag = soup.select_one("h1[itemprop='name']")
-            name = name_tag.text.strip() if name_tag else "Unknown"
-            if not name_tag:
-                missing_fields.append("name")
-
-            brand_tag = soup.select_one("p[itemprop='brand'] a span[itemprop='name']")
-            brand = brand_tag.text.strip() if brand_tag else "Unknown"
-            if not brand_tag:
-                missing_fields.append("brand")
-
-            image_tag = soup.select_one("img[itemprop='image']")
-            photo_url = image_tag["src"] if image_tag else None
-            if not image_tag:
-                missing_fields.append("photo_url")
-
-            # Extract Accords
-            accords = []
-            for accord_tag in soup.select(".accord-box .accord-bar"):
-                try:
-                    accord_name = accord_tag.text.strip()
-                    accord_width = accord_tag["style"].split("width:")[-1].split("%")[0]
-                    accords.append({accord_name: float(accord_width)})
-                except:
-                    missing_fields.append(f"accords: {accord_name}")
-
-            # Extract Notes
-            all_notes = set()
-
-            # 1) Find all <pyramid-level> nodes that have a [notes] attribute, e.g. notes="ingredients" or notes="top"
-            pyramid_levels = soup.select('pyramid-level[notes]')
-
-            for level in pyramid_levels:
-                # 2) For each anchor (<a>) inside, get the text from next_sibling 
-                # (because the note text typically appears after the <a>).
-                for anchor in level.select('a'):
-                    note_text = anchor.next_sibling
-                    if note_text:
-                        note_text = note_text.strip()
-                        if note_text:
-                            all_notes.add(note_text)
-
-            notes_list = list(all_notes)
-
-            smells_like = [perfume.text.strip() for perfume in soup.select("similar-perfumes .carousel-cell a span.brand")]
-
-            reviews = []
-            for review_box in soup.select(".fragrance-review-box"):
-                body_el = review_box.select_one('[itemprop="reviewBody"]')
-                if body_el:
-                    reviews.append(body_el.text.strip())
-
-            pros_container = None
-            cons_container = None
-
-            for column in soup.select('.grid-x .cell.small-6'):
-                header_el = column.select_one('h4.header')
-                if header_el and 'Pros' in header_el.get_text():
-                    pros_container = column
-                elif header_el and 'Cons' in header_el.get_text():
-                    cons_container = column
-            pros = []
-            cons = []
-
-            if pros_container:
-                for pro_div in pros_container.select('.cell.small-12'):
-                    line = pro_div.get_text(strip=True)
-                    # Clean up leading digits
-                    line = self.remove_leading_digits(line)
-                    if line:
-                        pros.append(line)
-
-            if cons_container:
-                for con_div in cons_container.select('.cell.small-12'):
-                    line = con_div.get_text(strip=True)
-                    # Clean up leading digits
-                    line = self.remove_leading_digits(line)
-                    if line:
-                        cons.append(line)
-
-            # Construct Perfume object
-            perfume_data = Perfume(
-                url=url, name=name, brand=brand, photo_url=photo_url, accords=accords,
-                notes=notes_list, smells_like=smells_like,
-                missing_fields=missing_fields, reviews=reviews, pros=pros, cons=cons
-            )
-
-            # Log missing fields
-            if missing_fields:
-                with open("missing_fields.log", "a") as log_file:
-                    log_file.write(f"URL: {url} - Missing: {', '.join(missing_fields)}\n")
-
-            return perfume_data
+    def fetch_page(self, url):
+        """
+        Fetch a page body, going through the raw HTML cache when enabled.
 
+        Cached pages are returned without touching the network unless
+        `refresh` is set, in which case a conditional GET is sent and a 304
+        reuses the cached body.
+        """
+        if self.cache is None:
+            response = self.request_with_retry(url)
+            return response.content if response is not None else None
+
+        entry = self.cache.get(url)
+        cached = self.cache.read(entry) if entry else None
+        if cached is not None and not self.refresh:
+            return cached
+
+        # Validators only when the cached body can stand in for a 304; a lost body needs a plain GET
+        headers = self.cache.conditional_headers(url) if cached is not None else {}
+        response = self.request_with_retry(url, headers=headers)
+        if response is None:
+            return None
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(url, response.headers)
+            return cached
+
+        self.cache.put(url, response.content, response.headers)
+        return response.content
+
+    def parse_perfume_page(self, url: str, html) -> Perfume:
+        """Parse a fetched perfume page, logging missing fields and parse errors."""
+        try:
+            perfume_data, missing_fields = parse_perfume_html(url, html, self.extractor)
         except Exception as e:
-            with open("error.log", "a") as log_file:
-                log_file.write(f"❌ Error parsing {url}: {str(e)}\n")
-            print(f"⚠️ Error parsing {url}, logged.")
+            get_log().error("parse_error", url, f"Error parsing {url}: {str(e)}")
             return None
+
+        self.record_missing_fields(url, missing_fields)
+        return perfume_data
+
+    def record_missing_fields(self, url, missing_fields):
+        """Count the page and any fields the extractor could not find on it."""
+        get_log().missing_fields(url, missing_fields)
+
+    def save_parsed(self, parsed):
+        """Save a (Perfume, missing_fields) pair produced by a parser process."""
+        perfume_data, missing_fields = parsed
+        self.record_missing_fields(perfume_data.url, missing_fields)
+        self.save_progress(perfume_data)
+
     def scrape_all_perfumes(self):
-        """Scrapes only 2 perfumes for testing purposes and saves progress."""
-        all_perfumes_data = list(self.scraped_perfumes)  # Load existing data
+        """Scrape every perfume URL, checkpointing each one as it completes."""
         count = 0  # Track the number of perfumes scraped
 
-        for designer_data in self.perfumes_by_designer:
-            for perfume_url in designer_data["perfumes"]:
-                perfume_data = self.scrape_perfume_data(perfume_url)
-                if perfume_data:
-                    all_perfumes_data.append(perfume_data)
-                    self.save_progress(all_perfumes_data)  # Save after each perfume
-                    count += 1
+        try:
+            for designer_data in self.perfumes_by_designer:
+                for perfume_url in designer_data["perfumes"]:
+                    perfume_data = self.scrape_perfume_data(perfume_url)
+                    if perfume_data:
+                        self.save_progress(perfume_data)  # Append after each perfume
+                        count += 1
+        finally:
+            self.compact_progress()
 
-        
         print(f"✅ Finished scraping {count} perfumes!")
+        print(self.fetcher.metrics.report())
+
+    def scrape_all_perfumes_async(self, concurrency=8, rate_per_host=2.0):
+        """
+        Scrape every pending perfume URL with the async crawler.
+
+        Args:
+            concurrency (int): Maximum number of requests in flight.
+            rate_per_host (float): Requests per second allowed per host.
+        """
+        pending = [
+            perfume_url
+            for designer_data in self.perfumes_by_designer
+            for perfume_url in designer_data["perfumes"]
+            if perfume_url not in self.scraped_perfumes
+        ]
+        print(f"Crawling {len(pending)} perfumes with {concurrency} workers...")
+
+        crawler = AsyncCrawler(
+            parse=self.parse_perfume_page,
+            sink=self.save_progress,
+            concurrency=concurrency,
+            rate_per_host=rate_per_host,
+            headers=self.get_headers,
+            cache=self.cache,
+            refresh=self.refresh,
+            metrics=self.fetcher.metrics,
+        )
+        try:
+            stats = crawler.run(pending)
+        finally:
+            self.compact_progress()
+
+        print(f"✅ Finished scraping {stats.parsed} perfumes! ({stats.pages_per_second:.2f} pages/sec, {stats.failed} failed)")
+        return stats
+
+    def scrape_all_perfumes_pipeline(self, concurrency=8, rate_per_host=2.0, parse_workers=None):
+        """
+        Scrape every pending perfume URL, parsing pages in a process pool.
+
+        Args:
+            concurrency (int): Maximum number of requests in flight.
+            rate_per_host (float): Requests per second allowed per host.
+            parse_workers (int): Parser processes; defaults to the CPU count.
+
+        Returns:
+            PipelineStats: Fetch, parse and write throughput.
+        """
+        pending = [
+            perfume_url
+            for designer_data in self.perfumes_by_designer
+            for perfume_url in designer_data["perfumes"]
+            if perfume_url not in self.scraped_perfumes
+        ]
+        print(f"Crawling {len(pending)} perfumes with {concurrency} fetchers...")
+
+        pipeline = ParsePipeline(
+            parse=partial(parse_perfume_html, backend=self.extractor),
+            sink=self.save_parsed,
+            parse_workers=parse_workers,
+            concurrency=concurrency,
+            rate_per_host=rate_per_host,
+            headers=self.get_headers,
+            cache=self.cache,
+            refresh=self.refresh,
+            metrics=self.fetcher.metrics,
+        )
+        try:
+            stats = pipeline.run_sync(pending)
+        finally:
+            self.compact_progress()
+
+        print(stats.report())
+        return stats
+
+    def reextract_from_cache(self, parse_workers=None):
+        """
+        Rebuild website_all_perfumes.json from cached HTML, with no network access.
+
+        Every cached perfume page is re-parsed with the current extractor, so
+        changes to the extraction logic can be applied to the whole catalog
+        at CPU speed. The checkpoint is rebuilt alongside the output; perfumes
+        whose page is not cached (or no longer parses) keep their existing record.
+
+        Args:
+            parse_workers (int): Parser processes; defaults to the CPU count.
+
+        Returns:
+            int: Number of perfumes written.
+        """
+        if self.cache is None:
+            raise ValueError("Re-extraction needs the HTML cache to be enabled")
+
+        known_urls = {
+            perfume_url
+            for designer_data in self.perfumes_by_designer
+            for perfume_url in designer_data["perfumes"]
+        }
+        pages = ((url, body) for url, body in self.cache.iter_pages() if url in known_urls)
+        parse = partial(parse_perfume_html, backend=self.extractor)
+
+        self.checkpoint.close()
+        rebuild_path = self.CHECKPOINT_PATH + ".rebuild"
+        if os.path.exists(rebuild_path):
+            os.remove(rebuild_path)
+        self.checkpoint = CheckpointStore(rebuild_path, fsync_every=1000)
+        self.scraped_perfumes = set()
+
+        def save(url, future):
+            try:
+                self.save_parsed(future.result())
+            except Exception as e:
+                get_log().error("parse_error", url, f"Error parsing {url}: {str(e)}")
+
+        # Keep a bounded window of pages in flight so memory stays flat
+        parse_workers = parse_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+            window = 4 * parse_workers
+            in_flight = deque()
+            for url, body in pages:
+                in_flight.append((url, executor.submit(parse, url, body)))
+                if len(in_flight) >= window:
+                    save(*in_flight.popleft())
+            while in_flight:
+                save(*in_flight.popleft())
+
+        reextracted = set(self.scraped_perfumes)
+        for record in CheckpointStore(self.CHECKPOINT_PATH).iter_records():
+            if record.get("url") in known_urls and record["url"] not in reextracted:
+                self.save_progress(record)
+
+        self.checkpoint.close()
+        os.replace(rebuild_path, self.CHECKPOINT_PATH)
+        self.checkpoint = CheckpointStore(self.CHECKPOINT_PATH)
+        return self.compact_progress()
+
 
 if __name__ == "__main__":
-    scraper = PerfumeDataScraper()
-    scraper.scrape_all_perfumes()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape perfume detail pages.")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Use the concurrent aiohttp crawler")
+    parser.add_argument("--pipeline", action="store_true", help="Async crawl with parsing in a process pool")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Parser processes (pipeline mode)")
+    parser.add_argument("--extractor", choices=["soup", "lxml"], default="soup", help="HTML extraction backend")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the raw HTML cache")
+    parser.add_argument("--refresh", action="store_true", help="Revalidate cached pages with conditional GETs")
+    parser.add_argument("--reextract", action="store_true", help="Rebuild the output from cached HTML only")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight (async mode)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Requests per second per host (async mode)")
+    args = parser.parse_args()
+
+    scraper = PerfumeDataScraper(extractor=args.extractor, use_cache=not args.no_cache, refresh=args.refresh)
+    if args.reextract:
+        scraper.reextract_from_cache(parse_workers=args.parse_workers)
+    elif args.pipeline:
+        scraper.scrape_all_perfumes_pipeline(concurrency=args.concurrency, rate_per_host=args.rate,
+                                             parse_workers=args.parse_workers)
+    elif args.use_async:
+        scraper.scrape_all_perfumes_async(concurrency=args.concurrency, rate_per_host=args.rate)
+    else:
+        scraper.scrape_all_perfumes()
@@ -1,67 +1,253 @@
 import praw
 import os
+import argparse
 from dotenv import load_dotenv
 from variables import SUBREDDITS, SEARCH_TERMS, GUIDE_POSTS
 from models import RedditPost, RedditComment
-import time
-import json
-from typing import List
+from reddit_store import RedditStore
+import itertools
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from scraper_utils import RateBudget
+from scrape_log import get_log
+from typing import List, Optional
 load_dotenv()
 
+# Recent posts keep collecting comments, so incremental runs re-check this far behind the watermark
+DEFAULT_LOOKBACK = 3 * 24 * 60 * 60
+
+# Reddit allows 100 OAuth requests per minute per client id, shared by every worker
+REDDIT_QUOTA_PER_MINUTE = 100
+REDDIT_QUOTA_BURST = 10
+LISTING_PAGE_SIZE = 100  # Search results returned per listing request
+REPLACE_MORE_LIMIT = 5
+
 class RedditScraper:
     """
     A class for scraping Reddit posts and comments related to perfumes.
     Uses the PRAW library to interact with Reddit's API.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        reddit=None,
+        store: Optional[RedditStore] = None,
+        workers: int = 4,
+        budget: Optional[RateBudget] = None,
+    ):
         """
         Initialize the Reddit scraper with API credentials from environment variables.
+
+        Args:
+            reddit: Optional Reddit client shared by all workers. When omitted,
+                each worker thread gets its own praw.Reddit, since PRAW clients
+                are not thread-safe.
+            store (RedditStore): Optional post store; defaults to the discussions file.
+            workers (int): Threads running searches and comment expansion.
+            budget (RateBudget): Shared request budget; defaults to Reddit's OAuth quota.
         """
-        self.reddit = praw.Reddit(
-            client_id=os.getenv("REDDIT_CLIENT_ID"),
-            client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
-            user_agent=os.getenv("REDDIT_USER_AGENT")
-        )
+        self._shared_reddit = reddit
+        self._local = threading.local()
+        self.store = store if store is not None else RedditStore()
+        self.workers = workers
+        self.budget = budget or RateBudget(REDDIT_QUOTA_PER_MINUTE / 60, capacity=REDDIT_QUOTA_BURST)
         self.subreddits = SUBREDDITS
         self.search_terms = SEARCH_TERMS
         print(f"Successfully connected to Reddit API")
 
 
+    @property
+    def reddit(self):
+        """Reddit client for the calling thread."""
+        if self._shared_reddit is not None:
+            return self._shared_reddit
+        client = getattr(self._local, "reddit", None)
+        if client is None:
+            client = self._local.reddit = praw.Reddit(
+                client_id=os.getenv("REDDIT_CLIENT_ID"),
+                client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
+                user_agent=os.getenv("REDDIT_USER_AGENT")
+            )
+        return client
+
+
+    def observe_limits(self):
+        """Pause the shared budget when Reddit reports the quota is used up."""
+        limits = getattr(getattr(self.reddit, "auth", None), "limits", None) or {}
+        self.budget.observe(limits.get("remaining"), limits.get("reset_timestamp"))
+
+
+    def build_post(self, submission, subreddit: str) -> dict:
+        """
+        Scrape a submission's comments and build the stored post record.
+
+        Args:
+            submission: A PRAW submission object
+            subreddit (str): Name of the subreddit the post belongs to
+
+        Returns:
+            dict: The RedditPost as a plain dict
+        """
+        comments = self.scrape_comments(submission)
+        return RedditPost(
+            title=submission.title,
+            url=submission.url,
+            selftext=submission.selftext,
+            score=submission.score,
+            num_comments=submission.num_comments,
+            subreddit=subreddit,
+            created_utc=submission.created_utc,
+            id=submission.id,
+            comments=comments
+        ).model_dump()
+
+
+    def search_candidates(self, subreddit_name: str, term: str, incremental: bool = True, lookback: float = DEFAULT_LOOKBACK):
+        """
+        Run one search in one subreddit and pick the posts that need (re)scraping.
+
+        Results are read newest-first. In incremental mode the search stops once
+        it is `lookback` seconds behind the stored watermark, and posts already
+        stored with an unchanged comment count are skipped. Every listing page
+        is charged against the shared API budget.
+
+        Args:
+            subreddit_name (str): Subreddit to search
+            term (str): Search term
+            incremental (bool): Honour the watermark and skip unchanged posts
+            lookback (float): Seconds behind the watermark to re-check for new comments
+
+        Returns:
+            Tuple of (subreddit display name, submission ids to scrape, skipped count, newest created_utc)
+        """
+        watermark = self.store.get_watermark(subreddit_name, term) if incremental else None
+        cutoff = watermark - lookback if watermark is not None else None
+
+        subreddit = self.reddit.subreddit(subreddit_name)
+        candidates = []
+        skipped = 0
+        newest = None
+        results = subreddit.search(query=term, sort="new", limit=None)
+        for seen in itertools.count():
+            # The listing fetches a new page before its first item and every LISTING_PAGE_SIZE items after
+            if seen % LISTING_PAGE_SIZE == 0:
+                self.budget.acquire()
+            submission = next(results, None)
+            if submission is None:
+                break
+            if cutoff is not None and submission.created_utc < cutoff:
+                break
+            newest = max(newest or submission.created_utc, submission.created_utc)
+
+            if incremental and not self.store.needs_update(submission.id, submission.num_comments):
+                skipped += 1
+                continue
+            candidates.append(submission.id)
+
+        self.observe_limits()
+        return str(subreddit), candidates, skipped, newest
+
 
-    def fetch_reddit_posts(self):
+    def scrape_submission(self, submission_id: str, subreddit: str) -> dict:
+        """
+        Fetch one submission with its comments on the calling worker's client.
+
+        Args:
+            submission_id (str): Reddit id of the submission
+            subreddit (str): Name of the subreddit the post belongs to
+
+        Returns:
+            dict: The RedditPost as a plain dict
+        """
+        self.budget.acquire()
+        return self.build_post(self.reddit.submission(id=submission_id), subreddit)
+
+
+    def fetch_reddit_posts(self, incremental: bool = True, lookback: float = DEFAULT_LOOKBACK):
         """
         Scrape posts from predefined subreddits based on search terms.
-        Saves results to a JSON file.
-        
+        Merges new and changed posts into the store and saves it.
+
+        Every (subreddit, search term) search and every comment expansion is a
+        job on one worker pool, all drawing from the shared API budget. The
+        store is only touched from this thread and is saved as each subreddit
+        finishes. A search's watermark only advances once every post it
+        matched was stored, including posts expanded on behalf of another term.
+
+        Args:
+            incremental (bool): Only fetch content newer than the stored watermarks;
+                pass False to re-pull every search in full.
+            lookback (float): Seconds behind each watermark to re-check for new comments
+
         Returns:
-            List of scraped posts
+            Iterator streaming all stored posts
         """
-        posts = []
-        for subreddit in self.subreddits:
-            print(f"Scraping {subreddit}...") 
-            subreddit = self.reddit.subreddit(subreddit)
-            for submission in subreddit.search(query=self.search_terms, limit=None):
-
-                comments = self.scrape_comments(submission)
-                post_data = RedditPost(
-                    title=submission.title,
-                    url=submission.url, 
-                    selftext=submission.selftext,
-                    score=submission.score,
-                    num_comments=submission.num_comments,
-                    subreddit=str(subreddit),
-                    created_utc=submission.created_utc,
-                    id=submission.id,
-                    comments=comments
-                )
-                posts.append(post_data.model_dump())
-            time.sleep(10)
-            
+        added = updated = skipped = 0
+        covers = {}  # submission id -> every (subreddit, term) search whose candidates included it
+        lost = set()  # Submissions whose expansion failed
+        newest = {}
+        failed = set()
+        pending = {subreddit: 0 for subreddit in self.subreddits}
+
+        def finish(subreddit):
+            # Save as soon as a subreddit is done, so an interrupted run keeps its progress
+            pending[subreddit] -= 1
+            if pending[subreddit]:
+                return
+            for term in self.search_terms:
+                key = (subreddit, term)
+                if key in newest and key not in failed:
+                    self.store.advance_watermark(subreddit, term, newest[key])
+            self.store.save()
 
-        with open("../../data/reddit_perfume_discussions.json", "w") as f:
-            json.dump(posts, f, indent=2)
-    
-        print(f"✅ Scraped {len(posts)} posts from Reddit.")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            jobs = {}
+            for subreddit in self.subreddits:
+                print(f"Scraping {subreddit}...")
+                for term in self.search_terms:
+                    job = pool.submit(self.search_candidates, subreddit, term, incremental, lookback)
+                    jobs[job] = ("search", subreddit, term, None)
+                    pending[subreddit] += 1
+
+            while jobs:
+                done, _ = wait(jobs, return_when=FIRST_COMPLETED)
+                for job in done:
+                    kind, subreddit, term, submission_id = jobs.pop(job)
+                    try:
+                        result = job.result()
+                    except Exception as e:
+                        # A lost post holds back every search it was a candidate of
+                        failed.update(covers.get(submission_id, {(subreddit, term)}))
+                        lost.add(submission_id)
+                        get_log().error(
+                            f"reddit_{kind}_error", None,
+                            f"Reddit {kind} failed in r/{subreddit} for {term!r}: {str(e)}",
+                            subreddit=subreddit, term=term,
+                        )
+                        finish(subreddit)
+                        continue
+
+                    if kind == "search":
+                        display_name, candidates, unchanged, newest[(subreddit, term)] = result
+                        skipped += unchanged
+                        for candidate in candidates:
+                            # The same post often matches several terms; expand it once
+                            if candidate in lost:
+                                failed.add((subreddit, term))
+                            if candidate in covers:
+                                covers[candidate].add((subreddit, term))
+                                continue
+                            covers[candidate] = {(subreddit, term)}
+                            job = pool.submit(self.scrape_submission, candidate, display_name)
+                            jobs[job] = ("post", subreddit, term, candidate)
+                            pending[subreddit] += 1
+                    elif self.store.upsert(result):
+                        added += 1
+                    else:
+                        updated += 1
+                    finish(subreddit)
+
+        print(f"✅ Reddit refresh: {added} new, {updated} updated, {skipped} unchanged ({len(self.store)} stored).")
+        return self.store.iter_posts()
 
 
     def scrape_comments(self, submission) -> List[RedditComment]:
@@ -75,10 +261,12 @@ class RedditScraper:
             List of RedditComment objects
         """
         comments = []
-        print(f"Scraping comments for {submission.title}...")
-        submission.comments.replace_more(limit=5)
+        # Each replace_more call is one API request, so charge them individually
+        for _ in range(REPLACE_MORE_LIMIT):
+            self.budget.acquire()
+            if not submission.comments.replace_more(limit=1):
+                break
         for comment in submission.comments.list():
-            print(f"Comment: {comment.body}")
             # Get author name as string, handling deleted accounts
             author_name = "DELETED"
             if comment.author:
@@ -97,21 +285,17 @@ class RedditScraper:
     def fetch_specific_posts(self, post_urls: List[str]):
         """
         Fetch specific Reddit posts or wiki pages by URL.
-        Adds them to existing scraped posts.
+        Merges them into the existing scraped posts.
         
         Args:
             post_urls: List of Reddit post or wiki URLs to scrape
             
         Returns:
-            Updated list of all posts
+            Iterator streaming all stored posts, including the new ones
         """
-        posts = []
-        # Load existing posts
-        with open("../../data/reddit_perfume_discussions.json", "r") as f:
-            posts = json.load(f)
-            
         for url in post_urls:
             try:
+                self.budget.acquire()
                 if "/wiki/" in url:
                     # Handle wiki pages
                     parts = url.split("/wiki/")
@@ -120,7 +304,7 @@ class RedditScraper:
                     subreddit = self.reddit.subreddit(subreddit_name)
                     wiki_content = subreddit.wiki[wiki_page].content_md
                     
-                    posts.append(RedditPost(
+                    self.store.upsert(RedditPost(
                         title=f"Wiki: {wiki_page}",
                         url=url,
                         selftext=wiki_content,
@@ -134,31 +318,27 @@ class RedditScraper:
                 else:
                     # Handle regular submissions
                     submission = self.reddit.submission(url=url)
-                    comments = self.scrape_comments(submission)
-                    posts.append(RedditPost(
-                        title=submission.title,
-                        url=submission.url, 
-                        selftext=submission.selftext,
-                        score=submission.score,
-                        num_comments=submission.num_comments,
-                        subreddit=str(submission.subreddit),
-                        created_utc=submission.created_utc,
-                        id=submission.id,
-                        comments=comments
-                    ).model_dump())
+                    self.store.upsert(self.build_post(submission, str(submission.subreddit)))
             except Exception as e:
-                print(f"Error processing URL {url}: {str(e)}")
+                get_log().error("guide_post_error", url, f"Error processing URL {url}: {str(e)}")
                 continue
             
-        # Write back all posts including new ones
-        with open("../../data/reddit_perfume_discussions.json", "w") as f:
-            json.dump(posts, f, indent=2)
+        self.store.save()
             
         print(f"✅ Added {len(post_urls)} guide posts to discussions.")
-        return posts
+        return self.store.iter_posts()
 
 
 if __name__ == "__main__":
-    scraper = RedditScraper()
-    posts = scraper.fetch_reddit_posts()
+    parser = argparse.ArgumentParser(description="Scrape perfume discussions from Reddit.")
+    parser.add_argument("--full", action="store_true", help="Ignore watermarks and re-pull every search")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel search / comment workers")
+    parser.add_argument("--quota", type=float, default=REDDIT_QUOTA_PER_MINUTE,
+                        help="API requests per minute shared by all workers")
+    parser.add_argument("--lookback-hours", type=float, default=DEFAULT_LOOKBACK / 3600,
+                        help="Hours behind the watermark to re-check for new comments")
+    args = parser.parse_args()
+
+    scraper = RedditScraper(workers=args.workers, budget=RateBudget(args.quota / 60, capacity=REDDIT_QUOTA_BURST))
+    posts = scraper.fetch_reddit_posts(incremental=not args.full, lookback=args.lookback_hours * 3600)
     specific_posts = scraper.fetch_specific_posts(GUIDE_POSTS)
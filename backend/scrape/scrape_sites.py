@@ -1,14 +1,141 @@
-import requests
 from bs4 import BeautifulSoup
 import time
 import json
 import random
 from models import Perfume, PerfumeNotes
+from async_crawler import AsyncCrawler
+from checkpoint import CheckpointStore
+from frontier import DONE, CrawlFrontier, absolute_url, normalize_url
+from pipeline import ParsePipeline
+from html_cache import HtmlCache
+from scraper_utils import get_fetcher
+from scrape_log import get_log
 from dotenv import load_dotenv
 import os
+from typing import List, Tuple
 
 load_dotenv()
 
+
+def parse_fragrance_html(url: str, html: str) -> Tuple[Perfume, List[str]]:
+    """
+    Extract a Perfume from a fetched perfume page.
+
+    Kept at module level (no scraper state) so it can be shared by the
+    synchronous and async crawl paths and pickled into parser processes.
+
+    Args:
+        url (str): URL the page was fetched from.
+        html (str or bytes): Raw page HTML.
+
+    Returns:
+        tuple: (Perfume, list of missing field names)
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    # Track missing fields
+    missing_fields = []
+
+    brand = url.split("/")[-2].replace("-", " ").title()
+    
+    # Extract Perfume Name
+    name_tag = soup.select_one("h1[itemprop='name']")
+    name = name_tag.text.strip() if name_tag else "Unknown"
+    if not name_tag:
+        missing_fields.append("name")
+
+    # Extract Brand Name
+    brand_tag = soup.select_one("p[itemprop='brand'] a span[itemprop='name']")
+    brand = brand_tag.text.strip() if brand_tag else "Unknown"
+    if not brand_tag:
+        missing_fields.append("brand")
+
+    # Extract Perfume Image
+    image_tag = soup.select_one("img[itemprop='image']")
+    photo_url = image_tag["src"] if image_tag else None
+    if not image_tag:
+        missing_fields.append("photo_url")
+
+    # Extract Accords
+    accords = []
+    for accord_tag in soup.select(".accord-box .accord-bar"):
+        accord_name = accord_tag.text.strip()
+        accord_width = accord_tag["style"].split("width:")[-1].split("%")[0]  # Extract percentage
+        try:
+            accords.append({accord_name: float(accord_width)})
+        except:
+            missing_fields.append(f"accords: {accord_name}")
+
+    if not accords:
+        missing_fields.append("accords")
+
+    # Extract Notes (Top, Middle, Base)
+    notes = {"top": [], "middle": [], "base": []}
+    
+    pyramid_sections = {
+        "top": "pyramid_top",
+        "middle": "pyramid_middle",
+        "base": "pyramid_base"
+    }
+    
+    for note_type, class_name in pyramid_sections.items():
+        notes_list = soup.select(f"div#{class_name} a")
+        if notes_list:
+            notes[note_type] = [note.text.strip() for note in notes_list]
+        else:
+            missing_fields.append(f"notes_{note_type}")
+
+    perfume_notes = PerfumeNotes(**notes)
+
+    # Extract Gender Description
+    gender_tag = soup.select_one("h1[itemprop='name'] small")
+    gender = gender_tag.text.strip() if gender_tag else "Unknown"
+    if not gender_tag:
+        missing_fields.append("gender")
+
+    # Extract Longevity and Sillage Ratings
+    longevity_tag = soup.select_one("longevity-rating p span")
+    longevity = longevity_tag.text.strip() if longevity_tag else None
+    if not longevity_tag:
+        missing_fields.append("longevity")
+
+    sillage_tag = soup.select_one("sillage-rating p span")
+    sillage = sillage_tag.text.strip() if sillage_tag else None
+    if not sillage_tag:
+        missing_fields.append("sillage")
+
+    # Extract Price Value Rating
+    price_value_tag = soup.select_one("price-value-widget p span")
+    price_value = price_value_tag.text.strip() if price_value_tag else None
+    if not price_value_tag:
+        missing_fields.append("price_value")
+
+    # Extract "This perfume reminds me of" section
+    smells_like = []
+    for similar_perfume in soup.select("similar-perfumes .carousel-cell a span.brand"):
+        smells_like.append(similar_perfume.text.strip())
+
+    if not smells_like:
+        missing_fields.append("smells_like")
+
+    # Construct the Perfume object
+    perfume_data = Perfume(
+        url=url,
+        name=name,
+        brand=brand,
+        photo_url=photo_url,
+        accords=accords,
+        notes=perfume_notes.top + perfume_notes.middle + perfume_notes.base,
+        smells_like=smells_like,
+        gender=gender,
+        longevity=longevity,
+        sillage=sillage,
+        price_value=price_value,
+        missing_fields=missing_fields
+    )
+
+    return perfume_data, missing_fields
+
+
 class FragranceScraper:
     """
     A class for scraping fragrance data from a perfume website.
@@ -23,11 +150,24 @@ class FragranceScraper:
         "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
     ]
 
-    def __init__(self):
-        """Initialize the scraper with empty data and starting position."""
-        self.all_brands_data = []
-        self.current_designer_index = 0
-        self.current_designer_url = None
+    CACHE_DIR = "../../data/html_cache"
+    FRONTIER_PATH = "../../data/crawl_frontier.sqlite3"
+    CHECKPOINT_PATH = "../../data/website_all_perfumes.jsonl"
+    LEGACY_PROGRESS_PATH = "../../data/scraping_progress.json"
+
+    def __init__(self, use_cache=True, refresh=False, fetcher=None):
+        """
+        Initialize the scraper.
+
+        Args:
+            use_cache (bool): Keep downloaded perfume pages in the raw HTML cache.
+            refresh (bool): Revalidate cached pages with conditional GETs
+                instead of serving them straight from the cache.
+            fetcher (HttpFetcher): HTTP layer; defaults to the shared pooled fetcher.
+        """
+        self.fetcher = fetcher or get_fetcher()
+        self.refresh = refresh
+        self.cache = HtmlCache(self.CACHE_DIR) if use_cache else None
 
     def get_headers(self):
         """
@@ -37,67 +177,36 @@ class FragranceScraper:
         """
         return {"User-Agent": random.choice(self.USER_AGENTS)}
 
-    def request_with_retry(self, url, retries=3):
+    def request_with_retry(self, url, retries=None, headers=None):
         """
-        Make HTTP requests with retry logic and exponential backoff.
+        Make HTTP requests through the shared pooled session.
+        Rate limits, backoff and retries are handled by the fetcher.
         
         Args:
             url (str): The URL to request.
-            retries (int): Number of retry attempts.
+            retries (int): Number of retry attempts; defaults to the fetcher's.
+            headers (dict): Extra request headers, e.g. conditional GET validators.
             
         Returns:
             Response object or None if all retries fail.
         """
-        for attempt in range(retries):
-            response = requests.get(url, headers=self.get_headers())
-
-            if response.status_code == 200:
-                return response
-            elif response.status_code == 429:
-                wait_time = random.randint(20, 30)
-                print(f"Rate limited! Waiting {wait_time} seconds before retrying...")
-                time.sleep(wait_time)
-                if attempt == retries - 1:  # If this was the last attempt
-                    return None
-            else:
-                print(f"Failed to fetch {url} (Status: {response.status_code})")
-                return None
-        return None
-
-    def save_progress(self):
-        """
-        Save current scraping progress to a JSON file.
-        Allows resuming the scraping process later.
-        """
-        progress_data = {
-            "all_brands_data": self.all_brands_data,
-            "current_designer_index": self.current_designer_index,
-            "current_designer_url": self.current_designer_url
-        }
-        with open("../../data/scraping_progress.json", "w") as f:
-            json.dump(progress_data, f, indent=2)
-        print(f"\nProgress saved! You can resume from designer index {self.current_designer_index}")
-        print(f"Current designer URL: {self.current_designer_url}")
-        print("To resume, run the script again and it will continue from where it left off.")
-
-    def load_progress(self):
-        """
-        Load previously saved scraping progress.
-        
-        Returns:
-            bool: True if progress was loaded, False otherwise.
+        return self.fetcher.get(url, headers={**self.get_headers(), **(headers or {})}, max_retries=retries)
+
+    def open_frontier(self):
         """
-        try:
-            with open("../../data/scraping_progress.json", "r") as f:
+        Open the persistent crawl frontier.
+
+        On first use, designers and perfume links recorded by the old
+        scraping_progress.json are imported so a run in progress is not lost.
+        """
+        frontier = CrawlFrontier(self.FRONTIER_PATH)
+        if not len(frontier) and os.path.exists(self.LEGACY_PROGRESS_PATH):
+            with open(self.LEGACY_PROGRESS_PATH, "r") as f:
                 progress_data = json.load(f)
-                self.all_brands_data = progress_data["all_brands_data"]
-                self.current_designer_index = progress_data["current_designer_index"]
-                self.current_designer_url = progress_data["current_designer_url"]
-                print(f"Resuming from designer index {self.current_designer_index}")
-                print(f"Current designer URL: {self.current_designer_url}")
-                return True
-        except FileNotFoundError:
-            return False
+            for brand_data in progress_data.get("all_brands_data", []):
+                frontier.add(brand_data["perfumes"], "perfume", parent=brand_data["brand"])
+            print(f"Imported {len(frontier)} perfume links from {self.LEGACY_PROGRESS_PATH}")
+        return frontier
 
     def get_all_designer_links(self):
         """
@@ -110,17 +219,28 @@ class FragranceScraper:
         if not response:
             return []
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        designer_links = []
-
-        for link in soup.select('a[href^="/designers/"]'):
-            full_url = self.BASE_URL + link['href']
-            if full_url not in designer_links and link['href'] != "":
-                designer_links.append(full_url)
-
+        designer_links = self.parse_designer_links(response.text)
         print(f"Found {len(designer_links)} designer links")
         return designer_links
 
+    def parse_designer_links(self, html):
+        """
+        Extract designer page URLs from the designers index page.
+
+        Args:
+            html (str): Body of the designers index page.
+
+        Returns:
+            list: Absolute designer URLs in page order, de-duplicated by normalized URL.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        links = {}
+        for link in soup.select('a[href^="/designers/"]'):
+            if link['href']:
+                url = absolute_url(link['href'], self.BASE_URL)
+                links.setdefault(normalize_url(url), url)
+        return list(links.values())
+
     def generate_designer_links(self):
         """
         Generate and save a list of all designer/brand URLs.
@@ -146,22 +266,32 @@ class FragranceScraper:
         if not response:
             return None, []
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        perfume_links = []
-
         designer_name = url.split("/")[-1].replace(".html", "")
-
-        # Find all perfume links for this designer
-        for link in soup.select(f'a[href*="/{designer_name}/"]'):
-            full_url = self.BASE_URL + link['href'] if link['href'].startswith('/') else link['href']
-
-            if full_url not in perfume_links:
-                perfume_links.append(full_url)
+        perfume_links = self.parse_perfume_links(response.text, designer_name, url)
 
         print(f"Found {len(perfume_links)} perfume links for {designer_name}")
         time.sleep(random.randint(2, 7))  # Randomized delay (2-7 seconds)
         return designer_name, perfume_links
 
+    def parse_perfume_links(self, html, designer_name, base):
+        """
+        Extract a designer's perfume page URLs from their designer page.
+
+        Args:
+            html (str): Body of the designer page.
+            designer_name (str): Designer slug as it appears in perfume URLs.
+            base (str): URL of the designer page, for resolving relative links.
+
+        Returns:
+            list: Absolute perfume URLs in page order, de-duplicated by normalized URL.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        links = {}
+        for link in soup.select(f'a[href*="/{designer_name}/"]'):
+            url = absolute_url(link['href'], base)
+            links.setdefault(normalize_url(url), url)
+        return list(links.values())
+
     def scrape_perfume_data(self, url: str) -> Perfume:
         """
         Scrapes detailed information about a specific perfume from its URL.
@@ -172,158 +302,168 @@ class FragranceScraper:
         Returns:
             Perfume: A Perfume model instance with the scraped data.
         """
-        response = self.request_with_retry(url)
-        if not response:
+        html = self.fetch_page(url)
+        if html is None:
             return None
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # Track missing fields
-        missing_fields = []
+        return self.parse_perfume_page(url, html)
 
-        brand = url.split("/")[-2].replace("-", " ").title()
+    def fetch_page(self, url):
+        """
+        Fetch a perfume page body, going through the raw HTML cache when enabled.
         
-        # Extract Perfume Name
-        name_tag = soup.select_one("h1[itemprop='name']")
-        name = name_tag.text.strip() if name_tag else "Unknown"
-        if not name_tag:
-            missing_fields.append("name")
-
-        # Extract Brand Name
-        brand_tag = soup.select_one("p[itemprop='brand'] a span[itemprop='name']")
-        brand = brand_tag.text.strip() if brand_tag else "Unknown"
-        if not brand_tag:
-            missing_fields.append("brand")
-
-        # Extract Perfume Image
-        image_tag = soup.select_one("img[itemprop='image']")
-        photo_url = image_tag["src"] if image_tag else None
-        if not image_tag:
-            missing_fields.append("photo_url")
-
-        # Extract Accords
-        accords = []
-        for accord_tag in soup.select(".accord-box .accord-bar"):
-            accord_name = accord_tag.text.strip()
-            accord_width = accord_tag["style"].split("width:")[-1].split("%")[0]  # Extract percentage
-            try:
-                accords.append({accord_name: float(accord_width)})
-            except:
-                missing_fields.append(f"accords: {accord_name}")
+        Args:
+            url (str): URL of the perfume page.
+            
+        Returns:
+            bytes: Page body, or None if the request failed.
+        """
+        if self.cache is None:
+            response = self.request_with_retry(url)
+            return response.content if response is not None else None
+
+        entry = self.cache.get(url)
+        cached = self.cache.read(entry) if entry else None
+        if cached is not None and not self.refresh:
+            return cached
+
+        # Validators only when the cached body can stand in for a 304; a lost body needs a plain GET
+        headers = self.cache.conditional_headers(url) if cached is not None else {}
+        response = self.request_with_retry(url, headers=headers)
+        if response is None:
+            return None
 
-        if not accords:
-            missing_fields.append("accords")
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(url, response.headers)
+            return cached
 
-        # Extract Notes (Top, Middle, Base)
-        notes = {"top": [], "middle": [], "base": []}
-        
-        pyramid_sections = {
-            "top": "pyramid_top",
-            "middle": "pyramid_middle",
-            "base": "pyramid_base"
-        }
-        
-        for note_type, class_name in pyramid_sections.items():
-            notes_list = soup.select(f"div#{class_name} a")
-            if notes_list:
-                notes[note_type] = [note.text.strip() for note in notes_list]
-            else:
-                missing_fields.append(f"notes_{note_type}")
-
-        perfume_notes = PerfumeNotes(**notes)
-
-        # Extract Gender Description
-        gender_tag = soup.select_one("h1[itemprop='name'] small")
-        gender = gender_tag.text.strip() if gender_tag else "Unknown"
-        if not gender_tag:
-            missing_fields.append("gender")
-
-        # Extract Longevity and Sillage Ratings
-        longevity_tag = soup.select_one("longevity-rating p span")
-        longevity = longevity_tag.text.strip() if longevity_tag else None
-        if not longevity_tag:
-            missing_fields.append("longevity")
-
-        sillage_tag = soup.select_one("sillage-rating p span")
-        sillage = sillage_tag.text.strip() if sillage_tag else None
-        if not sillage_tag:
-            missing_fields.append("sillage")
-
-        # Extract Price Value Rating
-        price_value_tag = soup.select_one("price-value-widget p span")
-        price_value = price_value_tag.text.strip() if price_value_tag else None
-        if not price_value_tag:
-            missing_fields.append("price_value")
-
-        # Extract "This perfume reminds me of" section
-        smells_like = []
-        for similar_perfume in soup.select("similar-perfumes .carousel-cell a span.brand"):
-            smells_like.append(similar_perfume.text.strip())
-
-        if not smells_like:
-            missing_fields.append("smells_like")
-
-        # Construct the Perfume object
-        perfume_data = Perfume(
-            url=url,
-            name=name,
-            brand=brand,
-            photo_url=photo_url,
-            accords=accords,
-            notes=perfume_notes,
-            smells_like=smells_like,
-            gender=gender,
-            longevity=longevity,
-            sillage=sillage,
-            price_value=price_value,
-            missing_fields=missing_fields
-        )
+        self.cache.put(url, response.content, response.headers)
+        return response.content
+
+    def parse_perfume_page(self, url: str, html) -> Perfume:
+        """
+        Parse a fetched perfume page and log any missing fields.
 
-        # Log missing fields
-        if missing_fields:
-            with open("missing_fields.log", "a") as log_file:
-                log_file.write(f"URL: {url} - Missing: {', '.join(missing_fields)}\n")
+        Args:
+            url (str): URL the page was fetched from.
+            html (str or bytes): Raw page HTML.
 
+        Returns:
+            Perfume: A Perfume model instance with the scraped data.
+        """
+        perfume_data, missing_fields = parse_fragrance_html(url, html)
+        self.record_missing_fields(url, missing_fields)
         return perfume_data
 
+    def record_missing_fields(self, url, missing_fields):
+        """
+        Count the page and any fields the extractor could not find on it.
+        
+        Args:
+            url (str): URL of the perfume page.
+            missing_fields (list): Names of the missing fields.
+        """
+        get_log().missing_fields(url, missing_fields)
+
     def scrape_all_designers(self):
         """
-        Main method to scrape all designers and their perfumes.
-        Loads previous progress if available and saves progress regularly.
-        """
-        # Try to load previous progress
-        if not self.load_progress():
-            print("No previous progress found. Starting fresh.")
-
-        # Step 2: Scrape Perfume Links for Each Designer
-        with open("../../data/website_designer_links.txt", "r") as f:
-            designer_links = f.readlines()
-            for i in range(self.current_designer_index, len(designer_links)):
-                link = designer_links[i].strip()
-                self.current_designer_url = link
-                self.current_designer_index = i
-                
-                try:
-                    brand_name, perfume_links = self.scrape_perfume_details(link)
-                    if perfume_links:
-                        self.all_brands_data.append({"brand": brand_name, "perfumes": perfume_links})
-                    
-                    # Save progress after each successful designer
-                    self.save_progress()
-                    
-                    print(f"Processed {i + 1}/{len(designer_links)} designers")
-                    time.sleep(random.randint(1,5))  # Longer delay between requests
-                    
-                except Exception as e:
-                    print(f"Error processing designer {link}: {str(e)}")
-                    self.save_progress()
-                    print("Progress saved. You can resume later.")
-                    break
-
-        # Step 3: Write Final Data to JSON
+        Collect the perfume links of every designer in website_designer_links.txt.
+
+        Designers are queued in the crawl frontier, so an interrupted run
+        resumes with the designers it had not finished, and a designer that
+        fails is retried later instead of ending the run.
+        """
+        with self.open_frontier() as frontier:
+            with open("../../data/website_designer_links.txt", "r") as f:
+                frontier.add((line for line in f if line.strip()), "designer")
+
+            while claimed := frontier.claim("designer"):
+                link = claimed[0][0]
+                self.crawl_designer(frontier, link)
+                counts = frontier.counts("designer")
+                print(f"Processed {counts[DONE]}/{sum(counts.values())} designers")
+                time.sleep(random.randint(1,5))  # Longer delay between requests
+
+            self.save_designer_perfumes(frontier)
+
+    def crawl(self):
+        """
+        Discover and scrape the whole site as one restartable pipeline.
+
+        Starts from the designers index page and works through the frontier
+        in discovery order: the index queues designers, each designer queues
+        its perfumes, and each perfume page is scraped and appended to the
+        JSONL checkpoint. Stopping and rerunning continues where the last
+        run left off. At the end website_perfumes_by_designer.json and
+        website_all_perfumes.json are written.
+
+        Returns:
+            dict: Number of URLs in each frontier state.
+        """
+        with self.open_frontier() as frontier, CheckpointStore(self.CHECKPOINT_PATH) as checkpoint:
+            frontier.add([self.BASE_URL + "/designers/"], "index")
+            while claimed := frontier.claim():
+                url, kind, parent = claimed[0]
+                if kind == "index":
+                    response = self.request_with_retry(url)
+                    if response is None:
+                        frontier.fail(url, "fetch failed")
+                        continue
+                    frontier.add(self.parse_designer_links(response.text), "designer")
+                    frontier.done(url)
+                elif kind == "designer":
+                    self.crawl_designer(frontier, url)
+                else:
+                    self.crawl_perfume(frontier, checkpoint, url)
+
+            self.save_designer_perfumes(frontier)
+            checkpoint.close()
+            count = checkpoint.compact("../../data/website_all_perfumes.json")
+            counts = frontier.counts()
+        print(f"Crawl finished: {count} perfumes saved, {counts}")
+        return counts
+
+    def crawl_designer(self, frontier, url):
+        """Queue the perfumes of one claimed designer page, recording failures in the frontier."""
+        try:
+            brand_name, perfume_links = self.scrape_perfume_details(url)
+        except Exception as e:
+            get_log().error("designer_error", url, f"Error processing designer {url}: {str(e)}")
+            frontier.fail(url, str(e))
+            return
+        if brand_name is None:
+            frontier.fail(url, "fetch failed")
+            return
+        frontier.add(perfume_links, "perfume", parent=brand_name)
+        frontier.done(url)
+
+    def crawl_perfume(self, frontier, checkpoint, url):
+        """Scrape one claimed perfume page into the checkpoint, recording failures in the frontier."""
+        try:
+            perfume_data = self.scrape_perfume_data(url)
+        except Exception as e:
+            get_log().error("parse_error", url, f"Error parsing {url}: {str(e)}")
+            frontier.fail(url, str(e))
+            return
+        if perfume_data is None:
+            frontier.fail(url, "fetch failed")
+            return
+        checkpoint.append(perfume_data.model_dump())
+        frontier.done(url)
+
+    def save_designer_perfumes(self, frontier):
+        """
+        Write website_perfumes_by_designer.json from the perfume links in the frontier.
+
+        Args:
+            frontier (CrawlFrontier): Frontier holding the discovered perfume links.
+        """
+        by_designer = {}
+        for url, brand in frontier.iter_urls("perfume"):
+            by_designer.setdefault(brand, []).append(url)
         with open("../../data/website_perfumes_by_designer.json", "w") as f:
-            json.dump(self.all_brands_data, f, indent=2)
-        
-        print(f"Scraped data for {len(self.all_brands_data)} designers.")
+            json.dump([{"brand": brand, "perfumes": urls} for brand, urls in by_designer.items()], f, indent=2)
+        print(f"Scraped data for {len(by_designer)} designers.")
 
     def scrape_all_perfumes(self):
         """
@@ -331,16 +471,118 @@ class FragranceScraper:
         Uses the previously collected perfume URLs.
         """
         all_perfumes_data = []
+        for perfume_url in self.load_perfume_urls():
+            perfume_data = self.scrape_perfume_data(perfume_url)
+            if perfume_data:
+                all_perfumes_data.append(perfume_data.model_dump())
+
+        self.save_all_perfumes(all_perfumes_data)
+
+    def scrape_all_perfumes_async(self, concurrency=8, rate_per_host=2.0):
+        """
+        Scrape detailed data for all perfumes with the async crawler.
+
+        Args:
+            concurrency (int): Maximum number of requests in flight.
+            rate_per_host (float): Requests per second allowed per host.
+            
+        Returns:
+            CrawlStats: Throughput and failure counts for the crawl.
+        """
+        all_perfumes_data = []
+        crawler = AsyncCrawler(
+            parse=self.parse_perfume_page,
+            sink=lambda perfume: all_perfumes_data.append(perfume.model_dump()),
+            concurrency=concurrency,
+            rate_per_host=rate_per_host,
+            headers=self.get_headers,
+            cache=self.cache,
+            refresh=self.refresh,
+            metrics=self.fetcher.metrics,
+        )
+        stats = crawler.run(self.load_perfume_urls())
+        self.save_all_perfumes(all_perfumes_data)
+        return stats
+
+    def scrape_all_perfumes_pipeline(self, concurrency=8, rate_per_host=2.0, parse_workers=None):
+        """
+        Scrape detailed data for all perfumes, parsing pages in a process pool.
+
+        Args:
+            concurrency (int): Maximum number of requests in flight.
+            rate_per_host (float): Requests per second allowed per host.
+            parse_workers (int): Parser processes; defaults to the CPU count.
+            
+        Returns:
+            PipelineStats: Fetch, parse and write throughput.
+        """
+        all_perfumes_data = []
+
+        def save_parsed(parsed):
+            perfume_data, missing_fields = parsed
+            self.record_missing_fields(perfume_data.url, missing_fields)
+            all_perfumes_data.append(perfume_data.model_dump())
+
+        pipeline = ParsePipeline(
+            parse=parse_fragrance_html,
+            sink=save_parsed,
+            parse_workers=parse_workers,
+            concurrency=concurrency,
+            rate_per_host=rate_per_host,
+            headers=self.get_headers,
+            cache=self.cache,
+            refresh=self.refresh,
+            metrics=self.fetcher.metrics,
+        )
+        stats = pipeline.run_sync(self.load_perfume_urls())
+        self.save_all_perfumes(all_perfumes_data)
+        print(stats.report())
+        return stats
+
+    def reextract_from_cache(self):
+        """
+        Rebuild website_all_perfumes.json from cached HTML, with no network access.
+
+        Pages that fail to parse are logged and skipped.
+        
+        Returns:
+            int: Number of perfumes written.
+        """
+        if self.cache is None:
+            raise ValueError("Re-extraction needs the HTML cache to be enabled")
+
+        all_perfumes_data = []
+        for perfume_url in self.load_perfume_urls():
+            body = self.cache.get_body(perfume_url)
+            if body is None:
+                continue
+            try:
+                all_perfumes_data.append(self.parse_perfume_page(perfume_url, body).model_dump())
+            except Exception as e:
+                get_log().error("parse_error", perfume_url, f"Error parsing {perfume_url}: {str(e)}")
+
+        self.save_all_perfumes(all_perfumes_data)
+        print(f"Re-extracted {len(all_perfumes_data)} perfumes from the HTML cache.")
+        return len(all_perfumes_data)
+
+    def load_perfume_urls(self):
+        """
+        Load the perfume URLs collected by scrape_all_designers.
+        
+        Returns:
+            list: Perfume page URLs for all designers.
+        """
         with open("../../data/website_perfumes_by_designer.json", "r") as f:
             perfumes_data = json.load(f)
+        return [perfume_url for designer_data in perfumes_data for perfume_url in designer_data["perfumes"]]
 
-        for designer_data in perfumes_data:
-            for perfume_url in designer_data["perfumes"]:
-                perfume_data = self.scrape_perfume_data(perfume_url)
-                if perfume_data:
-                    all_perfumes_data.append(perfume_data)
-
-        # Save all perfumes data to a single JSON file
+    def save_all_perfumes(self, all_perfumes_data):
+        """
+        Save all perfumes data to a single JSON file.
+        
+        Args:
+            all_perfumes_data (list): Perfume dictionaries to write.
+        """
         with open("../../data/website_all_perfumes.json", "w") as f:
             json.dump(all_perfumes_data, f, indent=2)
 
@@ -356,3 +598,15 @@ if __name__ == "__main__":
     
     # Uncomment to scrape all perfume details
     scraper.scrape_all_perfumes()
+
+    # Uncomment to scrape all perfume details with the concurrent crawler
+    # scraper.scrape_all_perfumes_async(concurrency=8, rate_per_host=2.0)
+
+    # Uncomment to crawl concurrently and parse in a process pool
+    # scraper.scrape_all_perfumes_pipeline(concurrency=8, rate_per_host=2.0)
+
+    # Uncomment to rebuild website_all_perfumes.json from cached pages only
+    # scraper.reextract_from_cache()
+
+    # Uncomment to discover and scrape everything as one resumable crawl
+    # scraper.crawl()
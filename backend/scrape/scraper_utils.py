@@ -0,0 +1,336 @@
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scrape_log import get_log
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header into a delay in seconds.
+
+    Args:
+        value (str): Header value, either delta-seconds or an HTTP date.
+
+    Returns:
+        float or None: Seconds to wait, or None if the header is absent or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base_wait: float, max_wait: float, retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retry number `attempt` (0-based).
+
+    A server-supplied Retry-After wins (capped at `max_wait`); otherwise the
+    delay is exponential with jitter between half and the full step, so
+    concurrent clients don't retry in lockstep.
+    """
+    if retry_after is not None:
+        return min(retry_after, max_wait)
+    step = min(base_wait * (2 ** attempt), max_wait)
+    return random.uniform(step / 2, step)
+
+
+class RateBudget:
+    """
+    Thread-safe token bucket shared by a pool of worker threads.
+
+    `rate` requests per second on average, with bursts of up to `capacity`.
+    Waiters are served in arrival order. `observe` lets the server's own
+    quota headers pause everyone until the quota window resets.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.waited = 0.0
+        self._lock = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def acquire(self) -> float:
+        """
+        Block until one request may be made.
+
+        Returns:
+            float: Seconds this call spent waiting.
+        """
+        started = time.monotonic()
+        blocked = False
+        with self._lock:
+            # Tickets serve waiters in arrival order; waiting releases the lock, so `observe` is never blocked
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while True:
+                now = time.monotonic()
+                if ticket != self._serving:
+                    blocked = True
+                    self._lock.wait()
+                    continue
+                if self.resume_at > now:
+                    delay = self.resume_at - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self._serving += 1
+                        self._lock.notify_all()
+                        waited = now - started if blocked else 0.0
+                        self.waited += waited
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+                blocked = True
+                self._lock.wait(delay)
+
+    def observe(self, remaining: Optional[float], reset_timestamp: Optional[float]):
+        """
+        Pause all callers until `reset_timestamp` (epoch seconds) once the
+        server reports no requests `remaining` in the current window.
+        """
+        if remaining is None or reset_timestamp is None or remaining >= 1:
+            return
+        delay = reset_timestamp - time.time()
+        if delay <= 0:
+            return
+        with self._lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + delay)
+            self.tokens = 0.0
+            self._lock.notify_all()  # The waiter at the head recomputes its delay
+
+
+@dataclass
+class HostMetrics:
+    """Request, connection and latency counters for one host."""
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    connections: int = 0
+    total_latency: float = 0.0
+    statuses: Counter = field(default_factory=Counter)
+    latencies: List[float] = field(default_factory=list)
+
+    MAX_SAMPLES = 1000
+
+    def record(self, latency: float, status: Optional[int] = None):
+        self.requests += 1
+        self.total_latency += latency
+        if status is None:
+            self.errors += 1
+        else:
+            self.statuses[status] += 1
+
+        # Reservoir sample keeps percentile estimates cheap over long crawls
+        if len(self.latencies) < self.MAX_SAMPLES:
+            self.latencies.append(latency)
+        else:
+            slot = random.randrange(self.requests)
+            if slot < self.MAX_SAMPLES:
+                self.latencies[slot] = latency
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "connections": self.connections,
+            "statuses": dict(self.statuses),
+            "mean_latency": round(self.total_latency / self.requests, 4) if self.requests else 0.0,
+            "p50_latency": round(self.percentile(50), 4),
+            "p95_latency": round(self.percentile(95), 4),
+        }
+
+
+class FetchMetrics:
+    """Thread-safe map of host -> HostMetrics."""
+
+    def __init__(self):
+        self.hosts: Dict[str, HostMetrics] = {}
+        self._lock = threading.Lock()
+
+    def host(self, url: str) -> HostMetrics:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostMetrics()
+            return self.hosts[host]
+
+    def record(self, url: str, latency: float, status: Optional[int] = None):
+        metrics = self.host(url)
+        with self._lock:
+            metrics.record(latency, status)
+
+    def retry(self, url: str):
+        metrics = self.host(url)
+        with self._lock:
+            metrics.retries += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            return {host: metrics.as_dict() for host, metrics in self.hosts.items()}
+
+    def report(self) -> str:
+        lines = []
+        for host, m in self.as_dict().items():
+            lines.append(
+                f"{host}: {m['requests']} requests, {m['connections']} connections, "
+                f"{m['retries']} retries, {m['errors']} errors, "
+                f"p50 {m['p50_latency'] * 1000:.0f}ms / p95 {m['p95_latency'] * 1000:.0f}ms"
+            )
+        return "\n".join(lines)
+
+
+class HttpFetcher:
+    """
+    Pooled, retrying HTTP client shared by the scrapers.
+
+    One requests.Session keeps connections alive per host, so consecutive
+    pages reuse the same TCP+TLS connection. Rate limits (429) and transient
+    server errors are retried with jittered exponential backoff, honouring
+    Retry-After. Every request feeds per-host connection and latency metrics.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 10,
+        base_wait: float = 20,
+        max_wait: float = 120,
+        timeout: float = 15,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+    ):
+        """
+        Args:
+            max_retries (int): Attempts per URL before giving up.
+            base_wait (float): First backoff step in seconds.
+            max_wait (float): Upper bound on any single wait.
+            timeout (float): Per-request timeout in seconds.
+            pool_connections (int): Number of hosts to keep connection pools for.
+            pool_maxsize (int): Keep-alive connections kept per host.
+        """
+        self.max_retries = max_retries
+        self.base_wait = base_wait
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.metrics = FetchMetrics()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def _count_connections(self, url: str):
+        """Copy urllib3's count of connections opened for this host into the metrics."""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            pools = self.session.get_adapter(url).poolmanager.pools
+            opened = sum(
+                pools[key].num_connections
+                for key in pools.keys()
+                if key.key_host == parts.hostname and key.key_port == port
+            )
+        except (AttributeError, KeyError):
+            return
+        self.metrics.host(url).connections = opened
+
+    def get(self, url: str, headers: Optional[Mapping[str, str]] = None, max_retries: Optional[int] = None):
+        """
+        GET a URL with retries.
+
+        Args:
+            url (str): The URL to request.
+            headers (Mapping): Request headers.
+            max_retries (int): Override the fetcher's retry budget.
+
+        Returns:
+            Response object on 200/304, or None if the URL failed.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+
+        for attempt in range(max_retries):
+            if attempt:
+                self.metrics.retry(url)
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                self.metrics.record(url, time.perf_counter() - started)
+                wait_time = backoff_delay(attempt, self.base_wait, self.max_wait)
+                get_log().warning("network_error", url, f"Network error: {str(e)} for {url}. Retrying after {wait_time:.0f} seconds...")
+                if attempt < max_retries - 1:  # No point waiting after the last attempt
+                    time.sleep(wait_time)
+                continue
+
+            self.metrics.record(url, time.perf_counter() - started, response.status_code)
+            self._count_connections(url)
+
+            if response.status_code in (200, 304):
+                return response
+
+            if response.status_code in RETRYABLE_STATUSES:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                wait_time = backoff_delay(attempt, self.base_wait, self.max_wait, retry_after)
+                if response.status_code == 429:
+                    get_log().warning("rate_limited", url, f"Rate limited! Waiting {wait_time:.0f} seconds before retrying...")
+                else:
+                    get_log().warning(
+                        f"http_{response.status_code}", url,
+                        f"Server error {response.status_code} for {url}. Waiting {wait_time:.0f} seconds...",
+                    )
+                if attempt < max_retries - 1:
+                    time.sleep(wait_time)
+                continue
+
+            get_log().error(f"http_{response.status_code}", url, f"Error {response.status_code} for {url}. Skipping.")
+            return None  # Move to next URL
+
+        get_log().error("max_retries", url, f"Max retries reached for {url}, skipping.")
+        return None
+
+
+_default_fetcher: Optional[HttpFetcher] = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher() -> HttpFetcher:
+    """Return the process-wide HttpFetcher so all scrapers share one connection pool."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = HttpFetcher()
+        return _default_fetcher
@@ -0,0 +1,555 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.accords import AccordIndex
+from backend.catalog import Catalog, CatalogWriter, perfume_id
+from backend.clones import CloneGraph, clone_claims
+from backend.db import DATA_DIR, PERFUMES_PATH, REDDIT_PATH, iter_json_records
+from backend.embeddings import (
+    Embedder, EmbeddingCache, EmbeddingPipeline, HashingEmbedder, embedder_from_name, perfume_documents, reddit_documents,
+)
+from backend.linking import MentionIndex, PerfumeLinker
+from backend.profiles import ProfileIndex, ProfileQuery
+from backend.rerank import Reranker
+from backend.retrieval import BM25Index, HybridSearcher, VectorIndex, reciprocal_rank_fusion
+from backend.versioning import CURRENT_FILE
+
+SNAPSHOT_ROOT = os.path.join(DATA_DIR, "snapshots")
+MANIFEST_FILE = "manifest.json"
+CATALOG_DIR = "catalog"
+MENTIONS_FILE = "mentions.sqlite3"
+
+# Seconds /ask waits for retrieval sub-queries before answering with what has finished
+RETRIEVAL_BUDGET = 0.5
+
+# Neighbours listed in an accord-similarity passage
+ACCORD_NEIGHBOURS = 5
+
+LINK_BATCH = 500
+
+# First-stage passages per requested passage handed to the reranker
+RERANK_CANDIDATES = 4
+
+
+class ChunkStore:
+    """
+    Chunk texts by chunk id, so search hits can be returned with their text.
+
+    Written once while a snapshot is built, then opened read-only by every
+    API worker.
+    """
+
+    FILE = "chunks.sqlite3"
+
+    def __init__(self, directory: str, read_only: bool = False):
+        path = os.path.join(directory, self.FILE)
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID")
+
+    def add(self, chunk_ids: Sequence[str], texts: Sequence[str]):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?)", zip(chunk_ids, texts))
+
+    def texts(self, chunk_ids: Sequence[str]) -> Dict[str, str]:
+        placeholders = ",".join("?" * len(chunk_ids))
+        return dict(self.conn.execute(f"SELECT chunk_id, text FROM chunks WHERE chunk_id IN ({placeholders})", list(chunk_ids)))
+
+    def close(self):
+        self.conn.close()
+
+
+class _Fanout:
+    """Feeds chunks to several `add(ids, texts)` sinks at once."""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def add(self, ids, texts):
+        for sink in self.sinks:
+            sink.add(ids, texts)
+
+
+def build_snapshot(
+    root: str,
+    perfumes: Iterable[dict],
+    posts: Iterable[dict],
+    embedder: Optional[Embedder] = None,
+    cache: Optional[EmbeddingCache] = None,
+    kind: str = "flat",
+    version: Optional[str] = None,
+    publish: bool = True,
+    keep: int = 3,
+) -> str:
+    """
+    Build a complete retrieval snapshot and (by default) publish it.
+
+    The snapshot is written to a hidden staging directory and renamed into
+    place when complete, so readers only ever see whole snapshots.
+
+    Args:
+        root (str): Snapshot root directory.
+        perfumes: Scraped perfume dicts.
+        posts: Scraped Reddit post dicts.
+        embedder (Embedder): Chunk embedder; defaults to HashingEmbedder.
+        cache (EmbeddingCache): Optional vector cache shared across builds.
+        kind (str): VectorIndex kind.
+        version (str): Snapshot name; defaults to a UTC timestamp.
+        publish (bool): Point CURRENT at the new snapshot.
+        keep (int): Snapshots to retain when publishing.
+
+    Returns:
+        str: The snapshot version.
+    """
+    version = version or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    staging = os.path.join(root, f".{version}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    pipeline = EmbeddingPipeline(embedder or HashingEmbedder(), cache)
+    vectors = VectorIndex(pipeline.embedder.dim, kind=kind)
+    keywords = BM25Index()
+    chunks = ChunkStore(staging)
+    mentions = MentionIndex(os.path.join(staging, MENTIONS_FILE))
+    catalog_writer = CatalogWriter(os.path.join(staging, CATALOG_DIR))
+    linker: Optional[PerfumeLinker] = None
+    claims: List[Tuple[str, str]] = []
+
+    def link(batch: List[dict]):
+        mentions.update(linker, batch)
+        claims.extend(clone_claims(batch, linker))
+
+    def documents() -> Iterator[Tuple[str, str]]:
+        nonlocal linker
+        for perfume in perfumes:
+            catalog_writer.add(perfume)
+            yield from perfume_documents(perfume)
+        # Perfumes are only held in the catalog; posts are linked against it as they stream past, in batches
+        catalog_writer.close()
+        linker = PerfumeLinker(Catalog(os.path.join(staging, CATALOG_DIR)).records())
+        batch: List[dict] = []
+        for post in posts:
+            batch.append(post)
+            if len(batch) >= LINK_BATCH:
+                link(batch)
+                batch = []
+            yield from reddit_documents(post)
+        link(batch)
+
+    pipeline.index_documents(vectors, documents(), keyword_index=_Fanout(keywords, chunks))
+    chunks.close()
+    mentions.close()
+    catalog = Catalog(os.path.join(staging, CATALOG_DIR))
+    accords = AccordIndex.from_records(catalog.records(("url", "name", "brand", "accords")))
+    profiles = ProfileIndex.from_records(catalog.records(("notes", "accords")))
+    clones = CloneGraph.build(catalog.records(("url", "smells_like")), linker, accords, claims)
+
+    vectors.save(os.path.join(staging, "vectors"))
+    keywords.save(os.path.join(staging, "keywords"))
+    accords.save(os.path.join(staging, "accords"))
+    profiles.save(os.path.join(staging, "profiles"))
+    clones.save(os.path.join(staging, "clones"))
+    manifest = {
+        "version": version,
+        "created": time.time(),
+        "embedder": pipeline.embedder.name,
+        "chunks": len(vectors),
+        "perfumes": len(catalog),
+        "clone_edges": clones.edges,
+        "embedding_stats": pipeline.stats.as_dict(),
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(staging, os.path.join(root, version))
+    if publish:
+        publish_snapshot(root, version, keep=keep)
+    return version
+
+
+def current_version(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_snapshot(root: str, version: str, keep: int = 3):
+    """
+    Atomically point CURRENT at `version` and prune old snapshots.
+
+    Workers still serving a pruned snapshot keep working: its files are
+    unlinked, but their open maps stay valid until the worker swaps.
+    """
+    if not os.path.isfile(os.path.join(root, version, MANIFEST_FILE)):
+        raise FileNotFoundError(f"No snapshot {version!r} in {root}")
+    tmp = os.path.join(root, f".{CURRENT_FILE}.tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+    versions = sorted(name for name in os.listdir(root) if os.path.isfile(os.path.join(root, name, MANIFEST_FILE)))
+    for old in versions[:-keep] if keep else []:
+        if old != version:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+
+class Snapshot:
+    """
+    A read-only, memory-mapped view of one snapshot directory.
+
+    Indexes and the perfume catalog are mapped rather than read, so several
+    API workers serving the same snapshot share its pages through the OS
+    page cache. The perfume linker is only built when a query first needs it.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.directory = directory
+        self.vectors = VectorIndex.load(os.path.join(directory, "vectors"), mmap=True)
+        self.keywords = BM25Index.load(os.path.join(directory, "keywords"), mmap=True)
+        self.accords = AccordIndex.load(os.path.join(directory, "accords"), mmap=True)
+        self.chunks = ChunkStore(directory, read_only=True)
+        self.mentions = MentionIndex(os.path.join(directory, MENTIONS_FILE), check_same_thread=False, read_only=True)
+        self.embedder = embedder_from_name(self.manifest["embedder"])
+        self.searcher = HybridSearcher(self.vectors, self.keywords, self.embedder)
+        self.catalog = Catalog(os.path.join(directory, CATALOG_DIR))
+        self.profiles = ProfileIndex.load(os.path.join(directory, "profiles"), mmap=True)
+        self.clones = CloneGraph.load(os.path.join(directory, "clones"), mmap=True)
+        self._linker: Optional[PerfumeLinker] = None
+        self._linker_lock = threading.Lock()
+
+    @property
+    def linker(self) -> PerfumeLinker:
+        if self._linker is None:
+            with self._linker_lock:
+                if self._linker is None:
+                    self._linker = PerfumeLinker(self.catalog.records())
+        return self._linker
+
+    def search(self, query: str, k: int = 10, profile: Optional[str] = None) -> List[Dict]:
+        """
+        Hybrid keyword + vector search; hits carry their chunk text.
+
+        With a `profile` query (see ProfileQuery.parse), only chunks of
+        perfumes matching it are returned.
+        """
+        allow = None
+        if profile:
+            mask = self.profiles.mask(ProfileQuery.parse(profile))
+            if not self.profiles.count(mask):
+                return []
+            rows: Dict[str, Optional[int]] = {}
+
+            def allow(doc_id: str) -> bool:
+                url = doc_id.split("#", 1)[0]  # Perfume chunk ids are "{url}#{section}:{n}"
+                if url not in rows:
+                    rows[url] = self.catalog.row_of(url)
+                row = rows[url]
+                return row is not None and bool((int(mask[row >> 6]) >> (row & 63)) & 1)
+
+        return self.passages(self.searcher.search(query, k, allow=allow))
+
+    def profile_search(self, query: str, limit: int = 20) -> Dict:
+        """
+        Perfumes matching a boolean note/accord query, in catalog order.
+
+        Returns:
+            dict: `count` of all matches and the first `limit` `perfumes`.
+
+        Raises:
+            ValueError: If the query cannot be parsed.
+        """
+        mask = self.profiles.mask(ProfileQuery.parse(query))
+        perfumes = [
+            dict(view.as_dict(("url", "name", "brand", "accords")), id=view.id)
+            for view in (self.catalog[int(row)] for row in self.profiles.rows(mask)[:limit])
+        ]
+        return {"count": self.profiles.count(mask), "perfumes": perfumes}
+
+    def passages(self, hits: Sequence[Tuple[str, float]]) -> List[Dict]:
+        """Attach passage text to (doc_id, score) hits."""
+        texts = self.passage_texts([doc_id for doc_id, _ in hits])
+        return [{"doc_id": doc_id, "score": score, "text": texts.get(doc_id, "")} for doc_id, score in hits]
+
+    def passage_texts(self, doc_ids: Sequence[str]) -> Dict[str, str]:
+        """Texts of chunk and accord-summary passages that exist in this snapshot."""
+        texts = self.chunks.texts([doc_id for doc_id in doc_ids if not doc_id.startswith("accords:")]) if doc_ids else {}
+        for doc_id in doc_ids:
+            if doc_id.startswith("accords:"):
+                text = self._accord_summary(doc_id.split(":", 1)[1])
+                if text:
+                    texts[doc_id] = text
+        return texts
+
+    # Retrieval sub-queries, run concurrently by gather_context
+
+    def vector_search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        return self.vectors.search(self.embedder.embed([query]), k)[0]
+
+    def keyword_search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        return self.keywords.search(query, k)
+
+    def mention_search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """First chunks of Reddit posts and comments that mention a perfume named in `query`."""
+        hits = []
+        for url in self.linker.link(query):
+            hits += [(f"{m['doc_id']}:0", 0.0) for m in self.mentions.mentions(url, limit=k)]
+        return hits[:k]
+
+    def accord_passages(self, query: str, k: int) -> List[Dict]:
+        """Accord-similarity summaries for perfumes named in `query`."""
+        doc_ids = [f"accords:{url}" for url in self.linker.link(query)][:k]
+        texts = self.passage_texts(doc_ids)
+        return [{"doc_id": doc_id, "score": 1.0, "text": texts[doc_id]} for doc_id in doc_ids if doc_id in texts]
+
+    def _accord_summary(self, url: str) -> Optional[str]:
+        if url not in self.accords.row_of:
+            return None
+        perfume = self.catalog.get(url)
+        similar = ", ".join(
+            f"{r['name']} ({r['score']:.0%})" for r in self.accords.similar_to(url, ACCORD_NEIGHBOURS)
+        )
+        return f"Perfumes with accords closest to {perfume.name}: {similar}."
+
+    def perfume(self, pid: int) -> Optional[Dict]:
+        perfume = self.catalog.by_id(pid)
+        if perfume is None:
+            return None
+        return dict(perfume.as_dict(("url", "name", "brand", "photo_url", "accords", "notes")), id=pid)
+
+    def similar(self, pid: int, k: int = 10, brands: Optional[Sequence[str]] = None, metric: str = "cosine") -> List[Dict]:
+        """Accord-similar perfumes to the perfume with id `pid`; KeyError if it has no accords."""
+        perfume = self.catalog.by_id(pid)
+        if perfume is None:
+            raise KeyError(pid)
+        results = self.accords.similar_to(perfume.url, k, brands=brands, metric=metric)
+        return [dict(result, id=perfume_id(result["url"])) for result in results]
+
+    def clone_family(self, pid: int, k: int = 10, hops: int = 2) -> List[Dict]:
+        """
+        Clones of the perfume with id `pid` and, with `hops=2`, clones of its clones.
+
+        Results come ranked from the precomputed clone graph: direct links
+        first, then by centrality. KeyError if the id is unknown.
+        """
+        perfume = self.catalog.by_id(pid)
+        if perfume is None:
+            raise KeyError(pid)
+        rows, distances = self.clones.neighbours(perfume.row, hops)
+        results = []
+        for row, hop in zip(rows[:k].tolist(), distances[:k].tolist()):
+            view = self.catalog[row]
+            results.append(dict(view.as_dict(("url", "name", "brand")), id=view.id, hops=hop, centrality=float(self.clones.centrality[row])))
+        return results
+
+    def close(self):
+        self.chunks.close()
+        self.mentions.close()
+
+
+def _abandoned(release: Optional[Callable[[], None]], task: asyncio.Task):
+    """Done-callback of a sub-query that missed the budget: unpin its snapshot now that its thread is finished."""
+    if not task.cancelled():
+        task.exception()  # Retrieved, so a late failure isn't reported as never retrieved
+    if release is not None:
+        release()
+
+
+async def gather_context(
+    snapshot: Snapshot,
+    question: str,
+    k: int = 8,
+    budget: float = RETRIEVAL_BUDGET,
+    reranker: Optional[Reranker] = None,
+    manager: Optional["SnapshotManager"] = None,
+) -> Tuple[List[Dict], Dict]:
+    """
+    Run the retrieval sub-queries concurrently and fuse their results.
+
+    Vector, keyword and Reddit-mention rankings are merged with RRF; accord
+    similarity summaries for perfumes named in the question go first. Only
+    sub-queries that finish within `budget` seconds are used (at least one
+    is always waited for), so one slow index cannot hold up the answer.
+    With a `reranker`, RERANK_CANDIDATES times as many fused passages are
+    rescored by the cross-encoder and the best `k` kept.
+
+    Worker threads cannot be cancelled, so sub-queries that miss the budget
+    are left to finish in the background. Given the `manager` serving
+    `snapshot`, each keeps the snapshot pinned until its thread is done, so
+    a swap never closes it under them.
+
+    Returns:
+        Tuple of (passages, stats) where stats has per-sub-query
+        `timings_ms`, the `cut` sub-queries that missed the budget and,
+        when reranking, `rerank` info.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    async def timed(name, fn, *args):
+        result = await asyncio.to_thread(fn, *args)
+        timings[name] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    fetch = max(k * 3, 20)
+    tasks = {
+        "vector": asyncio.create_task(timed("vector", snapshot.vector_search, question, fetch)),
+        "keyword": asyncio.create_task(timed("keyword", snapshot.keyword_search, question, fetch)),
+        "mentions": asyncio.create_task(timed("mentions", snapshot.mention_search, question, k)),
+        "accords": asyncio.create_task(timed("accords", snapshot.accord_passages, question, 2)),
+    }
+    done, pending = await asyncio.wait(tasks.values(), timeout=budget)
+    if not done:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.add_done_callback(functools.partial(_abandoned, manager.pin(snapshot) if manager is not None else None))
+
+    results = {}
+    for name, task in tasks.items():
+        if task in done:
+            if task.exception() is None:
+                results[name] = task.result()
+            else:
+                print(f"⚠️ Retrieval sub-query {name} failed: {task.exception()}")
+    rankings = [results[name] for name in ("vector", "keyword", "mentions") if name in results]
+    limit = k * RERANK_CANDIDATES if reranker else k
+    fused = await asyncio.to_thread(snapshot.passages, reciprocal_rank_fusion(rankings, limit=limit))
+    # A copy: sub-queries still running in the background record their timing when they finish
+    stats = {"timings_ms": dict(timings), "cut": sorted(name for name, task in tasks.items() if task in pending)}
+    if reranker:
+        fused, stats["rerank"] = await reranker.rerank(question, fused, k)
+    return results.get("accords", []) + fused, stats
+
+
+class SnapshotManager:
+    """
+    Serves the current snapshot and hot-swaps it when CURRENT changes.
+
+    Requests take the snapshot with `acquire()` and hold it for their whole
+    lifetime. A swap only replaces the reference new requests will see; the
+    old snapshot is closed once its last in-flight request releases it.
+    Callables in `on_swap` are called with each newly swapped-in snapshot.
+    """
+
+    def __init__(self, root: str = SNAPSHOT_ROOT, poll_interval: float = 5.0):
+        """
+        Args:
+            root (str): Snapshot root directory.
+            poll_interval (float): Seconds between checks of CURRENT in `watch`.
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.current: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._users: Dict[int, int] = {}  # id(snapshot) → in-flight requests
+        self._retired: Dict[int, Snapshot] = {}
+        self.on_swap: List[Callable[[Snapshot], object]] = []
+        self.swaps = 0
+
+    def reload(self) -> bool:
+        """
+        Open the snapshot CURRENT points at, if it is not already served.
+
+        Returns:
+            bool: Whether a new snapshot was swapped in.
+        """
+        version = current_version(self.root)
+        if version is None or (self.current is not None and self.current.version == version):
+            return False
+        snapshot = Snapshot(os.path.join(self.root, version))
+        with self._lock:
+            old, self.current = self.current, snapshot
+            self.swaps += 1
+            if old is not None:
+                self._retire(old)
+        for hook in self.on_swap:
+            hook(snapshot)
+        return True
+
+    def _retire(self, snapshot: Snapshot):
+        if self._users.get(id(snapshot), 0):
+            self._retired[id(snapshot)] = snapshot
+        else:
+            snapshot.close()
+
+    def _release(self, snapshot: Snapshot):
+        with self._lock:
+            key = id(snapshot)
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                retired = self._retired.pop(key, None)
+                if retired is not None:
+                    retired.close()
+
+    @contextmanager
+    def acquire(self) -> Iterator[Snapshot]:
+        """Pin the current snapshot for the duration of a request."""
+        with self._lock:
+            snapshot = self.current
+            if snapshot is None:
+                raise LookupError(f"No snapshot published in {self.root}")
+            self._users[id(snapshot)] = self._users.get(id(snapshot), 0) + 1
+        try:
+            yield snapshot
+        finally:
+            self._release(snapshot)
+
+    def pin(self, snapshot: Snapshot) -> Callable[[], None]:
+        """
+        Pin an already acquired snapshot beyond its request, e.g. for work
+        left running in a thread; call the returned function once to unpin.
+        """
+        with self._lock:
+            self._users[id(snapshot)] += 1
+        return functools.partial(self._release, snapshot)
+
+    async def watch(self):
+        """Poll CURRENT forever, swapping in new snapshots as they are published."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                print(f"⚠️ Snapshot reload failed: {e}")
+
+    def close(self):
+        with self._lock:
+            if self.current is not None:
+                self._retire(self.current)
+                self.current = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and publish a retrieval snapshot from scraped data.")
+    parser.add_argument("--root", default=SNAPSHOT_ROOT, help="Snapshot root directory")
+    parser.add_argument("--perfumes", default=PERFUMES_PATH, help="Scraped perfumes JSON / JSONL")
+    parser.add_argument("--reddit", default=REDDIT_PATH, help="Reddit posts NDJSON / JSON")
+    parser.add_argument("--kind", default="flat", help="Vector index kind")
+    parser.add_argument("--embedder", default="hashing-384", help="Embedder name, e.g. openai:text-embedding-3-small")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    os.makedirs(args.root, exist_ok=True)
+    version = build_snapshot(
+        args.root, iter_json_records(args.perfumes), iter_json_records(args.reddit),
+        embedder=embedder_from_name(args.embedder), cache=EmbeddingCache(), kind=args.kind,
+    )
+    print(f"✅ Published snapshot {version} in {time.perf_counter() - started:.2f}s")
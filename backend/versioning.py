@@ -0,0 +1,37 @@
+import os
+import shutil
+import time
+
+# Pointer file naming the live version directory of a versioned on-disk structure
+CURRENT_FILE = "CURRENT"
+
+
+def publish_version(directory: str, staging: str, keep: int = 2):
+    """
+    Rename a fully written staging directory to a new version in `directory`
+    and atomically point CURRENT at it.
+
+    Only the newest `keep` versions are kept; a worker still serving a
+    pruned one keeps its open maps until it reloads.
+    """
+    version = f"v{time.time_ns():020d}"
+    os.replace(staging, os.path.join(directory, version))
+    tmp = os.path.join(directory, f".{CURRENT_FILE}.tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, CURRENT_FILE))
+
+    versions = sorted(name for name in os.listdir(directory) if name.startswith("v") and os.path.isdir(os.path.join(directory, name)))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+
+
+def current_version_dir(directory: str) -> str:
+    """Version directory CURRENT points at; `directory` itself if it was written without versioning."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return os.path.join(directory, f.read().strip())
+    except FileNotFoundError:
+        return directory
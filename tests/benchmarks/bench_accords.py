@@ -0,0 +1,62 @@
+"""
+Query latency of AccordIndex dupe search on a synthetic catalog.
+
+Usage:
+    python tests/benchmarks/bench_accords.py [--perfumes 100000] [--accords 80] [--queries 200] [--k 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from backend.accords import AccordIndex  # noqa: E402
+
+BRANDS = ["Lattafa", "Armaf", "Rasasi", "Afnan", "Creed", "Dior", "Chanel", "Tom Ford"]
+
+
+def synthetic_catalog(perfumes, accords, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"accord-{i}" for i in range(accords)]
+    for i in range(perfumes):
+        chosen = rng.choice(vocabulary, size=rng.integers(3, 10), replace=False)
+        yield {
+            "url": f"https://example.com/perfume/{i}.html",
+            "name": f"Perfume {i}",
+            "brand": BRANDS[i % len(BRANDS)],
+            "accords": [{accord: float(rng.integers(10, 101))} for accord in chosen],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--perfumes", type=int, default=100_000)
+    parser.add_argument("--accords", type=int, default=80)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = AccordIndex.from_records(synthetic_catalog(args.perfumes, args.accords))
+    print(f"Built {len(index)} × {len(index.accords)} matrix in {time.perf_counter() - started:.2f}s")
+
+    probes = index.urls[:args.queries]
+    results = []
+    for metric in ("cosine", "overlap"):
+        for brands in (None, ["Lattafa", "Armaf"]):
+            started = time.perf_counter()
+            for url in probes:
+                index.similar_to(url, args.k, brands=brands, metric=metric)
+            latency = (time.perf_counter() - started) / len(probes)
+            label = metric + (" brands=" + ",".join(brands) if brands else "")
+            results.append((label, latency))
+            print(f"{label:<32} {latency * 1000:7.3f} ms/query")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Load generator for the query API: latency percentiles under concurrency.
+
+By default a synthetic snapshot is built in a temporary directory and the
+app is driven in-process. Pass --url to load-test a running server instead,
+e.g. one started with `uvicorn backend.main:app --workers 4`.
+
+Usage:
+    python tests/benchmarks/bench_api.py [--requests 2000] [--concurrency 32] [--perfumes 5000] [--url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from backend.snapshot import build_snapshot  # noqa: E402
+
+ACCORDS = ["woody", "fruity", "smoky", "sweet", "citrus", "aromatic", "amber", "fresh", "powdery", "leather"]
+WORDS = "smoky pineapple birch vanilla oud rose amber leather fresh citrus clone dupe longevity projection".split()
+
+
+def synthetic_catalog(perfumes, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(perfumes):
+        yield {
+            "url": f"https://example.com/perfume/Brand{i % 50}/Perfume-{i}.html",
+            "name": f"Perfume {i}",
+            "brand": f"Brand{i % 50}",
+            "accords": [{a: float(rng.integers(10, 101))} for a in rng.choice(ACCORDS, 4, replace=False)],
+            "reviews": [" ".join(rng.choice(WORDS, 25)) for _ in range(3)],
+        }
+
+
+def requests_mix(n, perfumes, seed=1):
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        if rng.random() < 0.5:
+            yield "GET", "/search", {"params": {"q": " ".join(rng.choice(WORDS, 3)), "k": 10}}
+        else:
+            yield "GET", f"/perfume/{int(rng.integers(perfumes))}/similar", {"params": {"k": 10}}
+
+
+async def load(client, requests, concurrency):
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            method, path, kwargs = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code >= 500
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - started
+
+
+async def run(args):
+    requests = list(requests_mix(args.requests, args.perfumes))
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            return await load(client, requests, args.concurrency)
+
+    from backend.main import app
+
+    with tempfile.TemporaryDirectory() as root:
+        build_snapshot(root, synthetic_catalog(args.perfumes), [], version="bench")
+        os.environ["SNAPSHOT_ROOT"] = root
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+                return await load(client, requests, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--perfumes", type=int, default=5000)
+    parser.add_argument("--url", help="Load-test a running server instead of the in-process app")
+    args = parser.parse_args()
+
+    latencies, errors, elapsed = asyncio.run(run(args))
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(f"{len(latencies)} requests, {errors} errors, {len(latencies) / elapsed:.0f} req/s")
+    print(f"p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms")
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "errors": errors}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Build, save, load and query times for BM25Index on synthetic comments.
+
+Words are drawn from a Zipf distribution so postings lengths look like
+natural text: a few huge lists for common words and a long tail.
+
+Usage:
+    python tests/benchmarks/bench_bm25.py [--docs 1000000] [--vocab 50000] [--words 30] [--queries 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from backend.retrieval import BM25Index  # noqa: E402
+from backend.versioning import current_version_dir  # noqa: E402
+
+
+def synthetic_texts(docs, vocab, words, seed=0):
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.2, size=docs * words), vocab) - 1
+    return [" ".join(f"w{r}" for r in ranks[i * words:(i + 1) * words].tolist()) for i in range(docs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--vocab", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.docs, args.vocab, args.words)
+    index = BM25Index()
+    started = time.perf_counter()
+    index.add([f"doc-{i}" for i in range(args.docs)], texts)
+    index.search("w0")  # Forces the merge into CSR postings
+    print(f"build   {time.perf_counter() - started:8.2f} s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        index.save(directory)
+        saved = current_version_dir(directory)
+        size = sum(os.path.getsize(os.path.join(saved, name)) for name in os.listdir(saved))
+        print(f"save    {time.perf_counter() - started:8.2f} s  ({size / 2 ** 20:.1f} MiB)")
+
+        started = time.perf_counter()
+        loaded = BM25Index.load(directory)
+        print(f"load    {time.perf_counter() - started:8.2f} s")
+
+        rng = np.random.default_rng(1)
+        queries = [" ".join(f"w{r}" for r in rng.integers(0, 2000, size=3)) for _ in range(args.queries)]
+        started = time.perf_counter()
+        for query in queries:
+            loaded.search(query, args.k)
+        latency = (time.perf_counter() - started) / len(queries)
+        print(f"query   {latency * 1000:8.3f} ms")
+    return latency
+
+
+if __name__ == "__main__":
+    main()
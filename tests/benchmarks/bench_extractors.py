@@ -0,0 +1,55 @@
+"""
+Pages/sec for each perfume extractor backend over the saved HTML fixtures.
+
+Usage:
+    python tests/benchmarks/bench_extractors.py [--seconds 2]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(ROOT, "backend", "scrape"))
+
+from extractors import EXTRACTORS, get_extractor  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "tests", "fixtures", "html")
+
+
+def load_pages():
+    pages = []
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), "rb") as f:
+                pages.append((f"https://example.com/perfume/Brand/{name}", f.read()))
+    return pages
+
+
+def bench_backend(name, pages, seconds):
+    extractor = get_extractor(name)
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for url, html in pages:
+            extractor.extract(url, html)
+        count += len(pages)
+    elapsed = time.perf_counter() - started
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time budget per backend")
+    args = parser.parse_args()
+
+    pages = load_pages()
+    results = {name: bench_backend(name, pages, args.seconds) for name in EXTRACTORS}
+    baseline = results["soup"]
+    for name, rate in results.items():
+        print(f"{name:>6}: {rate:9.1f} pages/sec  ({rate / baseline:.1f}x soup)")
+    return results
+
+
+if __name__ == "__main__":
+    main()
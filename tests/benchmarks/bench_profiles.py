@@ -0,0 +1,67 @@
+"""
+Latency of boolean note/accord profile queries on a synthetic catalog.
+
+Usage:
+    python tests/benchmarks/bench_profiles.py [--perfumes 100000] [--notes 400] [--queries 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from backend.profiles import ProfileIndex, ProfileQuery  # noqa: E402
+
+FAMILIES = ["Vanilla", "Tonka Bean", "Oud", "Amber", "Rose", "Musk", "Sandalwood", "Bergamot", "Patchouli", "Iris"]
+ACCORDS = ["amber", "woody", "sweet", "fresh", "citrus", "floral", "warm spicy", "powdery"]
+QUERIES = [
+    "has vanilla AND tonka, NOT oud, accord amber >= 30%",
+    "rose or iris, musk",
+    "NOT patchouli, woody < 50",
+    "bourbon vanilla, sandalwood, sweet >= 60",
+]
+
+
+def synthetic_catalog(perfumes, notes, seed=0):
+    rng = np.random.default_rng(seed)
+    # Specific notes ("Style3 Vanilla") roll up into a family, as scraped ones do
+    vocabulary = [f"Style{i} {FAMILIES[i % len(FAMILIES)]}" for i in range(notes)] + ["Bourbon Vanilla"] + FAMILIES
+    sizes = rng.integers(4, 15, size=perfumes)
+    for size in sizes:
+        chosen = rng.integers(len(vocabulary), size=size)
+        strengths = rng.integers(10, 101, size=4)
+        yield {
+            "notes": [vocabulary[i] for i in chosen],
+            "accords": [{ACCORDS[a]: float(s)} for a, s in zip(rng.permutation(len(ACCORDS))[:4], strengths)],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--perfumes", type=int, default=100_000)
+    parser.add_argument("--notes", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = ProfileIndex.from_records(synthetic_catalog(args.perfumes, args.notes))
+    print(f"Built {len(index.notes)} note bitsets over {len(index)} perfumes in {time.perf_counter() - started:.2f}s")
+
+    results = []
+    for text in QUERIES:
+        query = ProfileQuery.parse(text)
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            mask = index.mask(query)
+        latency = (time.perf_counter() - started) / args.queries
+        results.append((text, latency))
+        print(f"{text:<56} {latency * 1000:7.3f} ms/query  {index.count(mask):>7} matches")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Recall@k vs query latency for each VectorIndex kind on a synthetic corpus.
+
+The corpus is drawn from Gaussian clusters, which is closer to real
+embeddings than uniform noise. Ground truth comes from the flat index.
+
+Usage:
+    python tests/benchmarks/bench_retrieval.py [--docs 50000] [--dim 384] [--queries 500] [--k 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from backend.retrieval import VectorIndex  # noqa: E402
+
+
+def synthetic_corpus(docs, dim, queries, clusters=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=docs)] + 0.6 * rng.standard_normal((docs, dim)).astype(np.float32)
+    probes = centers[rng.integers(clusters, size=queries)] + 0.6 * rng.standard_normal((queries, dim)).astype(np.float32)
+    return [f"doc-{i}" for i in range(docs)], vectors, probes
+
+
+def run(index, probes, k):
+    started = time.perf_counter()
+    hits = [index.search(probe, k)[0] for probe in probes]
+    latency = (time.perf_counter() - started) / len(probes)
+    return [[doc_id for doc_id, _ in row] for row in hits], latency
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    ids, vectors, probes = synthetic_corpus(args.docs, args.dim, args.queries)
+    configs = [("flat", {}, [{}])]
+    configs.append(("ivf", {"nlist": 1024}, [{"nprobe": n} for n in (1, 4, 16, 64)]))
+    configs.append(("hnsw", {"hnsw_m": 32}, [{"ef_search": ef} for ef in (16, 64, 256)]))
+
+    truth = None
+    results = []
+    for kind, build_params, search_params in configs:
+        index = VectorIndex(args.dim, kind=kind, **build_params)
+        started = time.perf_counter()
+        index.add(ids, vectors)
+        build = time.perf_counter() - started
+        for params in search_params:
+            index.set_search_params(**params)
+            found, latency = run(index, probes, args.k)
+            truth = truth or found  # Flat runs first and is exact
+            label = kind + "".join(f" {key}={value}" for key, value in params.items())
+            results.append((label, recall(found, truth), latency, build))
+            print(f"{label:<20} recall@{args.k} {results[-1][1]:.3f}  {latency * 1000:7.3f} ms/query  (build {build:.1f}s)")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+End-to-end benchmark suite with JSON results and a regression gate.
+
+Measures page parsing through both scrapers' `scrape_perfume_data` (served
+from the recorded HTML fixtures, no network), Reddit linking over a
+synthetic corpus, snapshot (index) build time, and search / similar /
+/ask-retrieval latency. Results are written as JSON; with --baseline the
+run fails (exit 1) if any metric regressed by more than --threshold.
+
+Usage:
+    python tests/benchmarks/bench_suite.py [--perfumes 5000] [--posts 5000] [--queries 300] [--seconds 2]
+        [--output results.json] [--baseline previous.json] [--threshold 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend", "scrape"))
+
+from backend.linking import PerfumeLinker  # noqa: E402
+from backend.snapshot import Snapshot, build_snapshot, gather_context  # noqa: E402
+from bench_api import WORDS, synthetic_catalog  # noqa: E402
+from bench_extractors import load_pages  # noqa: E402
+from results import compare, latency_metrics, load_results, metric, run_meta, save_results  # noqa: E402
+
+
+class RecordedFetcher:
+    """Serves the saved fixture pages in place of HttpFetcher."""
+
+    class Response:
+        status_code = 200
+        headers = {}
+
+        def __init__(self, content):
+            self.content = content
+            self.text = content.decode("utf-8")
+
+    def __init__(self, pages):
+        self.pages = dict(pages)
+
+    def get(self, url, headers=None, max_retries=None):
+        return self.Response(self.pages[url])
+
+
+def synthetic_posts(posts, perfumes, comments=5, seed=2):
+    """
+    Reddit posts whose titles and comments name catalog perfumes.
+
+    About a third of comments mention a perfume by brand and name; the rest
+    are filler drawn from WORDS, so the linker sees realistic miss rates.
+    """
+    rng = np.random.default_rng(seed)
+    for i in range(posts):
+        a, b = rng.integers(perfumes, size=2)
+        body = []
+        for _ in range(comments):
+            text = " ".join(rng.choice(WORDS, 15))
+            if rng.random() < 0.33:
+                n = int(rng.integers(perfumes))
+                text = f"Brand{n % 50} Perfume {n} is {text}"
+            body.append({"body": text})
+        yield {
+            "id": f"t3_{i}", "title": f"Brand{a % 50} Perfume {a} vs Brand{b % 50} Perfume {b}?",
+            "selftext": " ".join(rng.choice(WORDS, 40)), "comments": body,
+        }
+
+
+@contextmanager
+def scrape_workspace(pages):
+    """Run the scrapers in a throwaway data/ + backend/scrape/ layout with a quiet log."""
+    import scrape_log
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "data"))
+        with open(os.path.join(tmp, "data", "website_perfumes_by_designer.json"), "w") as f:
+            json.dump([{"brand": "Brand", "perfumes": [url for url, _ in pages]}], f)
+        os.makedirs(os.path.join(tmp, "backend", "scrape"))
+        os.chdir(os.path.join(tmp, "backend", "scrape"))
+        log = scrape_log.ScrapeLog(os.path.join(tmp, "logs"), echo_per_second=0)
+        previous = scrape_log.set_log(log)
+        try:
+            yield
+        finally:
+            log.close()
+            scrape_log.set_log(previous)
+            os.chdir(cwd)
+
+
+def pages_per_second(scrape, urls, seconds):
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for url in urls:
+            scrape(url)
+        count += len(urls)
+    return count / (time.perf_counter() - started)
+
+
+def parses(scraper, url):
+    # The legacy FragranceScraper parser raises on some malformed fixtures instead of logging them
+    try:
+        return scraper.scrape_perfume_data(url) is not None
+    except (KeyError, ValueError, AttributeError):
+        return False
+
+
+def bench_scrapers(seconds):
+    from scrape_perfume_data import PerfumeDataScraper
+    from scrape_sites import FragranceScraper
+
+    pages = load_pages()
+    urls = [url for url, _ in pages]
+    fetcher = RecordedFetcher(pages)
+    results = {}
+    with scrape_workspace(pages):
+        for extractor in ("soup", "lxml"):
+            scraper = PerfumeDataScraper(extractor=extractor, use_cache=False, fetcher=fetcher)
+            scraper.scraped_perfumes = set()
+            rate = pages_per_second(scraper.scrape_perfume_data, urls, seconds)
+            results[f"scrape.perfume_data.{extractor}.pages_per_s"] = metric(rate, "pages/s", lower_is_better=False)
+        scraper = FragranceScraper(use_cache=False, fetcher=fetcher)
+        rate = pages_per_second(scraper.scrape_perfume_data, [url for url in urls if parses(scraper, url)], seconds)
+        results["scrape.fragrance.pages_per_s"] = metric(rate, "pages/s", lower_is_better=False)
+    return results
+
+
+def bench_linking(catalog, posts):
+    started = time.perf_counter()
+    linker = PerfumeLinker(catalog)
+    build = time.perf_counter() - started
+    texts = [text for post in posts for text in [post["title"], post["selftext"]] + [c["body"] for c in post["comments"]]]
+    started = time.perf_counter()
+    links = sum(len(linker.link(text)) for text in texts)
+    elapsed = time.perf_counter() - started
+    print(f"linked {links} mentions in {len(texts)} texts")
+    return {
+        "link.build_s": metric(build, "s"),
+        "link.texts_per_s": metric(len(texts) / elapsed, "texts/s", lower_is_better=False),
+    }
+
+
+def bench_queries(snapshot, perfumes, queries, seed=3):
+    rng = np.random.default_rng(seed)
+    questions = [" ".join(rng.choice(WORDS, 3)) for _ in range(queries)]
+    named = [f"Brand{n % 50} Perfume {n} dupe" for n in rng.integers(perfumes, size=queries)]
+    ids = [int(n) for n in rng.integers(perfumes, size=queries)]
+
+    def timings(call, args):
+        seconds = []
+        for arg in args:
+            started = time.perf_counter()
+            call(arg)
+            seconds.append(time.perf_counter() - started)
+        return seconds
+
+    async def contexts():
+        seconds = []
+        for question in named:
+            started = time.perf_counter()
+            await gather_context(snapshot, question, 8, budget=5.0)
+            seconds.append(time.perf_counter() - started)
+        return seconds
+
+    results = {}
+    results.update(latency_metrics("query.search", timings(lambda q: snapshot.search(q, 10), questions)))
+    results.update(latency_metrics("query.similar", timings(lambda pid: snapshot.similar(pid, 10), ids)))
+    results.update(latency_metrics("query.gather_context", asyncio.run(contexts())))
+    return results
+
+
+def run_suite(args):
+    metrics = bench_scrapers(args.seconds)
+    catalog = list(synthetic_catalog(args.perfumes))
+    posts = list(synthetic_posts(args.posts, args.perfumes))
+    records = [{key: p[key] for key in ("url", "name", "brand", "accords")} for p in catalog]
+    metrics.update(bench_linking(records, posts))
+
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        version = build_snapshot(root, catalog, posts, version="bench")
+        build = time.perf_counter() - started
+        documents = len(catalog) + len(posts)
+        metrics["build.snapshot_s"] = metric(build, "s")
+        metrics["build.docs_per_s"] = metric(documents / build, "docs/s", lower_is_better=False)
+
+        started = time.perf_counter()
+        snapshot = Snapshot(os.path.join(root, version))
+        metrics["build.open_ms"] = metric((time.perf_counter() - started) * 1000, "ms")
+        try:
+            metrics.update(bench_queries(snapshot, args.perfumes, args.queries))
+        finally:
+            snapshot.close()
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--perfumes", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time budget per scraper")
+    parser.add_argument("--output", default=os.path.join(ROOT, "data", "benchmarks", "latest.json"))
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    metrics = run_suite(args)
+    meta = run_meta(perfumes=args.perfumes, posts=args.posts, queries=args.queries, seconds=args.seconds)
+    for name, value in sorted(metrics.items()):
+        print(f"{name:<36} {value['value']:12.3f} {value['unit']}")
+    save_results(args.output, metrics, meta)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(load_results(args.baseline), {"meta": meta, "metrics": metrics}, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"❌ {name}: {before:.3f} -> {after:.3f} ({change:+.0%} worse)")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return metrics
+
+
+if __name__ == "__main__":
+    main()
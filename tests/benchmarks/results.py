@@ -0,0 +1,75 @@
+"""
+JSON benchmark results and run-to-run regression checks.
+
+A results file holds run metadata and named metrics:
+
+    {"meta": {...}, "metrics": {"search.p50_ms": {"value": 0.41, "unit": "ms", "lower_is_better": true}}}
+
+`compare` reports every metric that got worse than the baseline by more
+than a relative threshold.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+
+def metric(value, unit, lower_is_better=True):
+    return {"value": float(value), "unit": unit, "lower_is_better": lower_is_better}
+
+
+def latency_metrics(prefix, seconds):
+    """p50/p95/p99 metrics in milliseconds for a list of per-call timings."""
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000
+    return {f"{prefix}.p50_ms": metric(p50, "ms"), f"{prefix}.p95_ms": metric(p95, "ms"), f"{prefix}.p99_ms": metric(p99, "ms")}
+
+
+def run_meta(**params):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "commit": commit,
+        "python": platform.python_version(), "machine": platform.machine(), "params": params,
+    }
+
+
+def save_results(path, metrics, meta):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"meta": meta, "metrics": metrics}, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Metrics that regressed by more than `threshold` (0.2 = 20%) against `baseline`.
+
+    Metrics missing from either run, or with a zero baseline, are skipped.
+
+    Returns:
+        list: (name, baseline value, current value, relative change) tuples,
+        worst first. A positive change is always a regression.
+    """
+    regressions = []
+    for name, before in baseline["metrics"].items():
+        after = current["metrics"].get(name)
+        if after is None or not before["value"]:
+            continue
+        if before.get("lower_is_better", True):
+            change = (after["value"] - before["value"]) / abs(before["value"])
+        else:  # Throughputs compare as time per item, so halving one is a +100% regression
+            change = before["value"] / after["value"] - 1 if after["value"] else float("inf")
+        if change > threshold:
+            regressions.append((name, before["value"], after["value"], change))
+    return sorted(regressions, key=lambda r: -r[3])
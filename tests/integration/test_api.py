@@ -0,0 +1,168 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.embeddings import HashingEmbedder
+from backend.main import app
+from backend.model import AnswerCache, RAGModel, StubLLM
+from backend.snapshot import build_snapshot
+
+PERFUMES = [
+    {
+        "url": "https://example.com/perfume/Creed/Aventus-9828.html", "name": "Aventus Creed for men", "brand": "Creed",
+        "accords": [{"fruity": 100.0}, {"woody": 82.3}, {"smoky": 68.5}], "notes": ["Pineapple", "Birch"],
+        "reviews": ["Smoky pineapple opening, iconic."],
+    },
+    {
+        "url": "https://example.com/perfume/Armaf/Club-de-Nuit-Intense-Man-34696.html", "name": "Club de Nuit Intense Man Armaf for men",
+        "brand": "Armaf", "accords": [{"fruity": 95.0}, {"woody": 80.0}, {"smoky": 60.0}], "smells_like": ["Creed"],
+        "reviews": ["The best budget Aventus clone, a smoky pineapple bomb."],
+    },
+    {
+        "url": "https://example.com/perfume/Lattafa/Khamrah-75805.html", "name": "Khamrah Lattafa for women and men",
+        "brand": "Lattafa", "accords": [{"sweet": 100.0}, {"warm spicy": 90.0}], "reviews": ["Boozy dates and cinnamon."],
+    },
+]
+POSTS = [{"id": "p1", "title": "Best Aventus clone?", "selftext": "CDNIM or something else?", "comments": [{"body": "Try CDNIM"}]}]
+
+
+def publish(root, version, perfumes=PERFUMES):
+    build_snapshot(str(root), perfumes, POSTS, embedder=HashingEmbedder(64), version=version)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_ROOT", str(tmp_path))
+    publish(tmp_path, "v1")
+    app.state.model = RAGModel(StubLLM(), AnswerCache(HashingEmbedder(256), threshold=0.8))
+    with TestClient(app) as client:
+        yield client
+    del app.state.model
+
+
+def test_health(client):
+    assert client.get("/health").json() == {"status": "ok", "snapshot": "v1"}
+
+
+def test_search(client):
+    body = client.get("/search", params={"q": "smoky pineapple", "k": 3}).json()
+    assert body["snapshot"] == "v1" and len(body["results"]) == 3
+    assert "pineapple" in body["results"][0]["text"].lower()
+    assert client.get("/search", params={"q": ""}).status_code == 422
+
+
+def test_profile(client):
+    body = client.get("/profile", params={"q": "birch AND pineapple, smoky >= 60%"}).json()
+    assert body["count"] == 1 and body["perfumes"][0]["brand"] == "Creed"
+    assert client.get("/profile", params={"q": "NOT birch", "limit": 1}).json()["count"] == 2
+    assert client.get("/profile", params={"q": ","}).status_code == 422
+
+    hits = client.get("/search", params={"q": "smoky pineapple", "profile": "sweet >= 50"}).json()["results"]
+    assert hits and all("Khamrah" in hit["doc_id"] for hit in hits)
+    assert client.get("/search", params={"q": "smoky", "profile": "and"}).status_code == 422
+
+
+def test_similar(client):
+    body = client.get("/perfume/9828/similar", params={"k": 2}).json()
+    assert body["perfume"]["brand"] == "Creed"
+    assert [r["id"] for r in body["results"]] == [34696, 75805]
+
+    lattafa = client.get("/perfume/9828/similar", params=[("brands", "Lattafa"), ("metric", "overlap")]).json()
+    assert [r["brand"] for r in lattafa["results"]] == ["Lattafa"]
+    assert client.get("/perfume/1/similar").status_code == 404
+    assert client.get("/perfume/9828/similar", params={"metric": "l2"}).status_code == 422
+
+
+def test_clones(client):
+    body = client.get("/perfume/9828/clones").json()
+    assert body["perfume"]["brand"] == "Creed" and [(r["id"], r["hops"]) for r in body["results"]] == [(34696, 1)]
+    assert client.get("/perfume/75805/clones").json()["results"] == []
+    assert client.get("/perfume/1/clones").status_code == 404
+    assert client.get("/perfume/9828/clones", params={"hops": 3}).status_code == 422
+
+
+def test_ask(client):
+    response = client.post("/ask", json={"question": "What is a good Aventus clone?", "k": 3})
+    body = response.json()
+    assert response.status_code == 200 and body["snapshot"] == "v1"
+    assert body["answer"] == body["sources"][0]["text"]
+    assert app.state.model.llm.calls == 1 and body["cached"] is False
+    assert client.post("/ask", json={"question": ""}).status_code == 422
+
+    again = client.post("/ask", json={"question": "what is a good aventus clone"}).json()
+    assert again["cached"] is True and again["answer"] == body["answer"]
+    assert app.state.model.llm.calls == 1
+    metrics = client.get("/metrics").json()
+    cache = metrics["answer_cache"]
+    assert cache["exact_hits"] == 1 and cache["entries"] == 1 and cache["hit_ratio"] == 0.5
+    # Unstreamed answers arrive all at once, so they are not counted as time to first token
+    assert metrics["ask_unstreamed_latency"]["count"] == 2 and metrics["ask_ttft"]["count"] == 0
+
+
+def stream_ask(client, question, k=3):
+    with client.stream("POST", "/ask", json={"question": question, "k": k, "stream": True}) as response:
+        assert response.status_code == 200 and response.headers["content-type"].startswith("text/event-stream")
+        events = [block.split("\n", 1) for block in response.read().decode().strip().split("\n\n")]
+    return [(event.removeprefix("event: "), json.loads(data.removeprefix("data: "))) for event, data in events]
+
+
+def test_ask_stream(client):
+    events = stream_ask(client, "What is a good Aventus clone?")
+    (kind, sources), *tokens, (last, done) = events
+    assert kind == "sources" and last == "done" and {kind for kind, _ in tokens} == {"token"}
+    assert sources["cached"] is False and set(sources["retrieval"]["timings_ms"]) == {"vector", "keyword", "mentions", "accords"}
+    assert "".join(data["text"] for _, data in tokens) == sources["sources"][0]["text"]
+    assert len(tokens) > 1 and 0 < done["ttft_ms"] <= done["total_ms"]
+
+    (_, sources), *tokens, _ = stream_ask(client, "what is a good aventus clone")
+    assert sources["cached"] is True and len(tokens) == 1
+    assert app.state.model.llm.calls == 1
+    metrics = client.get("/metrics").json()
+    assert metrics["ask_ttft"]["count"] == 2 and metrics["ask_latency"]["p50_ms"] > 0
+    assert metrics["rerank"] is None  # No RERANK_MODEL configured
+
+
+def test_snapshot_swap_invalidates_changed_answers(client, tmp_path):
+    client.post("/ask", json={"question": "Khamrah dates", "k": 1})
+    client.post("/ask", json={"question": "smoky pineapple", "k": 1})
+    changed = [dict(p, reviews=["Reformulated: now mostly vanilla."]) if "Khamrah" in p["url"] else p for p in PERFUMES]
+    publish(tmp_path, "v2", changed)
+    assert app.state.snapshots.reload() is True
+    assert client.get("/metrics").json()["answer_cache"]["invalidations"] == 1
+    assert client.post("/ask", json={"question": "smoky pineapple", "k": 1}).json()["cached"] is True
+    assert client.post("/ask", json={"question": "Khamrah dates", "k": 1}).json()["cached"] is False
+
+
+def test_hot_swap(client, tmp_path):
+    publish(tmp_path, "v2", PERFUMES[:2])
+    assert app.state.snapshots.reload() is True
+    assert client.get("/health").json()["snapshot"] == "v2"
+    assert client.get("/perfume/75805/similar").status_code == 404
+
+
+def test_answer_cache_follows_snapshot_embedder(tmp_path, monkeypatch):
+    import backend.main as main
+
+    monkeypatch.setenv("SNAPSHOT_ROOT", str(tmp_path))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    publish(tmp_path, "v1")
+    with TestClient(app):
+        # The snapshot embeds with feature hashing, which has no threshold that separates paraphrases
+        assert app.state.model.cache.embedder is None
+    del app.state.model
+
+    monkeypatch.setattr(main, "ANSWER_CACHE_EMBEDDER", "hashing-32")
+    monkeypatch.setattr(main, "ANSWER_CACHE_THRESHOLD", 0.95)
+    with TestClient(app):
+        cache = app.state.model.cache
+        assert cache.embedder.name == "hashing-32" and cache.threshold == 0.95
+    del app.state.model
+
+
+def test_no_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_ROOT", str(tmp_path / "empty"))
+    with TestClient(app) as client:
+        assert client.get("/health").json() == {"status": "no_snapshot", "snapshot": None}
+        assert client.get("/search", params={"q": "oud"}).status_code == 503
+        assert client.post("/ask", json={"question": "oud", "stream": True}).status_code == 503
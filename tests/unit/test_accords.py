@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from backend.accords import AccordIndex
+from backend.db import PerfumeDB
+
+
+def perfume(name, brand, accords):
+    return {"url": f"https://example.com/perfume/{brand}/{name}.html", "name": name, "brand": brand, "accords": accords}
+
+
+AVENTUS = perfume("Aventus", "Creed", [{"fruity": 100.0}, {"woody": 82.3}, {"smoky": 68.5}])
+CDNIM = perfume("Club de Nuit Intense Man", "Armaf", [{"fruity": 95.0}, {"woody": 80.0}, {"smoky": 60.0}])
+HAWAS = perfume("Hawas", "Rasasi", [{"fresh": 100.0}, {"aquatic": 85.0}, {"fruity": 40.0}])
+KHAMRAH = perfume("Khamrah", "Lattafa", [{"sweet": 100.0}, {"warm spicy": 90.0}, {"woody": 30.0}])
+ASAD = perfume("Asad", "Lattafa", [{"fruity": 60.0}, {"woody": 70.0}, {"smoky": 40.0}, {"amber": 50.0}])
+CATALOG = [AVENTUS, CDNIM, HAWAS, KHAMRAH, ASAD]
+
+
+@pytest.fixture
+def index():
+    return AccordIndex.from_records(CATALOG)
+
+
+def urls(results):
+    return [result["url"] for result in results]
+
+
+class TestAccordIndex:
+    def test_builds_dense_matrix_over_vocabulary(self, index):
+        assert index.matrix.shape == (5, len(index.accords))
+        assert index.matrix.dtype == np.float32
+        assert index.accords == sorted(index.accords)
+        row = index.matrix[index.row_of[AVENTUS["url"]]]
+        assert row[index.column_of["woody"]] == pytest.approx(0.823)
+
+    def test_skips_records_without_accords_and_keeps_last_duplicate(self):
+        updated = dict(AVENTUS, accords=[{"citrus": 100.0}])
+        index = AccordIndex.from_records([AVENTUS, perfume("Blank", "X", []), updated])
+        assert len(index) == 1
+        assert index.accords == ["citrus"]
+
+    def test_similar_to_ranks_clone_first_and_excludes_self(self, index):
+        results = index.similar_to(AVENTUS["url"], k=3)
+        assert urls(results)[0] == CDNIM["url"]
+        assert AVENTUS["url"] not in urls(results)
+        scores = [result["score"] for result in results]
+        assert scores == sorted(scores, reverse=True)
+        assert scores[0] > 0.99
+
+    @pytest.mark.parametrize("metric", ["cosine", "overlap"])
+    def test_brand_filter_is_case_insensitive(self, index, metric):
+        results = index.similar_to(AVENTUS["url"], k=10, brands=["lattafa"], metric=metric)
+        assert urls(results) == [ASAD["url"], KHAMRAH["url"]]
+
+    def test_unknown_brand_returns_nothing(self, index):
+        assert index.similar_to(AVENTUS["url"], brands=["Nope"]) == []
+
+    def test_search_by_profile(self, index):
+        results = index.search({"Sweet": 90, "warm spicy": 80, "unknown": 100}, k=1)
+        assert urls(results) == [KHAMRAH["url"]]
+        assert index.search({"unknown": 50}, k=2)[0]["score"] == 0.0
+
+    def test_overlap_penalises_extra_accords(self, index):
+        results = index.search({"fruity": 100, "woody": 82.3, "smoky": 68.5}, k=5, metric="overlap")
+        assert results[0]["url"] == AVENTUS["url"]
+        assert results[0]["score"] == pytest.approx(1.0)
+        assert urls(results).index(CDNIM["url"]) < urls(results).index(ASAD["url"])
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        vocabulary = [f"accord-{i}" for i in range(30)]
+        records = [
+            perfume(f"P{i}", f"B{i % 7}", [{a: float(rng.integers(1, 100))} for a in rng.choice(vocabulary, 6, replace=False)])
+            for i in range(500)
+        ]
+        index = AccordIndex.from_records(records)
+        results = index.similar_to(records[0]["url"], k=10)
+        unit = index.matrix / np.linalg.norm(index.matrix, axis=1, keepdims=True)
+        scores = unit @ unit[0]
+        scores[0] = -np.inf
+        assert [index.row_of[url] for url in urls(results)] == list(np.argsort(-scores, kind="stable")[:10])
+
+    def test_errors(self, index):
+        with pytest.raises(KeyError):
+            index.similar_to("https://example.com/missing.html")
+        with pytest.raises(ValueError):
+            index.search({"woody": 50}, metric="euclidean")
+        assert index.search({"woody": 50}, k=0) == []
+
+    def test_save_and_load_memory_mapped(self, index, tmp_path):
+        index.save(str(tmp_path))
+        loaded = AccordIndex.load(str(tmp_path))
+        assert isinstance(loaded.matrix, np.memmap)
+        assert loaded.accords == index.accords
+        assert loaded.similar_to(AVENTUS["url"], k=3) == index.similar_to(AVENTUS["url"], k=3)
+
+    def test_from_db(self, tmp_path):
+        with PerfumeDB(str(tmp_path / "perfumes.sqlite3")) as db:
+            db.load_perfumes([dict(record, notes=[], reviews=[]) for record in CATALOG])
+            index = AccordIndex.from_db(db)
+        assert len(index) == len(CATALOG)
+        assert urls(index.similar_to(AVENTUS["url"], k=1)) == [CDNIM["url"]]
+        assert index.brands[index.row_of[AVENTUS["url"]]] == "Creed"
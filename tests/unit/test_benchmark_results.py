@@ -0,0 +1,47 @@
+import pytest
+
+from tests.benchmarks.results import compare, metric
+
+
+def run(**metrics):
+    return {"meta": {}, "metrics": metrics}
+
+
+class TestCompare:
+    def test_latency_regressions_worst_first(self):
+        baseline = run(**{"search.p50_ms": metric(10, "ms"), "search.p99_ms": metric(20, "ms"), "ask.p50_ms": metric(5, "ms")})
+        current = run(**{"search.p50_ms": metric(15, "ms"), "search.p99_ms": metric(22, "ms"), "ask.p50_ms": metric(10, "ms")})
+        assert compare(baseline, current) == [("ask.p50_ms", 5.0, 10.0, 1.0), ("search.p50_ms", 10.0, 15.0, 0.5)]
+        # Getting faster is never reported, however large the change
+        assert compare(current, baseline) == []
+
+    def test_threshold_is_exclusive(self):
+        baseline, current = run(x=metric(10, "ms")), run(x=metric(12, "ms"))
+        assert compare(baseline, current, threshold=0.2) == []
+        assert [name for name, *_ in compare(baseline, current, threshold=0.1)] == ["x"]
+
+    def test_throughput_is_inverted(self):
+        baseline = run(qps=metric(100, "1/s", lower_is_better=False))
+        # Halving a throughput doubles the time per item: a +100% regression
+        assert compare(baseline, run(qps=metric(50, "1/s", lower_is_better=False))) == [("qps", 100.0, 50.0, pytest.approx(1.0))]
+        assert compare(baseline, run(qps=metric(200, "1/s", lower_is_better=False))) == []
+        assert compare(baseline, run(qps=metric(90, "1/s", lower_is_better=False))) == []
+
+    def test_throughput_dropping_to_zero(self):
+        baseline = run(qps=metric(100, "1/s", lower_is_better=False))
+        assert compare(baseline, run(qps=metric(0, "1/s", lower_is_better=False))) == [("qps", 100.0, 0.0, float("inf"))]
+
+    def test_missing_metrics_are_skipped(self):
+        baseline = run(old=metric(1, "ms"), kept=metric(1, "ms"))
+        current = run(kept=metric(3, "ms"), new=metric(1000, "ms"))
+        assert [name for name, *_ in compare(baseline, current)] == ["kept"]
+        assert compare(run(), current) == [] and compare(baseline, run()) == []
+
+    def test_zero_baselines_are_skipped(self):
+        baseline = run(errors=metric(0, "count"), qps=metric(0, "1/s", lower_is_better=False))
+        current = run(errors=metric(5, "count"), qps=metric(0, "1/s", lower_is_better=False))
+        assert compare(baseline, current) == []
+
+    def test_metrics_default_to_lower_is_better(self):
+        baseline = run(x={"value": 1.0, "unit": "ms"})
+        assert compare(baseline, run(x={"value": 2.0, "unit": "ms"})) == [("x", 1.0, 2.0, 1.0)]
@@ -0,0 +1,87 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from backend.catalog import Catalog, CatalogWriter, build_catalog, perfume_id, write_catalog
+
+AVENTUS = {
+    "url": "https://example.com/perfume/Creed/Aventus-9828.html", "name": "Aventus Creed for men", "brand": "Creed",
+    "photo_url": "https://example.com/img/9828.jpg", "accords": [{"fruity": 100.0}, {"woody": 82.3}, {"smoky": 68.5}],
+    "notes": ["Pineapple", "Birch", "Musk"], "smells_like": ["Club de Nuit Intense Man"], "pros": ["Compliment magnet"],
+    "cons": [], "reviews": ["Smoky pineapple opening, iconic.", "Batch variation is real."],
+}
+CDNIM = {
+    "url": "https://example.com/perfume/Armaf/Club-de-Nuit-Intense-Man-34696.html", "name": "Club de Nuit Intense Man",
+    "brand": "Armaf", "accords": [{"fruity": 95.0}, {"woody": 80.0}], "notes": ["Pineapple", "Birch", "Lemon"],
+}
+NO_ID = {"url": "https://example.com/perfume/Unknown/Mystery.html", "name": "Mystery", "brand": "Unknown"}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    assert write_catalog([AVENTUS, CDNIM, NO_ID], str(tmp_path)) == 3
+    return Catalog(str(tmp_path))
+
+
+def test_perfume_id():
+    assert perfume_id(AVENTUS["url"]) == 9828
+    assert perfume_id(NO_ID["url"]) is None and perfume_id(None) is None
+
+
+class TestCatalog:
+    def test_round_trips_records(self, catalog):
+        assert len(catalog) == 3
+        assert catalog[0].as_dict() == AVENTUS
+        cdnim = catalog[1].as_dict()
+        assert cdnim["accords"] == CDNIM["accords"] and cdnim["notes"] == CDNIM["notes"]
+        assert cdnim["photo_url"] is None and cdnim["reviews"] is None  # None stays None, [] stays []
+        assert catalog[0].cons == [] and catalog[-1].name == "Mystery"
+        with pytest.raises(IndexError):
+            catalog[3]
+        with pytest.raises(AttributeError):
+            catalog[0].price
+
+    def test_interns_strings_and_memory_maps_columns(self, catalog, tmp_path):
+        blob = bytes(catalog._blob)
+        assert blob.count(b"Pineapple") == 1 and blob.count(b"woody") == 1
+        assert blob.count(b"Club de Nuit Intense Man") == 1  # Name of one perfume, smells_like of another
+        assert isinstance(catalog._blob, np.memmap) and catalog._accords[2].dtype == np.float32
+        assert not isinstance(Catalog(str(tmp_path), mmap=False)._blob, np.memmap)
+
+    def test_lookups(self, catalog):
+        assert catalog.get(CDNIM["url"]).row == 1 and CDNIM["url"] in catalog
+        assert catalog.get("https://example.com/perfume/Creed/Nope-1.html") is None
+        assert catalog.by_id(9828) == catalog[0] and catalog.by_id(34696).brand == "Armaf"
+        assert catalog.by_id(1) is None and catalog.by_id(10 ** 9) is None
+        assert catalog.get(NO_ID["url"]).id is None
+        assert list(catalog.records()) == [{key: p[key] for key in ("url", "name", "brand")} for p in (AVENTUS, CDNIM, NO_ID)]
+
+    def test_materializes_perfume_model(self, catalog):
+        perfume = catalog[0].to_model()
+        assert perfume.name == "Aventus Creed for men" and perfume.accords[1] == {"woody": 82.3}
+        assert repr(catalog[0]) == f"PerfumeView({AVENTUS['url']!r})"
+
+    def test_empty_catalog(self, tmp_path):
+        CatalogWriter(str(tmp_path)).close()
+        catalog = Catalog(str(tmp_path))
+        assert len(catalog) == 0 and list(catalog) == [] and catalog.by_id(1) is None and catalog.get("x") is None
+
+    def test_rejects_unknown_format(self, catalog, tmp_path):
+        (tmp_path / "meta.json").write_text(json.dumps(dict(catalog.meta, format=99)))
+        with pytest.raises(ValueError):
+            Catalog(str(tmp_path))
+
+
+def test_build_catalog_replaces_previous(tmp_path):
+    perfumes = tmp_path / "perfumes.jsonl"
+    perfumes.write_text("\n".join(json.dumps(p) for p in (AVENTUS, CDNIM)) + "\n")
+    out = tmp_path / "catalog"
+    build_catalog(str(tmp_path / "missing.json"), str(out))
+    assert len(Catalog(str(out))) == 0
+    assert build_catalog(str(perfumes), str(out)) == 2
+    catalog = Catalog(str(out))
+    assert catalog.by_id(34696).name == CDNIM["name"]
+    assert catalog.directory == str(out / (out / "CURRENT").read_text())
+    assert sorted(name for name in os.listdir(out) if not name.startswith("v")) == ["CURRENT"]  # No staging left
@@ -0,0 +1,84 @@
+import numpy as np
+
+from backend.accords import AccordIndex
+from backend.clones import (
+    INFERRED_SMELLS_LIKE_WEIGHT, MAX_NEIGHBOURHOOD, SMELLS_LIKE_WEIGHT, CloneGraph, clone_claims, resolve_smells_like,
+)
+from backend.linking import PerfumeLinker
+
+AVENTUS = "https://example.com/perfume/Creed/Aventus-9828.html"
+CDNIM = "https://example.com/perfume/Armaf/Club-de-Nuit-Intense-Man-34696.html"
+EXPLORER = "https://example.com/perfume/Montblanc/Explorer-47124.html"
+KHAMRAH = "https://example.com/perfume/Lattafa/Khamrah-75805.html"
+PERFUMES = [
+    {"url": AVENTUS, "name": "Aventus Creed for men", "brand": "Creed", "accords": [{"fruity": 100.0}, {"smoky": 70.0}]},
+    {
+        "url": CDNIM, "name": "Club de Nuit Intense Man Armaf for men", "brand": "Armaf",
+        "accords": [{"fruity": 95.0}, {"smoky": 60.0}], "smells_like": ["Aventus Creed for men"],
+    },
+    {
+        "url": EXPLORER, "name": "Explorer Montblanc for men", "brand": "Montblanc",
+        "accords": [{"woody": 100.0}, {"smoky": 40.0}], "smells_like": ["Armaf", "Unknown House"],
+    },
+    {"url": KHAMRAH, "name": "Khamrah Lattafa for women and men", "brand": "Lattafa", "accords": [{"sweet": 100.0}]},
+]
+
+
+def test_clone_claims():
+    linker = PerfumeLinker(PERFUMES)
+    posts = [{
+        "title": "Explorer Montblanc is basically a dupe of Creed Aventus. Khamrah is great",
+        "selftext": "Club de Nuit Intense Man is a clone of Aventus",  # Short name without the brand: not linked
+        "comments": [{"body": "Aventus is a clone of nothing"}, {"body": None}],
+    }]
+    assert list(clone_claims(posts, linker)) == [(EXPLORER, AVENTUS)]
+    posts = [{"title": "Explorer Montblanc = a cheap copy of Creed Aventus", "comments": []}]
+    assert list(clone_claims(posts, linker)) == [(EXPLORER, AVENTUS)]
+
+
+def test_resolve_named_smells_like():
+    linker, accords = PerfumeLinker(PERFUMES), AccordIndex.from_records(PERFUMES)
+    assert resolve_smells_like("Aventus Creed for men", CDNIM, linker) == (AVENTUS, SMELLS_LIKE_WEIGHT)
+    assert resolve_smells_like("Aventus Creed for men", CDNIM, linker, accords) == (AVENTUS, SMELLS_LIKE_WEIGHT)
+
+
+def test_resolve_brand_only_smells_like():
+    linker, accords = PerfumeLinker(PERFUMES), AccordIndex.from_records(PERFUMES)
+    # A brand-only carousel entry resolves to the brand's accord-closest perfume, as a weaker guess
+    assert resolve_smells_like("Armaf", EXPLORER, linker, accords) == (CDNIM, INFERRED_SMELLS_LIKE_WEIGHT)
+    assert INFERRED_SMELLS_LIKE_WEIGHT < SMELLS_LIKE_WEIGHT
+    assert resolve_smells_like("Armaf", EXPLORER, linker) is None
+    assert resolve_smells_like("Unknown House", EXPLORER, linker, accords) is None
+
+
+class TestCloneGraph:
+    def test_build_from_smells_like_and_claims(self):
+        graph = CloneGraph.build(PERFUMES, PerfumeLinker(PERFUMES), AccordIndex.from_records(PERFUMES), [(KHAMRAH, AVENTUS)])
+        assert len(graph) == 4 and graph.edges == 3
+        assert graph.indptr.tolist() == [0, 2, 4, 5, 6] and graph.indices.dtype == np.int32
+        rows, hops = graph.neighbours(0, hops=1)
+        assert rows.tolist() == [1, 3] and graph.weights[:2].tolist() == [1.0, 0.5]  # smells_like outweighs a claim
+        rows, hops = graph.neighbours(2)  # Explorer -> CDNIM -> Aventus -> Khamrah is three hops
+        assert rows.tolist() == [1, 0] and hops.tolist() == [1, 2]
+        # Explorer's only edge comes from the brand-only "Armaf" entry
+        assert graph.weights[graph.indptr[2]:graph.indptr[3]].tolist() == [INFERRED_SMELLS_LIKE_WEIGHT]
+        assert np.argmax(graph.centrality) in (0, 1) and abs(graph.centrality.sum() - 1) < 1e-5
+
+    def test_merges_parallel_edges_and_drops_self_loops(self):
+        graph = CloneGraph.from_edges(3, [(0, 1, 1.0), (1, 0, 0.5), (2, 2, 1.0)])
+        assert graph.edges == 1 and graph.weights.tolist() == [1.5, 1.5]
+        assert graph.neighbours(2)[0].tolist() == [] and len(CloneGraph.from_edges(0, [])) == 0
+
+    def test_caps_hub_neighbourhoods(self):
+        graph = CloneGraph.from_edges(MAX_NEIGHBOURHOOD + 20, [(0, i, 1.0) for i in range(1, MAX_NEIGHBOURHOOD + 20)])
+        assert len(graph.neighbours(0)[0]) == MAX_NEIGHBOURHOOD and len(graph.neighbours(0, hops=1)[0]) == MAX_NEIGHBOURHOOD
+        rows, hops = graph.neighbours(5)
+        assert rows[0] == 0 and set(hops[1:].tolist()) == {2} and 5 not in rows.tolist()
+        # Two-hop neighbours only come from the hub's kept direct neighbours
+        assert set(rows[1:].tolist()) <= set(graph.neighbours(0, hops=1)[0].tolist())
+
+    def test_save_and_load(self, tmp_path):
+        graph = CloneGraph.from_edges(3, [(0, 1, 1.0), (1, 2, 1.0)])
+        graph.save(str(tmp_path))
+        loaded = CloneGraph.load(str(tmp_path))
+        assert isinstance(loaded.hop_indices, np.memmap) and loaded.neighbours(0)[0].tolist() == [1, 2]
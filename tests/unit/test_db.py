@@ -0,0 +1,147 @@
+import json
+import time
+
+import pytest
+
+from backend.db import PerfumeDB, build_database, iter_json_records
+
+
+def perfume(i, brand="Lattafa", accords=None, notes=None, **extra):
+    return {
+        "url": f"https://example.com/perfume/{brand}/Perfume-{i}.html",
+        "name": f"Perfume {i}",
+        "brand": brand,
+        "photo_url": f"https://img.example.com/{i}.jpg",
+        "accords": accords if accords is not None else [{"woody": 80.0}, {"oud": 10.0 * (i % 10)}],
+        "notes": notes if notes is not None else ["Bergamot", "Oud", "Vanilla"],
+        "smells_like": ["Aventus Creed for men"],
+        "pros": ["Long lasting"],
+        "cons": ["Synthetic"],
+        "reviews": [f"Review of perfume {i}"],
+        **extra,
+    }
+
+
+AVENTUS = {
+    "url": "https://example.com/perfume/Creed/Aventus-9828.html",
+    "name": "Aventus Creed for men",
+    "brand": "Creed",
+    "photo_url": None,
+    "accords": [{"fruity": 100.0}, {"woody": 82.3}, {"smoky": 68.5}],
+    "notes": ["Pineapple", "Bergamot", "Birch", "Musk"],
+    "smells_like": ["Club de Nuit Intense Man"],
+    "pros": ["Compliment magnet", "Versatile"],
+    "cons": ["Very expensive"],
+    "reviews": ["Smoky pineapple opening."],
+}
+
+
+@pytest.fixture
+def db():
+    with PerfumeDB(":memory:") as store:
+        store.load_perfumes([AVENTUS] + [perfume(i) for i in range(20)])
+        yield store
+
+
+class TestLoadPerfumes:
+    def test_round_trips_record_layout(self, db):
+        assert db.get_perfume(AVENTUS["url"]) == AVENTUS
+        assert db.get_perfume("https://example.com/missing") is None
+
+    def test_lookup_tables_are_shared(self, db):
+        counts = db.counts()
+        assert counts["perfumes"] == 21
+        assert counts["brands"] == 2
+        assert counts["accords"] == 4  # fruity, woody, smoky, oud
+        assert counts["notes"] == 6
+
+    def test_reload_replaces_children_and_keeps_id(self, db):
+        before = db.perfumes_by_brand("creed")[0]["id"]
+        updated = {**AVENTUS, "notes": ["Pineapple"], "reviews": [], "accords": [{"fruity": 95.0}]}
+        db.load_perfumes([AVENTUS, updated])  # Last record for a URL wins
+
+        stored = db.get_perfume(AVENTUS["url"])
+        assert stored["notes"] == ["Pineapple"] and stored["reviews"] == []
+        assert stored["accords"] == [{"fruity": 95.0}]
+        assert db.perfumes_by_brand("Creed")[0]["id"] == before
+        assert db.counts()["perfumes"] == 21
+
+    def test_smells_like_links_known_perfumes(self, db):
+        links = db.smells_like(perfume(3)["url"])
+        assert links == [{"similar_name": "Aventus Creed for men", "similar_id": 1, "similar_url": AVENTUS["url"]}]
+        assert db.smells_like(AVENTUS["url"])[0]["similar_id"] is None
+
+    def test_smells_like_resolves_scraped_text(self, db):
+        # The carousel yields brand spans, not exact catalog names
+        db.load_perfumes([perfume(30, smells_like=["Creed Aventus", "Armaf", "Perfume 30"])])
+        links = [(s["similar_name"], s["similar_id"]) for s in db.smells_like(perfume(30)["url"])]
+        assert links == [("Creed Aventus", 1), ("Armaf", None), ("Perfume 30", None)]
+
+    def test_skips_records_without_url(self, db):
+        assert db.load_perfumes([{"name": "No URL"}]) == 0
+
+
+class TestQueries:
+    def test_by_brand_and_note(self, db):
+        assert len(db.perfumes_by_brand("LATTAFA")) == 20
+        assert [p["name"] for p in db.perfumes_with_note("pineapple")] == ["Aventus Creed for men"]
+        assert len(db.perfumes_with_note("Bergamot")) == 21
+
+    def test_accord_threshold_strongest_first(self, db):
+        rows = db.perfumes_with_accord("oud", 40)
+        assert [row["strength"] for row in rows] == [90.0, 90.0, 80.0, 80.0, 70.0, 70.0, 60.0, 60.0, 50.0, 50.0, 40.0, 40.0]
+        assert len(db.perfumes_with_accord("oud", 40, limit=3)) == 3
+
+    @pytest.mark.parametrize("sql, params, index", [
+        ("SELECT perfume_id FROM perfume_accords WHERE accord_id = ? AND strength >= ?", (1, 40), "idx_perfume_accords_strength"),
+        ("SELECT perfume_id FROM perfume_notes WHERE note_id = ?", (1,), "idx_perfume_notes_note"),
+        ("SELECT id FROM perfumes WHERE brand_id = ?", (1,), "idx_perfumes_brand"),
+    ])
+    def test_clone_finder_lookups_use_indexes(self, db, sql, params, index):
+        plan = " ".join(row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        assert index in plan and "SCAN" not in plan
+
+
+class TestRedditAndFiles:
+    def test_reddit_posts_and_comments(self, db):
+        posts = [
+            {"id": "p1", "title": "Aventus clone?", "url": "u1", "subreddit": "fragranceclones", "created_utc": 100,
+             "score": 5, "num_comments": 2, "comments": [{"author": "a", "body": "CDNIM", "score": 3}, {"author": "b", "body": "Rasasi", "score": 1}]},
+            {"id": "p2", "title": "Older", "url": "u2", "subreddit": "fragranceclones", "created_utc": 50, "comments": []},
+        ]
+        assert db.load_reddit_posts(posts) == 2
+        assert [p["id"] for p in db.reddit_posts("FragranceClones")] == ["p1", "p2"]
+        assert [p["id"] for p in db.reddit_posts("fragranceclones", since=60)] == ["p1"]
+        assert [c["body"] for c in db.reddit_comments("p1")] == ["CDNIM", "Rasasi"]
+
+        posts[0]["comments"] = [{"author": "c", "body": "Edited", "score": 1}]
+        db.load_reddit_posts(posts[:1])
+        assert [c["body"] for c in db.reddit_comments("p1")] == ["Edited"]
+
+    def test_build_database_from_scraped_files(self, tmp_path):
+        perfumes_path = tmp_path / "website_all_perfumes.json"
+        perfumes_path.write_text(json.dumps([AVENTUS, perfume(1)]))
+        reddit_path = tmp_path / "reddit.ndjson"
+        reddit_path.write_text(
+            json.dumps({"id": "p1", "title": "t", "url": "u", "subreddit": "fragrance", "comments": []}) + "\n" + '{"id": "torn'
+        )
+        assert list(iter_json_records(str(tmp_path / "missing.json"))) == []
+
+        counts = build_database(str(tmp_path / "db.sqlite3"), str(perfumes_path), str(reddit_path))
+        assert counts["perfumes"] == 2 and counts["reddit_posts"] == 1
+
+        with PerfumeDB(str(tmp_path / "db.sqlite3")) as db:
+            assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_bulk_load_is_fast(self, tmp_path):
+        brands = [f"Brand {b}" for b in range(50)]
+        records = (
+            perfume(i, brand=brands[i % 50], notes=[f"Note {(i + k) % 300}" for k in range(12)],
+                    accords=[{f"accord {(i + k) % 40}": 100.0 - 10 * k} for k in range(6)])
+            for i in range(20_000)
+        )
+        with PerfumeDB(str(tmp_path / "bulk.sqlite3")) as db:
+            started = time.perf_counter()
+            assert db.load_perfumes(records) == 20_000
+            assert time.perf_counter() - started < 20
+            assert db.counts()["notes"] == 300
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from backend.embeddings import (
+    Embedder,
+    EmbeddingCache,
+    EmbeddingPipeline,
+    HashingEmbedder,
+    OpenAIEmbedder,
+    chunk_documents,
+    chunk_text,
+    perfume_documents,
+    reddit_documents,
+)
+from backend.retrieval import VectorIndex
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self, dim=32):
+        super().__init__(dim)
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return super().embed(texts)
+
+
+class TestChunking:
+    def test_short_text_is_one_chunk(self):
+        assert chunk_text("  smoky   pineapple  ") == ["smoky pineapple"]
+        assert chunk_text("   ") == []
+
+    def test_long_text_windows_overlap(self):
+        words = [f"w{i}" for i in range(250)]
+        chunks = chunk_text(" ".join(words), max_words=100, overlap=10)
+        assert [len(c.split()) for c in chunks] == [100, 100, 70]
+        assert chunks[1].split()[0] == "w90" and chunks[-1].split()[-1] == "w249"
+
+    def test_documents_from_scraped_records(self):
+        perfume = {
+            "url": "u", "name": "Aventus", "brand": "Creed", "notes": ["Pineapple", "Birch"],
+            "pros": ["Versatile"], "cons": [], "reviews": ["Great", "Pricey"],
+        }
+        docs = dict(perfume_documents(perfume))
+        assert list(docs) == ["u#notes", "u#pros", "u#review-0", "u#review-1"]
+        assert docs["u#notes"] == "Aventus by Creed. Notes: Pineapple, Birch"
+
+        post = {"id": "p1", "title": "Dupe?", "selftext": "", "comments": [{"body": "CDNIM"}, {"body": None}]}
+        assert list(reddit_documents(post)) == [("reddit:p1", "Dupe?"), ("reddit:p1#comment-0", "CDNIM")]
+        assert [c.chunk_id for c in chunk_documents(reddit_documents(post))] == ["reddit:p1:0", "reddit:p1#comment-0:0"]
+
+
+class TestHashingEmbedder:
+    def test_deterministic_and_normalized(self):
+        a = HashingEmbedder(64).embed(["smoky pineapple birch", ""])
+        b = HashingEmbedder(64).embed(["smoky pineapple birch", ""])
+        assert np.array_equal(a, b)
+        assert np.linalg.norm(a[0]) == pytest.approx(1.0) and not a[1].any()
+
+    def test_shared_vocabulary_is_closer(self):
+        vectors = HashingEmbedder(256).embed(["creed aventus dupe", "aventus dupe from armaf", "vanilla gourmand"])
+        assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+    def test_embedder_is_abstract(self):
+        with pytest.raises(TypeError):
+            Embedder()
+
+
+class TestEmbeddingPipeline:
+    def test_dedupes_and_batches(self):
+        embedder = CountingEmbedder()
+        pipeline = EmbeddingPipeline(embedder, batch_size=2)
+        texts = ["same", "same", "other", "third", "same", "fourth"]
+        vectors = pipeline.embed_texts(texts)
+
+        assert vectors.shape == (6, 32)
+        assert np.array_equal(vectors[0], vectors[4])
+        assert [len(call) for call in embedder.calls] == [2, 2]
+        assert pipeline.stats.as_dict() == {"requested": 6, "unique": 4, "cached": 0, "embedded": 4, "batches": 2}
+        assert pipeline.embed_texts([]).shape == (0, 32)
+
+    def test_cache_makes_reruns_embed_only_changes(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite3")
+        first = CountingEmbedder()
+        EmbeddingPipeline(first, EmbeddingCache(path)).embed_texts(["a", "b", "c"])
+
+        second = CountingEmbedder()
+        cache = EmbeddingCache(path)
+        pipeline = EmbeddingPipeline(second, cache)
+        vectors = pipeline.embed_texts(["a", "b", "c", "d"])
+        assert second.calls == [["d"]]
+        assert pipeline.stats.cached == 3 and len(cache) == 4
+        assert np.allclose(vectors, HashingEmbedder(32).embed(["a", "b", "c", "d"]))
+
+        # Another model never reuses these vectors
+        other = CountingEmbedder(dim=16)
+        EmbeddingPipeline(other, cache).embed_texts(["a"])
+        assert other.calls == [["a"]]
+
+    def test_cache_lookup_spans_parameter_batches(self):
+        cache = EmbeddingCache(":memory:")
+        pipeline = EmbeddingPipeline(CountingEmbedder(8), cache, batch_size=256)
+        texts = [f"text {i}" for i in range(1200)]
+        pipeline.embed_texts(texts)
+        rerun = EmbeddingPipeline(CountingEmbedder(8), cache)
+        rerun.embed_texts(texts)
+        assert rerun.stats.cached == 1200 and rerun.stats.embedded == 0
+
+    def test_index_documents(self):
+        pipeline = EmbeddingPipeline(HashingEmbedder(64), max_words=5, overlap=1)
+        index = VectorIndex(64)
+        docs = [("d1", "creed aventus smoky pineapple birch musk oakmoss"), ("d2", "vanilla tonka gourmand")]
+        assert pipeline.index_documents(index, docs, chunk_size=2) == 3
+        query = pipeline.embed_texts(["smoky pineapple"])[0]
+        assert index.search(query, k=1)[0][0][0] == "d1:0"
+
+        chunks, vectors = pipeline.embed_documents(docs)
+        assert [c.chunk_id for c in chunks] == ["d1:0", "d1:1", "d2:0"] and vectors.shape == (3, 64)
+
+
+def test_openai_embedder_uses_client(mocker):
+    client = mocker.Mock()
+    client.embeddings.create.return_value = mocker.Mock(data=[mocker.Mock(embedding=[0.1, 0.2])])
+    embedder = OpenAIEmbedder("text-embedding-3-small", client=client)
+    assert embedder.name == "openai:text-embedding-3-small" and embedder.dim == 1536
+    assert embedder.embed(["hi"]).tolist() == [[pytest.approx(0.1), pytest.approx(0.2)]]
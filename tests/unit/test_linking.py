@@ -0,0 +1,112 @@
+import pytest
+
+from backend.linking import AhoCorasick, MentionIndex, PerfumeLinker, normalize, perfume_aliases
+
+AVENTUS = {"url": "https://example.com/perfume/Creed/Aventus-9828.html", "name": "Aventus Creed for men", "brand": "Creed"}
+AVENTUS_HER = {"url": "https://example.com/perfume/Creed/Aventus-for-Her-14337.html", "name": "Aventus for Her Creed for women", "brand": "Creed"}
+CDNIM = {
+    "url": "https://example.com/perfume/Armaf/Club-de-Nuit-Intense-Man-34696.html",
+    "name": "Club de Nuit Intense Man Armaf for men", "brand": "Armaf",
+}
+OUD = {"url": "https://example.com/perfume/Lattafa/Oud-1.html", "name": "Oud Lattafa for women and men", "brand": "Lattafa"}
+ORIGINAL_ITALIAN = {"url": "https://example.com/perfume/MFK/OV-1.html", "name": "Oud Satin Mood Maison Francis Kurkdjian for women and men", "brand": "Maison Francis Kurkdjian"}
+CATALOG = [AVENTUS, AVENTUS_HER, CDNIM, OUD, ORIGINAL_ITALIAN]
+
+
+def post(post_id, title, selftext="", comments=(), num_comments=None):
+    comments = [{"body": body} for body in comments]
+    return {
+        "id": post_id, "title": title, "selftext": selftext, "url": f"https://reddit.com/{post_id}", "subreddit": "fragrance",
+        "comments": comments, "num_comments": len(comments) if num_comments is None else num_comments,
+    }
+
+
+@pytest.fixture
+def linker():
+    return PerfumeLinker(CATALOG, aliases={CDNIM["url"]: ["CDNIM"]})
+
+
+class TestAliases:
+    def test_normalize(self):
+        assert normalize("  Club  de Nuit — Intense MAN!") == "club de nuit intense man"
+        assert normalize("Hermès Terre d'Hermès") == "hermes terre dhermes"
+
+    def test_perfume_aliases(self):
+        full, short = perfume_aliases("Aventus Creed for men", "Creed")
+        assert {"aventus creed for men", "aventus creed", "creed aventus"} <= full
+        assert short == {"aventus"}
+        assert perfume_aliases("Oud Lattafa for women and men", "Lattafa")[1] == set()
+
+
+class TestAhoCorasick:
+    def test_finds_overlapping_patterns_on_token_boundaries(self):
+        matcher = AhoCorasick()
+        ids = {p: matcher.add(p) for p in ["he", "she", "his", "hers", "a b c", "b c d"]}
+        assert matcher.add("she") == ids["she"]
+        found = matcher.find("ushers ushe she hers a b c d".split())
+        assert [(start, stop, matcher.patterns[i]) for start, stop, i in found] == [
+            (2, 3, "she"), (3, 4, "hers"), (4, 7, "a b c"), (5, 8, "b c d"),
+        ]
+        assert matcher.find("sheer".split()) == []
+
+    def test_rebuilds_after_add(self):
+        matcher = AhoCorasick()
+        matcher.add("rose")
+        assert matcher.find(["rose"]) == [(0, 1, 0)]
+        matcher.add("rose oud")
+        assert matcher.find(["rose", "oud"]) == [(0, 1, 0), (0, 2, 1)]
+
+
+class TestPerfumeLinker:
+    def test_full_aliases_link_on_their_own(self, linker):
+        assert set(linker.link("Is Creed Aventus worth it?")) == {AVENTUS["url"]}
+        assert set(linker.link("cdnim batch 20B is great")) == {CDNIM["url"]}
+        assert set(linker.link("Club de Nuit Intense Man smells like...")) == {CDNIM["url"]}
+
+    def test_short_names_need_the_brand(self, linker):
+        assert linker.link("Aventus is overrated") == {}
+        assert set(linker.link("Aventus is overrated, Creed prices too")) == {AVENTUS["url"]}
+        assert set(linker.link("Oud Satin Mood by MFK")) == {ORIGINAL_ITALIAN["url"]}
+        assert linker.link("I love oud from Lattafa") == {}  # "Oud" is too short to link alone
+
+    def test_longer_names_are_distinct(self, linker):
+        links = linker.link("Creed Aventus for Her vs Aventus Creed")
+        assert set(links) == {AVENTUS["url"], AVENTUS_HER["url"]}
+        assert links[AVENTUS_HER["url"]] == "creed aventus for her"
+        assert set(linker.link("Aventus for Her by Creed")) == {AVENTUS_HER["url"]}
+
+    def test_fingerprint_tracks_catalog(self, linker):
+        assert PerfumeLinker(CATALOG, aliases={CDNIM["url"]: ["CDNIM"]}).fingerprint == linker.fingerprint
+        assert PerfumeLinker(CATALOG).fingerprint != linker.fingerprint
+
+
+class TestMentionIndex:
+    def test_update_and_lookup(self, linker, tmp_path):
+        posts = [
+            post("p1", "Best Creed Aventus dupe?", comments=["CDNIM for sure", "Nothing beats Aventus by Creed"]),
+            post("p2", "Vanilla recommendations", comments=["Try something sweet"]),
+        ]
+        with MentionIndex(str(tmp_path / "mentions.sqlite3")) as index:
+            counts = index.update(linker, posts)
+            assert counts == {"linked": 2, "skipped": 0, "mentions": 3}
+            assert [m["doc_id"] for m in index.mentions(AVENTUS["url"])] == ["reddit:p1", "reddit:p1#comment-1"]
+            assert index.mentions(CDNIM["url"]) == [{"doc_id": "reddit:p1#comment-0", "post_id": "p1", "alias": "cdnim"}]
+            assert len(index.mentions(AVENTUS["url"], limit=1)) == 1
+            assert index.mention_counts([AVENTUS["url"], OUD["url"]]) == {AVENTUS["url"]: 2, OUD["url"]: 0}
+
+        # Reopened: unchanged posts are skipped, posts with new comments are relinked
+        with MentionIndex(str(tmp_path / "mentions.sqlite3")) as index:
+            posts[1] = post("p2", "Vanilla recommendations", comments=["Try something sweet", "Aventus for Her by Creed"])
+            assert index.update(linker, posts) == {"linked": 1, "skipped": 1, "mentions": 1}
+            assert [m["post_id"] for m in index.mentions(AVENTUS_HER["url"])] == ["p2"]
+
+    def test_catalog_change_relinks_everything(self, linker):
+        index = MentionIndex(":memory:")
+        posts = [post("p1", "Creed Aventus or Armaf Club de Nuit Intense Man")]
+        index.update(linker, posts)
+        assert index.update(linker, posts)["skipped"] == 1
+
+        smaller = PerfumeLinker([AVENTUS])
+        assert index.update(smaller, posts) == {"linked": 1, "skipped": 0, "mentions": 1}
+        assert index.mentions(CDNIM["url"]) == []
+        index.close()
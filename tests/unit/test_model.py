@@ -0,0 +1,159 @@
+import pytest
+
+from backend.embeddings import HashingEmbedder, OpenAIEmbedder
+from backend.model import (
+    LLM, SEMANTIC_THRESHOLDS, SYSTEM_PROMPT, AnswerCache, LatencyStats, OpenAIChatLLM, RAGModel, StubLLM, build_prompt, get_llm, normalize_query,
+)
+
+PASSAGES = [{"doc_id": "a", "text": "CDNIM is the classic Aventus clone."}, {"doc_id": "b", "text": "x" * 500}]
+
+
+def test_build_prompt_numbers_and_truncates_context():
+    prompt = build_prompt("Aventus clone?", PASSAGES)
+    assert prompt.startswith("Context:\n[1] CDNIM") and "[2] xxx" in prompt
+    assert prompt.endswith("Question: Aventus clone?")
+    assert "[2]" not in build_prompt("Aventus clone?", PASSAGES, max_chars=100)
+
+
+def test_stub_llm():
+    llm = StubLLM()
+    assert RAGModel(llm).answer("Aventus clone?", PASSAGES) == "CDNIM is the classic Aventus clone."
+    assert RAGModel(llm).answer("anything", []) == "I couldn't find anything about that."
+    assert StubLLM("fixed").complete(SYSTEM_PROMPT, "prompt") == "fixed"
+    assert llm.calls == 2
+    with pytest.raises(TypeError):
+        LLM()  # Abstract: backends must implement complete
+
+
+def test_openai_chat_llm_uses_client(mocker):
+    client = mocker.Mock()
+    client.chat.completions.create.return_value = mocker.Mock(choices=[mocker.Mock(message=mocker.Mock(content="Try CDNIM"))])
+    llm = OpenAIChatLLM("gpt-4o-mini", client=client)
+    assert llm.complete("system", "prompt") == "Try CDNIM" and llm.name == "openai:gpt-4o-mini"
+    messages = client.chat.completions.create.call_args.kwargs["messages"]
+    assert [m["role"] for m in messages] == ["system", "user"]
+
+
+def test_streaming_llms(mocker):
+    assert list(RAGModel(StubLLM()).stream_answer("Aventus clone?", PASSAGES)) == ["CDNIM ", "is ", "the ", "classic ", "Aventus ", "clone."]
+
+    client = mocker.Mock()
+    chunks = [mocker.Mock(choices=[mocker.Mock(delta=mocker.Mock(content=text))]) for text in ("Try", None, " CDNIM")]
+    client.chat.completions.create.return_value = iter(chunks + [mocker.Mock(choices=[])])
+    assert "".join(OpenAIChatLLM(client=client).stream("system", "prompt")) == "Try CDNIM"
+    assert client.chat.completions.create.call_args.kwargs["stream"] is True
+
+
+def test_latency_stats():
+    stats = LatencyStats(window=3)
+    assert stats.as_dict() == {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    for seconds in (5.0, 0.001, 0.002, 0.003):
+        stats.record(seconds)
+    summary = stats.as_dict()
+    assert summary["count"] == 4 and summary["p50_ms"] == 2.0 and summary["p99_ms"] < 5
+
+
+def test_get_llm_falls_back_to_stub(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert isinstance(get_llm(), StubLLM)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(**kw):
+    clock = FakeClock()
+    return AnswerCache(HashingEmbedder(256), clock=clock, **kw), clock
+
+
+SOURCES = [{"doc_id": "d1:0", "text": "Dior Sauvage clones: Armaf Ventana, Afnan Supremacy"}]
+
+
+class TestAnswerCache:
+    def test_exact_tier_ignores_case_and_punctuation(self):
+        cache, _ = make_cache()
+        assert normalize_query("  Sauvage   ALTERNATIVE?! ") == "sauvage alternative"
+        assert cache.get("Sauvage alternative") is None
+        cache.put("Sauvage alternative", "Try Ventana", SOURCES)
+        assert cache.get("sauvage alternative??").answer == "Try Ventana"
+        assert cache.stats.as_dict()["exact_hits"] == 1 and cache.stats.misses == 1
+
+    def test_semantic_tier_at_production_threshold(self, mocker):
+        # Vectors spaced like a real model's: a paraphrase at 0.95, a different fragrance question at 0.8
+        vectors = {
+            "cheap alternative to dior sauvage": [1.0, 0.0, 0.0],
+            "dior sauvage cheap alternative": [0.95, 0.3122, 0.0],
+            "best vanilla for winter": [0.8, 0.0, 0.6],
+        }
+        client = mocker.Mock()
+        client.embeddings.create.side_effect = lambda model, input: mocker.Mock(
+            data=[mocker.Mock(embedding=vectors[text]) for text in input]
+        )
+        cache = AnswerCache.for_embedder(OpenAIEmbedder(client=client))
+        assert cache.threshold == SEMANTIC_THRESHOLDS["openai"]
+        cache.put("cheap alternative to dior sauvage", "Try Ventana", SOURCES)
+        assert cache.get("dior sauvage cheap alternative").answer == "Try Ventana"
+        assert cache.get("best vanilla for winter") is None
+        stats = cache.stats.as_dict()
+        assert stats["semantic_hits"] == 1 and stats["hit_ratio"] == 0.5
+
+        exact_only = AnswerCache()
+        exact_only.put("cheap alternative to dior sauvage", "Try Ventana", SOURCES)
+        assert exact_only.get("dior sauvage cheap alternative") is None
+
+    def test_hashing_embedder_gets_no_semantic_tier(self):
+        # Word overlap ranks a different question above a paraphrase, so no threshold is safe
+        assert AnswerCache.for_embedder(HashingEmbedder()).embedder is None
+        assert AnswerCache.for_embedder(None).embedder is None
+        tuned = AnswerCache.for_embedder(HashingEmbedder(), threshold=0.99)
+        assert tuned.embedder is not None and tuned.threshold == 0.99
+
+    def test_ttl_expiry(self):
+        cache, clock = make_cache(ttl=60)
+        cache.put("q", "a", SOURCES)
+        clock.now = 59
+        assert cache.get("q") is not None
+        clock.now = 61
+        assert cache.get("q") is None and cache.stats.expirations == 1 and len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache, _ = make_cache(max_entries=2, threshold=1.1)
+        cache.put("first question", "1", SOURCES)
+        cache.put("second question", "2", SOURCES)
+        cache.get("first question")  # Now most recently used
+        cache.put("third question", "3", SOURCES)
+        assert cache.get("second question") is None
+        assert cache.get("first question").answer == "1" and cache.stats.evictions == 1
+        cache.put("first question", "1b", SOURCES)
+        assert len(cache) == 2 and cache.get("first question").answer == "1b"
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_revalidate_drops_answers_with_changed_sources(self, mocker):
+        cache, _ = make_cache()
+        cache.put("sauvage alternative", "Try Ventana", SOURCES)
+        cache.put("vanilla", "Try Khamrah", [{"doc_id": "d2:0", "text": "Khamrah is sweet"}])
+        cache.put("nothing", "No idea", [])
+        snapshot = mocker.Mock()
+        snapshot.passage_texts.side_effect = lambda ids: {"d1:0": SOURCES[0]["text"], "d2:0": "Khamrah was reformulated"}
+        assert cache.revalidate(snapshot) == 1
+        assert cache.get("sauvage alternative") is not None and cache.get("vanilla") is None
+
+        snapshot.passage_texts.side_effect = lambda ids: {}
+        assert cache.revalidate(snapshot) == 1 and cache.stats.invalidations == 2
+
+
+def test_rag_model_ask_skips_retrieval_and_llm_on_hit():
+    llm = StubLLM("Try Ventana")
+    cache, _ = make_cache()
+    model = RAGModel(llm, cache)
+    retrieve = lambda question: SOURCES  # noqa: E731
+    assert model.ask("Sauvage alternative", retrieve) == ("Try Ventana", SOURCES, False)
+    assert model.ask("sauvage alternative!", lambda question: []) == ("Try Ventana", SOURCES, True)
+    assert llm.calls == 1
+    assert RAGModel(llm).ask("Sauvage alternative", retrieve)[2] is False
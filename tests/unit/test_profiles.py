@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from backend.profiles import ProfileIndex, ProfileQuery, canonical_note, note_terms
+
+PERFUMES = [
+    {"notes": ["Bourbon Vanilla", "Tonka Bean", "Amber"], "accords": [{"amber": 45.0}, {"vanilla": 80.0}]},
+    {"notes": ["Vanille", "Tonka", "Agarwood (Oud)"], "accords": [{"amber": 60.0}, {"oud": 90.0}]},
+    {"notes": ["Madagascar Vanilla", "Tonka Bean"], "accords": [{"Amber": 20.0}]},
+    {"notes": ["Lemon", "Pineapple"], "accords": [{"citrus": 100.0}]},
+    {"notes": None, "accords": None},
+]
+
+
+@pytest.fixture
+def index():
+    return ProfileIndex.from_records(PERFUMES)
+
+
+def rows(index, text):
+    return index.match(ProfileQuery.parse(text)).tolist()
+
+
+def test_note_normalization():
+    assert canonical_note("  Tonka BEAN ") == "tonka" and canonical_note("Vanille") == "vanilla"
+    assert note_terms("Bourbon Vanilla") == ("bourbon vanilla", "vanilla")
+    assert note_terms("Agarwood (Oud)") == ("agarwood oud", "oud")
+    assert note_terms("Vanilla") == ("vanilla",) and note_terms("Dates") == ("dates",) and note_terms("") == ()
+
+
+def test_parse():
+    query = ProfileQuery.parse("has vanilla AND tonka, NOT oud, accord amber ≥ 30%, rose or jasmine")
+    assert query.all_of == ["vanilla", "tonka"] and query.none_of == ["oud"]
+    assert query.any_of == [["rose", "jasmine"]] and query.accords == [("amber", "≥", 30.0)]
+    assert ProfileQuery.parse("woody<10").accords == [("woody", "<", 10.0)]
+    with pytest.raises(ValueError):
+        ProfileQuery.parse(" , and ")
+
+
+class TestProfileIndex:
+    def test_boolean_queries(self, index):
+        assert rows(index, "has vanilla AND tonka") == [0, 1, 2]
+        assert rows(index, "has vanilla AND tonka, NOT oud, accord amber >= 30%") == [0]
+        assert rows(index, "bourbon vanilla") == [0]
+        assert rows(index, "oud or lemon") == [1, 3]
+        assert rows(index, "NOT vanilla") == [3, 4]  # Inversion stays within the catalog
+        assert rows(index, "amber > 45") == [1] and rows(index, "amber <= 45") == [0, 2, 3, 4]
+
+    def test_unknown_terms(self, index):
+        assert rows(index, "vanilla, saffron") == []
+        assert rows(index, "NOT saffron") == [0, 1, 2, 3, 4]
+        assert rows(index, "leather >= 1") == []
+
+    def test_packs_bits_across_words(self):
+        records = [{"notes": ["Vanilla"] if i % 3 == 0 else ["Rose"]} for i in range(200)]
+        index = ProfileIndex.from_records(records)
+        assert index.bits.shape == (2, 4) and index.bits.dtype == np.uint64
+        mask = index.mask(ProfileQuery.parse("vanilla"))
+        assert index.count(mask) == 67 and index.rows(mask).tolist() == list(range(0, 200, 3))
+        assert index.count(index.mask(ProfileQuery.parse("NOT rose"))) == 67
+
+    def test_save_and_load(self, index, tmp_path):
+        index.save(str(tmp_path))
+        loaded = ProfileIndex.load(str(tmp_path))
+        assert len(loaded) == 5 and isinstance(loaded.bits, np.memmap)
+        assert rows(loaded, "vanilla, tonka, NOT oud, amber >= 30") == [0]
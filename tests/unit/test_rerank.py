@@ -0,0 +1,137 @@
+import asyncio
+import re
+import time
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from onnx import TensorProto, helper  # noqa: E402
+
+from backend.embeddings import HashingEmbedder  # noqa: E402
+from backend.rerank import CrossEncoder, Reranker  # noqa: E402
+from backend.snapshot import Snapshot, build_snapshot, gather_context  # noqa: E402
+
+
+def overlap_tokenizer(pairs):
+    """Stand-in tokenizer: one token per passage word, id 1 if the query has that word."""
+    encoded = []
+    for query, passage in pairs:
+        words = set(re.findall(r"\w+", query.lower()))
+        encoded.append([1 if word in words else 0 for word in re.findall(r"\w+", passage.lower())] or [0])
+    length = max(map(len, encoded))
+    ids = np.zeros((len(pairs), length), dtype=np.int64)
+    mask = np.zeros((len(pairs), length), dtype=np.int64)
+    for row, tokens in enumerate(encoded):
+        ids[row, :len(tokens)] = tokens
+        mask[row, :len(tokens)] = 1
+    return {"input_ids": ids, "attention_mask": mask, "token_type_ids": np.zeros_like(ids)}
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    """Tiny ONNX "cross-encoder": the logit is the number of passage words found in the query."""
+    nodes = [
+        helper.make_node("Mul", ["input_ids", "attention_mask"], ["hits"]),
+        helper.make_node("Cast", ["hits"], ["hits_f"], to=TensorProto.FLOAT),
+        helper.make_node("ReduceSum", ["hits_f", "axes"], ["logits"], keepdims=1),
+    ]
+    graph = helper.make_graph(
+        nodes, "overlap",
+        [helper.make_tensor_value_info(name, TensorProto.INT64, ["batch", "length"]) for name in ("input_ids", "attention_mask")],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", 1])],
+        [helper.make_tensor("axes", TensorProto.INT64, [1], [1])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    path = tmp_path_factory.mktemp("reranker") / "model.onnx"
+    onnx.save(model, str(path))
+    return str(path)
+
+
+@pytest.fixture
+def encoder(model_path):
+    return CrossEncoder(model_path, tokenizer=overlap_tokenizer, threads=1)
+
+
+PASSAGES = [
+    {"doc_id": "a", "text": "Boozy dates and cinnamon."},
+    {"doc_id": "b", "text": "Smoky pineapple opening, smoky birch drydown."},
+    {"doc_id": "c", "text": "Pineapple and lemon."},
+]
+
+
+def test_cross_encoder_scores_pairs(encoder):
+    assert encoder.inputs == ["input_ids", "attention_mask"]  # token_type_ids is not a model input
+    scores = encoder.score([("smoky pineapple", p["text"]) for p in PASSAGES])
+    assert scores.tolist() == [0.0, 3.0, 1.0] and encoder.score([]).shape == (0,)
+
+
+class TestReranker:
+    @pytest.mark.asyncio
+    async def test_reranks_and_truncates(self, encoder):
+        reranker = Reranker(encoder)
+        passages, info = await reranker.rerank("smoky pineapple", PASSAGES, k=2)
+        assert [p["doc_id"] for p in passages] == ["b", "c"] and passages[0]["rerank_score"] == 3.0
+        assert info["reranked"] and info["candidates"] == 3
+        passages, info = await reranker.rerank("x", [], k=2)
+        assert passages == [] and info["candidates"] == 0 and reranker.stats.batches == 1
+        reranker.close()
+
+    @pytest.mark.asyncio
+    async def test_batches_concurrent_requests(self, encoder):
+        reranker = Reranker(encoder, max_batch=8, max_wait=0.01)
+        results = await asyncio.gather(*(reranker.rerank(f"pineapple {i}", PASSAGES, k=1) for i in range(5)))
+        assert all(passages[0]["doc_id"] in ("b", "c") for passages, _ in results)
+        assert reranker.stats.requests == 5 and reranker.stats.pairs == 15
+        assert reranker.stats.batches < 5 and reranker.stats.pair_seconds > 0
+        reranker.close()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_first_stage_order_over_budget(self, encoder):
+        class Slow:
+            def score(self, pairs):
+                time.sleep(0.05)
+                return encoder.score(pairs)
+
+        reranker = Reranker(Slow(), budget=0.01)
+        passages, info = await reranker.rerank("smoky pineapple", PASSAGES, k=2)
+        assert [p["doc_id"] for p in passages] == ["a", "b"] and not info["reranked"]
+        assert reranker.stats.timeouts == 1
+
+        # Once the per-pair cost is known, only as many candidates as fit the budget are sent
+        await asyncio.sleep(0.1)
+        assert reranker.stats.pair_seconds > 0
+        _, info = await reranker.rerank("smoky pineapple", PASSAGES * 10, k=2)
+        assert info["candidates"] < 30
+        reranker.close()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_first_stage_order_on_model_error(self):
+        class Broken:
+            def score(self, pairs):
+                raise RuntimeError("input_ids: unexpected shape")
+
+        reranker = Reranker(Broken())
+        passages, info = await reranker.rerank("smoky pineapple", PASSAGES, k=2)
+        assert [p["doc_id"] for p in passages] == ["a", "b"] and not info["reranked"]
+        assert reranker.stats.errors == 1 and reranker.stats.timeouts == 0
+        assert reranker.stats.as_dict()["errors"] == 1
+        reranker.close()
+
+    @pytest.mark.asyncio
+    async def test_gather_context_reranks_fused_passages(self, encoder, tmp_path):
+        perfumes = [
+            {"url": f"https://example.com/perfume/B/P-{i}.html", "name": f"P{i}", "brand": "B", "reviews": [text]}
+            for i, text in enumerate(["cinnamon dates", "smoky pineapple birch", "pineapple lemon", "vanilla"])
+        ]
+        build_snapshot(str(tmp_path), perfumes, [], embedder=HashingEmbedder(64), version="v1")
+        snapshot = Snapshot(str(tmp_path / "v1"))
+        reranker = Reranker(encoder)
+        passages, stats = await gather_context(snapshot, "smoky pineapple birch", k=1, budget=5.0, reranker=reranker)
+        assert [p["text"] for p in passages] == ["smoky pineapple birch"] and stats["rerank"]["reranked"]
+        assert stats["rerank"]["candidates"] > 1
+        reranker.close()
+        snapshot.close()
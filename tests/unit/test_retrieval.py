@@ -0,0 +1,275 @@
+import os
+
+import numpy as np
+import pytest
+
+from backend.embeddings import EmbeddingPipeline, HashingEmbedder
+from backend.retrieval import INDEX_KINDS, BM25Index, HybridSearcher, VectorIndex, reciprocal_rank_fusion, tokenize
+
+DIM = 16
+
+
+def corpus(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"doc-{i}" for i in range(n)], rng.standard_normal((n, DIM)).astype(np.float32)
+
+
+def brute_force(vectors, query, k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(normed @ (query / np.linalg.norm(query))))[:k])
+
+
+@pytest.mark.parametrize("kind", INDEX_KINDS)
+class TestVectorIndex:
+    def make(self, kind, n=600):
+        ids, vectors = corpus(n)
+        index = VectorIndex(DIM, kind=kind, nlist=8, nprobe=8, ef_search=128)
+        index.add(ids, vectors)
+        return index, ids, vectors
+
+    def test_finds_nearest_documents(self, kind):
+        index, ids, vectors = self.make(kind)
+        hits = index.search(vectors[42], k=5)[0]
+        assert hits[0][0] == "doc-42" and hits[0][1] == pytest.approx(1.0, abs=1e-4)
+        expected = [ids[i] for i in brute_force(vectors, vectors[7], 10)]
+        found = [doc_id for doc_id, _ in index.search(vectors[7], k=10)[0]]
+        assert len(set(found) & set(expected)) >= 9
+
+    def test_incremental_add_remove_and_replace(self, kind):
+        index, ids, vectors = self.make(kind)
+        assert index.remove(["doc-42", "doc-43", "unknown"]) == 2
+        assert "doc-42" not in index and len(index) == 598
+        assert all(doc_id != "doc-42" for doc_id, _ in index.search(vectors[42], k=20)[0])
+
+        # Re-adding an id replaces its vector instead of duplicating it
+        index.add(["doc-7", "doc-new"], np.stack([vectors[100], vectors[200]]))
+        assert len(index) == 599
+        assert [d for d, _ in index.search(vectors[100], k=2)[0]] in (["doc-7", "doc-100"], ["doc-100", "doc-7"])
+        assert index.search(vectors[200], k=1)[0][0][0] in ("doc-new", "doc-200")
+
+    def test_save_and_mmap_load(self, kind, tmp_path):
+        index, ids, vectors = self.make(kind)
+        index.remove(["doc-1"])
+        index.save(str(tmp_path / "index"))
+
+        loaded = VectorIndex.load(str(tmp_path / "index"))
+        assert isinstance(loaded._vector_chunks[0], np.memmap)
+        assert len(loaded) == 599 and "doc-1" not in loaded
+        assert loaded.search(vectors[3], k=3) == index.search(vectors[3], k=3)
+
+        # Mutating a mapped index copies it into memory first
+        loaded.add(["doc-x"], vectors[5:6] + 0.01)
+        loaded.remove(["doc-5"])
+        assert loaded.search(vectors[5], k=1)[0][0][0] == "doc-x"
+        assert not isinstance(loaded._vector_chunks[0], np.memmap)
+
+        loaded.save(str(tmp_path / "index"))
+        again = VectorIndex.load(str(tmp_path / "index"), mmap=False)
+        assert len(again) == 599 and "doc-x" in again and "doc-5" not in again
+
+        # Each save is a new version directory behind the CURRENT pointer; the previous one is kept
+        index.save(str(tmp_path / "index"))
+        versions = sorted(name for name in os.listdir(tmp_path / "index") if name.startswith("v"))
+        assert len(versions) == 2 and (tmp_path / "index" / "CURRENT").read_text() == versions[-1]
+        assert "doc-x" not in VectorIndex.load(str(tmp_path / "index"))
+
+
+class TestVectorIndexEdges:
+    def test_hnsw_tombstones_then_rebuild(self):
+        ids, vectors = corpus(100)
+        index = VectorIndex(DIM, kind="hnsw", rebuild_ratio=0.25)
+        index.add(ids, vectors)
+        index.remove(ids[:10])
+        assert len(index._tombstones) == 10 and index.index.ntotal == 100
+        assert len(index.search(vectors[0], k=95)[0]) == 90
+
+        index.remove(ids[10:30])
+        assert not index._tombstones and index.index.ntotal == 70
+
+    def test_ivf_retrains_as_it_grows(self, tmp_path):
+        ids, vectors = corpus(1000)
+        index = VectorIndex(DIM, kind="ivf", nlist=16, nprobe=16)
+        index.add(ids[:40], vectors[:40])
+        assert index.index.nlist == 1
+        index.add(ids[40:60], vectors[40:60])
+        assert index.index.nlist == 1  # Below retrain_ratio x the training set
+        index.add(ids[60:], vectors[60:])
+        assert index.index.nlist == 16 and index._trained_on == 1000
+        assert index.search(vectors[500], k=1)[0][0][0] == "doc-500"
+
+        index.save(str(tmp_path / "ivf"))
+        loaded = VectorIndex.load(str(tmp_path / "ivf"))
+        assert loaded._trained_on == 1000 and loaded.retrain_ratio == 2.0
+
+    def test_empty_and_invalid_input(self, tmp_path):
+        index = VectorIndex(DIM)
+        assert index.search(np.ones(DIM), k=3) == [[]]
+        assert index.add([], np.empty((0, DIM))) == 0
+        with pytest.raises(ValueError):
+            index.add(["a"], np.ones((1, DIM + 1)))
+        with pytest.raises(ValueError):
+            index.add(["a", "b"], np.ones((1, DIM)))
+        with pytest.raises(ValueError):
+            index.add(["bad\nid"], np.ones((1, DIM)))
+        with pytest.raises(ValueError):
+            VectorIndex(DIM, kind="annoy")
+
+        index.save(str(tmp_path / "empty"))
+        loaded = VectorIndex.load(str(tmp_path / "empty"))
+        assert len(loaded) == 0 and loaded.search(np.ones(DIM)) == [[]]
+        loaded.add(["a"], np.ones((1, DIM)))
+        assert loaded.search(np.ones(DIM), k=1)[0][0][0] == "a"
+
+    def test_remove_everything(self):
+        ids, vectors = corpus(10)
+        index = VectorIndex(DIM, kind="hnsw")
+        index.add(ids, vectors)
+        index.remove(ids)
+        assert len(index) == 0 and index.search(vectors[0]) == [[]]
+
+    def test_search_params(self):
+        ids, vectors = corpus(2000)
+        ivf = VectorIndex(DIM, kind="ivf", nlist=32, nprobe=1)
+        ivf.add(ids, vectors)
+        assert ivf.index.nlist == 32
+        ivf.set_search_params(nprobe=32)
+        assert ivf.index.nprobe == 32
+        expected = [ids[i] for i in brute_force(vectors, vectors[9], 10)]
+        assert [d for d, _ in ivf.search(vectors[9], k=10)[0]] == expected
+
+        hnsw = VectorIndex(DIM, kind="hnsw")
+        hnsw.add(ids[:10], vectors[:10])
+        hnsw.set_search_params(ef_search=200)
+        assert hnsw.ef_search == 200
+
+
+DOCS = {
+    "r1": "Club de Nuit Intense Man is the best Creed Aventus dupe for the price",
+    "r2": "Aventus opens with smoky pineapple and birch",
+    "r3": "Khamrah by Lattafa is a sweet date and cinnamon gourmand",
+    "r4": "Vanilla vanilla vanilla, a cozy winter scent",
+    "r5": "Not a dupe of anything, just a fresh aquatic",
+}
+
+
+@pytest.fixture
+def bm25():
+    index = BM25Index()
+    index.add(list(DOCS), list(DOCS.values()))
+    return index
+
+
+def ids(results):
+    return [doc_id for doc_id, _ in results]
+
+
+class TestBM25Index:
+    def test_tokenize(self):
+        assert tokenize("Creed Aventus, L'Homme 2010!") == ["creed", "aventus", "l", "homme", "2010"]
+
+    def test_ranks_exact_names(self, bm25):
+        assert ids(bm25.search("Creed Aventus dupe", k=3))[0] == "r1"
+        assert ids(bm25.search("lattafa"))[0] == "r3"
+        assert bm25.search("nonexistent") == [] and bm25.search("") == []
+
+    def test_scores_match_reference_formula(self, bm25):
+        tokens = {doc_id: tokenize(text) for doc_id, text in DOCS.items()}
+        average = sum(map(len, tokens.values())) / len(tokens)
+        df = sum("vanilla" in t for t in tokens.values())
+        idf = np.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+        tf, length = tokens["r4"].count("vanilla"), len(tokens["r4"])
+        expected = idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / average))
+        assert bm25.search("vanilla") == [("r4", pytest.approx(expected, rel=1e-5))]
+
+    def test_add_replace_and_remove(self, bm25):
+        bm25.search("warm-up")  # Merge the initial batch
+        bm25.add(["r3", "r6", "r6"], ["now about oud", "draft", "Lattafa Asad is a Sauvage dupe"])
+        assert len(bm25) == 6
+        assert ids(bm25.search("lattafa")) == ["r6"]
+        assert ids(bm25.search("oud")) == ["r3"] and bm25.search("draft") == []
+        assert bm25.remove(["r1", "unknown"]) == 1
+        assert "r1" not in bm25 and set(ids(bm25.search("dupe"))) == {"r5", "r6"}
+
+    def test_top_k_is_ordered(self, bm25):
+        results = bm25.search("dupe aventus vanilla", k=2)
+        assert len(results) == 2 and results[0][1] >= results[1][1]
+        assert bm25.search("dupe", k=0) == []
+
+    def test_rejects_bad_input(self):
+        index = BM25Index()
+        with pytest.raises(ValueError):
+            index.add(["a", "b"], ["only one"])
+        with pytest.raises(ValueError):
+            index.add(["bad\nid"], ["text"])
+        assert index.search("anything") == []
+
+    @pytest.mark.parametrize("mmap", [True, False])
+    def test_save_and_load(self, bm25, tmp_path, mmap):
+        bm25.remove(["r2"])
+        bm25.save(str(tmp_path / "bm25"))
+        loaded = BM25Index.load(str(tmp_path / "bm25"), mmap=mmap)
+        assert isinstance(loaded._docs, np.memmap) == mmap
+        assert len(loaded) == 4 and "r2" not in loaded and "r1" in loaded and "r0" not in loaded
+        assert loaded.search("creed aventus dupe") == bm25.search("creed aventus dupe")
+        # Terms and ids are binary-searched in the saved tables, not loaded into dicts
+        assert loaded._term_of == {} and loaded._doc_of == {}
+        terms = [loaded._terms[n] for n in range(len(loaded._terms))]
+        assert terms == sorted(terms, key=str.encode) and "r2" not in [loaded._ids[n] for n in loaded._ids.order]
+
+        before = loaded.search("creed aventus dupe")
+        bm25.add(["r8"], ["creed aventus dupe dupe"])
+        bm25.save(str(tmp_path / "bm25"))  # Published as a new version; readers of the old one are unaffected
+        assert loaded.search("creed aventus dupe") == before
+        assert ids(BM25Index.load(str(tmp_path / "bm25")).search("creed aventus dupe"))[0] == "r8"
+        versions = sorted(name for name in os.listdir(tmp_path / "bm25") if name.startswith("v"))
+        assert len(versions) == 2 and (tmp_path / "bm25" / "CURRENT").read_text() == versions[-1]
+
+        loaded.add(["r7"], ["another aventus clone"])
+        assert "r7" in ids(loaded.search("aventus")) and not isinstance(loaded._docs, np.memmap)
+
+    def test_unicode_terms_survive_save(self, tmp_path):
+        index = BM25Index()
+        index.add(["é", "z", "a"], ["Eau de Café", "zeste d'été", "ambre"])
+        index.save(str(tmp_path / "bm25"))
+        loaded = BM25Index.load(str(tmp_path / "bm25"))
+        for query in ("café", "été", "ambre", "zeste"):
+            assert loaded.search(query) == index.search(query) and loaded.search(query)
+        assert "é" in loaded and loaded.search("absent") == []
+
+    def test_save_empty(self, tmp_path):
+        BM25Index().save(str(tmp_path / "empty"))
+        loaded = BM25Index.load(str(tmp_path / "empty"))
+        assert len(loaded) == 0 and loaded.search("x") == []
+        loaded.add(["a"], ["x"])
+        assert ids(loaded.search("x")) == ["a"]
+
+
+class TestFusion:
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[("a", 9.0), ("b", 5.0)], [("b", 0.9), ("c", 0.8)]], k=60)
+        assert ids(fused) == ["b", "a", "c"]
+        assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+        assert ids(reciprocal_rank_fusion([[("a", 1)], [("c", 1)]], weights=[1, 2], limit=1)) == ["c"]
+
+    def test_hybrid_search_uses_both_indexes(self):
+        pipeline = EmbeddingPipeline(HashingEmbedder(64))
+        vectors, keywords = VectorIndex(64), BM25Index()
+        pipeline.index_documents(vectors, DOCS.items(), keyword_index=keywords)
+        assert len(keywords) == len(vectors) == len(DOCS)
+
+        searcher = HybridSearcher(vectors, keywords, pipeline.embedder, fetch=3)
+        results = searcher.search("Creed Aventus dupe", k=3)
+        assert ids(results)[0] == "r1:0" and len(results) == 3
+
+    def test_selective_filter_widens_the_search(self):
+        pipeline = EmbeddingPipeline(HashingEmbedder(64))
+        vectors, keywords = VectorIndex(64), BM25Index()
+        docs = [(f"d{i}", f"smoky pineapple birch {i}") for i in range(400)]
+        pipeline.index_documents(vectors, docs, keyword_index=keywords)
+
+        searcher = HybridSearcher(vectors, keywords, pipeline.embedder, fetch=2)
+        # 3 allowed ids out of 400: a fixed 10x over-fetch of 2 would find almost none
+        allowed = {"d1", "d200", "d399"}
+        results = searcher.search("smoky pineapple", k=3, allow=lambda doc_id: doc_id.split(":")[0] in allowed)
+        assert {doc_id.split(":")[0] for doc_id in ids(results)} == allowed
+        assert searcher.search("smoky pineapple", k=3, allow=lambda doc_id: False) == []
@@ -1,2 +1,1307 @@
+import json
+import os
+import threading
+import time
 
+import pytest
+import pytest_asyncio
 
+from checkpoint import CheckpointStore
+from models import Perfume
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures", "html")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = headers or {}
+
+
+def patch_http(mocker, **kwargs):
+    """Replace network access in the shared fetcher (and its backoff sleeps)."""
+    import requests
+    import scraper_utils
+
+    mocker.patch.object(scraper_utils.time, "sleep")
+    return mocker.patch.object(requests.Session, "get", **kwargs)
+
+
+def make_record(i, **extra):
+    return {"url": f"https://example.com/perfume/Brand/Perfume-{i}.html", "name": f"Perfume {i}", "brand": "Brand", **extra}
+
+
+@pytest.fixture(autouse=True)
+def scrape_log(tmp_path):
+    """Route scrape events to a fresh, quiet log per test."""
+    import scrape_log as scrape_log_module
+
+    log = scrape_log_module.ScrapeLog(str(tmp_path / "logs"), echo_per_second=0)
+    previous = scrape_log_module.set_log(log)
+    yield log
+    log.close()
+    scrape_log_module.set_log(previous)
+
+
+def logged_events(log):
+    log.flush()
+    with open(log.events_path) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def scrape_dir(tmp_path, monkeypatch):
+    """Lay out data/ and backend/scrape/ so the scrapers' relative paths resolve."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "website_perfumes_by_designer.json").write_text(json.dumps([
+        {"brand": "Brand", "perfumes": [make_record(i)["url"] for i in range(3)]}
+    ]))
+    work_dir = tmp_path / "backend" / "scrape"
+    work_dir.mkdir(parents=True)
+    monkeypatch.chdir(work_dir)
+    return data_dir
+
+
+class TestCheckpointStore:
+    def test_append_and_stream_back(self, tmp_path):
+        path = str(tmp_path / "perfumes.jsonl")
+        with CheckpointStore(path, fsync_every=2) as store:
+            for i in range(5):
+                store.append(make_record(i))
+
+        records = list(CheckpointStore(path).iter_records())
+        assert [r["name"] for r in records] == [f"Perfume {i}" for i in range(5)]
+
+    def test_torn_last_line_is_ignored_and_repaired(self, tmp_path):
+        path = tmp_path / "perfumes.jsonl"
+        with CheckpointStore(str(path)) as store:
+            store.append(make_record(0))
+            store.append(make_record(1))
+        with open(path, "a") as f:
+            f.write('{"url": "https://example.com/half-writ')  # Simulated kill -9
+
+        store = CheckpointStore(str(path))
+        assert len(store.urls()) == 2
+
+        store.append(make_record(2))
+        store.close()
+        assert [r["name"] for r in store.iter_records()] == ["Perfume 0", "Perfume 1", "Perfume 2"]
+
+    def test_compact_writes_json_array_with_last_record_winning(self, tmp_path):
+        path = str(tmp_path / "perfumes.jsonl")
+        output = tmp_path / "perfumes.json"
+        with CheckpointStore(path) as store:
+            store.append(make_record(0, notes=["rose"]))
+            store.append(make_record(1))
+            store.append(make_record(0, notes=["oud"]))
+            assert store.compact(str(output)) == 2
+
+        data = json.loads(output.read_text())
+        assert [p["name"] for p in data] == ["Perfume 1", "Perfume 0"]
+        assert data[1]["notes"] == ["oud"]
+        assert not os.path.exists(str(output) + ".tmp")
+
+    def test_compact_empty_checkpoint(self, tmp_path):
+        output = tmp_path / "perfumes.json"
+        assert CheckpointStore(str(tmp_path / "missing.jsonl")).compact(str(output)) == 0
+        assert json.loads(output.read_text()) == []
+
+    def test_import_legacy_json(self, tmp_path):
+        legacy = tmp_path / "perfumes.json"
+        legacy.write_text(json.dumps([make_record(0), "stray-url", make_record(1)]))
+        store = CheckpointStore(str(tmp_path / "perfumes.jsonl"))
+        assert store.import_json(str(legacy)) == 2
+        assert store.import_json(str(tmp_path / "nope.json")) == 0
+        store.close()
+
+
+class TestPerfumeDataScraperCheckpoint:
+    def test_save_progress_appends_and_resumes(self, scrape_dir):
+        from scrape_perfume_data import PerfumeDataScraper
+
+        scraper = PerfumeDataScraper()
+        assert scraper.scraped_perfumes == set()
+
+        scraper.save_progress(Perfume(**make_record(0)))
+        scraper.save_progress(make_record(1))
+        scraper.save_progress("not-a-perfume")
+        assert scraper.compact_progress() == 2
+
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert [p["url"] for p in data] == [make_record(0)["url"], make_record(1)["url"]]
+
+        resumed = PerfumeDataScraper()
+        assert resumed.scraped_perfumes == {make_record(0)["url"], make_record(1)["url"]}
+
+    def test_legacy_output_is_imported_on_first_run(self, scrape_dir):
+        from scrape_perfume_data import PerfumeDataScraper
+
+        (scrape_dir / "website_all_perfumes.json").write_text(json.dumps([make_record(2)]))
+        scraper = PerfumeDataScraper()
+        assert scraper.scraped_perfumes == {make_record(2)["url"]}
+        assert (scrape_dir / "website_all_perfumes.jsonl").exists()
+
+    def test_scrape_all_perfumes_checkpoints_and_compacts(self, scrape_dir, mocker):
+        import scrape_perfume_data
+        from scrape_perfume_data import PerfumeDataScraper
+
+        pages = [load_fixture("perfume_aventus.html"), load_fixture("perfume_khamrah.html"), "<html></html>"]
+        patch_http(mocker, side_effect=[FakeResponse(text=p) for p in pages])
+
+        scraper = PerfumeDataScraper()
+        scraper.scrape_all_perfumes()
+
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert [p["name"] for p in data] == ["Aventus Creed for men", "Khamrah Lattafa Perfumes for women and men", "Unknown"]
+        assert data[0]["accords"][1] == {"woody": 82.3}
+        assert data[0]["pros"] == ["Good for everyday wear", "Compliment magnet", "Versatile"]
+
+        # A second run skips everything already in the checkpoint
+        rerun = PerfumeDataScraper()
+        assert rerun.scrape_perfume_data(data[0]["url"]) is None
+
+    def test_request_with_retry_goes_through_shared_fetcher(self, scrape_dir, mocker):
+        import scraper_utils
+        from scrape_perfume_data import PerfumeDataScraper
+
+        get = patch_http(mocker, side_effect=[FakeResponse(200, "ok")])
+        scraper = PerfumeDataScraper()
+        assert scraper.fetcher is scraper_utils.get_fetcher()
+        assert scraper.request_with_retry("https://example.com/a", headers={"X-Test": "1"}).text == "ok"
+        sent = get.call_args.kwargs["headers"]
+        assert sent["X-Test"] == "1" and sent["User-Agent"] in PerfumeDataScraper.USER_AGENTS
+
+
+class TestParsers:
+    def test_parse_perfume_html_extracts_all_fields(self):
+        from scrape_perfume_data import parse_perfume_html
+
+        url = "https://example.com/perfume/Creed/Aventus-9828.html"
+        perfume, missing = parse_perfume_html(url, load_fixture("perfume_aventus.html"))
+        assert perfume.brand == "Creed"
+        assert perfume.photo_url.endswith("375x500.9828.jpg")
+        assert perfume.accords[0] == {"fruity": 100.0}
+        assert {"Pineapple", "Patchouli", "Vanilla"} <= set(perfume.notes)
+        assert perfume.smells_like == ["Armaf", "Creed", "Lattafa Perfumes"]
+        assert len(perfume.reviews) == 2
+        assert perfume.cons == ["Very expensive", "Batch variations"]
+        assert missing == []
+
+    def test_parse_fragrance_html_flattens_pyramid(self):
+        from scrape_sites import parse_fragrance_html
+
+        url = "https://example.com/perfume/Lattafa-Perfumes/Khamrah-75805.html"
+        perfume, missing = parse_fragrance_html(url, load_fixture("perfume_khamrah.html"))
+        assert perfume.brand == "Lattafa Perfumes"
+        assert perfume.notes == []
+        assert perfume.smells_like == ["By Kilian"]
+        assert {"photo_url", "notes_top", "longevity", "price_value"} <= set(missing)
+
+        perfume, missing = parse_fragrance_html(url, load_fixture("perfume_aventus.html"))
+        assert perfume.notes[:3] == ["Pineapple", "Bergamot", "Black Currant"]
+        assert "notes_top" not in missing
+
+
+class StubSite:
+    """Local aiohttp server serving perfume pages, optionally rate limiting."""
+
+    def __init__(self, delay=0.0, rate_limit_paths=(), retry_after="0.3"):
+        from aiohttp import web
+
+        self.delay = delay
+        self.rate_limit_paths = set(rate_limit_paths)
+        self.retry_after = retry_after
+        self.hits = []
+        self.app = web.Application()
+        self.app.router.add_get("/perfume/{brand}/{page}", self.handle)
+
+    async def handle(self, request):
+        import asyncio
+        import time
+        from aiohttp import web
+
+        self.hits.append((request.path, time.monotonic()))
+        if request.path in self.rate_limit_paths:
+            self.rate_limit_paths.discard(request.path)
+            return web.Response(status=429, headers={"Retry-After": self.retry_after})
+        if request.match_info["page"].startswith("missing"):
+            return web.Response(status=404)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        await asyncio.sleep(self.delay)
+        return web.Response(text=load_fixture("perfume_aventus.html"), content_type="text/html",
+                            headers={"ETag": '"v1"'})
+
+
+@pytest_asyncio.fixture
+async def stub_site():
+    from aiohttp.test_utils import TestServer
+
+    servers = []
+
+    async def start(**kwargs):
+        site = StubSite(**kwargs)
+        server = TestServer(site.app)
+        await server.start_server()
+        servers.append(server)
+        site.url = lambda path: str(server.make_url(path))
+        return site
+
+    yield start
+    for server in servers:
+        await server.close()
+
+
+class TestAsyncCrawler:
+    @pytest.mark.asyncio
+    async def test_concurrent_crawl_feeds_sink(self, stub_site, tmp_path, monkeypatch):
+        import time
+        from async_crawler import AsyncCrawler
+        from scrape_perfume_data import parse_perfume_html
+
+        monkeypatch.chdir(tmp_path)
+        site = await stub_site(delay=0.1)
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(20)]
+        urls.append(site.url("/perfume/Creed/missing-1.html"))
+
+        saved = []
+        crawler = AsyncCrawler(
+            parse=lambda url, html: parse_perfume_html(url, html)[0],
+            sink=saved.append,
+            concurrency=10,
+            rate_per_host=1000,
+            burst=10,
+        )
+        started = time.monotonic()
+        stats = await crawler.crawl(urls + urls[:5])
+        elapsed = time.monotonic() - started
+
+        assert len(saved) == 20 and stats.parsed == 20
+        assert stats.failed == 1
+        assert {p.name for p in saved} == {"Aventus Creed for men"}
+        assert elapsed < 20 * 0.1 / 2  # Well under the sequential time
+        assert stats.pages_per_second > 0
+
+    @pytest.mark.asyncio
+    async def test_per_host_token_bucket_caps_request_rate(self, stub_site):
+        import time
+        from async_crawler import AsyncCrawler
+
+        site = await stub_site()
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(11)]
+        crawler = AsyncCrawler(parse=lambda url, html: url, sink=lambda url: None,
+                               concurrency=8, rate_per_host=20, burst=1)
+        started = time.monotonic()
+        await crawler.crawl(urls)
+
+        # 1 token up front, then 10 more at 20/sec
+        assert time.monotonic() - started >= 0.45
+        starts = sorted(t for _, t in site.hits)
+        assert starts[-1] - starts[0] >= 0.45
+
+    @pytest.mark.asyncio
+    async def test_429_pauses_every_worker(self, stub_site):
+        from async_crawler import AsyncCrawler
+
+        site = await stub_site(delay=0.05, rate_limit_paths={"/perfume/Creed/Aventus-0.html"})
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(12)]
+        saved = []
+        crawler = AsyncCrawler(parse=lambda url, html: url, sink=saved.append,
+                               concurrency=4, rate_per_host=1000, burst=4)
+        stats = await crawler.crawl(urls)
+
+        assert stats.rate_limited == 1
+        assert sorted(saved) == sorted(urls)
+
+        limited_at = next(t for path, t in site.hits if path.endswith("Aventus-0.html"))
+        # Requests already in flight may land, but nothing new starts during the pause
+        later = [t for _, t in site.hits if t > limited_at + 0.01]
+        assert later and min(later) >= limited_at + 0.3 - 0.02
+
+
+    @pytest.mark.asyncio
+    async def test_parse_and_sink_run_off_the_event_loop(self, stub_site):
+        import asyncio
+        import threading
+        import time
+        from async_crawler import AsyncCrawler
+
+        site = await stub_site()
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(4)]
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def slow(url, *args):
+            threads.append(threading.get_ident())
+            time.sleep(0.1)  # A heavy parse or an fsync
+            return url
+
+        crawler = AsyncCrawler(parse=slow, sink=slow, concurrency=4, rate_per_host=1000, burst=4)
+        crawl = asyncio.create_task(crawler.crawl(urls))
+        gaps, last = [], time.monotonic()
+        while not crawl.done():
+            await asyncio.sleep(0.01)
+            gaps.append(time.monotonic() - last)
+            last = time.monotonic()
+        assert (await crawl).parsed == 4
+        assert loop_thread not in threads and max(gaps) < 0.08
+
+
+class TestRetryAfter:
+    def test_parse_retry_after(self):
+        from email.utils import formatdate
+        import time
+        from async_crawler import GlobalBackoff
+        from scraper_utils import parse_retry_after
+
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("12") == 12.0
+        assert parse_retry_after("garbage") is None
+        assert 50 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 61
+
+        backoff = GlobalBackoff(base_wait=10, max_wait=30)
+        assert 5 <= backoff.trigger() <= 10
+        assert 10 <= backoff.trigger() <= 20
+        assert backoff.trigger(retry_after=90) == 30
+        backoff.reset()
+        assert backoff.strikes == 0
+
+
+class Killed(BaseException):
+    """Stands in for the process being killed; not caught by `except Exception`."""
+
+
+class TestCrawlFrontier:
+    def test_normalize_url(self):
+        from frontier import normalize_url
+
+        base = "https://Example.com:443/designers/"
+        assert normalize_url("/designers/Creed.html?page=2#top", base) == "https://example.com/designers/Creed.html"
+        assert normalize_url("Armaf.html", base) == "https://example.com/designers/Armaf.html"
+        assert normalize_url("https://example.com/designers/") == "https://example.com/designers"
+        assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+    def test_dedup_claim_and_retry(self, tmp_path):
+        from frontier import CrawlFrontier
+
+        with CrawlFrontier(str(tmp_path / "frontier.sqlite3"), max_attempts=2) as frontier:
+            added = frontier.add(["/perfume/A-1.html?ref=x#top", "/perfume/A-1.html", "/perfume/B-2.html/"], "perfume",
+                                 parent="Brand", base="https://example.com/designers/Brand.html")
+            # Deduplicated by normalized URL, but stored as found so they are fetched as linked
+            assert added == ["https://example.com/perfume/A-1.html?ref=x", "https://example.com/perfume/B-2.html/"]
+            assert frontier.add(["https://example.com/perfume/A-1.html#reviews"], "perfume") == []
+            assert "https://EXAMPLE.com/perfume/A-1.html" in frontier and len(frontier) == 2
+
+            (a, kind, parent), = frontier.claim()
+            assert (a, kind, parent) == ("https://example.com/perfume/A-1.html?ref=x", "perfume", "Brand")
+            assert frontier.claim(kind="designer") == []
+            assert frontier.fail(a, "timeout") is True
+            # The failed URL waits behind the untried one
+            assert [url for url, _, _ in frontier.claim(limit=5)] == ["https://example.com/perfume/B-2.html/", a]
+            assert frontier.fail(a, "timeout") is False
+            frontier.done("https://example.com/perfume/B-2.html")
+            assert frontier.counts() == {"pending": 0, "in_flight": 0, "done": 1, "failed": 1}
+            assert frontier.fail("https://example.com/unknown", "x") is False
+            assert list(frontier.iter_urls("perfume", "done")) == [("https://example.com/perfume/B-2.html/", "Brand")]
+
+    def test_resume_requeues_in_flight(self, tmp_path):
+        from frontier import CrawlFrontier
+
+        path = str(tmp_path / "frontier.sqlite3")
+        frontier = CrawlFrontier(path)
+        frontier.add(["https://example.com/a", "https://example.com/b"], "designer")
+        frontier.claim()
+        frontier.close()  # Crashed with /a in flight
+
+        with CrawlFrontier(path) as resumed:
+            assert resumed.counts("designer")["pending"] == 2
+            assert [url for url, _, _ in resumed.claim(limit=2)] == ["https://example.com/a", "https://example.com/b"]
+
+
+class TestFragranceScraper:
+    DESIGNERS_PAGE = """
+    <html><body>
+      <a href="/designers/Creed.html">Creed</a>
+      <a href="/designers/Armaf.html">Armaf</a>
+      <a href="/designers/Creed.html">Creed again</a>
+    </body></html>
+    """
+    DESIGNER_PAGE = """
+    <html><body>
+      <a href="/perfume/Creed/Aventus-9828.html">Aventus</a>
+      <a href="https://example.com/perfume/Creed/Green-Irish-Tweed-474.html">GIT</a>
+      <a href="/perfume/Creed/Aventus-9828.html">Aventus</a>
+    </body></html>
+    """
+
+    @pytest.fixture
+    def scraper(self, scrape_dir, mocker):
+        import scrape_sites
+
+        mocker.patch.object(scrape_sites.FragranceScraper, "BASE_URL", "https://example.com")
+        mocker.patch.object(scrape_sites.time, "sleep")
+        return scrape_sites.FragranceScraper()
+
+    def test_discovery_and_detail_scrape(self, scraper, scrape_dir, mocker):
+        import scrape_sites
+
+        patch_http(mocker, side_effect=[
+            FakeResponse(text=self.DESIGNERS_PAGE),
+            FakeResponse(text=self.DESIGNER_PAGE),
+            FakeResponse(text=self.DESIGNER_PAGE.replace("Creed", "Armaf")),
+            FakeResponse(text=load_fixture("perfume_aventus.html")),
+            FakeResponse(404),
+            FakeResponse(404),
+            FakeResponse(404),
+        ])
+        scraper.generate_designer_links()
+        links = (scrape_dir / "website_designer_links.txt").read_text().split()
+        assert links == ["https://example.com/designers/Creed.html", "https://example.com/designers/Armaf.html"]
+
+        scraper.scrape_all_designers()
+        by_designer = json.loads((scrape_dir / "website_perfumes_by_designer.json").read_text())
+        assert by_designer[0] == {"brand": "Creed", "perfumes": [
+            "https://example.com/perfume/Creed/Aventus-9828.html",
+            "https://example.com/perfume/Creed/Green-Irish-Tweed-474.html",
+        ]}
+        with scraper.open_frontier() as frontier:
+            assert frontier.counts("designer")["done"] == 2 and frontier.counts("perfume")["pending"] == 4
+
+        scraper.scrape_all_perfumes()
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert [p["name"] for p in data] == ["Aventus Creed for men"]
+
+    def test_failed_designer_does_not_abort_the_run(self, scraper, scrape_dir, mocker):
+        (scrape_dir / "website_designer_links.txt").write_text(
+            "https://example.com/designers/Creed.html\nhttps://example.com/designers/Armaf.html\n"
+        )
+        creed, armaf = "https://example.com/designers/Creed.html", "https://example.com/designers/Armaf.html"
+        responses = {
+            creed: [RuntimeError("boom"), ("Creed", [])],
+            armaf: [("Armaf", ["https://example.com/perfume/Armaf/CDNIM-1.html"])],
+        }
+        calls = []
+
+        def details(url):
+            calls.append(url)
+            result = responses[url].pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        mocker.patch.object(scraper, "scrape_perfume_details", side_effect=details)
+        scraper.scrape_all_designers()
+        assert calls == [creed, armaf, creed]  # Creed failed, and was retried after Armaf rather than straight away
+        by_designer = json.loads((scrape_dir / "website_perfumes_by_designer.json").read_text())
+        assert by_designer == [{"brand": "Armaf", "perfumes": ["https://example.com/perfume/Armaf/CDNIM-1.html"]}]
+        with scraper.open_frontier() as frontier:
+            assert frontier.counts("designer")["done"] == 2
+
+    def test_crawl_is_one_resumable_pipeline(self, scraper, scrape_dir, mocker):
+        pages = {
+            "https://example.com/designers/": self.DESIGNERS_PAGE,
+            "https://example.com/designers/Creed.html": self.DESIGNER_PAGE,
+            "https://example.com/designers/Armaf.html": "<html></html>",
+            "https://example.com/perfume/Creed/Aventus-9828.html": load_fixture("perfume_aventus.html"),
+        }
+        fetched, killed = [], []
+
+        def get(url, **kwargs):
+            fetched.append(url)
+            if url == "https://example.com/designers/Armaf.html" and not killed:
+                killed.append(url)
+                raise Killed  # The process dies mid-run
+            return FakeResponse(text=pages[url]) if url in pages else FakeResponse(404)
+
+        patch_http(mocker, side_effect=get)
+        with pytest.raises(Killed):
+            scraper.crawl()
+        assert fetched == ["https://example.com/designers/", "https://example.com/designers/Creed.html",
+                           "https://example.com/designers/Armaf.html"]
+
+        fetched.clear()
+        counts = scraper.crawl()
+        assert fetched[0] == "https://example.com/designers/Armaf.html"
+        assert fetched.count("https://example.com/perfume/Creed/Green-Irish-Tweed-474.html") == 3  # Retried, then failed
+        assert counts == {"pending": 0, "in_flight": 0, "done": 4, "failed": 1}
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert [p["name"] for p in data] == ["Aventus Creed for men"]
+        assert json.loads((scrape_dir / "website_perfumes_by_designer.json").read_text())[0]["brand"] == "Creed"
+
+    def test_request_with_retry_gives_up_on_rate_limits(self, scraper, mocker):
+        import scrape_sites
+
+        patch_http(mocker, return_value=FakeResponse(429))
+        assert scraper.request_with_retry("https://example.com/a") is None
+        assert scraper.get_all_designer_links() == []
+        assert scraper.scrape_perfume_details("https://example.com/designers/Creed.html") == (None, [])
+        assert scraper.scrape_perfume_data("https://example.com/perfume/Creed/Aventus-9828.html") is None
+
+    @pytest.mark.asyncio
+    async def test_scrape_all_perfumes_async(self, scraper, scrape_dir, stub_site):
+        import asyncio
+
+        site = await stub_site()
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(4)]
+        (scrape_dir / "website_perfumes_by_designer.json").write_text(json.dumps([{"brand": "Creed", "perfumes": urls}]))
+
+        stats = await asyncio.to_thread(scraper.scrape_all_perfumes_async, concurrency=4, rate_per_host=1000)
+        assert stats.parsed == 4
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert sorted(p["url"] for p in data) == sorted(urls)
+
+    @pytest.mark.asyncio
+    async def test_perfume_data_scraper_async(self, scrape_dir, stub_site):
+        import asyncio
+        from scrape_perfume_data import PerfumeDataScraper
+
+        site = await stub_site()
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(3)]
+        (scrape_dir / "website_perfumes_by_designer.json").write_text(json.dumps([{"brand": "Creed", "perfumes": urls}]))
+
+        scraper = PerfumeDataScraper()
+        scraper.save_progress(make_record(0, url=urls[0]))
+        stats = await asyncio.to_thread(scraper.scrape_all_perfumes_async, concurrency=2, rate_per_host=1000)
+
+        assert stats.parsed == 2
+        assert len([p for p in site.hits]) == 2
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert sorted(p["url"] for p in data) == sorted(urls)
+
+
+def parse_or_fail(url, html):
+    """Top-level (picklable) parser for pipeline tests."""
+    from scrape_perfume_data import parse_perfume_html
+
+    if url.endswith("-bad.html"):
+        raise ValueError("unparseable")
+    return parse_perfume_html(url, html)
+
+
+class TestParsePipeline:
+    @pytest.mark.asyncio
+    async def test_pipeline_parses_in_process_pool(self, stub_site, tmp_path, monkeypatch, scrape_log):
+        from pipeline import ParsePipeline
+
+        monkeypatch.chdir(tmp_path)
+        site = await stub_site()
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(10)]
+        urls.append(site.url("/perfume/Creed/Aventus-bad.html"))
+
+        saved = []
+        pipeline = ParsePipeline(parse=parse_or_fail, sink=saved.append, parse_workers=2, queue_size=2,
+                                 concurrency=4, rate_per_host=1000, burst=4)
+        stats = await pipeline.run(urls)
+
+        assert len(saved) == 10
+        assert all(perfume.name == "Aventus Creed for men" and missing == [] for perfume, missing in saved)
+        assert stats.fetch.items == 11
+        assert stats.parse.items == 10 and stats.parse.failed == 1
+        assert stats.write.items == 10
+        assert stats.parse.busy > 0 and stats.parse.per_second_busy > 0
+        assert set(stats.as_dict()) == {"elapsed_seconds", "fetch", "parse", "write"}
+        assert "parse" in stats.report()
+        assert [e["code"] for e in logged_events(scrape_log)] == ["parse_error"]
+        assert "unparseable" in logged_events(scrape_log)[0]["message"]
+
+    @pytest.mark.asyncio
+    async def test_scraper_pipeline_modes(self, scrape_dir, stub_site):
+        import asyncio
+        import scrape_sites
+        from scrape_perfume_data import PerfumeDataScraper
+
+        site = await stub_site()
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(4)]
+        (scrape_dir / "website_perfumes_by_designer.json").write_text(json.dumps([{"brand": "Creed", "perfumes": urls}]))
+
+        stats = await asyncio.to_thread(PerfumeDataScraper().scrape_all_perfumes_pipeline,
+                                        concurrency=4, rate_per_host=1000, parse_workers=2)
+        assert stats.write.items == 4
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert sorted(p["url"] for p in data) == sorted(urls)
+
+        (scrape_dir / "website_all_perfumes.json").unlink()
+        stats = await asyncio.to_thread(scrape_sites.FragranceScraper().scrape_all_perfumes_pipeline,
+                                        concurrency=4, rate_per_host=1000, parse_workers=2)
+        assert stats.write.items == 4
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert sorted(p["url"] for p in data) == sorted(urls)
+
+
+class TestExtractorParity:
+    URL = "https://example.com/perfume/Brand/Perfume-1.html"
+
+    @pytest.mark.parametrize("fixture", sorted(f for f in os.listdir(FIXTURES) if f.endswith(".html")))
+    @pytest.mark.parametrize("as_bytes", [False, True])
+    def test_lxml_matches_soup_reference(self, fixture, as_bytes):
+        from extractors import get_extractor
+
+        html = load_fixture(fixture)
+        if as_bytes:
+            html = html.encode("utf-8")
+
+        reference = get_extractor("soup").extract(self.URL, html)
+        fast = get_extractor("lxml").extract(self.URL, html)
+        assert fast == reference
+
+    def test_edge_cases_fixture(self):
+        from extractors import get_extractor
+
+        perfume, missing = get_extractor("lxml").extract(self.URL, load_fixture("perfume_edge_cases.html"))
+        assert perfume.notes == ["Leather", "Jasmine Sambac & Amber"]
+        assert perfume.accords == [{"leather": 100.0}, {"floral": 47.75}]
+        assert perfume.pros == ["Long lasting"] and perfume.cons == ["Polarizing"]
+        assert missing == ["accords: animalic", "accords: smoky"]
+
+    def test_bytes_without_charset_declaration(self):
+        from extractors import get_extractor
+
+        # Pages arrive as raw bytes, and not every page declares its encoding
+        html = load_fixture("perfume_no_charset.html").encode("utf-8")
+        perfume, _ = get_extractor("lxml").extract(self.URL, html)
+        assert perfume.name == "Avéntus Creed for men" and "crème brûlée" in perfume.reviews[0]
+
+    def test_empty_document(self):
+        from extractors import get_extractor
+
+        perfume, missing = get_extractor("lxml").extract(self.URL, "")
+        assert perfume.name == "Unknown"
+        assert missing == ["name", "brand", "photo_url"]
+
+    def test_unknown_backend(self):
+        from extractors import PerfumeExtractor, get_extractor
+
+        with pytest.raises(ValueError):
+            get_extractor("regex")
+        with pytest.raises(TypeError):
+            PerfumeExtractor()  # Abstract: backends must implement extract
+
+    def test_scraper_uses_configured_backend(self, scrape_dir, mocker):
+        import scrape_perfume_data
+        from scrape_perfume_data import PerfumeDataScraper
+
+        extract = mocker.spy(scrape_perfume_data.get_extractor("lxml"), "extract")
+        scraper = PerfumeDataScraper(extractor="lxml")
+        perfume = scraper.parse_perfume_page(self.URL, load_fixture("perfume_aventus.html"))
+        assert perfume.name == "Aventus Creed for men"
+        assert extract.call_count == 1
+
+
+class TestHtmlCache:
+    def test_put_get_and_content_addressing(self, tmp_path):
+        from html_cache import HtmlCache
+
+        cache = HtmlCache(str(tmp_path / "cache"))
+        body = load_fixture("perfume_aventus.html").encode("utf-8")
+        entry = cache.put("https://example.com/a", body, {"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+        cache.put("https://example.com/b", body)
+
+        assert len(cache) == 2 and "https://example.com/a" in cache
+        assert cache.get_body("https://example.com/a") == body
+        assert cache.get("https://example.com/missing") is None
+        assert cache.get_body("https://example.com/missing") is None
+        objects = [f for _, _, files in os.walk(tmp_path / "cache" / "objects") for f in files]
+        assert len(objects) == 1  # Same body stored once
+        assert os.path.getsize(os.path.join(cache._object_path(entry.digest))) < len(body)
+
+        assert cache.conditional_headers("https://example.com/a") == {
+            "If-None-Match": '"abc"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        assert cache.conditional_headers("https://example.com/b") == {}
+
+        cache.touch("https://example.com/a", {"ETag": '"def"'})
+        assert cache.get("https://example.com/a").etag == '"def"'
+        assert cache.get("https://example.com/a").last_modified == "Mon, 01 Jan 2024 00:00:00 GMT"
+        assert [url for url, _ in cache.iter_pages()] == ["https://example.com/a", "https://example.com/b"]
+        cache.close()
+
+    def test_scraper_serves_cache_and_revalidates(self, scrape_dir, mocker):
+        import scrape_perfume_data
+        from scrape_perfume_data import PerfumeDataScraper
+
+        url = make_record(0)["url"]
+        get = patch_http(mocker, return_value=FakeResponse(
+            text=load_fixture("perfume_aventus.html"), headers={"ETag": '"v1"'}))
+
+        scraper = PerfumeDataScraper()
+        assert scraper.fetch_page(url) == load_fixture("perfume_aventus.html").encode("utf-8")
+        assert scraper.fetch_page(url) is not None
+        assert get.call_count == 1  # Second read came from the cache
+
+        get.return_value = FakeResponse(304)
+        refresher = PerfumeDataScraper(refresh=True)
+        assert refresher.scrape_perfume_data(url).name == "Aventus Creed for men"
+        assert get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+        # A lost cache body means a plain GET; validators would only earn a 304 with nothing to serve
+        os.remove(scraper.cache._object_path(scraper.cache.get(url).digest))
+        get.return_value = FakeResponse(text=load_fixture("perfume_aventus.html"), headers={"ETag": '"v1"'})
+        assert PerfumeDataScraper().fetch_page(url) == load_fixture("perfume_aventus.html").encode("utf-8")
+        assert "If-None-Match" not in get.call_args.kwargs["headers"]
+
+        uncached = PerfumeDataScraper(use_cache=False)
+        get.return_value = FakeResponse(text="<html></html>")
+        assert uncached.fetch_page(url) == b"<html></html>"
+        with pytest.raises(ValueError):
+            uncached.reextract_from_cache()
+
+    def test_reextract_from_cache_needs_no_network(self, scrape_dir, mocker):
+        import scrape_perfume_data
+        import scrape_sites
+        from scrape_perfume_data import PerfumeDataScraper
+
+        scraper = PerfumeDataScraper()
+        urls = [make_record(i)["url"] for i in range(3)]
+        scraper.cache.put(urls[0], load_fixture("perfume_aventus.html").encode("utf-8"))
+        scraper.cache.put(urls[1], load_fixture("perfume_khamrah.html").encode("utf-8"))
+        scraper.cache.put("https://example.com/designers/Brand.html", b"<html></html>")
+        scraper.save_progress(make_record(2, name="Stale"))
+
+        patch_http(mocker, side_effect=AssertionError("network used"))
+        assert scraper.reextract_from_cache(parse_workers=2) == 3
+
+        # The perfume without cached HTML keeps its existing record
+        data = json.loads((scrape_dir / "website_all_perfumes.json").read_text())
+        assert sorted(p["name"] for p in data) == ["Aventus Creed for men", "Khamrah Lattafa Perfumes for women and men", "Stale"]
+        assert PerfumeDataScraper().scraped_perfumes == set(urls)
+
+        patch_http(mocker, side_effect=AssertionError("network used"))
+        assert scrape_sites.FragranceScraper().reextract_from_cache() == 2
+
+        # One unparseable page doesn't abort the rest
+        fragrance = scrape_sites.FragranceScraper()
+        parse = fragrance.parse_perfume_page
+        mocker.patch.object(fragrance, "parse_perfume_page",
+                            side_effect=lambda url, body: parse(url, body) if url != urls[0] else 1 / 0)
+        assert fragrance.reextract_from_cache() == 1
+        with pytest.raises(ValueError):
+            scrape_sites.FragranceScraper(use_cache=False).reextract_from_cache()
+
+    @pytest.mark.asyncio
+    async def test_async_crawler_uses_cache(self, stub_site, tmp_path):
+        from async_crawler import AsyncCrawler
+        from html_cache import HtmlCache
+
+        site = await stub_site()
+        urls = [site.url(f"/perfume/Creed/Aventus-{i}.html") for i in range(3)]
+        cache = HtmlCache(str(tmp_path / "cache"))
+
+        def crawler(**kwargs):
+            return AsyncCrawler(parse=lambda url, html: url, sink=lambda url: None,
+                                rate_per_host=1000, burst=3, cache=cache, **kwargs)
+
+        stats = await crawler().crawl(urls)
+        assert stats.fetched == 3 and len(cache) == 3
+
+        stats = await crawler().crawl(urls)
+        assert stats.cached == 3 and len(site.hits) == 3
+
+        stats = await crawler(refresh=True).crawl(urls)
+        assert stats.revalidated == 3 and stats.parsed == 3
+
+        # An entry whose body is gone is fetched in full, not revalidated into nothing
+        os.remove(cache._object_path(cache.get(urls[0]).digest))
+        stats = await crawler(refresh=True).crawl(urls[:1])
+        assert stats.fetched == 1 and stats.revalidated == 0 and cache.get_body(urls[0])
+
+
+class TestHttpFetcher:
+    def test_retries_with_backoff_and_retry_after(self, tmp_path, monkeypatch, mocker):
+        import requests
+        from scraper_utils import HttpFetcher
+
+        monkeypatch.chdir(tmp_path)
+        get = patch_http(mocker, side_effect=[
+            FakeResponse(429, headers={"Retry-After": "7"}),
+            requests.exceptions.ConnectionError("reset"),
+            FakeResponse(503),
+            FakeResponse(200, "ok"),
+        ])
+        import scraper_utils
+        fetcher = HttpFetcher(base_wait=2, max_wait=30)
+        assert fetcher.get("https://example.com/a").text == "ok"
+        assert get.call_count == 4
+
+        waits = [call.args[0] for call in scraper_utils.time.sleep.call_args_list]
+        assert waits[0] == 7  # Retry-After honoured
+        assert 2 <= waits[1] <= 4 and 4 <= waits[2] <= 8  # Jittered exponential
+
+        metrics = fetcher.metrics.as_dict()["example.com"]
+        assert metrics["requests"] == 4 and metrics["retries"] == 3 and metrics["errors"] == 1
+        assert metrics["statuses"] == {429: 1, 503: 1, 200: 1}
+        assert "example.com: 4 requests" in fetcher.metrics.report()
+
+    def test_gives_up(self, tmp_path, monkeypatch, mocker, scrape_log):
+        import scraper_utils
+        from scraper_utils import HttpFetcher
+
+        monkeypatch.chdir(tmp_path)
+        patch_http(mocker, side_effect=[FakeResponse(404)])
+        fetcher = HttpFetcher()
+        assert fetcher.get("https://example.com/missing") is None
+        assert logged_events(scrape_log)[-1]["code"] == "http_404"
+
+        patch_http(mocker, return_value=FakeResponse(429))
+        assert fetcher.get("https://example.com/busy", max_retries=3) is None
+        event = logged_events(scrape_log)[-1]
+        assert event["code"] == "max_retries" and event["url"] == "https://example.com/busy"
+        # Backs off between attempts, but not after the last one
+        assert scraper_utils.time.sleep.call_count == 2
+
+    def test_keep_alive_reuses_connections(self, tmp_path, monkeypatch):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from scraper_utils import HttpFetcher
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = b"<html></html>"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            fetcher = HttpFetcher()
+            base = f"http://127.0.0.1:{server.server_port}"
+            for i in range(5):
+                assert fetcher.get(f"{base}/page-{i}").status_code == 200
+            metrics = fetcher.metrics.as_dict()[f"127.0.0.1:{server.server_port}"]
+            assert metrics["requests"] == 5
+            assert metrics["connections"] == 1
+            assert metrics["p95_latency"] >= metrics["p50_latency"] > 0
+            fetcher.close()
+        finally:
+            server.shutdown()
+
+    def test_latency_reservoir_is_bounded(self):
+        from scraper_utils import HostMetrics, backoff_delay
+
+        metrics = HostMetrics()
+        for i in range(HostMetrics.MAX_SAMPLES * 2):
+            metrics.record(i / 1000, 200)
+        assert len(metrics.latencies) == HostMetrics.MAX_SAMPLES
+        assert metrics.requests == HostMetrics.MAX_SAMPLES * 2
+        assert HostMetrics().percentile(50) == 0.0
+        assert backoff_delay(10, 1, 5) <= 5
+
+
+class FakeAuthor:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeComment:
+    def __init__(self, body, author="someone", score=1):
+        self.body = body
+        self.author = FakeAuthor(author) if author else None
+        self.score = score
+
+
+class FakeCommentForest:
+    def __init__(self, comments):
+        self._comments = comments
+        self.expanded = 0
+
+    def replace_more(self, limit=None):
+        self.expanded += 1
+        return []
+
+    def list(self):
+        return list(self._comments)
+
+
+class FakeSubmission:
+    def __init__(self, post_id, created_utc, num_comments=None, subreddit="fragrance", title=None):
+        self.id = post_id
+        self.created_utc = created_utc
+        self.title = title or f"Post {post_id}"
+        self.url = f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/"
+        self.selftext = "Looking for a clone"
+        self.score = 10
+        self.subreddit = subreddit
+        comment_count = 2 if num_comments is None else num_comments
+        self.comments = FakeCommentForest([FakeComment(f"comment {i}") for i in range(comment_count)])
+        self.num_comments = comment_count
+
+
+class FakeSubreddit:
+    def __init__(self, name, submissions):
+        self.name = name
+        self.submissions = submissions
+        self.searches = []
+
+    def __str__(self):
+        return self.name
+
+    def search(self, query, sort="relevance", limit=None):
+        self.searches.append(query)
+        results = [s for s in self.submissions if query in s.title]
+        if sort == "new":
+            results.sort(key=lambda s: s.created_utc, reverse=True)
+        return iter(results)
+
+
+class FakeReddit:
+    """Stand-in for praw.Reddit serving canned submissions."""
+
+    def __init__(self, subreddits, latency=0.0):
+        self.subreddits = subreddits
+        self.threads = set()
+        self.latency = latency
+
+    def subreddit(self, name):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.latency)
+        return self.subreddits[name]
+
+    def submission(self, id=None, url=None):
+        self.threads.add(threading.get_ident())
+        for subreddit in self.subreddits.values():
+            for submission in subreddit.submissions:
+                if submission.id == id or submission.url == url:
+                    return submission
+        raise KeyError(id or url)
+
+
+class TestRedditIncremental:
+    @pytest.fixture
+    def reddit_env(self, tmp_path, monkeypatch):
+        import scrape_reddit
+        from reddit_store import RedditStore
+        from scraper_utils import RateBudget
+
+        monkeypatch.chdir(tmp_path)
+        submissions = [FakeSubmission(f"p{i}", 1_700_000_000 + i * 100, title=f"clone {i}") for i in range(5)]
+        reddit = FakeReddit({"fragrance": FakeSubreddit("fragrance", submissions)})
+
+        def make_scraper():
+            store = RedditStore(str(tmp_path / "posts.ndjson"), str(tmp_path / "watermarks.json"))
+            scraper = scrape_reddit.RedditScraper(reddit=reddit, store=store, budget=RateBudget(1000, capacity=100))
+            scraper.subreddits = ["fragrance"]
+            scraper.search_terms = ["clone"]
+            return scraper
+
+        return make_scraper, submissions, reddit
+
+    def test_first_run_ingests_everything(self, reddit_env):
+        make_scraper, submissions, _ = reddit_env
+        posts = list(make_scraper().fetch_reddit_posts())
+        assert sorted(p["id"] for p in posts) == [f"p{i}" for i in range(5)]
+        assert all(s.comments.expanded == 1 for s in submissions)
+
+        reloaded = make_scraper().store
+        assert len(reloaded) == 5
+        assert reloaded.get_watermark("fragrance", "clone") == submissions[-1].created_utc
+
+    def test_refresh_only_touches_new_and_changed_posts(self, reddit_env):
+        make_scraper, submissions, reddit = reddit_env
+        make_scraper().fetch_reddit_posts()
+
+        # One new post arrives and one recent post gains a comment
+        changed = submissions[4]
+        changed.comments._comments.append(FakeComment("late reply"))
+        changed.num_comments += 1
+        fresh = FakeSubmission("p9", 1_700_001_000, title="clone 9")
+        reddit.subreddits["fragrance"].submissions.append(fresh)
+
+        scraper = make_scraper()
+        posts = {p["id"]: p for p in scraper.fetch_reddit_posts(lookback=150)}
+        assert len(posts) == 6
+        assert len(posts["p4"]["comments"]) == 3
+        assert fresh.comments.expanded == 1 and changed.comments.expanded == 2
+        # Older posts are behind the lookback window and never re-expanded
+        assert all(s.comments.expanded == 1 for s in submissions[:4])
+        assert scraper.store.get_watermark("fragrance", "clone") == fresh.created_utc
+
+    def test_full_mode_re_expands_everything(self, reddit_env):
+        make_scraper, submissions, _ = reddit_env
+        make_scraper().fetch_reddit_posts()
+        make_scraper().fetch_reddit_posts(incremental=False)
+        assert all(s.comments.expanded == 2 for s in submissions)
+        assert len(make_scraper().store) == 5
+
+    def test_specific_posts_merge_into_store(self, reddit_env, mocker):
+        make_scraper, submissions, reddit = reddit_env
+        scraper = make_scraper()
+        scraper.fetch_reddit_posts()
+        reddit.subreddits["fragrance"].wiki = {"faq": mocker.Mock(content_md="# FAQ")}
+
+        posts = list(scraper.fetch_specific_posts([
+            "https://www.reddit.com/r/fragrance/wiki/faq/",
+            submissions[0].url,
+        ]))
+        ids = [p["id"] for p in posts]
+        assert len(ids) == len(set(ids)) == 6
+        assert "wiki_faq" in make_scraper().store
+
+
+class TestRedditScheduler:
+    def make_scraper(self, tmp_path, subreddits, budget, workers=4):
+        import scrape_reddit
+        from reddit_store import RedditStore
+
+        reddit = FakeReddit(subreddits)
+        store = RedditStore(str(tmp_path / "posts.ndjson"), str(tmp_path / "watermarks.json"))
+        scraper = scrape_reddit.RedditScraper(reddit=reddit, store=store, workers=workers, budget=budget)
+        scraper.subreddits = list(subreddits)
+        scraper.search_terms = ["clone", "dupe"]
+        return scraper, reddit
+
+    def test_fans_out_and_expands_each_post_once(self, tmp_path, monkeypatch):
+        from scraper_utils import RateBudget
+
+        monkeypatch.chdir(tmp_path)
+        subreddits = {
+            name: FakeSubreddit(name, [
+                FakeSubmission(f"{name}{i}", 1_700_000_000 + i, subreddit=name, title=f"clone dupe {i}")
+                for i in range(6)
+            ])
+            for name in ("fragrance", "fragranceclones", "DesiFragranceAddicts")
+        }
+        scraper, reddit = self.make_scraper(tmp_path, subreddits, RateBudget(1000, capacity=100))
+        reddit.latency = 0.02  # Searches overlap like real API calls, so the pool needs more than one thread
+        posts = list(scraper.fetch_reddit_posts())
+
+        assert len(posts) == 18
+        assert {p["subreddit"] for p in posts} == set(subreddits)
+        # Posts matching both terms are expanded once
+        assert all(s.comments.expanded == 1 for sub in subreddits.values() for s in sub.submissions)
+        assert all(sorted(sub.searches) == ["clone", "dupe"] for sub in subreddits.values())
+        assert len(reddit.threads) > 1
+        assert scraper.store.get_watermark("fragranceclones", "dupe") == 1_700_000_005
+
+    def test_workers_share_one_budget(self, tmp_path, monkeypatch):
+        from scraper_utils import RateBudget
+
+        monkeypatch.chdir(tmp_path)
+        subreddits = {
+            "fragrance": FakeSubreddit("fragrance", [
+                FakeSubmission(f"p{i}", 1_700_000_000 + i, title=f"clone {i}") for i in range(4)
+            ])
+        }
+        started = time.monotonic()
+        budget = RateBudget(rate=100, capacity=1)
+        scraper, _ = self.make_scraper(tmp_path, subreddits, budget, workers=8)
+        scraper.fetch_reddit_posts()
+        elapsed = time.monotonic() - started
+
+        # 2 searches + 4 submission fetches + 4 replace_more calls; the first token is free
+        assert elapsed >= 9 / 100
+        assert budget.waited > 0
+
+    def test_failed_search_keeps_its_watermark(self, tmp_path, monkeypatch, scrape_log):
+        from scraper_utils import RateBudget
+
+        monkeypatch.chdir(tmp_path)
+        subreddit = FakeSubreddit("fragrance", [FakeSubmission("p1", 1_700_000_000, title="clone dupe")])
+        original = subreddit.search
+
+        def flaky_search(query, **kwargs):
+            if query == "dupe":
+                raise RuntimeError("503 from search")
+            return original(query, **kwargs)
+
+        subreddit.search = flaky_search
+        scraper, _ = self.make_scraper(tmp_path, {"fragrance": subreddit}, RateBudget(1000, capacity=100))
+        assert len(list(scraper.fetch_reddit_posts())) == 1
+        assert scraper.store.get_watermark("fragrance", "clone") == 1_700_000_000
+        assert scraper.store.get_watermark("fragrance", "dupe") is None
+        event = logged_events(scrape_log)[-1]
+        assert event["code"] == "reddit_search_error" and event["term"] == "dupe"
+        assert "503 from search" in event["message"]
+
+    def test_failed_post_holds_back_every_term_it_matched(self, tmp_path, monkeypatch, scrape_log):
+        import scrape_reddit
+        from scraper_utils import RateBudget
+
+        monkeypatch.chdir(tmp_path)
+        subreddit = FakeSubreddit("fragrance", [FakeSubmission("p1", 1_700_000_000, title="clone dupe")])
+        scraper, _ = self.make_scraper(tmp_path, {"fragrance": subreddit}, RateBudget(1000, capacity=100))
+        monkeypatch.setattr(scrape_reddit.RedditScraper, "scrape_submission", lambda *args: 1 / 0)
+        assert list(scraper.fetch_reddit_posts()) == []
+        # p1 was expanded once, on behalf of whichever term found it first; neither term may skip past it
+        assert scraper.store.get_watermark("fragrance", "clone") is None
+        assert scraper.store.get_watermark("fragrance", "dupe") is None
+        assert logged_events(scrape_log)[-1]["code"] == "reddit_post_error"
+
+    def test_saves_each_subreddit_as_it_finishes(self, tmp_path, monkeypatch):
+        from reddit_store import RedditStore
+        from scraper_utils import RateBudget
+
+        monkeypatch.chdir(tmp_path)
+        subreddits = {
+            name: FakeSubreddit(name, [FakeSubmission(f"{name}1", 1_700_000_000, subreddit=name, title="clone")])
+            for name in ("fragrance", "fragranceclones")
+        }
+        scraper, _ = self.make_scraper(tmp_path, subreddits, RateBudget(1000, capacity=100), workers=1)
+        saved = []
+        monkeypatch.setattr(RedditStore, "save", lambda store: saved.append(len(store)))
+        scraper.fetch_reddit_posts()
+        # One save per subreddit; which one finishes first depends on job scheduling
+        assert len(saved) == 2 and saved[-1] == 2
+
+
+class TestRateBudget:
+    def test_bursts_then_throttles(self):
+        from scraper_utils import RateBudget
+
+        budget = RateBudget(rate=50, capacity=3)
+        started = time.monotonic()
+        waits = [budget.acquire() for _ in range(6)]
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert time.monotonic() - started >= 3 / 50 * 0.9
+
+    def test_observe_pauses_until_quota_resets(self):
+        from scraper_utils import RateBudget
+
+        budget = RateBudget(rate=1000, capacity=10)
+        budget.observe(remaining=5, reset_timestamp=time.time() + 60)
+        assert budget.acquire() == 0.0
+        budget.observe(remaining=0, reset_timestamp=time.time() + 0.1)
+        assert budget.acquire() >= 0.05
+
+    def test_observe_does_not_wait_behind_acquire(self):
+        from scraper_utils import RateBudget
+
+        budget = RateBudget(rate=2, capacity=1)
+        budget.acquire()
+        waiter = threading.Thread(target=budget.acquire)
+        waiter.start()
+        time.sleep(0.05)
+        started = time.monotonic()
+        budget.observe(remaining=0, reset_timestamp=time.time() + 0.1)
+        assert time.monotonic() - started < 0.1
+        waiter.join()
+        assert budget.tokens < 1
+
+
+class TestRedditStore:
+    def test_log_keeps_last_version_and_compacts(self, tmp_path):
+        from reddit_store import RedditStore, iter_ndjson
+
+        path = str(tmp_path / "posts.ndjson")
+        store = RedditStore(path, str(tmp_path / "state.json"), legacy_path=None)
+        assert store.upsert({"id": "a", "num_comments": 1})
+        assert store.upsert_many([{"id": "b", "num_comments": 0}, {"id": "c", "num_comments": 0}]) == 2
+        for comments in range(2, 6):
+            assert not store.upsert({"id": "a", "num_comments": comments})
+
+        assert [p["id"] for p in store] == ["b", "c", "a"]
+        assert next(p for p in store if p["id"] == "a")["num_comments"] == 5
+        assert not store.needs_update("a", 5) and store.needs_update("a", 6)
+
+        # 7 lines for 3 posts: save() compacts the log down to the live versions
+        store.save()
+        assert len(list(iter_ndjson(path))) == 3
+        reopened = RedditStore(path, str(tmp_path / "state.json"), legacy_path=None)
+        assert len(reopened) == 3 and reopened.lines == 3
+
+    def test_survives_torn_write(self, tmp_path):
+        from reddit_store import RedditStore, append_ndjson
+
+        path = str(tmp_path / "posts.ndjson")
+        append_ndjson(path, [{"id": "a", "num_comments": 1}])
+        with open(path, "ab") as f:
+            f.write(b'{"id": "b", "num_com')  # Crash mid-write
+
+        store = RedditStore(path, str(tmp_path / "state.json"), legacy_path=None)
+        assert len(store) == 1
+        store.upsert({"id": "c", "num_comments": 0})
+        assert [p["id"] for p in store] == ["a", "c"]
+
+    def test_imports_legacy_json_once(self, tmp_path):
+        from reddit_store import RedditStore
+
+        legacy = tmp_path / "reddit_perfume_discussions.json"
+        legacy.write_text(json.dumps([{"id": "old", "num_comments": 3, "title": "Legacy"}]))
+        path = str(tmp_path / "posts.ndjson")
+        store = RedditStore(path, str(tmp_path / "state.json"), legacy_path=str(legacy))
+        assert "old" in store and not store.needs_update("old", 3)
+
+        store.upsert({"id": "new", "num_comments": 0})
+        again = RedditStore(path, str(tmp_path / "state.json"), legacy_path=str(legacy))
+        assert sorted(p["id"] for p in again) == ["new", "old"]
+
+
+class TestScrapeLog:
+    def test_aggregates_missing_fields_into_summary(self, tmp_path):
+        from scrape_log import ScrapeLog
+
+        with ScrapeLog(str(tmp_path), summary_interval=3600, echo_per_second=0, examples=2) as log:
+            log.missing_fields("https://example.com/1", ["photo_url", "accords: Woody", "accords: Amber"])
+            log.missing_fields("https://example.com/2", ["photo_url"])
+            log.missing_fields("https://example.com/3", ["photo_url", "brand"])
+            log.missing_fields("https://example.com/4", [])
+            log.error("http_404", "https://example.com/5", "gone")
+
+        summary = json.loads((tmp_path / ScrapeLog.SUMMARY_FILE).read_text())
+        assert summary["pages"] == 4 and summary["pages_with_missing"] == 3
+        assert [f["field"] for f in summary["fields"]] == ["photo_url", "accords", "brand"]
+        assert summary["fields"][0]["count"] == 3 and summary["fields"][0]["rate"] == 0.75
+        assert summary["fields"][0]["examples"] == ["https://example.com/1", "https://example.com/2"]
+        assert summary["errors"] == {"http_404": 1}
+        assert not (tmp_path / "missing_fields.log").exists()
+
+    def test_summary_is_rewritten_periodically(self, tmp_path):
+        from scrape_log import ScrapeLog
+
+        log = ScrapeLog(str(tmp_path), summary_interval=0.05, echo_per_second=0)
+        log.missing_fields("https://example.com/1", ["brand"])
+        summary_path = tmp_path / ScrapeLog.SUMMARY_FILE
+        deadline = time.monotonic() + 5
+        while not summary_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert json.loads(summary_path.read_text())["fields"][0]["field"] == "brand"
+        log.close()
+
+    def test_writer_survives_failures(self, tmp_path, capsys, mocker):
+        from scrape_log import ScrapeLog
+
+        log = ScrapeLog(str(tmp_path), summary_interval=3600, echo_per_second=0)
+        log.error("bad_field", "https://example.com/1", "unserializable", extra=object())
+        log.error("http_404", "https://example.com/2", "gone")
+        log.flush()  # Returns even though one event could not be written
+        assert [e["code"] for e in logged_events(log)] == ["http_404"]
+
+        mocker.patch.object(log, "_write_summary", side_effect=OSError("disk full"))
+        log.close()  # The final summary fails, but the writer still finishes
+        assert log.codes["log_writer_error"] == 2 and not log._thread.is_alive()
+        err = capsys.readouterr().err
+        assert "not JSON serializable" in err and "disk full" in err
+
+    def test_console_echo_is_rate_limited(self, tmp_path, capsys):
+        from scrape_log import ScrapeLog
+
+        with ScrapeLog(str(tmp_path), echo_per_second=3) as log:
+            for i in range(50):
+                log.error("http_500", f"https://example.com/{i}", f"Error 500 for page {i}")
+            log.flush()
+            assert len(logged_events(log)) == 50
+        assert capsys.readouterr().err.count("Error 500 for page") <= 6
+
+    def test_reddit_comments_are_not_printed(self, tmp_path, capsys):
+        import scrape_reddit
+        from reddit_store import RedditStore
+        from scraper_utils import RateBudget
+
+        submission = FakeSubmission("p1", 1_700_000_000)
+        store = RedditStore(str(tmp_path / "posts.ndjson"), str(tmp_path / "state.json"), legacy_path=None)
+        scraper = scrape_reddit.RedditScraper(reddit=FakeReddit({}), store=store, budget=RateBudget(1000, 10))
+        capsys.readouterr()
+        assert len(scraper.scrape_comments(submission)) == 2
+        assert "comment 0" not in capsys.readouterr().out
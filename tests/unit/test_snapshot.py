@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+import pytest
+
+from backend.embeddings import HashingEmbedder
+from backend.snapshot import (
+    CURRENT_FILE, Snapshot, SnapshotManager, build_snapshot, current_version, gather_context, perfume_id, publish_snapshot,
+)
+
+PERFUMES = [
+    {
+        "url": "https://example.com/perfume/Creed/Aventus-9828.html", "name": "Aventus Creed for men", "brand": "Creed",
+        "accords": [{"fruity": 100.0}, {"woody": 82.3}, {"smoky": 68.5}], "notes": ["Pineapple", "Birch"],
+        "pros": ["Compliment magnet"], "reviews": ["Smoky pineapple opening, iconic."],
+    },
+    {
+        "url": "https://example.com/perfume/Armaf/Club-de-Nuit-Intense-Man-34696.html", "name": "Club de Nuit Intense Man Armaf for men",
+        "brand": "Armaf", "accords": [{"fruity": 95.0}, {"woody": 80.0}, {"smoky": 60.0}], "notes": ["Lemon", "Pineapple", "Birch"],
+        "smells_like": ["Aventus Creed for men"], "reviews": ["The best budget Aventus clone."],
+    },
+    {
+        "url": "https://example.com/perfume/Lattafa/Khamrah-75805.html", "name": "Khamrah Lattafa for women and men",
+        "brand": "Lattafa", "accords": [{"sweet": 100.0}, {"warm spicy": 90.0}], "notes": ["Dates", "Cinnamon"],
+        "reviews": ["Boozy dates and cinnamon."],
+    },
+]
+POSTS = [
+    {"id": "p1", "title": "Creed Aventus vs CDNIM", "selftext": "Is the clone close enough?", "comments": [{"body": "Batch variation is real"}]},
+]
+
+
+def build(root, version, perfumes=PERFUMES, **kw):
+    return build_snapshot(str(root), perfumes, POSTS, embedder=HashingEmbedder(64), version=version, **kw)
+
+
+def test_perfume_id():
+    assert perfume_id(PERFUMES[0]["url"]) == 9828
+    assert perfume_id("https://example.com/perfume/no-id") is None
+
+
+class TestSnapshot:
+    def test_build_publish_and_open(self, tmp_path):
+        assert current_version(str(tmp_path)) is None
+        assert build(tmp_path, "v1") == "v1"
+        assert current_version(str(tmp_path)) == "v1"
+        assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+        snapshot = Snapshot(str(tmp_path / "v1"))
+        assert snapshot.manifest["perfumes"] == 3 and snapshot.manifest["embedder"] == "hashing-64"
+        assert isinstance(snapshot.keywords._docs, np.memmap) and isinstance(snapshot.accords.matrix, np.memmap)
+
+        hits = snapshot.search("aventus clone", k=3)
+        assert hits and all(hit["text"] for hit in hits)
+        assert {"doc_id", "score", "text"} <= set(hits[0])
+
+        assert snapshot.perfume(9828)["name"] == "Aventus Creed for men" and snapshot.perfume(1) is None
+        assert snapshot.perfume(9828)["notes"] == ["Pineapple", "Birch"] and snapshot.catalog.get(PERFUMES[0]["url"]).pros == ["Compliment magnet"]
+        assert snapshot._linker is None  # Built on first use only
+        with pytest.raises(KeyError):
+            snapshot.similar(1)
+        similar = snapshot.similar(9828, k=1)
+        assert similar[0]["id"] == 34696 and similar[0]["brand"] == "Armaf"
+
+        matches = snapshot.profile_search("pineapple, NOT lemon, woody >= 80")
+        assert matches["count"] == 1 and matches["perfumes"][0]["id"] == 9828
+        assert snapshot.manifest["clone_edges"] == 1
+        assert [(c["id"], c["hops"]) for c in snapshot.clone_family(9828)] == [(34696, 1)]
+        with pytest.raises(KeyError):
+            snapshot.clone_family(1)
+        filtered = snapshot.search("aventus clone", k=3, profile="cinnamon")
+        assert filtered and all(hit["doc_id"].startswith(PERFUMES[2]["url"]) for hit in filtered)
+        assert snapshot.search("aventus clone", k=3, profile="oud") == []
+        snapshot.close()
+
+    def test_publish_prunes_old_versions(self, tmp_path):
+        for version in ("v1", "v2", "v3"):
+            build(tmp_path, version, keep=2)
+        assert sorted(n for n in os.listdir(tmp_path) if n != CURRENT_FILE) == ["v2", "v3"]
+        with pytest.raises(FileNotFoundError):
+            publish_snapshot(str(tmp_path), "v9")
+        publish_snapshot(str(tmp_path), "v2")
+        assert current_version(str(tmp_path)) == "v2"
+
+    def test_unpublished_build(self, tmp_path):
+        build(tmp_path, "v1")
+        build(tmp_path, "v2", publish=False)
+        assert current_version(str(tmp_path)) == "v1" and (tmp_path / "v2").is_dir()
+
+
+class TestSnapshotManager:
+    def test_requires_a_snapshot(self, tmp_path):
+        manager = SnapshotManager(str(tmp_path))
+        assert manager.reload() is False
+        with pytest.raises(LookupError):
+            with manager.acquire():
+                pass
+
+    def test_hot_swap_waits_for_in_flight_requests(self, tmp_path, mocker):
+        build(tmp_path, "v1")
+        manager = SnapshotManager(str(tmp_path))
+        assert manager.reload() is True and manager.reload() is False
+
+        with manager.acquire() as old:
+            close = mocker.spy(old, "close")
+            build(tmp_path, "v2", perfumes=PERFUMES[:2])
+            assert manager.reload() is True
+            assert manager.current.version == "v2"
+            # The request that started on v1 keeps a working v1
+            assert old.version == "v1" and old.search("khamrah", k=1)
+            assert close.call_count == 0
+        assert close.call_count == 1
+
+        with manager.acquire() as snapshot:
+            assert snapshot.perfume(75805) is None
+        manager.close()
+        assert manager.current is None
+
+    @pytest.mark.asyncio
+    async def test_watch_picks_up_new_snapshots(self, tmp_path):
+        build(tmp_path, "v1")
+        manager = SnapshotManager(str(tmp_path), poll_interval=0.01)
+        watcher = asyncio.create_task(manager.watch())
+        for _ in range(200):
+            if manager.current is not None:
+                break
+            await asyncio.sleep(0.01)
+        assert manager.current.version == "v1"
+        watcher.cancel()
+        manager.close()
+
+
+class TestGatherContext:
+    @pytest.fixture
+    def snapshot(self, tmp_path):
+        build(tmp_path, "v1")
+        snapshot = Snapshot(str(tmp_path / "v1"))
+        yield snapshot
+        snapshot.close()
+
+    def test_sub_queries(self, snapshot):
+        assert snapshot.mention_search("Is Creed Aventus worth it?", 5) == [("reddit:p1:0", 0.0)]
+        accords = snapshot.accord_passages("Creed Aventus dupes", 2)
+        assert accords[0]["doc_id"] == "accords:" + PERFUMES[0]["url"]
+        assert "Club de Nuit Intense Man" in accords[0]["text"]
+        assert snapshot.passage_texts(["accords:https://example.com/unknown.html"]) == {}
+
+    @pytest.mark.asyncio
+    async def test_fuses_all_sub_queries(self, snapshot):
+        passages, stats = await gather_context(snapshot, "Creed Aventus clone", k=4, budget=5)
+        assert set(stats["timings_ms"]) == {"vector", "keyword", "mentions", "accords"} and stats["cut"] == []
+        assert passages[0]["doc_id"].startswith("accords:")
+        assert "reddit:p1:0" in [p["doc_id"] for p in passages] and all(p["text"] for p in passages)
+
+    @pytest.mark.asyncio
+    async def test_cuts_off_slow_sub_queries(self, snapshot, mocker):
+        def slow(*args):
+            time.sleep(0.3)
+            return [("never", 1.0)]
+
+        mocker.patch.object(snapshot, "mention_search", side_effect=slow)
+        mocker.patch.object(snapshot, "keyword_search", side_effect=RuntimeError("index gone"))
+        started = time.perf_counter()
+        passages, stats = await gather_context(snapshot, "smoky pineapple", k=3, budget=0.05)
+        assert time.perf_counter() - started < 0.25
+        assert stats["cut"] == ["mentions"] and "keyword" not in stats["timings_ms"]
+        assert passages and "never" not in [p["doc_id"] for p in passages]
+
+    @pytest.mark.asyncio
+    async def test_cut_sub_queries_keep_the_snapshot_pinned(self, tmp_path, mocker):
+        build(tmp_path, "v1")
+        manager = SnapshotManager(str(tmp_path))
+        manager.reload()
+        with manager.acquire() as snapshot:
+            close = mocker.spy(snapshot, "close")
+            mocker.patch.object(snapshot, "mention_search", side_effect=lambda *args: time.sleep(0.2) or [])
+            _, stats = await gather_context(snapshot, "smoky pineapple", k=3, budget=0.05, manager=manager)
+            assert stats["cut"] == ["mentions"]
+        build(tmp_path, "v2")
+        assert manager.reload() is True
+        # The request is over, but its abandoned thread may still be reading v1
+        assert close.call_count == 0
+        await asyncio.sleep(0.3)
+        assert close.call_count == 1 and "mentions" not in stats["timings_ms"]
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_at_least_one_sub_query(self, snapshot, mocker):
+        def slow(result):
+            def run(*args):
+                time.sleep(0.1)
+                return result
+            return run
+
+        for name in ("vector_search", "keyword_search", "mention_search"):
+            mocker.patch.object(snapshot, name, side_effect=slow([("reddit:p1:0", 1.0)]))
+        mocker.patch.object(snapshot, "accord_passages", side_effect=slow([]))
+        passages, stats = await gather_context(snapshot, "anything", k=3, budget=0.001)
+        assert [p["doc_id"] for p in passages] == ["reddit:p1:0"]
@@ -0,0 +1,26 @@
+import os
+
+from backend.versioning import CURRENT_FILE, current_version_dir, publish_version
+
+
+def stage(directory, content):
+    staging = directory / ".staging"
+    staging.mkdir()
+    (staging / "data.txt").write_text(content)
+    return str(staging)
+
+
+def test_unversioned_directory_is_its_own_version(tmp_path):
+    assert current_version_dir(str(tmp_path)) == str(tmp_path)
+
+
+def test_publish_switches_current_and_prunes(tmp_path):
+    published = []
+    for content in ("one", "two", "three"):
+        publish_version(str(tmp_path), stage(tmp_path, content), keep=2)
+        current = current_version_dir(str(tmp_path))
+        assert open(os.path.join(current, "data.txt")).read() == content
+        published.append(os.path.basename(current))
+
+    assert published == sorted(published) and not (tmp_path / ".staging").exists()
+    assert sorted(os.listdir(tmp_path)) == sorted([CURRENT_FILE] + published[1:])